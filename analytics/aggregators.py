@@ -0,0 +1,264 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+# Fields that may carry a course reference on submissions/results, in the
+# order the analyst views have always checked them.
+SUBMISSION_COURSE_FIELDS = ("course_code", "course_id", "course", "course_title", "code", "title", "name")
+RESULT_COURSE_FIELDS = ("course_code", "course_id", "course", "course_title")
+SUBMISSION_STUDENT_FIELDS = ("student_id", "studentId", "user_id", "userId", "student", "email", "student_email", "student_name", "name")
+RESULT_STUDENT_FIELDS = ("student_id", "user_id", "student_email", "email", "name")
+
+
+def to_float(v: Any) -> float:
+    try:
+        if v is None:
+            return 0.0
+        if isinstance(v, (int, float)):
+            return float(v)
+        s = str(v).strip().replace('%', '')
+        return float(s) if s else 0.0
+    except Exception:
+        return 0.0
+
+
+def first_present(doc: Dict[str, Any], fields: Iterable[str]) -> Any:
+    for f in fields:
+        v = doc.get(f)
+        if v:
+            return v
+    return None
+
+
+def _is_hex(s: str) -> bool:
+    try:
+        int(s, 16)
+        return True
+    except Exception:
+        return False
+
+
+def iter_chunks(cursor, size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CourseResolver:
+    """Resolve raw course references (ids, codes, titles) to course codes.
+
+    Same rules as the old per-document lookup, but unresolved values are
+    looked up together with two ``$in`` queries per batch and cached for the
+    lifetime of the resolver.
+    """
+
+    def __init__(self, mongo_db):
+        self.courses = mongo_db.courses
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def prime(self, raws: Iterable[Any]) -> None:
+        pending = set()
+        for raw in raws:
+            if not raw:
+                continue
+            s = str(raw).strip()
+            if s and s not in self._cache:
+                pending.add(s)
+        if not pending:
+            return
+        # 24-hex values are ObjectId references: resolve by _id only
+        by_oid = {s for s in pending if len(s) == 24 and _is_hex(s)}
+        if by_oid:
+            found = {}
+            for c in self.courses.find({"_id": {"$in": [ObjectId(s) for s in by_oid]}}, {"code": 1}):
+                found[str(c["_id"])] = c.get("code") or None
+            for s in by_oid:
+                self._cache[s] = found.get(s)
+        rest = list(pending - by_oid)
+        if not rest:
+            return
+        # Otherwise match raw string _id, then code, title, name (first wins)
+        matches: Dict[str, List[Optional[str]]] = {s: [None, None, None, None] for s in rest}
+        query = {"$or": [{f: {"$in": rest}} for f in ("_id", "code", "title", "name")]}
+        for c in self.courses.find(query, {"code": 1, "title": 1, "name": 1}):
+            for rank, f in enumerate(("_id", "code", "title", "name")):
+                v = c.get(f)
+                if isinstance(v, str) and v in matches and matches[v][rank] is None:
+                    matches[v][rank] = c.get("code") or ""
+        for s in rest:
+            code = next((m for m in matches[s] if m is not None), None)
+            if code:
+                self._cache[s] = code
+            else:
+                # Unresolved hex strings are dangling ids; anything else is already code-like
+                self._cache[s] = None if _is_hex(s) else s
+
+    def resolve(self, raw: Any) -> Optional[str]:
+        if not raw:
+            return None
+        s = str(raw).strip()
+        if not s:
+            return None
+        if s not in self._cache:
+            self.prime([s])
+        return self._cache.get(s)
+
+
+class StudentNameResolver:
+    """Batched replacement for per-student demographics/users lookups."""
+
+    def __init__(self, mongo_db):
+        self.demographics = mongo_db.demographics
+        self.users = mongo_db.users
+
+    def resolve_many(self, sids: Iterable[Any]) -> Dict[str, str]:
+        ids = list({str(s) for s in sids if s})
+        out: Dict[str, str] = {}
+        if not ids:
+            return out
+        for d in self.demographics.find({"$or": [{"student_id": {"$in": ids}}, {"studentId": {"$in": ids}}, {"email": {"$in": ids}}]}):
+            name = d.get("name") or d.get("full_name") or d.get("email")
+            if not name:
+                continue
+            for key in (d.get("student_id"), d.get("studentId"), d.get("email")):
+                if key is not None and str(key) in ids:
+                    out.setdefault(str(key), name)
+        pending = [s for s in ids if s not in out]
+        oids = [ObjectId(s) for s in pending if len(s) == 24 and ObjectId.is_valid(s)]
+        if oids:
+            for u in self.users.find({"_id": {"$in": oids}}, {"name": 1, "email": 1}):
+                out[str(u["_id"])] = u.get("name") or u.get("email") or str(u["_id"])
+        pending = [s for s in pending if s not in out]
+        if pending:
+            for u in self.users.find({"email": {"$in": pending}}, {"name": 1, "email": 1}):
+                out[u["email"]] = u.get("name") or u.get("email")
+        for s in ids:
+            out.setdefault(s, s)
+        return out
+
+
+class CoursePerformanceAccumulator:
+    """Single pass over submissions and results feeding the analyst views.
+
+    Builds both the per-course average percentage from submissions (the
+    "upcoming performance" table) and the per-course, per-student marks used
+    by the interactive charts, resolving course references in batches.
+    """
+
+    def __init__(self, mongo_db, batch_size: int = 1000):
+        self.db = mongo_db
+        self.batch_size = batch_size
+        self.resolver = CourseResolver(mongo_db)
+        # code -> [sum, count] from submissions
+        self.course_pct: Dict[str, List[float]] = {}
+        # COURSE -> sid -> [sum, count] from submissions and results
+        self.marks: Dict[str, Dict[str, List[float]]] = {}
+        self.course_labels: Dict[str, str] = {}
+        self.display_overrides: Dict[str, Dict[str, str]] = {}
+
+    def _add_mark(self, course_code: str, sid: str, pct: float, disp_hint: Any, prefer_existing_label: bool) -> None:
+        course_id = str(course_code).strip().upper()
+        if prefer_existing_label:
+            self.course_labels.setdefault(course_id, course_code)
+        else:
+            self.course_labels[course_id] = course_code
+        if disp_hint:
+            self.display_overrides.setdefault(course_id, {})[sid] = str(disp_hint)
+        if course_id and sid and pct > 0:
+            acc = self.marks.setdefault(course_id, {}).setdefault(sid, [0.0, 0])
+            acc[0] += pct
+            acc[1] += 1
+
+    def feed_submissions(self, cursor) -> None:
+        for chunk in iter_chunks(cursor, self.batch_size):
+            self.resolver.prime(first_present(d, SUBMISSION_COURSE_FIELDS) for d in chunk)
+            for doc in chunk:
+                course_code = self.resolver.resolve(first_present(doc, SUBMISSION_COURSE_FIELDS))
+                if not course_code:
+                    continue
+                score = to_float(doc.get("score"))
+                total = to_float(doc.get("total_marks"))
+                pct = (score / total * 100.0) if total > 0 else score
+                if pct > 0:
+                    acc = self.course_pct.setdefault(course_code, [0.0, 0])
+                    acc[0] += pct
+                    acc[1] += 1
+                sid = str(first_present(doc, SUBMISSION_STUDENT_FIELDS) or "Unknown")
+                disp_hint = doc.get("student_name") or doc.get("name") or doc.get("email") or doc.get("student_email")
+                self._add_mark(course_code, sid, pct, disp_hint, prefer_existing_label=False)
+
+    def feed_results(self, cursor) -> None:
+        # results already hold a 0..100 score
+        for chunk in iter_chunks(cursor, self.batch_size):
+            self.resolver.prime(first_present(d, RESULT_COURSE_FIELDS) for d in chunk)
+            for doc in chunk:
+                course_code = self.resolver.resolve(first_present(doc, RESULT_COURSE_FIELDS))
+                if not course_code:
+                    continue
+                sid = str(first_present(doc, RESULT_STUDENT_FIELDS) or "Unknown")
+                disp_hint = doc.get("name") or doc.get("email") or doc.get("student_email")
+                self._add_mark(course_code, sid, to_float(doc.get("score")), disp_hint, prefer_existing_label=True)
+
+    def course_averages(self, limit: int = 20) -> List[Dict[str, Any]]:
+        items = [{"course": c, "predicted_avg": round(s / max(1, n), 1)} for c, (s, n) in self.course_pct.items() if n]
+        return sorted(items, key=lambda x: x.get("predicted_avg", 0), reverse=True)[:limit]
+
+    def top_marks(self, per_course: int = 20) -> Tuple[Dict[str, Dict[str, List[Any]]], Dict[str, str]]:
+        """Return ``(course_marks, course_labels)`` with the top students per course.
+
+        Names are only resolved for students that make the cut, in one batch.
+        """
+        top: Dict[str, List[Tuple[str, float]]] = {}
+        need_names = set()
+        for course_id, by_student in self.marks.items():
+            vals = [(sid, round(s / max(1, n), 1)) for sid, (s, n) in by_student.items() if n]
+            vals = sorted(vals, key=lambda x: x[1], reverse=True)[:per_course]
+            top[course_id] = vals
+            hints = self.display_overrides.get(course_id, {})
+            need_names.update(sid for sid, _ in vals if not hints.get(sid))
+        names = StudentNameResolver(self.db).resolve_many(need_names)
+        course_marks: Dict[str, Dict[str, List[Any]]] = {}
+        for course_id, vals in top.items():
+            if not vals or not (self.course_labels.get(course_id) or "").strip():
+                continue
+            hints = self.display_overrides.get(course_id, {})
+            course_marks[course_id] = {
+                "labels": [prettify_student_label(sid, hints.get(sid) or names.get(sid)) for sid, _ in vals],
+                "values": [v for _, v in vals],
+            }
+        labels = {cid: lbl for cid, lbl in self.course_labels.items() if cid in course_marks}
+        return course_marks, labels
+
+
+def prettify_student_label(sid: Any, disp: Any) -> str:
+    try:
+        label = (disp or "").strip()
+        if not label:
+            label = str(sid)
+        # If still looks like a 24-hex ObjectId, shorten
+        s = str(label)
+        if len(s) == 24 and _is_hex(s):
+            return f"ID …{s[-6:]}"
+        return label
+    except Exception:
+        return str(disp or sid)
+
+
+def enrollment_course_counts(mongo_db, batch_size: int = 1000) -> Dict[str, int]:
+    resolver = CourseResolver(mongo_db)
+    counts: Dict[str, int] = {}
+    cursor = mongo_db.enrollments.find({"status": {"$ne": "dropped"}}, {"course_id": 1, "course_code": 1})
+    for chunk in iter_chunks(cursor, batch_size):
+        resolver.prime(e.get("course_code") or e.get("course_id") for e in chunk)
+        for e in chunk:
+            code = resolver.resolve(e.get("course_code") or e.get("course_id"))
+            if not code:
+                continue
+            key = str(code).strip().upper()
+            counts[key] = counts.get(key, 0) + 1
+    return counts
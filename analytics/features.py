@@ -0,0 +1,292 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from analytics.risk import result_pct_expr
+from db.ids import ref_values
+from db.indexes import ensure_indexes, ensure_indexes_on
+from ingestion.rollups import parse_event_time
+
+# Per-student feature store. Each document keeps the raw components for one
+# student_id (attendance counts, result sums, assignment counts, LMS activity,
+# demographics); feature vectors are derived from them on read so every
+# component can be refreshed independently as its source collection changes.
+FEATURE_COLLECTION = "student_features"
+# rebuild_features writes here, then renames it over FEATURE_COLLECTION
+REBUILD_COLLECTION = "student_features_rebuild"
+
+# Column names follow the analyst training CSVs so stored features can be
+# mixed with uploaded label files and existing models.
+FEATURE_COLUMNS = [
+    "Age",
+    "Gender",
+    "Attendance_Percentage",
+    "Assignment_Completion",
+    "Test_Score",
+    "LMS_Event_Count",
+    "LMS_Active_Days",
+]
+
+COMPONENTS = ("attendance", "results", "assignments", "lms")
+
+
+def get_feature_collection(mongo_db):
+    return mongo_db[FEATURE_COLLECTION]
+
+
+def ensure_feature_indexes(mongo_db) -> None:
+    # lms_events carries the (student_id, event_time) index the LMS component refresh uses
+    ensure_indexes(mongo_db, [FEATURE_COLLECTION, "lms_events"])
+
+
+def _clean_ids(student_ids: Iterable[Any]) -> List[str]:
+    return list({str(s) for s in student_ids if s not in (None, "")})
+
+
+def _write(mongo_db, sets: Dict[str, Dict[str, Any]], unsets: Optional[Dict[str, List[str]]] = None,
+           collection=None) -> int:
+    now = datetime.utcnow()
+    ops = []
+    for sid, fields in sets.items():
+        update: Dict[str, Any] = {"$set": dict(fields, updated_at=now)}
+        ops.append(UpdateOne({"student_id": sid}, update, upsert=True))
+    for sid, paths in (unsets or {}).items():
+        if sid in sets or not paths:
+            continue
+        ops.append(UpdateOne({"student_id": sid}, {"$unset": {p: "" for p in paths}, "$set": {"updated_at": now}}))
+    if ops:
+        (collection if collection is not None else get_feature_collection(mongo_db)).bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def refresh_attendance_component(mongo_db, student_ids: Iterable[Any], collection=None) -> int:
+    ids = _clean_ids(student_ids)
+    if not ids:
+        return 0
+    sets = {}
+    for d in mongo_db.attendance.aggregate([
+        {"$match": {"student_id": {"$in": ref_values(ids)}}},
+        {"$group": {
+            "_id": {"$toString": "$student_id"},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+    ]):
+        sets[str(d["_id"])] = {"attendance": {"present": int(d.get("present") or 0), "total": int(d.get("total") or 0)}}
+    return _write(mongo_db, sets, {sid: ["attendance"] for sid in ids}, collection=collection)
+
+
+def refresh_results_component(mongo_db, student_ids: Iterable[Any], collection=None) -> int:
+    ids = _clean_ids(student_ids)
+    if not ids:
+        return 0
+    sets = {}
+    for d in mongo_db.results.aggregate([
+        {"$match": {"student_id": {"$in": ref_values(ids)}}},
+        {"$project": {"student_id": 1, "pct": result_pct_expr()}},
+        {"$match": {"pct": {"$ne": None}}},
+        {"$group": {"_id": {"$toString": "$student_id"}, "sum": {"$sum": "$pct"}, "n": {"$sum": 1}}},
+    ]):
+        sets[str(d["_id"])] = {"results": {"sum": float(d.get("sum") or 0.0), "n": int(d.get("n") or 0)}}
+    return _write(mongo_db, sets, {sid: ["results"] for sid in ids}, collection=collection)
+
+
+def refresh_assignments_component(mongo_db, student_ids: Iterable[Any], collection=None) -> int:
+    ids = _clean_ids(student_ids)
+    if not ids:
+        return 0
+    # Assignments posted in each student's active courses
+    student_courses: Dict[str, set] = defaultdict(set)
+    for e in mongo_db.enrollments.find({"user_id": {"$in": ref_values(ids)}, "status": {"$ne": "dropped"}}, {"user_id": 1, "course_id": 1}):
+        if e.get("course_id") is not None:
+            student_courses[str(e["user_id"])].add(e["course_id"])
+    all_courses = list({c for cs in student_courses.values() for c in cs})
+    per_course: Dict[Any, int] = {}
+    if all_courses:
+        for d in mongo_db.assignments.aggregate([
+            {"$match": {"course_id": {"$in": all_courses}}},
+            {"$group": {"_id": "$course_id", "n": {"$sum": 1}}},
+        ]):
+            per_course[d["_id"]] = int(d.get("n") or 0)
+    submitted: Dict[str, int] = {}
+    for d in mongo_db.submissions.aggregate([
+        {"$match": {"student_id": {"$in": ref_values(ids)}}},
+        {"$group": {"_id": {"$toString": "$student_id"}, "assignments": {"$addToSet": {"$toString": "$assignment_id"}}}},
+        {"$project": {"n": {"$size": "$assignments"}}},
+    ]):
+        submitted[str(d["_id"])] = int(d.get("n") or 0)
+    sets = {}
+    for sid in ids:
+        assigned = sum(per_course.get(c, 0) for c in student_courses.get(sid, ()))
+        if assigned or submitted.get(sid):
+            sets[sid] = {"assignments": {"submitted": submitted.get(sid, 0), "assigned": assigned}}
+    return _write(mongo_db, sets, {sid: ["assignments"] for sid in ids}, collection=collection)
+
+
+def refresh_lms_component(mongo_db, student_ids: Iterable[Any], collection=None) -> int:
+    ids = _clean_ids(student_ids)
+    if not ids:
+        return 0
+    events: Dict[str, int] = defaultdict(int)
+    days: Dict[str, set] = defaultdict(set)
+    for ev in mongo_db.lms_events.find({"student_id": {"$in": ref_values(ids)}}, {"student_id": 1, "event_time": 1, "_id": 0}):
+        sid = str(ev.get("student_id"))
+        events[sid] += 1
+        dt = parse_event_time(ev.get("event_time"))
+        if dt is not None:
+            days[sid].add(dt.date().isoformat())
+    sets = {sid: {"lms": {"events": n, "days": sorted(days.get(sid, ()))}} for sid, n in events.items()}
+    return _write(mongo_db, sets, {sid: ["lms"] for sid in ids}, collection=collection)
+
+
+def record_lms_activity(mongo_db, events: Iterable[Dict[str, Any]]) -> int:
+    """Fold freshly inserted LMS events into the store without rescanning history."""
+    counts: Dict[str, int] = defaultdict(int)
+    days: Dict[str, set] = defaultdict(set)
+    for ev in events:
+        sid = ev.get("student_id")
+        if sid in (None, ""):
+            continue
+        sid = str(sid)
+        counts[sid] += 1
+        dt = parse_event_time(ev.get("event_time"))
+        if dt is not None:
+            days[sid].add(dt.date().isoformat())
+    now = datetime.utcnow()
+    ops = []
+    for sid, n in counts.items():
+        update: Dict[str, Any] = {"$inc": {"lms.events": n}, "$set": {"updated_at": now}}
+        if days.get(sid):
+            update["$addToSet"] = {"lms.days": {"$each": sorted(days[sid])}}
+        ops.append(UpdateOne({"student_id": sid}, update, upsert=True))
+    if ops:
+        get_feature_collection(mongo_db).bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def record_demographics(mongo_db, records: Iterable[Dict[str, Any]], collection=None) -> int:
+    sets = {}
+    for rec in records:
+        sid = rec.get("student_id")
+        if sid in (None, ""):
+            continue
+        sets[str(sid)] = {"demographics": {"gender": rec.get("gender"), "dob": rec.get("dob")}}
+    return _write(mongo_db, sets, collection=collection)
+
+
+def refresh_student_features(mongo_db, student_ids: Iterable[Any], components: Iterable[str] = COMPONENTS) -> None:
+    ids = _clean_ids(student_ids)
+    if not ids:
+        return
+    comps = set(components)
+    if "attendance" in comps:
+        refresh_attendance_component(mongo_db, ids)
+    if "results" in comps:
+        refresh_results_component(mongo_db, ids)
+    if "assignments" in comps:
+        refresh_assignments_component(mongo_db, ids)
+    if "lms" in comps:
+        refresh_lms_component(mongo_db, ids)
+
+
+def refresh_course_students(mongo_db, course_id: Any, components: Iterable[str] = ("assignments",)) -> None:
+    # Assignments added/removed on a course change every enrolled student's completion rate
+    ids = mongo_db.enrollments.distinct("user_id", {"course_id": course_id, "status": {"$ne": "dropped"}})
+    refresh_student_features(mongo_db, ids, components)
+
+
+def _age(dob: Any) -> Optional[float]:
+    if not dob:
+        return None
+    try:
+        born = datetime.fromisoformat(str(dob)).date()
+    except Exception:
+        return None
+    today = date.today()
+    return float(today.year - born.year - ((today.month, today.day) < (born.month, born.day)))
+
+
+def feature_vector(doc: Dict[str, Any]) -> Dict[str, Any]:
+    att = doc.get("attendance") or {}
+    res = doc.get("results") or {}
+    asg = doc.get("assignments") or {}
+    lms = doc.get("lms") or {}
+    demo = doc.get("demographics") or {}
+    return {
+        "Age": _age(demo.get("dob")),
+        "Gender": (str(demo["gender"]).strip().title() if demo.get("gender") else None),
+        "Attendance_Percentage": round(att["present"] / att["total"] * 100.0, 2) if att.get("total") else None,
+        "Assignment_Completion": round(min(100.0, asg.get("submitted", 0) / asg["assigned"] * 100.0), 2) if asg.get("assigned") else None,
+        "Test_Score": round(res["sum"] / res["n"], 2) if res.get("n") else None,
+        "LMS_Event_Count": int(lms.get("events") or 0),
+        "LMS_Active_Days": len(lms.get("days") or []),
+    }
+
+
+def get_features(mongo_db, student_ids: Optional[Iterable[Any]] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Feature rows (``{"student_id": ..., <FEATURE_COLUMNS>}``) for the given students, or all."""
+    q: Dict[str, Any] = {}
+    if student_ids is not None:
+        q["student_id"] = {"$in": _clean_ids(student_ids)}
+    cur = get_feature_collection(mongo_db).find(q).sort("student_id", 1)
+    if limit:
+        cur = cur.limit(int(limit))
+    return [dict(student_id=d["student_id"], **feature_vector(d)) for d in cur]
+
+
+def _grouped_ids(collection, field: str) -> Iterable[str]:
+    for d in collection.aggregate([{"$group": {"_id": {"$toString": f"${field}"}}}], allowDiskUse=True):
+        if d.get("_id") not in (None, ""):
+            yield str(d["_id"])
+
+
+def rebuild_features(mongo_db, chunk_size: int = 1000) -> Dict[str, Any]:
+    """Recompute every component from its source collection, chunk by chunk.
+
+    The store is rebuilt in a staging collection and renamed over the live one,
+    so readers (/api/analyst/features, model scoring) keep the old rows until
+    the new set is complete. Students whose live row changed meanwhile are
+    refreshed again after the swap.
+    """
+    started = datetime.utcnow()
+    staging = mongo_db[REBUILD_COLLECTION]
+    staging.drop()
+    ensure_indexes_on(mongo_db, FEATURE_COLLECTION, REBUILD_COLLECTION)
+    sources = [
+        ("attendance", mongo_db.attendance, "student_id", refresh_attendance_component),
+        ("results", mongo_db.results, "student_id", refresh_results_component),
+        ("assignments", mongo_db.enrollments, "user_id", refresh_assignments_component),
+        ("assignments", mongo_db.submissions, "student_id", refresh_assignments_component),
+        ("lms", mongo_db.lms_events, "student_id", refresh_lms_component),
+    ]
+    for _, collection, field, refresh in sources:
+        chunk: List[str] = []
+        for sid in _grouped_ids(collection, field):
+            chunk.append(sid)
+            if len(chunk) >= chunk_size:
+                refresh(mongo_db, chunk, collection=staging)
+                chunk = []
+        if chunk:
+            refresh(mongo_db, chunk, collection=staging)
+    demo_written = 0
+    batch: List[Dict[str, Any]] = []
+    for d in mongo_db.demographics.find({}, {"student_id": 1, "gender": 1, "dob": 1, "_id": 0}):
+        batch.append(d)
+        if len(batch) >= chunk_size:
+            demo_written += record_demographics(mongo_db, batch, collection=staging)
+            batch = []
+    if batch:
+        demo_written += record_demographics(mongo_db, batch, collection=staging)
+
+    # Incremental updates since the start went to the live rows the rename drops
+    changed = get_feature_collection(mongo_db).distinct("student_id", {"updated_at": {"$gte": started}})
+    staging.rename(FEATURE_COLLECTION, dropTarget=True)
+    for i in range(0, len(changed), chunk_size):
+        ids = changed[i:i + chunk_size]
+        refresh_student_features(mongo_db, ids)
+        record_demographics(mongo_db, mongo_db.demographics.find(
+            {"student_id": {"$in": ref_values(ids)}}, {"student_id": 1, "gender": 1, "dob": 1, "_id": 0}))
+    return {"students": get_feature_collection(mongo_db).count_documents({}), "demographics": demo_written,
+            "refreshed_after_swap": len(changed)}
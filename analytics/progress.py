@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from db.ids import ref, ref_values
+
+# Per-course result averages shown on /student/progress, computed in Mongo and
+# cached per student in ``student_progress``. A grade write bumps the
+# student's version and drops the cached courses; a reader only stores what it
+# computed if the version it started from is still current, so a recompute
+# racing a grade write never caches the old numbers.
+PROGRESS_COLLECTION = "student_progress"
+
+# Bands used for the chart colours and the cohort distribution
+HIGH_PCT = 80.0
+PASS_PCT = 50.0
+
+
+def get_progress_collection(mongo_db):
+    return mongo_db[PROGRESS_COLLECTION]
+
+
+def _to_double(expr: Any) -> Dict[str, Any]:
+    return {"$convert": {"input": expr, "to": "double", "onError": None, "onNull": None}}
+
+
+def _blank(expr: Any) -> Dict[str, Any]:
+    return {"$eq": [{"$ifNull": [expr, ""]}, ""]}
+
+
+def progress_pct_expr() -> Dict[str, Any]:
+    # marks_obtained / total_marks as a percentage; marks without a total are
+    # already a percentage; an unparseable or non-positive total gives null
+    return {"$let": {
+        "vars": {"mo": _to_double("$marks_obtained"), "tm": _to_double("$total_marks")},
+        "in": {"$cond": [
+            {"$eq": ["$$mo", None]},
+            None,
+            {"$cond": [
+                _blank("$total_marks"),
+                "$$mo",
+                {"$cond": [{"$gt": ["$$tm", 0]}, {"$multiply": [{"$divide": ["$$mo", "$$tm"]}, 100]}, None]},
+            ]},
+        ]},
+    }}
+
+
+def _graded_stages(match: Dict[str, Any], courses: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+    course_match: Dict[str, Any] = {"$nin": [None, ""]} if courses is None else {"$in": courses}
+    return [
+        {"$match": match},
+        {"$project": {
+            "student_id": {"$toString": "$student_id"},
+            # Legacy rows hold the code in course_id
+            "course": {"$cond": [_blank("$course_code"), "$course_id", "$course_code"]},
+            "pct": progress_pct_expr(),
+        }},
+        {"$match": {"pct": {"$ne": None}, "course": course_match}},
+    ]
+
+
+def band(pct: float) -> str:
+    if pct >= HIGH_PCT:
+        return "high"
+    if pct >= PASS_PCT:
+        return "pass"
+    return "low"
+
+
+def compute_student_progress(mongo_db, student_id: Any) -> List[Dict[str, Any]]:
+    """Average percentage per course for one student, in the order the courses were first graded."""
+    pipeline = _graded_stages({"student_id": ref(student_id)}) + [
+        {"$group": {"_id": "$course", "sum": {"$sum": "$pct"}, "n": {"$sum": 1}, "first": {"$min": "$_id"}}},
+        {"$sort": {"first": 1}},
+    ]
+    return [{"course": str(d["_id"]), "avg": round(d["sum"] / d["n"], 2), "n": d["n"]}
+            for d in mongo_db.results.aggregate(pipeline)]
+
+
+def get_student_progress(mongo_db, student_id: Any) -> List[Dict[str, Any]]:
+    """Cached per-course averages for one student, recomputed after a grade write."""
+    sid = str(student_id)
+    col = get_progress_collection(mongo_db)
+    cached = col.find_one({"student_id": sid})
+    if cached is not None and cached.get("courses") is not None:
+        return cached["courses"]
+    version = (cached or {}).get("version", 0)
+    courses = compute_student_progress(mongo_db, student_id)
+    try:
+        col.update_one(
+            {"student_id": sid, "version": version},
+            {"$set": {"courses": courses, "computed_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # A grade was written meanwhile; leave the row for the next reader
+        pass
+    return courses
+
+
+def invalidate_student_progress(mongo_db, student_ids: Iterable[Any]) -> None:
+    ids = list({str(s) for s in student_ids if s not in (None, "")})
+    if not ids:
+        return
+    col = get_progress_collection(mongo_db)
+    for sid in ids:
+        col.update_one({"student_id": sid}, {"$inc": {"version": 1}, "$unset": {"courses": ""}}, upsert=True)
+
+
+def cohort_progress(mongo_db, student_ids: Iterable[Any], course_keys: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+    """Per-course distribution of student averages for a class, in one aggregation.
+
+    ``course_keys`` (course codes and/or course ids) limits the courses reported.
+    """
+    match: Dict[str, Any] = {"student_id": {"$in": ref_values(student_ids)}}
+    keys = None
+    if course_keys is not None:
+        keys = [k for k in course_keys if k not in (None, "")]
+        match["$or"] = [{"course_code": {"$in": keys}}, {"course_id": {"$in": keys}}]
+    pipeline = _graded_stages(match, keys) + [
+        {"$group": {"_id": {"course": "$course", "student_id": "$student_id"}, "avg": {"$avg": "$pct"}}},
+        {"$group": {
+            "_id": "$_id.course",
+            "students": {"$sum": 1},
+            "mean": {"$avg": "$avg"},
+            "min": {"$min": "$avg"},
+            "max": {"$max": "$avg"},
+            "high": {"$sum": {"$cond": [{"$gte": ["$avg", HIGH_PCT]}, 1, 0]}},
+            "pass": {"$sum": {"$cond": [{"$and": [{"$gte": ["$avg", PASS_PCT]}, {"$lt": ["$avg", HIGH_PCT]}]}, 1, 0]}},
+            "low": {"$sum": {"$cond": [{"$lt": ["$avg", PASS_PCT]}, 1, 0]}},
+            "averages": {"$push": "$avg"},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
+    out = []
+    for d in mongo_db.results.aggregate(pipeline):
+        out.append({
+            "course": str(d["_id"]),
+            "students": d["students"],
+            "mean": round(d["mean"], 2),
+            "min": round(d["min"], 2),
+            "max": round(d["max"], 2),
+            "bands": {"high": d["high"], "pass": d["pass"], "low": d["low"]},
+            "averages": sorted(round(v, 2) for v in d["averages"]),
+        })
+    return out
@@ -0,0 +1,224 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, ReplaceOne
+
+from db.ids import ref_values
+from db.indexes import ensure_indexes, ensure_indexes_on
+
+# Materialized per-student risk table. One document per student_id with the
+# attendance rate, average result percentage, per-course averages and the
+# at-risk flag shown on the analyst predictions page.
+RISK_COLLECTION = "student_risk"
+REBUILD_COLLECTION = "student_risk_rebuild"
+ATTENDANCE_RISK_THRESHOLD = 0.75
+SCORE_RISK_THRESHOLD = 60.0
+
+
+def get_risk_collection(mongo_db):
+    return mongo_db[RISK_COLLECTION]
+
+
+def ensure_risk_indexes(mongo_db) -> None:
+    ensure_indexes(mongo_db, [RISK_COLLECTION])
+
+
+def _to_double(expr: Any) -> Dict[str, Any]:
+    return {"$convert": {"input": expr, "to": "double", "onError": None, "onNull": None}}
+
+
+def result_pct_expr() -> Dict[str, Any]:
+    # Percentage for one results document: numeric `score` when present,
+    # otherwise marks_obtained / total_marks, otherwise marks_obtained as-is
+    # (grades entered without a total are treated as percentages already).
+    return {"$let": {
+        "vars": {
+            "score": _to_double("$score"),
+            "mo": _to_double("$marks_obtained"),
+            "tm": _to_double("$total_marks"),
+        },
+        "in": {"$cond": [
+            {"$ne": ["$$score", None]},
+            "$$score",
+            {"$cond": [
+                {"$and": [{"$ne": ["$$mo", None]}, {"$gt": ["$$tm", 0]}]},
+                {"$multiply": [{"$divide": ["$$mo", "$$tm"]}, 100]},
+                "$$mo",
+            ]},
+        ]},
+    }}
+
+
+def _attendance_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$group": {
+            # Same grouping as _results_pipeline: string and ObjectId ids of one student merge
+            "_id": {"$toString": "$student_id"},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "total": {"$sum": 1},
+        }},
+    ]
+
+
+def _results_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$project": {
+            "student_id": 1,
+            "course": {"$ifNull": ["$course_code", "$course_id"]},
+            "pct": result_pct_expr(),
+        }},
+        {"$match": {"pct": {"$ne": None}}},
+        {"$group": {
+            # Legacy string and canonical ObjectId ids of one student land in the same group
+            "_id": {"student_id": {"$toString": "$student_id"}, "course": "$course"},
+            "sum": {"$sum": "$pct"},
+            "n": {"$sum": 1},
+        }},
+    ]
+
+
+def _display_names(mongo_db, student_ids: List[str]) -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    for d in mongo_db.demographics.find(
+        {"$or": [{"student_id": {"$in": student_ids}}, {"studentId": {"$in": student_ids}}]},
+        {"student_id": 1, "studentId": 1, "name": 1, "full_name": 1, "first_name": 1, "last_name": 1, "email": 1},
+    ):
+        sid = str(d.get("student_id") or d.get("studentId"))
+        full = " ".join(p for p in (d.get("first_name"), d.get("last_name")) if p)
+        name = d.get("name") or d.get("full_name") or full or d.get("email")
+        if name:
+            names[sid] = str(name)
+    # Students graded in-app are keyed by their users _id
+    oids = []
+    for sid in student_ids:
+        if sid not in names and ObjectId.is_valid(sid):
+            oids.append(ObjectId(sid))
+    if oids:
+        for u in mongo_db.users.find({"_id": {"$in": oids}}, {"name": 1, "email": 1}):
+            names[str(u["_id"])] = u.get("name") or u.get("email")
+    return names
+
+
+def compute_student_risk(mongo_db, student_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    ids = [str(s) for s in {s for s in student_ids if s not in (None, "")}]
+    if not ids:
+        return {}
+    match = {"student_id": {"$in": ref_values(ids)}}
+    docs: Dict[str, Dict[str, Any]] = {}
+
+    def doc_for(sid: str) -> Dict[str, Any]:
+        return docs.setdefault(sid, {"student_id": sid, "present": 0, "total": 0, "score_sum": 0.0, "score_n": 0, "courses": {}})
+
+    for d in mongo_db.attendance.aggregate(_attendance_pipeline(match)):
+        doc = doc_for(str(d["_id"]))
+        doc["present"] += int(d.get("present") or 0)
+        doc["total"] += int(d.get("total") or 0)
+    for d in mongo_db.results.aggregate(_results_pipeline(match)):
+        g = d.get("_id") or {}
+        doc = doc_for(str(g.get("student_id")))
+        doc["score_sum"] += float(d.get("sum") or 0.0)
+        doc["score_n"] += int(d.get("n") or 0)
+        course = g.get("course")
+        if course not in (None, ""):
+            c = doc["courses"].setdefault(str(course), [0.0, 0])
+            c[0] += float(d.get("sum") or 0.0)
+            c[1] += int(d.get("n") or 0)
+
+    names = _display_names(mongo_db, list(docs.keys()))
+    now = datetime.utcnow()
+    out: Dict[str, Dict[str, Any]] = {}
+    for sid, doc in docs.items():
+        rate = (doc["present"] / doc["total"]) if doc["total"] else None
+        avg = (doc["score_sum"] / doc["score_n"]) if doc["score_n"] else None
+        # Only students with attendance history are flagged, as before
+        at_risk = rate is not None and (rate < ATTENDANCE_RISK_THRESHOLD or (avg is not None and avg < SCORE_RISK_THRESHOLD))
+        out[sid] = {
+            "student_id": sid,
+            "name": names.get(sid) or "Unknown",
+            "present": doc["present"],
+            "attendance_total": doc["total"],
+            "attendance_rate": round(rate, 4) if rate is not None else None,
+            "avg_score": round(avg, 2) if avg is not None else None,
+            "score_count": doc["score_n"],
+            "course_avgs": {k: round(v[0] / v[1], 2) for k, v in doc["courses"].items() if v[1]},
+            "at_risk": bool(at_risk),
+            "updated_at": now,
+        }
+    return out
+
+
+def refresh_student_risk(mongo_db, student_ids: Iterable[Any], collection=None) -> int:
+    """Recompute the risk rows for the given students from their source rows.
+
+    Students that no longer have any attendance or results lose their row.
+    ``collection`` defaults to the live table (rebuilds pass their staging copy).
+    """
+    ids = list({str(s) for s in student_ids if s not in (None, "")})
+    if not ids:
+        return 0
+    computed = compute_student_risk(mongo_db, ids)
+    ops = []
+    for sid in ids:
+        doc = computed.get(sid)
+        if doc is None:
+            ops.append(DeleteOne({"student_id": sid}))
+            continue
+        ops.append(ReplaceOne({"student_id": sid}, doc, upsert=True))
+    (get_risk_collection(mongo_db) if collection is None else collection).bulk_write(ops, ordered=False)
+    return len(computed)
+
+
+def _grouped_student_ids(collection) -> Iterable[str]:
+    for d in collection.aggregate([{"$group": {"_id": {"$toString": "$student_id"}}}], allowDiskUse=True):
+        if d.get("_id") not in (None, ""):
+            yield str(d["_id"])
+
+
+def rebuild_student_risk(mongo_db, chunk_size: int = 1000) -> Dict[str, Any]:
+    """Rebuild the whole table in bounded chunks of students.
+
+    Rows are written to a staging collection that is renamed over the live
+    one, so top_at_risk keeps reading the old rows until the new set is
+    complete. Students refreshed meanwhile are refreshed again after the swap.
+    """
+    started = datetime.utcnow()
+    staging = mongo_db[REBUILD_COLLECTION]
+    staging.drop()
+    ensure_indexes_on(mongo_db, RISK_COLLECTION, REBUILD_COLLECTION)
+    refreshed = 0
+
+    def flush(chunk: List[str]) -> int:
+        # Students with both attendance and results are written by the first pass
+        done = {d["student_id"] for d in staging.find({"student_id": {"$in": chunk}}, {"student_id": 1})}
+        todo = [s for s in chunk if s not in done]
+        return refresh_student_risk(mongo_db, todo, collection=staging) if todo else 0
+
+    for source in (mongo_db.attendance, mongo_db.results):
+        chunk: List[str] = []
+        for sid in _grouped_student_ids(source):
+            chunk.append(sid)
+            if len(chunk) >= chunk_size:
+                refreshed += flush(chunk)
+                chunk = []
+        if chunk:
+            refreshed += flush(chunk)
+
+    # Incremental refreshes since the start went to the live rows the rename drops
+    changed = get_risk_collection(mongo_db).distinct("student_id", {"updated_at": {"$gte": started}})
+    staging.rename(RISK_COLLECTION, dropTarget=True)
+    for i in range(0, len(changed), chunk_size):
+        refresh_student_risk(mongo_db, changed[i:i + chunk_size])
+    return {"students": refreshed, "refreshed_after_swap": len(changed)}
+
+
+def top_at_risk(mongo_db, limit: int = 50) -> List[Dict[str, Any]]:
+    cur = get_risk_collection(mongo_db).find({"at_risk": True}).sort([("avg_score", 1), ("attendance_rate", 1)]).limit(int(limit))
+    return [{
+        "student_id": d.get("student_id"),
+        "attendance_rate": round((d.get("attendance_rate") or 0) * 100, 1),
+        "avg_score": round(d["avg_score"], 1) if d.get("avg_score") is not None else None,
+        "name": d.get("name") or "Unknown",
+    } for d in cur]
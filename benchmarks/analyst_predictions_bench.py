@@ -0,0 +1,152 @@
+"""Benchmark the analyst predictions submission/result accumulation.
+
+Seeds a scratch database on a local mongod with N submissions (plus results
+and courses), then times the old two-pass, per-document course resolution
+against the single-pass CoursePerformanceAccumulator and counts the Mongo
+commands each one issues.
+
+    python benchmarks/analyst_predictions_bench.py --submissions 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient, monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.aggregators import CoursePerformanceAccumulator, to_float  # noqa: E402
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(db, n_submissions, n_courses, n_students):
+    for name in ("courses", "submissions", "results", "demographics", "users"):
+        db[name].drop()
+    course_docs = [{"_id": ObjectId(), "code": f"CS{100 + i}", "title": f"Course {i}", "active": True} for i in range(n_courses)]
+    db.courses.insert_many(course_docs)
+    db.courses.create_index("code", unique=True)
+    students = [str(ObjectId()) for _ in range(n_students)]
+    batch = []
+    for i in range(n_submissions):
+        c = random.choice(course_docs)
+        # Mix of denormalized codes, ObjectId strings and legacy titles like real data
+        ref = random.choice([{"course_code": c["code"]}, {"course_id": str(c["_id"])}, {"course_title": c["title"]}])
+        doc = {"student_id": random.choice(students), "score": str(random.randint(1, 50)), "total_marks": "50"}
+        doc.update(ref)
+        batch.append(doc)
+        if len(batch) >= 10000:
+            db.submissions.insert_many(batch)
+            batch = []
+    if batch:
+        db.submissions.insert_many(batch)
+    results = [{"student_id": random.choice(students), "course_id": random.choice(course_docs)["code"], "score": random.randint(30, 100)}
+               for _ in range(n_submissions // 4)]
+    if results:
+        db.results.insert_many(results)
+
+
+def legacy(db):
+    """Reference copy of the previous per-document implementation."""
+    courses = db.courses
+
+    def resolve_course_code(raw):
+        if not raw:
+            return None
+        s = str(raw).strip()
+        if len(s) == 24:
+            try:
+                int(s, 16)
+                c = courses.find_one({"_id": ObjectId(s)})
+                return (c or {}).get("code") or None
+            except Exception:
+                pass
+        c = (courses.find_one({"_id": s}) or courses.find_one({"code": s}) or
+             courses.find_one({"title": s}) or courses.find_one({"name": s}))
+        if c and c.get("code"):
+            return c.get("code")
+        try:
+            int(s, 16)
+            return None
+        except Exception:
+            return s
+
+    accum_course = {}
+    for doc in db.submissions.find({}):
+        code = resolve_course_code(doc.get("course_code") or doc.get("course_id") or doc.get("course_title"))
+        score, total = to_float(doc.get("score")), to_float(doc.get("total_marks"))
+        pct = (score / total * 100.0) if total > 0 else score
+        if pct > 0 and code:
+            accum_course.setdefault(code, []).append(pct)
+    accum = {}
+    for doc in db.submissions.find({}):
+        code = resolve_course_code(doc.get("course_code") or doc.get("course_id") or doc.get("course_title"))
+        if not code:
+            continue
+        score, total = to_float(doc.get("score")), to_float(doc.get("total_marks"))
+        pct = (score / total * 100.0) if total > 0 else score
+        accum.setdefault(code.upper(), {}).setdefault(doc.get("student_id"), []).append(pct)
+    for doc in db.results.find({}):
+        code = resolve_course_code(doc.get("course_code") or doc.get("course_id"))
+        if code:
+            accum.setdefault(code.upper(), {}).setdefault(doc.get("student_id"), []).append(to_float(doc.get("score")))
+    return accum_course, accum
+
+
+def current(db):
+    perf = CoursePerformanceAccumulator(db)
+    perf.feed_submissions(db.submissions.find({}))
+    perf.feed_results(db.results.find({}))
+    return perf.course_averages(), perf.top_marks()
+
+
+def timed(fn, db, counter):
+    counter.count = 0
+    t0 = time.perf_counter()
+    fn(db)
+    return {"seconds": round(time.perf_counter() - t0, 3), "mongo_commands": counter.count}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    ap.add_argument("--db", default="education_app_bench")
+    ap.add_argument("--submissions", type=int, default=100000)
+    ap.add_argument("--courses", type=int, default=200)
+    ap.add_argument("--students", type=int, default=5000)
+    ap.add_argument("--skip-legacy", action="store_true", help="legacy path issues ~2 queries per document")
+    ap.add_argument("--no-seed", action="store_true")
+    args = ap.parse_args(argv)
+
+    counter = CommandCounter()
+    client = MongoClient(args.uri, event_listeners=[counter])
+    db = client[args.db]
+    if not args.no_seed:
+        seed(db, args.submissions, args.courses, args.students)
+    out = {"submissions": db.submissions.estimated_document_count(), "results": db.results.estimated_document_count()}
+    out["single_pass"] = timed(current, db, counter)
+    if not args.skip_legacy:
+        out["legacy_two_pass"] = timed(legacy, db, counter)
+        out["speedup"] = round(out["legacy_two_pass"]["seconds"] / max(out["single_pass"]["seconds"], 1e-9), 1)
+    print(json.dumps(out, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
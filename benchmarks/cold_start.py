@@ -0,0 +1,108 @@
+"""Measure app cold start and break import time down with ``-X importtime``.
+
+Each run starts a fresh interpreter that imports app, calls create_app() and
+serves one request to "/" through the test client, so it covers what every
+worker fork pays before it can answer. The import of the heavy ML stack is
+timed separately, as the first analyst/ML request pays it now. The first
+request also reads the id-migration state, so point MONGO_URI at a running
+mongod or that step measures a server-selection timeout.
+
+    python benchmarks/cold_start.py --runs 5 --top 20
+    python benchmarks/cold_start.py --json > cold_start.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app({"TESTING": True})
+t2 = time.perf_counter()
+status = flask_app.test_client().get("/").status_code
+t3 = time.perf_counter()
+heavy = sorted(m for m in ("pandas", "numpy", "sklearn") if m in sys.modules)
+import pandas, numpy, sklearn.ensemble, sklearn.linear_model, sklearn.metrics, sklearn.model_selection
+t4 = time.perf_counter()
+print(json.dumps({"import_app": t1 - t0, "create_app": t2 - t1, "first_request": t3 - t2, "status": status,
+                  "heavy_loaded_at_start": heavy, "ml_stack_import": t4 - t3}))
+"""
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_once(python, importtime):
+    cmd = [python] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=600)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, proc.stderr
+
+
+def top_level_imports(stderr, stop_at="app"):
+    """Cumulative time of each direct import made while importing ``stop_at``."""
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        self_us, cum_us, indent, name = int(m.group(1)), int(m.group(2)), len(m.group(3)), m.group(4)
+        rows.append((indent, name, self_us, cum_us))
+        if indent == 1 and name == stop_at:
+            break
+    # Children are printed before their parent; direct imports of app sit one level deeper
+    return sorted(((name, cum) for indent, name, _, cum in rows if indent == 3), key=lambda r: -r[1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="import-time rows to show")
+    ap.add_argument("--python", default=sys.executable)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    samples = [run_once(args.python, importtime=False)[0] for _ in range(args.runs)]
+    probe, stderr = run_once(args.python, importtime=True)
+    breakdown = top_level_imports(stderr)
+
+    def med(key):
+        return statistics.median(s[key] for s in samples)
+
+    report = {
+        "runs": args.runs,
+        "import_app_s": round(med("import_app"), 4),
+        "create_app_s": round(med("create_app"), 4),
+        "first_request_s": round(med("first_request"), 4),
+        "cold_start_s": round(statistics.median(s["import_app"] + s["create_app"] + s["first_request"] for s in samples), 4),
+        "ml_stack_import_s": round(med("ml_stack_import"), 4),
+        "heavy_loaded_at_start": probe["heavy_loaded_at_start"],
+        "import_breakdown_ms": [{"module": name, "cumulative_ms": round(us / 1000.0, 1)} for name, us in breakdown[:args.top]],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"cold start (median of {args.runs}): {report['cold_start_s'] * 1000:.0f} ms "
+              f"= import {report['import_app_s'] * 1000:.0f} + create_app {report['create_app_s'] * 1000:.0f} "
+              f"+ first request {report['first_request_s'] * 1000:.0f}")
+        print(f"heavy modules loaded at start: {', '.join(report['heavy_loaded_at_start']) or 'none'}")
+        print(f"deferred ML stack import (first ML request): {report['ml_stack_import_s'] * 1000:.0f} ms")
+        print("import time under app (cumulative):")
+        for row in report["import_breakdown_ms"]:
+            print(f"  {row['cumulative_ms']:8.1f} ms  {row['module']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Worker occupancy of concurrent attachment downloads, streamed vs offloaded.
+
+Stores a synthetic attachment in the blob store of a scratch database on a
+local mongod, serves the app from a threaded in-process server and has N slow
+clients download it at once through ``/assignments/<aid>/download``. Every
+mode runs the same clients; a WSGI wrapper records how long each request holds
+its worker, from the call until the response iterable is closed:
+
+    python benchmarks/download_bench.py --clients 32 --size-mb 20 --rate-kb 4096
+
+With DOWNLOAD_OFFLOAD the app only returns X-Accel-Redirect / X-Sendfile
+headers; there is no front-end server here, so clients receive the headers
+and the worker time is what a real deployment would keep off the workers.
+"""
+import argparse
+import http.client
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from db.blobs import put_stream, release  # noqa: E402
+from web.extensions import mongo  # noqa: E402
+
+MODES = ("", "accel", "sendfile")
+
+
+class Occupancy:
+    """WSGI wrapper timing how long each request keeps its worker busy."""
+
+    def __init__(self, app):
+        self.app = app
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.peak = 0
+        self.held = []
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        with self.lock:
+            self.busy += 1
+            self.peak = max(self.peak, self.busy)
+        try:
+            body = self.app(environ, start_response)
+        except Exception:
+            self._done(start)
+            raise
+        return _Closing(body, lambda: self._done(start))
+
+    def _done(self, start):
+        with self.lock:
+            self.busy -= 1
+            self.held.append(time.perf_counter() - start)
+
+
+class _Closing:
+    def __init__(self, body, on_close):
+        self.body = body
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def close(self):
+        try:
+            if hasattr(self.body, "close"):
+                self.body.close()
+        finally:
+            self.on_close()
+
+
+def download(port, path, rate, out):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    start = time.perf_counter()
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    chunk = 64 * 1024
+    got = 0
+    while True:
+        data = resp.read(chunk)
+        if not data:
+            break
+        got += len(data)
+        if rate:
+            # Throttle like a client on a slow link
+            time.sleep(len(data) / rate)
+    conn.close()
+    out.append((resp.status, got, time.perf_counter() - start))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))] if values else 0.0
+
+
+def run_mode(uri, mode, aid, clients, rate):
+    app = create_app({"MONGO_URI": uri, "DOWNLOAD_OFFLOAD": mode})
+    wrapped = Occupancy(app.wsgi_app)
+    app.wsgi_app = wrapped
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    port = server.server_port
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    results = []
+    threads = [threading.Thread(target=download, args=(port, f"/assignments/{aid}/download", rate, results))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - start
+    server.shutdown()
+    held = wrapped.held
+    return {
+        "mode": mode or "stream",
+        "ok": sum(1 for s, _, _ in results if s == 200),
+        "bytes": sum(b for _, b, _ in results),
+        "worker_s_total": sum(held),
+        "worker_s_p50": percentile(held, 50),
+        "worker_s_p95": percentile(held, 95),
+        "peak_busy": wrapped.peak,
+        "wall_s": wall,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default="mongodb://localhost:27017/education_app_download_bench")
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--size-mb", type=int, default=20)
+    ap.add_argument("--rate-kb", type=float, default=4096.0, help="per-client read rate in KiB/s (0 = unthrottled)")
+    ap.add_argument("--mode", action="append", choices=[m or "stream" for m in MODES])
+    args = ap.parse_args(argv)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    modes = [("" if m == "stream" else m) for m in (args.mode or [m or "stream" for m in MODES])]
+    setup = create_app({"MONGO_URI": args.uri})
+    static_dir = os.path.join(setup.root_path, "static")
+    with setup.app_context():
+        db = mongo.db
+        payload = os.urandom(1 << 20) * max(1, args.size_mb)
+        blob = put_stream(db, static_dir, io.BytesIO(payload))
+        aid = ObjectId()
+        db.assignments.insert_one({"_id": aid, "title": "download bench", "attachment_name": "bench.bin",
+                                   "attachment_path": blob["path"], "attachment_sha256": blob["sha256"],
+                                   "created_at": datetime.utcnow()})
+    try:
+        rows = [run_mode(args.uri, m, aid, args.clients, args.rate_kb * 1024) for m in modes]
+    finally:
+        with setup.app_context():
+            mongo.db.assignments.delete_one({"_id": aid})
+            release(mongo.db, static_dir, [blob["sha256"]])
+
+    print(f"{args.clients} clients, {len(payload) / (1 << 20):.0f} MiB attachment, "
+          f"{args.rate_kb:.0f} KiB/s per client")
+    print(f"{'mode':10s} {'ok':>4s} {'MiB sent':>9s} {'worker-s':>9s} {'p50 s':>8s} {'p95 s':>8s} {'peak busy':>9s} {'wall s':>7s}")
+    for r in rows:
+        print(f"{r['mode']:10s} {r['ok']:4d} {r['bytes'] / (1 << 20):9.1f} {r['worker_s_total']:9.2f} "
+              f"{r['worker_s_p50']:8.3f} {r['worker_s_p95']:8.3f} {r['peak_busy']:9d} {r['wall_s']:7.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
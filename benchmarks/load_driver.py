@@ -0,0 +1,340 @@
+"""Closed-loop HTTP load driver for the main routes of each role.
+
+Logs in as the synthetic users from benchmarks/synthetic.py (one session per
+worker, spread over the generated accounts), trains one model as analyst0 so
+the predict endpoints have something to serve, then runs every scenario for
+--duration seconds with --concurrency workers and reports p50/p95/p99
+latency and req/s. Non-2xx responses (including a redirect to /login) count
+as errors and are excluded from the latency percentiles.
+
+    python benchmarks/synthetic.py --uri mongodb://localhost:27017/education_app_bench
+    MONGO_URI=mongodb://localhost:27017/education_app_bench python app.py &
+    python benchmarks/load_driver.py --duration 20 --save baseline.json
+    python benchmarks/load_driver.py --duration 20 --compare baseline.json   # exit 1 on regression
+
+--save writes the run (with the git commit it was taken at) as a JSON
+baseline; --compare diffs p95 and req/s per scenario against one and fails
+when either moves by more than --tolerance.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import EVENT_TYPES, STATUSES, csv_id, email_for, training_csv  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS = ("attendance", "grades", "enrollments", "demographics", "lms", "academic_records")
+
+
+class Client:
+    """One keep-alive connection plus the Flask session cookie."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        u = urlparse(base_url)
+        self.host, self.port = u.hostname, u.port or (443 if u.scheme == "https" else 80)
+        self.conn_cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        self.timeout = timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+        self.cookies: Dict[str, str] = {}
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        hdrs = dict(headers or {})
+        if self.cookies:
+            hdrs["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = self.conn_cls(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=hdrs)
+                resp = self.conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The dev server speaks HTTP/1.0 and may have dropped the socket
+                self.close()
+                if attempt:
+                    raise
+        for header, value in resp.getheaders():
+            if header.lower() == "set-cookie":
+                name, _, rest = value.partition("=")
+                self.cookies[name.strip()] = rest.split(";", 1)[0]
+        if resp.will_close:
+            self.close()
+        return resp.status, data
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def login(self, email: str, password: str) -> None:
+        status, _ = self.request("POST", "/login", urlencode({"email": email, "password": password}).encode(),
+                                 {"Content-Type": "application/x-www-form-urlencoded"})
+        if status != 302 or "session" not in self.cookies:
+            raise SystemExit(f"login failed for {email} (status {status}); did you run benchmarks/synthetic.py?")
+
+
+def multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: text/csv\r\n\r\n'.encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# A scenario builds (method, path, body, headers) for one request
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+class Scenario:
+    def __init__(self, name: str, role: Optional[str], build: Callable[[random.Random, "Options"], Request]):
+        self.name = name
+        self.role = role
+        self.build = build
+
+
+def get(path: str) -> Callable[[random.Random, "Options"], Request]:
+    return lambda rnd, opts: ("GET", path, None, {})
+
+
+def dataset_query(rnd: random.Random, opts: "Options") -> Request:
+    name = rnd.choice(DATASETS)
+    q = {"name": name, "limit": 200}
+    if rnd.random() < 0.3:
+        q["q"] = csv_id(rnd.randrange(opts.students))
+    return "GET", "/api/analyst/dataset?" + urlencode(q), None, {}
+
+
+def predict_payload(rnd: random.Random, opts: "Options") -> bytes:
+    return json.dumps({"Age": rnd.randint(17, 30), "Gender": rnd.choice(["Male", "Female"]),
+                       "Attendance_Percentage": round(rnd.uniform(30, 100), 1),
+                       "Assignment_Completion": round(rnd.uniform(20, 100), 1),
+                       "Test_Score": round(rnd.uniform(10, 100), 1)}).encode()
+
+
+def analyst_predict(rnd: random.Random, opts: "Options") -> Request:
+    return "POST", "/api/analyst/model/predict", predict_payload(rnd, opts), {"Content-Type": "application/json"}
+
+
+def student_predict(rnd: random.Random, opts: "Options") -> Request:
+    return "POST", "/api/student/model/predict", predict_payload(rnd, opts), {"Content-Type": "application/json"}
+
+
+def ingest_csv(rnd: random.Random, opts: "Options") -> Request:
+    start = datetime.utcnow().date() - timedelta(days=rnd.randint(0, 365))
+    lines = ["student_id,course_code,date,status"]
+    for i in range(opts.rows):
+        lines.append(f"{csv_id(rnd.randrange(opts.students))},C{rnd.randrange(opts.courses):04d},"
+                     f"{(start - timedelta(days=i % 30)).isoformat()},{rnd.choice(STATUSES)}")
+    body, ctype = multipart({}, {"file": ("attendance.csv", ("\n".join(lines) + "\n").encode())})
+    return "POST", "/ingest/csv/attendance", body, {"Content-Type": ctype}
+
+
+def ingest_stream(rnd: random.Random, opts: "Options") -> Request:
+    run = uuid.uuid4().hex[:12]
+    now = datetime.utcnow()
+    body = "".join(json.dumps({"event_id": f"{run}-{i}", "student_id": csv_id(rnd.randrange(opts.students)),
+                               "course_code": f"C{rnd.randrange(opts.courses):04d}", "event_type": rnd.choice(EVENT_TYPES),
+                               "event_time": (now - timedelta(seconds=i)).isoformat()}) + "\n" for i in range(opts.rows))
+    return "POST", "/ingest/stream/lms?batch_size=500", body.encode(), {"Content-Type": "application/x-ndjson"}
+
+
+SCENARIOS = [
+    Scenario("admin_dashboard", "Admin", get("/admin")),
+    Scenario("teacher_dashboard", "Teacher", get("/teacher")),
+    Scenario("teacher_submissions", "Teacher", get("/teacher/submissions")),
+    Scenario("student_dashboard", "Student", get("/student")),
+    Scenario("student_progress", "Student", get("/student/progress")),
+    Scenario("analyst_dashboard", "Analyst", get("/analyst")),
+    Scenario("analyst_dataset", "Analyst", dataset_query),
+    Scenario("analyst_predict", "Analyst", analyst_predict),
+    Scenario("student_predict", "Student", student_predict),
+    Scenario("ingest_csv", None, ingest_csv),
+    Scenario("ingest_stream", None, ingest_stream),
+]
+
+
+class Options:
+    def __init__(self, args):
+        self.url = args.url
+        self.password = args.password
+        self.students = args.students
+        self.teachers = args.teachers
+        self.courses = args.courses
+        self.rows = args.rows
+
+
+def account_count(role: str, opts: Options) -> int:
+    # Analysts share analyst0, the only one with a trained model
+    return {"Student": opts.students, "Teacher": opts.teachers}.get(role, 1)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    k = max(0, min(len(sorted_values), math.ceil(p / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+
+def run_scenario(scenario: Scenario, opts: Options, concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    rnds = [random.Random(seed * 1000 + n) for n in range(concurrency)]
+    # Log everyone in up front so login time is not part of the measured window
+    clients = []
+    for rnd in rnds:
+        client = Client(opts.url)
+        if scenario.role:
+            client.login(email_for(scenario.role, rnd.randrange(account_count(scenario.role, opts))), opts.password)
+        clients.append(client)
+    deadline = [0.0]
+    start = threading.Barrier(concurrency + 1, action=lambda: deadline.__setitem__(0, time.perf_counter() + duration))
+
+    def worker(client: Client, rnd: random.Random):
+        local, local_errors = [], {}
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            method, path, body, headers = scenario.build(rnd, opts)
+            t0 = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - t0
+            if isinstance(status, int) and 200 <= status < 300:
+                local.append(elapsed)
+            else:
+                local_errors[str(status)] = local_errors.get(str(status), 0) + 1
+        client.close()
+        with lock:
+            latencies.extend(local)
+            for k, v in local_errors.items():
+                errors[k] = errors.get(k, 0) + v
+
+    threads = [threading.Thread(target=worker, args=(c, r), daemon=True) for c, r in zip(clients, rnds)]
+    for t in threads:
+        t.start()
+    start.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def train_model(opts: Options) -> None:
+    client = Client(opts.url, timeout=300)
+    client.login(email_for("Analyst", 0), opts.password)
+    body, ctype = multipart({"target": "Dropout", "model": "random_forest"}, {"file": ("train.csv", training_csv())})
+    status, data = client.request("POST", "/api/analyst/model/train", body, {"Content-Type": ctype})
+    client.close()
+    if status != 200:
+        raise SystemExit(f"model training failed ({status}): {data[:300]!r}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print per-scenario deltas; returns the scenarios that regressed."""
+    regressed = []
+    print(f"\nvs baseline {baseline.get('commit') or '?'} ({baseline.get('timestamp', '?')}), tolerance {tolerance:.0%}")
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"  {name:22s} (not in baseline)")
+            continue
+        p95 = (cur["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps = (cur["rps"] - base["rps"]) / base["rps"] if base["rps"] else 0.0
+        bad = p95 > tolerance or rps < -tolerance
+        if bad:
+            regressed.append(name)
+        print(f"  {'REGRESSED' if bad else 'ok':9s} {name:22s} p95 {base['p95_ms']:8.1f} -> {cur['p95_ms']:8.1f} ms ({p95:+.0%})"
+              f"  rps {base['rps']:8.1f} -> {cur['rps']:8.1f} ({rps:+.0%})")
+    return regressed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--password", default="bench")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    ap.add_argument("--scenarios", default="", help="comma-separated subset (default: all)")
+    ap.add_argument("--students", type=int, default=5000, help="accounts to spread student sessions over")
+    ap.add_argument("--teachers", type=int, default=100)
+    ap.add_argument("--courses", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=200, help="rows per ingest request")
+    ap.add_argument("--no-train", action="store_true", help="reuse the model analyst0 already has")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", metavar="PATH", help="write this run as a JSON baseline")
+    ap.add_argument("--compare", metavar="PATH", help="baseline to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/req/s change before failing")
+    args = ap.parse_args(argv)
+    opts = Options(args)
+
+    wanted = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    unknown = wanted - {s.name for s in SCENARIOS}
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    selected = [s for s in SCENARIOS if not wanted or s.name in wanted]
+    if not args.no_train and any(s.name.endswith("_predict") for s in selected):
+        train_model(opts)
+
+    report = {"commit": git_commit(), "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+              "url": args.url, "concurrency": args.concurrency, "duration_s": args.duration, "scenarios": {}}
+    print(f"{'scenario':22s} {'reqs':>7s} {'err':>5s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}  (ms)")
+    for s in selected:
+        r = run_scenario(s, opts, args.concurrency, args.duration, args.seed)
+        report["scenarios"][s.name] = r
+        print(f"{s.name:22s} {r['requests']:7d} {sum(r['errors'].values()):5d} {r['rps']:8.1f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f}" + (f"  errors={r['errors']}" if r["errors"] else ""))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Explain every registered query shape against a seeded local mongod.
+
+Seeds a scratch database with synthetic users, courses, enrollments,
+assignments, submissions, results, attendance, LMS events, feedback and
+analyst data, creates the managed indexes from db/indexes.py and runs
+explain("executionStats") for each shape in db/query_shapes.py. Exits 1 when
+any shape plans a COLLSCAN or examines more than --max-ratio keys/documents
+per returned document.
+
+    python benchmarks/query_audit.py --students 5000
+    python benchmarks/query_audit.py --no-seed --json   # re-check an existing scratch db
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.indexes import INDEXES, ensure_indexes  # noqa: E402
+from db.query_shapes import DEFAULT_MAX_RATIO, SHAPES, audit  # noqa: E402
+
+
+def _insert(col, docs):
+    for i in range(0, len(docs), 10000):
+        col.insert_many(docs[i:i + 10000], ordered=False)
+
+
+def seed(db, n_students, n_teachers, n_courses, per_course):
+    for name in INDEXES:
+        db[name].drop()
+    now = datetime.utcnow()
+    rnd = random.Random(42)
+
+    def ago(days):
+        return now - timedelta(days=rnd.random() * days)
+
+    teachers = [{"_id": ObjectId(), "name": f"Teacher {i}", "email": f"t{i}@example.edu", "role": "Teacher", "created_at": ago(900)}
+                for i in range(n_teachers)]
+    students = [{"_id": ObjectId(), "name": f"Student {i}", "email": f"s{i}@example.edu", "role": "Student", "created_at": ago(900)}
+                for i in range(n_students)]
+    analysts = [{"_id": ObjectId(), "name": f"Analyst {i}", "email": f"a{i}@example.edu", "role": "Analyst", "created_at": ago(900)}
+                for i in range(3)]
+    _insert(db.users, teachers + students + analysts)
+
+    courses = [{"_id": ObjectId(), "code": f"C{i:04d}", "title": f"Course {i}", "active": rnd.random() > 0.1,
+                "instructor_id": rnd.choice(teachers)["_id"]} for i in range(n_courses)]
+    _insert(db.courses, courses)
+
+    enrollments, assignments, submissions, results, announcements = [], [], [], [], []
+    for c in courses:
+        roster = rnd.sample(students, min(per_course, len(students)))
+        for s in roster:
+            enrollments.append({"user_id": s["_id"], "course_id": c["_id"], "course_code": c["code"],
+                                "status": "dropped" if rnd.random() < 0.05 else "enrolled"})
+        for k in range(5):
+            a = {"_id": ObjectId(), "course_id": c["_id"], "course_code": c["code"], "title": f"A{k}", "deadline": ago(-60)}
+            assignments.append(a)
+            for s in roster:
+                if rnd.random() < 0.7:
+                    graded = rnd.random() < 0.6
+                    submissions.append({"assignment_id": a["_id"], "student_id": s["_id"], "course_id": c["_id"],
+                                        "course_code": c["code"], "submitted_on": ago(60),
+                                        "score": str(rnd.randint(0, 50)) if graded else None})
+                    if graded:
+                        results.append({"student_id": s["_id"], "course_id": c["_id"], "course_code": c["code"],
+                                        "component": "assignment", "ref_id": a["_id"],
+                                        "marks_obtained": str(rnd.randint(0, 50)), "total_marks": "50"})
+        announcements.extend({"course_id": c["_id"], "title": f"Note {k}", "created_at": ago(120)} for k in range(4))
+    for col, docs in ((db.enrollments, enrollments), (db.assignments, assignments), (db.submissions, submissions),
+                      (db.results, results), (db.announcements, announcements)):
+        _insert(col, docs)
+
+    # Imported datasets use CSV student ids
+    csv_ids = [f"S{i:05d}" for i in range(n_students)]
+    attendance, lms, demographics = [], [], []
+    for sid in csv_ids:
+        demographics.append({"student_id": sid, "gender": rnd.choice(["male", "female"]), "dob": "2003-05-01"})
+        for c in rnd.sample(courses, min(3, len(courses))):
+            for d in range(10):
+                attendance.append({"student_id": sid, "course_code": c["code"], "date": f"2026-09-{d + 1:02d}",
+                                   "status": "present" if rnd.random() < 0.85 else "absent"})
+        for e in range(5):
+            lms.append({"event_id": f"{sid}-{e}", "student_id": sid, "event_type": "view", "event_time": ago(60).isoformat()})
+    for col, docs in ((db.attendance, attendance), (db.lms_events, lms), (db.demographics, demographics)):
+        _insert(col, docs)
+    _insert(db.feedbacks, [{"email": rnd.choice(students)["email"], "status": rnd.choice(["new", "read", "read", "read"]),
+                            "created_at": ago(365)} for _ in range(n_students // 5 or 1)])
+    _insert(db.admin_notifications, [{"type": rnd.choice(["model_trained", "ingestion"]), "created_at": ago(365)}
+                                     for _ in range(500)])
+    _insert(db.models, [{"analyst_email": rnd.choice(analysts)["email"], "target": "Pass", "created_at": ago(365)}
+                        for _ in range(200)])
+    _insert(db.manual_predictions, [{"analyst_email": a["email"], "analyst": a["name"], "created_at": ago(365)}
+                                    for a in (rnd.choice(analysts) for _ in range(2000))])
+    _insert(db.ml_predictions, [{"type": "ml", "analyst_email": rnd.choice(analysts)["email"], "source": "manual",
+                                 "target": rnd.choice(["Pass", "Risk"]), "created_at": ago(365) - timedelta(hours=1)}
+                                for _ in range(5000)])
+    _insert(db.student_risk, [{"student_id": str(s["_id"]), "at_risk": rnd.random() < 0.2, "avg_score": rnd.random() * 100,
+                               "attendance_rate": rnd.random()} for s in students])
+    _insert(db.student_features, [{"student_id": str(s["_id"]), "updated_at": now} for s in students])
+    _insert(db.student_progress, [{"student_id": str(s["_id"]), "version": 0, "courses": []} for s in students])
+    _insert(db.announcement_reads, [{"student_id": str(s["_id"]), "seen_at": ago(120)} for s in students])
+
+
+def sample_for(db):
+    """Pick concrete ids for the shape filters from whatever is in the db."""
+    student = db.users.find_one({"role": "Student"}, sort=[("_id", 1)])
+    teacher = db.courses.find_one({}, sort=[("_id", 1)])
+    course_ids = [c["_id"] for c in db.courses.find({"instructor_id": teacher["instructor_id"]}, {"_id": 1})]
+    course = db.courses.find_one({"_id": course_ids[0]})
+    assignment_ids = [a["_id"] for a in db.assignments.find({"course_id": {"$in": course_ids}}, {"_id": 1})]
+    student_ids = [u["_id"] for u in db.users.find({"role": "Student"}, {"_id": 1}).sort("_id", 1).limit(50)]
+    teacher_ids = [u["_id"] for u in db.users.find({"role": "Teacher"}, {"_id": 1}).limit(8)]
+    csv_ids = [d["student_id"] for d in db.demographics.find({}, {"student_id": 1}).sort("student_id", 1).limit(50)]
+    analyst = db.users.find_one({"role": "Analyst"}) or {}
+    announcement = db.announcements.find_one({"course_id": {"$in": course_ids}}, sort=[("_id", -1)]) or {}
+    return {
+        "email": student["email"],
+        "student_id": student["_id"],
+        "student_ids": student_ids,
+        "teacher_id": teacher["instructor_id"],
+        "teacher_ids": teacher_ids,
+        "course_id": course["_id"],
+        "course_code": course["code"],
+        "course_ids": course_ids,
+        "assignment_ids": assignment_ids,
+        "csv_ids": csv_ids,
+        "announcement_id": announcement.get("_id"),
+        "analyst_email": analyst.get("email"),
+        "analyst_name": analyst.get("name"),
+        "recent_window": datetime.utcnow() - timedelta(minutes=10),
+        # a keyset cursor deep into the manual_predictions history
+        "older_than": datetime.utcnow() - timedelta(days=180),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Explain registered query shapes against synthetic data")
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    ap.add_argument("--db", default="education_app_audit")
+    ap.add_argument("--students", type=int, default=2000)
+    ap.add_argument("--teachers", type=int, default=40)
+    ap.add_argument("--courses", type=int, default=200)
+    ap.add_argument("--per-course", type=int, default=40, help="students enrolled per course")
+    ap.add_argument("--max-ratio", type=float, default=DEFAULT_MAX_RATIO)
+    ap.add_argument("--no-seed", action="store_true", help="reuse the data already in --db")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    db = MongoClient(args.uri)[args.db]
+    if not args.no_seed:
+        seed(db, args.students, args.teachers, args.courses, args.per_course)
+    ensure_indexes(db)
+    rows = audit(db, sample_for(db), SHAPES, args.max_ratio)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for r in rows:
+            flag = "ok  " if r["ok"] else "FAIL"
+            print(f"{flag} {r['name']:36s} {'>'.join(r['stages']):40s} "
+                  f"keys={r['keys_examined']:<7d} docs={r['docs_examined']:<7d} n={r['returned']:<6d} ratio={r['ratio']}"
+                  + (f"  [{'; '.join(r['problems'])}]" if r["problems"] else ""))
+    failed = [r["name"] for r in rows if not r["ok"]]
+    if failed:
+        print(f"{len(failed)} of {len(rows)} shapes failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Load test for the NDJSON streaming ingest endpoint.
+
+Streams synthetic LMS (or attendance) events to ``/ingest/stream/<dataset>``
+using chunked transfer encoding and reports throughput and per-batch latency.
+Run against a dev server backed by a local mongod:
+
+    python app.py &
+    python benchmarks/stream_load.py --events 200000 --min-rate 10000
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlparse
+
+EVENT_TYPES = ["login", "view", "quiz", "submit", "forum_post", "logout", "drop"]
+STATUSES = ["present", "absent", "late"]
+
+
+def gen_lms(n, run_id, courses=50, students=5000):
+    start = datetime.utcnow() - timedelta(days=7)
+    for i in range(n):
+        yield {
+            "event_id": f"{run_id}-{i}",
+            "student_id": f"S{random.randint(1, students):05d}",
+            "course_code": f"CS{random.randint(100, 100 + courses - 1)}",
+            "event_type": random.choice(EVENT_TYPES),
+            "event_time": (start + timedelta(seconds=i)).isoformat(),
+        }
+
+
+def gen_attendance(n, run_id, courses=50, students=5000):
+    start = datetime.utcnow().date() - timedelta(days=n // (courses * students) + 1)
+    for i in range(n):
+        yield {
+            "student_id": f"{run_id[:6]}-{i % students:05d}",
+            "course_code": f"CS{100 + (i // students) % courses}",
+            "date": (start + timedelta(days=i // (courses * students))).isoformat(),
+            "status": random.choice(STATUSES),
+        }
+
+
+def body(records, lines_per_chunk):
+    buf = []
+    for rec in records:
+        buf.append(json.dumps(rec))
+        if len(buf) >= lines_per_chunk:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--dataset", choices=["lms", "attendance"], default="lms")
+    ap.add_argument("--events", type=int, default=100000)
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--max-wait-ms", type=int, default=250)
+    ap.add_argument("--lines-per-chunk", type=int, default=200)
+    ap.add_argument("--min-rate", type=float, default=10000.0, help="fail if events/sec falls below this")
+    args = ap.parse_args(argv)
+
+    run_id = uuid.uuid4().hex[:12]
+    gen = gen_lms if args.dataset == "lms" else gen_attendance
+    target = urlparse(args.url)
+    qs = urlencode({"batch_size": args.batch_size, "max_wait_ms": args.max_wait_ms})
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=600)
+
+    t0 = time.perf_counter()
+    conn.request(
+        "POST", f"/ingest/stream/{args.dataset}?{qs}",
+        body=body(gen(args.events, run_id), args.lines_per_chunk),
+        headers={"Content-Type": "application/x-ndjson"},
+        encode_chunked=True,
+    )
+    resp = conn.getresponse()
+    payload = resp.read()
+    elapsed = time.perf_counter() - t0
+    if resp.status != 200:
+        print(f"HTTP {resp.status}: {payload[:500]!r}", file=sys.stderr)
+        return 2
+    summary = json.loads(payload)
+    rate = summary.get("valid", 0) / elapsed if elapsed > 0 else 0.0
+    summary.pop("batch_log", None)
+    summary.pop("errors", None)
+    print(json.dumps({
+        "dataset": args.dataset,
+        "events": args.events,
+        "client_elapsed_s": round(elapsed, 3),
+        "client_events_per_sec": round(rate, 1),
+        "server": summary,
+    }, indent=2))
+    if rate < args.min_rate:
+        print(f"FAIL: {rate:.0f} events/sec is below the {args.min_rate:.0f} target", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
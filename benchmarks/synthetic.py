@@ -0,0 +1,272 @@
+"""Synthetic education data with realistic skew, for benchmarks and audits.
+
+Loads users (admin, analysts, teachers, students), courses, enrollments,
+assignments, submissions, graded results, announcements, attendance, LMS
+events, academic records, demographics, feedback and analyst artefacts into a
+database. Skew follows what the real data looks like: course popularity and
+teacher load are Zipf-distributed, student activity is log-normal (a few
+students produce most LMS events and submissions), and attendance and scores
+track activity.
+
+Every generated user has the password given by --password, with emails
+``<role><n>@bench.local`` (admin0, analyst0.., teacher0.., student0..), which
+is what benchmarks/load_driver.py logs in with.
+
+    python benchmarks/synthetic.py --students 20000 --courses 400
+    python benchmarks/synthetic.py --db education_app_bench --scale 0.1
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.indexes import INDEXES, ensure_indexes  # noqa: E402
+
+EMAIL_DOMAIN = "bench.local"
+EVENT_TYPES = ["login", "view", "view", "view", "quiz", "submit", "forum_post", "logout"]
+STATUSES = ("present", "absent", "late")
+
+
+def email_for(role: str, i: int) -> str:
+    return f"{role.lower()}{i}@{EMAIL_DOMAIN}"
+
+
+def csv_id(i: int) -> str:
+    # Imported datasets (attendance, LMS, demographics) key students by CSV id
+    return f"S{i + 1:05d}"
+
+
+class Weighted:
+    """Sample indexes 0..n-1 with Zipf(s) weights."""
+
+    def __init__(self, n: int, s: float, rnd: random.Random):
+        self.rnd = rnd
+        self.cum = list(itertools.accumulate(1.0 / (k + 1) ** s for k in range(n)))
+        # Popular items should not all have the lowest codes
+        self.order = list(range(n))
+        rnd.shuffle(self.order)
+
+    def pick(self) -> int:
+        return self.order[bisect.bisect_left(self.cum, self.rnd.random() * self.cum[-1])]
+
+    def sample(self, k: int) -> List[int]:
+        out: List[int] = []
+        tries = 0
+        while len(out) < k and tries < k * 20:
+            i = self.pick()
+            if i not in out:
+                out.append(i)
+            tries += 1
+        return out
+
+
+def _insert(col, docs: Iterable[Dict[str, Any]], batch: int = 5000) -> int:
+    n, buf = 0, []
+    for d in docs:
+        buf.append(d)
+        if len(buf) >= batch:
+            col.insert_many(buf, ordered=False)
+            n += len(buf)
+            buf = []
+    if buf:
+        col.insert_many(buf, ordered=False)
+        n += len(buf)
+    return n
+
+
+def load(db, students: int = 5000, teachers: int = 100, courses: int = 200, analysts: int = 3,
+         assignments_per_course: int = 6, events_per_student: int = 40, attendance_days: int = 30,
+         password: str = "bench", seed: int = 42, drop: bool = True) -> Dict[str, int]:
+    """Generate and insert the dataset; returns document counts per collection."""
+    rnd = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    if drop:
+        for name in INDEXES:
+            db[name].drop()
+    ensure_indexes(db)
+
+    def ago(days: float) -> datetime:
+        return now - timedelta(seconds=rnd.random() * days * 86400)
+
+    counts: Dict[str, int] = {}
+
+    def user(role, i):
+        return {"_id": ObjectId(), "name": f"{role} {i}", "email": email_for(role, i), "password": password,
+                "role": role, "created_at": ago(720)}
+
+    admin = [user("Admin", 0)]
+    analyst_docs = [user("Analyst", i) for i in range(analysts)]
+    teacher_docs = [user("Teacher", i) for i in range(teachers)]
+    student_docs = [user("Student", i) for i in range(students)]
+    counts["users"] = _insert(db.users, admin + analyst_docs + teacher_docs + student_docs)
+
+    teacher_pick = Weighted(teachers, 0.8, rnd)
+    course_docs = [{"_id": ObjectId(), "code": f"C{i:04d}", "title": f"Course {i}", "description": "Synthetic course",
+                    "instructor_id": teacher_docs[teacher_pick.pick()]["_id"], "active": rnd.random() > 0.05,
+                    "created_at": ago(720)} for i in range(courses)]
+    counts["courses"] = _insert(db.courses, course_docs)
+
+    # Per-student activity multiplier, log-normal around 1
+    activity = [min(6.0, rnd.lognormvariate(0, 0.8)) for _ in range(students)]
+    course_pick = Weighted(courses, 1.05, rnd)
+    roster: Dict[int, List[int]] = {}
+    enrollments = []
+    for si in range(students):
+        k = max(1, min(8, int(round(rnd.gauss(4, 1.5)))))
+        roster[si] = course_pick.sample(k)
+        for ci in roster[si]:
+            c = course_docs[ci]
+            status = "dropped" if rnd.random() < 0.04 else ("pending" if rnd.random() < 0.05 else "enrolled")
+            enrollments.append({"user_id": student_docs[si]["_id"], "course_id": c["_id"], "course_code": c["code"],
+                                "status": status, "enrolled_at": ago(300)})
+    counts["enrollments"] = _insert(db.enrollments, enrollments)
+
+    assignment_docs = []
+    for c in course_docs:
+        for k in range(assignments_per_course):
+            assignment_docs.append({"_id": ObjectId(), "course_id": c["_id"], "course_code": c["code"],
+                                    "course_title": c["title"],
+                                    "title": f"{c['code']} Assignment {k + 1}", "description": "Synthetic assignment",
+                                    "deadline": (now + timedelta(days=rnd.randint(-60, 60))).strftime("%Y-%m-%d"),
+                                    "total_marks": 100, "created_at": ago(200)})
+    counts["assignments"] = _insert(db.assignments, assignment_docs)
+    by_course: Dict[Any, List[Dict[str, Any]]] = {}
+    for a in assignment_docs:
+        by_course.setdefault(a["course_id"], []).append(a)
+
+    def submissions_and_results():
+        for si, cis in roster.items():
+            s = student_docs[si]
+            p_submit = min(0.97, 0.45 + 0.15 * activity[si])
+            for ci in cis:
+                c = course_docs[ci]
+                for a in by_course[c["_id"]]:
+                    if rnd.random() > p_submit:
+                        continue
+                    graded = rnd.random() < 0.7
+                    score = max(0, min(100, int(rnd.gauss(55 + 8 * activity[si], 15))))
+                    yield "submissions", {"assignment_id": a["_id"], "student_id": s["_id"], "student_name": s["name"],
+                                          "student_email": s["email"], "course_id": c["_id"], "course_code": c["code"],
+                                          "course_title": c["title"], "filename": "answer.pdf", "submitted_on": ago(120),
+                                          "score": str(score) if graded else None, "total_marks": "100" if graded else None}
+                    if graded:
+                        yield "results", {"student_id": s["_id"], "course_id": c["_id"], "course_code": c["code"],
+                                          "component": "assignment", "ref_id": a["_id"], "marks_obtained": str(score),
+                                          "total_marks": "100", "created_at": ago(100)}
+
+    sub_buf: List[Dict[str, Any]] = []
+    res_buf: List[Dict[str, Any]] = []
+    counts["submissions"] = counts["results"] = 0
+    for name, doc in submissions_and_results():
+        (sub_buf if name == "submissions" else res_buf).append(doc)
+        if len(sub_buf) >= 5000:
+            counts["submissions"] += _insert(db.submissions, sub_buf)
+            sub_buf = []
+        if len(res_buf) >= 5000:
+            counts["results"] += _insert(db.results, res_buf)
+            res_buf = []
+    counts["submissions"] += _insert(db.submissions, sub_buf)
+    counts["results"] += _insert(db.results, res_buf)
+
+    counts["announcements"] = _insert(db.announcements, (
+        {"course_id": c["_id"], "course_code": c["code"], "title": f"Update {k + 1}", "content": "Synthetic announcement",
+         "created_at": ago(120)} for c in course_docs for k in range(rnd.randint(0, 8))))
+
+    def attendance():
+        start = now.date() - timedelta(days=attendance_days)
+        for si, cis in roster.items():
+            rate = min(0.99, 0.55 + 0.1 * activity[si])
+            for ci in cis[:3]:
+                for d in range(attendance_days):
+                    if rnd.random() < 0.5:  # about two or three sessions a week
+                        continue
+                    status = "present" if rnd.random() < rate else rnd.choice(STATUSES[1:])
+                    yield {"student_id": csv_id(si), "course_code": course_docs[ci]["code"],
+                           "date": (start + timedelta(days=d)).isoformat(), "status": status}
+
+    counts["attendance"] = _insert(db.attendance, attendance())
+
+    def lms_events():
+        n = 0
+        for si, cis in roster.items():
+            for _ in range(int(rnd.expovariate(1.0 / (events_per_student * activity[si])))):
+                n += 1
+                yield {"event_id": f"E{n:09d}", "student_id": csv_id(si), "course_code": course_docs[rnd.choice(cis)]["code"],
+                       "event_type": rnd.choice(EVENT_TYPES), "event_time": ago(60).isoformat()}
+
+    counts["lms_events"] = _insert(db.lms_events, lms_events())
+    grades = "ABBCCCDF"
+    counts["academic_records"] = _insert(db.academic_records, (
+        {"student_id": csv_id(si), "course_code": course_docs[ci]["code"], "term": rnd.choice(["2025-Fall", "2026-Spring"]),
+         "grade": grades[max(0, min(7, int(rnd.gauss(5 - activity[si], 1.5))))], "credits": 3}
+        for si, cis in roster.items() for ci in cis))
+    counts["demographics"] = _insert(db.demographics, (
+        {"student_id": csv_id(si), "first_name": "Student", "last_name": str(si), "gender": rnd.choice(["Male", "Female"]),
+         "dob": f"{rnd.randint(1998, 2007)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"} for si in range(students)))
+    counts["feedbacks"] = _insert(db.feedbacks, (
+        {"name": f"Student {i}", "email": email_for("Student", i), "message": "Synthetic feedback",
+         "status": "new" if rnd.random() < 0.2 else "read", "created_at": ago(365)} for i in range(max(1, students // 20))))
+    counts["admin_notifications"] = _insert(db.admin_notifications, (
+        {"type": rnd.choice(["model_trained", "ingestion"]), "message": "Synthetic notification", "created_at": ago(365)}
+        for _ in range(200)))
+    counts["ml_predictions"] = _insert(db.ml_predictions, (
+        {"type": "ml", "analyst": a["name"], "analyst_email": a["email"], "source": "manual",
+         "inputs": {"Attendance_Percentage": rnd.randint(40, 100), "Test_Score": rnd.randint(20, 100)},
+         "prediction": rnd.choice([0, 1]), "probability": round(rnd.random(), 3), "target": rnd.choice(["Dropout", "Pass"]),
+         "created_at": ago(365)} for a in analyst_docs for _ in range(500)))
+    counts["manual_predictions"] = _insert(db.manual_predictions, (
+        {"analyst_email": a["email"], "inputs": {"Test_Score": rnd.randint(20, 100)}, "prediction": rnd.choice([0, 1]),
+         "created_at": ago(365)} for a in analyst_docs for _ in range(100)))
+    return counts
+
+
+def training_csv(rows: int = 500, seed: int = 7) -> bytes:
+    """Labelled rows in the shape of csv/student_dropout_binary_1000.csv, for the train endpoint."""
+    rnd = random.Random(seed)
+    lines = ["Student_ID,Age,Gender,Attendance_Percentage,Assignment_Completion,Test_Score,Dropout"]
+    for i in range(rows):
+        att = rnd.uniform(30, 100)
+        comp = rnd.uniform(20, 100)
+        test = rnd.uniform(10, 100)
+        risk = 1.0 / (1.0 + math.exp(0.06 * (att - 60) + 0.04 * (test - 50)))
+        lines.append(f"{i + 1},{rnd.randint(17, 30)},{rnd.choice(['Male', 'Female'])},{att:.1f},{comp:.1f},{test:.1f},"
+                     f"{1 if rnd.random() < risk else 0}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/education_app_bench"))
+    ap.add_argument("--db", default=None, help="database name (default: the one in --uri)")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every count")
+    ap.add_argument("--students", type=int, default=5000)
+    ap.add_argument("--teachers", type=int, default=100)
+    ap.add_argument("--courses", type=int, default=200)
+    ap.add_argument("--analysts", type=int, default=3)
+    ap.add_argument("--events-per-student", type=int, default=40)
+    ap.add_argument("--password", default="bench")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args(argv)
+
+    client = MongoClient(args.uri)
+    db = client[args.db] if args.db else client.get_default_database("education_app_bench")
+    counts = load(db, students=max(1, int(args.students * args.scale)), teachers=max(1, int(args.teachers * args.scale)),
+                  courses=max(1, int(args.courses * args.scale)), analysts=args.analysts,
+                  events_per_student=args.events_per_student, password=args.password, seed=args.seed)
+    print(json.dumps({"database": db.name, "counts": counts}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
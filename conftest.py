@@ -0,0 +1,133 @@
+"""Shared fixtures: an ``app`` built by create_app() on a throwaway database.
+
+Set ``TEST_MONGO_URI`` (e.g. ``mongodb://localhost:27017/education_app_test``)
+to run against a real server; the database is dropped afterwards. Without it
+the app runs on mongomock, whose collections are wrapped below to report each
+call to the app's command listeners the way pymongo's command monitoring
+does, so ``query_budget`` counts queries either way. Pipelines mongomock
+cannot run skip with ``needs_mongod``.
+"""
+import itertools
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest_plugins = ["web.pytest_plugin"]
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "")
+
+needs_mongod = pytest.mark.skipif(not TEST_MONGO_URI, reason="needs a MongoDB server: set TEST_MONGO_URI")
+
+
+def _command(name, method, args, kwargs):
+    """The (command name, command document) pymongo would send for a collection method call."""
+    def arg(i, key, default=None):
+        return args[i] if len(args) > i else kwargs.get(key, default)
+
+    if method in ("find", "find_one"):
+        return "find", {"find": name, "filter": arg(0, "filter") or {}, "projection": arg(1, "projection"),
+                        "sort": kwargs.get("sort")}
+    if method == "aggregate":
+        return "aggregate", {"aggregate": name, "pipeline": arg(0, "pipeline") or []}
+    if method in ("count_documents", "estimated_document_count"):
+        return "count", {"count": name, "query": arg(0, "filter") or {}}
+    if method == "distinct":
+        return "distinct", {"distinct": name, "key": arg(0, "key"), "query": arg(1, "filter") or {}}
+    if method in ("insert_one", "insert_many"):
+        return "insert", {"insert": name}
+    if method in ("update_one", "update_many", "replace_one"):
+        return "update", {"update": name, "updates": [{"q": arg(0, "filter") or {}}]}
+    if method in ("delete_one", "delete_many"):
+        return "delete", {"delete": name, "deletes": [{"q": arg(0, "filter") or {}}]}
+    if method.startswith("find_one_and_"):
+        return "findAndModify", {"findAndModify": name, "query": arg(0, "filter") or {}, "update": arg(1, "update")}
+    if method == "bulk_write":
+        return "bulkWrite", {"bulkWrite": name}
+    return None
+
+
+_MONITORED = ("find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+              "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+              "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write")
+_request_ids = itertools.count(1)
+_depth = threading.local()
+
+
+def _monitor_mongomock():
+    """Make mongomock collections report their calls to the client's event listeners."""
+    import mongomock
+    from mongomock.collection import Collection
+
+    if getattr(Collection, "_monitored_client", None):
+        return Collection._monitored_client
+
+    def wrap(method):
+        original = getattr(Collection, method)
+
+        def monitored(self, *args, **kwargs):
+            # mongomock calls its own public methods internally (find_one -> find)
+            if getattr(_depth, "n", 0):
+                return original(self, *args, **kwargs)
+            # vars(): mongomock clients answer any missing attribute with a database
+            listeners = vars(self.database.client).get("_test_listeners", ())
+            cmd = _command(self.name, method, args, kwargs)
+            rid = next(_request_ids)
+            if cmd:
+                for listener in listeners:
+                    listener.started(SimpleNamespace(command_name=cmd[0], command=cmd[1], request_id=rid,
+                                                     database_name=self.database.name))
+            _depth.n = 1
+            try:
+                result = original(self, *args, **kwargs)
+            finally:
+                _depth.n = 0
+            if cmd:
+                for listener in listeners:
+                    listener.succeeded(SimpleNamespace(command_name=cmd[0], request_id=rid, duration_micros=0, reply={}))
+            return result
+
+        setattr(Collection, method, monitored)
+
+    class MonitoredClient(mongomock.MongoClient):
+        def __init__(self, *args, event_listeners=(), **kwargs):
+            super().__init__(*args, **kwargs)
+            self._test_listeners = list(event_listeners)
+
+    for method in _MONITORED:
+        wrap(method)
+    Collection._monitored_client = MonitoredClient
+    return MonitoredClient
+
+
+@pytest.fixture
+def app(monkeypatch):
+    if not TEST_MONGO_URI:
+        import flask_pymongo
+        monkeypatch.setattr(flask_pymongo, "MongoClient", _monitor_mongomock())
+    from app import create_app
+    from web.extensions import mongo
+
+    application = create_app({"TESTING": True, "MONGO_URI": TEST_MONGO_URI or "mongodb://localhost:27017/education_app_test",
+                              "MAIL_SENDER": "off", "COURSE_DELETE_RESUMER": "off"})
+    # Startup work (unique indexes, id state) runs before the first request; keep
+    # it out of the tests' query counts
+    application.test_client().get("/login")
+    yield application
+    if TEST_MONGO_URI:
+        with application.app_context():
+            mongo.cx.drop_database(mongo.db.name)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    from web.extensions import mongo
+
+    with app.app_context():
+        yield mongo.db
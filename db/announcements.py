@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from db.ids import ref_values
+from db.keyset import encode_cursor, seek
+
+# Announcement feeds. A student enrolled in many long-running courses used to
+# get every announcement ever posted to them on one page. Pages are now read
+# newest first from the (course_id, created_at, _id) index: with course_id an
+# $in, the server merges the per-course index ranges in order and stops after
+# one page, and the opaque cursor resumes strictly after the last item shown.
+READS_COLLECTION = "announcement_reads"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Unread counts stop here; the UI shows "99+"
+UNREAD_CAP = 100
+
+def feed_page(
+    mongo_db,
+    course_ids: Iterable[Any],
+    labels: Mapping[str, str],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Dict[str, Any]:
+    """One page of announcements for ``course_ids``, newest first.
+
+    ``labels`` maps str(course_id) to the label shown with each item (the
+    course code). Returns ``{"items": [...], "next_cursor": token or None}``.
+    """
+    ids = ref_values(course_ids)
+    if not ids:
+        return {"items": [], "next_cursor": None}
+    limit = min(MAX_LIMIT, max(1, int(limit)))
+    query: Dict[str, Any] = {"course_id": {"$in": ids}}
+    if cursor:
+        query = seek(query, cursor)
+    docs = list(mongo_db.announcements.find(query)
+                .sort([("created_at", -1), ("_id", -1)])
+                .limit(limit + 1))
+    more = len(docs) > limit
+    docs = docs[:limit]
+    items = [{
+        "_id": str(a["_id"]),
+        "course_id": str(a.get("course_id")),
+        "course_code": labels.get(str(a.get("course_id")), ""),
+        "title": a.get("title"),
+        "content": a.get("content"),
+        "created_at": a.get("created_at"),
+    } for a in docs]
+    next_cursor = None
+    if more and docs and isinstance(docs[-1].get("created_at"), datetime):
+        next_cursor = encode_cursor(docs[-1]["created_at"], docs[-1]["_id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def seen_at(mongo_db, student_id: Any) -> Optional[datetime]:
+    doc = mongo_db[READS_COLLECTION].find_one({"student_id": str(student_id)}, {"seen_at": 1})
+    return (doc or {}).get("seen_at")
+
+
+def unread_count(mongo_db, student_id: Any, course_ids: Iterable[Any]) -> int:
+    """Announcements newer than the student's last read mark, capped at UNREAD_CAP."""
+    ids = ref_values(course_ids)
+    if not ids:
+        return 0
+    query: Dict[str, Any] = {"course_id": {"$in": ids}}
+    last = seen_at(mongo_db, student_id)
+    if last is not None:
+        query["created_at"] = {"$gt": last}
+    return mongo_db.announcements.count_documents(query, limit=UNREAD_CAP)
+
+
+def mark_seen(mongo_db, student_id: Any, items: List[Dict[str, Any]]) -> None:
+    """Move the read mark up to the newest of ``items`` (never back)."""
+    stamps = [a["created_at"] for a in items if isinstance(a.get("created_at"), datetime)]
+    if not stamps:
+        return
+    mongo_db[READS_COLLECTION].update_one(
+        {"student_id": str(student_id)},
+        {"$max": {"seen_at": max(stamps)}},
+        upsert=True,
+    )
@@ -0,0 +1,198 @@
+"""Content-addressed store for assignment attachments and submission files.
+
+    python -m db.blobs --uri mongodb://localhost:27017/education_app
+    python -m db.blobs --dry-run
+    python -m db.blobs --reconcile
+
+Uploads used to be saved as ``{ObjectId}_{filename}`` each time, so the same
+handout or template submitted by a whole class was stored once per upload.
+Each upload is now streamed to a temp file while it is hashed, and kept once
+under ``static/uploads/blobs/<aa>/<sha256>``; documents keep the hash next to
+their usual path. ``blobs`` holds one row per hash with a reference count, and
+the file goes when the last reference is released.
+
+Run as a script, it moves uploads saved before the store existed into it;
+``--reconcile`` recounts references and removes files nothing points to.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Optional
+
+from pymongo import MongoClient, ReturnDocument
+
+BLOBS_COLLECTION = "blobs"
+BLOBS_DIR = "uploads/blobs"
+CHUNK_SIZE = 1 << 20
+
+# (collection, hash field, path field) of every document that references a blob
+REFERENCES = (
+    ("assignments", "attachment_sha256", "attachment_path"),
+    ("submissions", "file_sha256", "file_path"),
+)
+
+
+def blob_path(sha256: str) -> str:
+    """Path of a blob relative to the static folder, usable with url_for('static', ...)."""
+    return f"{BLOBS_DIR}/{sha256[:2]}/{sha256}"
+
+
+def _full_path(static_dir: str, rel_path: str) -> str:
+    return os.path.join(static_dir, *rel_path.split("/"))
+
+
+def put_stream(mongo_db, static_dir: str, stream: BinaryIO) -> Dict[str, Any]:
+    """Store the bytes of ``stream`` and take one reference to them.
+
+    Returns ``{"sha256", "path", "size"}``; ``path`` is relative to ``static_dir``.
+    """
+    root = _full_path(static_dir, BLOBS_DIR)
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+        sha = digest.hexdigest()
+        rel = blob_path(sha)
+        mongo_db[BLOBS_COLLECTION].update_one(
+            {"_id": sha},
+            {"$inc": {"refs": 1}, "$setOnInsert": {"size": size, "path": rel, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        # Reference first, file second: release() only removes a file after
+        # taking it out of place, so a blob being released concurrently is
+        # either put back by release() or rewritten here
+        full = _full_path(static_dir, rel)
+        if not os.path.exists(full):
+            os.makedirs(os.path.dirname(full), exist_ok=True)
+            os.replace(tmp, full)
+            tmp = None
+    finally:
+        if tmp is not None:
+            os.unlink(tmp)
+    return {"sha256": sha, "path": rel, "size": size}
+
+
+def put_file(mongo_db, static_dir: str, path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return put_stream(mongo_db, static_dir, f)
+
+
+def _remove_file(col, static_dir: str, sha: str, path: Optional[str]) -> bool:
+    """Remove an unreferenced blob unless it is referenced again meanwhile."""
+    full = _full_path(static_dir, path or blob_path(sha))
+    trash = f"{full}.deleting"
+    try:
+        os.replace(full, trash)
+    except FileNotFoundError:
+        trash = None
+    if col.delete_one({"_id": sha, "refs": {"$lte": 0}}).deleted_count:
+        if trash:
+            os.unlink(trash)
+            return True
+    elif trash:
+        # Referenced again meanwhile: put the file back
+        os.replace(trash, full)
+    return False
+
+
+def release(mongo_db, static_dir: str, hashes: Iterable[str]) -> int:
+    """Drop one reference per hash (repeat a hash to drop several); returns the number of files removed."""
+    counts: Dict[str, int] = {}
+    for h in hashes:
+        if h:
+            counts[h] = counts.get(h, 0) + 1
+    col = mongo_db[BLOBS_COLLECTION]
+    removed = 0
+    for sha, n in counts.items():
+        doc = col.find_one_and_update({"_id": sha}, {"$inc": {"refs": -n}}, return_document=ReturnDocument.AFTER)
+        if doc is not None and doc.get("refs", 0) <= 0 and _remove_file(col, static_dir, sha, doc.get("path")):
+            removed += 1
+    return removed
+
+
+def count_references(mongo_db, sha256: str) -> int:
+    return sum(mongo_db[name].count_documents({hash_field: sha256}) for name, hash_field, _ in REFERENCES)
+
+
+def reconcile(mongo_db, static_dir: str, hashes: Iterable[str]) -> int:
+    """Set each blob's count to the documents that actually reference it; returns the files removed.
+
+    Unlike release() this is idempotent, so a job that deletes documents in
+    batches can note their hashes first and reconcile them after a crash.
+    """
+    col = mongo_db[BLOBS_COLLECTION]
+    removed = 0
+    for sha in {h for h in hashes if h}:
+        while True:
+            doc = col.find_one({"_id": sha})
+            if doc is None:
+                break
+            actual = count_references(mongo_db, sha)
+            # Compare-and-set so an upload taking a reference meanwhile is not lost
+            if col.update_one({"_id": sha, "refs": doc.get("refs", 0)}, {"$set": {"refs": actual}}).matched_count:
+                if actual <= 0 and _remove_file(col, static_dir, sha, doc.get("path")):
+                    removed += 1
+                break
+    return removed
+
+
+def import_legacy(mongo_db, static_dir: str, dry_run: bool = False) -> Dict[str, Dict[str, int]]:
+    """Move uploads saved before the blob store into it, one document at a time (safe to re-run)."""
+    summary: Dict[str, Dict[str, int]] = {}
+    for name, hash_field, path_field in REFERENCES:
+        stats = {"scanned": 0, "imported": 0, "missing": 0, "bytes": 0}
+        query = {path_field: {"$nin": [None, ""]}, hash_field: {"$exists": False}}
+        for doc in mongo_db[name].find(query, {path_field: 1}):
+            stats["scanned"] += 1
+            old = _full_path(static_dir, str(doc[path_field]).replace("\\", "/"))
+            if not os.path.isfile(old):
+                stats["missing"] += 1
+                continue
+            if dry_run:
+                continue
+            blob = put_file(mongo_db, static_dir, old)
+            mongo_db[name].update_one({"_id": doc["_id"]},
+                                      {"$set": {hash_field: blob["sha256"], path_field: blob["path"]}})
+            os.unlink(old)
+            stats["imported"] += 1
+            stats["bytes"] += blob["size"]
+        summary[name] = stats
+    if not dry_run:
+        # What is left on disk once duplicates are folded together
+        stored = sum(d.get("size", 0) for d in mongo_db[BLOBS_COLLECTION].find({}, {"size": 1}))
+        summary["blobs"] = {"count": mongo_db[BLOBS_COLLECTION].count_documents({}), "bytes": stored}
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/education_app"))
+    ap.add_argument("--static-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"))
+    ap.add_argument("--dry-run", action="store_true", help="only count the uploads to import")
+    ap.add_argument("--reconcile", action="store_true", help="recount every blob's references and remove orphans")
+    args = ap.parse_args(argv)
+
+    mongo_db = MongoClient(args.uri).get_default_database("education_app")
+    if args.reconcile:
+        hashes = [d["_id"] for d in mongo_db[BLOBS_COLLECTION].find({}, {"_id": 1})]
+        print(f"removed {reconcile(mongo_db, args.static_dir, hashes)} unreferenced blobs")
+        return 0
+    for name, stats in import_legacy(mongo_db, args.static_dir, args.dry_run).items():
+        print(f"{name:12s} " + " ".join(f"{k}={v}" for k, v in stats.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
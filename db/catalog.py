@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from db.ids import as_object_id
+
+# In-process course catalog. The courses collection is small and changes
+# rarely, yet the student pages looked courses up one at a time (and the
+# enrollment page listed every active course on each GET and POST). Each
+# worker keeps a snapshot of the whole collection tagged with a version number
+# that lives in Mongo (``cache_versions``); every code path that writes courses
+# bumps it, and readers compare the stored version with their snapshot before
+# use, so all workers see a change on their next request.
+VERSIONS_COLLECTION = "cache_versions"
+COURSES = "courses"
+
+
+def read_version(mongo_db, name: str = COURSES) -> int:
+    doc = mongo_db[VERSIONS_COLLECTION].find_one({"_id": name}, {"version": 1})
+    return int((doc or {}).get("version") or 0)
+
+
+def bump_version(mongo_db, name: str = COURSES) -> int:
+    doc = mongo_db[VERSIONS_COLLECTION].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc["version"])
+
+
+def is_active(course: Dict[str, Any]) -> bool:
+    # Courses created before the flag existed count as active
+    return course.get("active", True) is True
+
+
+class CatalogSnapshot:
+    """Immutable view of the courses collection at one version. Callers must not mutate the docs."""
+
+    def __init__(self, version: int, docs: List[Dict[str, Any]]):
+        self.version = version
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        for d in docs:
+            self._by_id[d["_id"]] = d
+            if d.get("code"):
+                self._by_code[str(d["code"])] = d
+        self.active: Tuple[Dict[str, Any], ...] = tuple(
+            sorted((d for d in docs if is_active(d)), key=lambda d: str(d.get("code") or "")))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def by_id(self, course_id: Any) -> Optional[Dict[str, Any]]:
+        if course_id is None:
+            return None
+        # Legacy rows may carry the id as a hex string
+        return self._by_id.get(as_object_id(course_id) or course_id)
+
+    def by_code(self, code: Any) -> Optional[Dict[str, Any]]:
+        return self._by_code.get(str(code)) if code else None
+
+    def resolve(self, course_id: Any = None, code: Any = None) -> Optional[Dict[str, Any]]:
+        return self.by_id(course_id) or self.by_code(code)
+
+
+class CourseCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def snapshot(self, mongo_db) -> CatalogSnapshot:
+        """Current snapshot, reloaded when the stored version has moved on."""
+        version = read_version(mongo_db)
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.version != version:
+                # Version is read before the documents: a write racing the load
+                # leaves a stale version behind, which only costs one more reload
+                snap = CatalogSnapshot(version, list(mongo_db[COURSES].find({})))
+                self._snapshot = snap
+            return snap
+
+    def invalidate(self) -> None:
+        self._snapshot = None
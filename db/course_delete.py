@@ -0,0 +1,355 @@
+"""Background, resumable deletion of a course and everything that hangs off it.
+
+    python -m db.course_delete --uri mongodb://localhost:27017/education_app
+    python -m db.course_delete --course 64b7f0c2e4b0a1a2b3c4d5e6
+
+Deleting a long-running course used to remove its submissions, results,
+enrollments, announcements and attendance in one request. The request now only
+marks the course as deleting (it drops out of the catalog at once) and records
+a job in ``course_deletions``; a worker thread removes the dependents in
+bounded batches with a pause between them, saving its counts after each batch.
+The uploads and students each batch touched go to ``course_deletion_refs``
+(one row per job and value, so a large course cannot outgrow the job
+document) and are reconciled/refreshed once the dependents are gone.
+Every step deletes "whatever still matches", so a job interrupted by a crash
+is simply run again: the CLI (without --course it resumes every unfinished
+job) or the app's resumer thread picks it up once its heartbeat is stale.
+Failed runs are retried with exponential backoff; after MAX_ATTEMPTS the job
+stays ``failed`` until someone runs it by hand with ``--course``.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.features import refresh_student_features  # noqa: E402
+from analytics.progress import invalidate_student_progress  # noqa: E402
+from analytics.risk import refresh_student_risk  # noqa: E402
+from db.blobs import reconcile  # noqa: E402
+from db.catalog import COURSES, bump_version  # noqa: E402
+from db.ids import ref_values  # noqa: E402
+
+JOBS_COLLECTION = "course_deletions"
+REFS_COLLECTION = "course_deletion_refs"
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAUSE_MS = 50
+# A running job whose heartbeat is older than this is taken over
+STALE_AFTER = timedelta(minutes=2)
+# Dependents in deletion order; assignments go after their submissions
+STEPS = ("submissions", "assignments", "results", "enrollments", "announcements", "attendance")
+# Students whose derived rows are refreshed per call
+REFRESH_CHUNK = 500
+# Automatic runs per job; a failed run waits RETRY_BASE * 2**(attempts - 1)
+MAX_ATTEMPTS = 5
+RETRY_BASE = timedelta(minutes=2)
+# How often the app's resumer looks for jobs nobody is working on
+DEFAULT_RESUME_S = STALE_AFTER.total_seconds()
+RESUMER_MODES = ("thread", "off")
+
+
+def get_job(mongo_db, course_id: Any) -> Optional[Dict[str, Any]]:
+    return mongo_db[JOBS_COLLECTION].find_one({"_id": course_id})
+
+
+def request_deletion(mongo_db, course: Dict[str, Any]) -> Dict[str, Any]:
+    """Mark ``course`` as deleting and record its job; cheap enough for a request."""
+    now = datetime.utcnow()
+    mongo_db.courses.update_one({"_id": course["_id"]},
+                                {"$set": {"deleting": True, "active": False, "deleting_since": now}})
+    bump_version(mongo_db, COURSES)
+    return mongo_db[JOBS_COLLECTION].find_one_and_update(
+        {"_id": course["_id"]},
+        {"$setOnInsert": {
+            "course_code": course.get("code"),
+            "instructor_id": course.get("instructor_id"),
+            "status": "pending",
+            "steps": {},
+            "created_at": now,
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _claimable(now: datetime, manual: bool = False) -> Dict[str, Any]:
+    """Filter for jobs a worker may take; ``manual`` ignores the backoff and the attempt cap."""
+    if manual:
+        return {"$or": [
+            {"status": {"$in": ["pending", "failed"]}},
+            {"status": "running", "heartbeat_at": {"$lt": now - STALE_AFTER}},
+        ]}
+    # $not also matches jobs recorded before attempts/retry_at existed
+    under_cap = {"attempts": {"$not": {"$gte": MAX_ATTEMPTS}}}
+    return {"$or": [
+        {"status": "pending"},
+        {"status": "failed", "retry_at": {"$not": {"$gt": now}}, **under_cap},
+        # A worker that died mid-run counts as a failed attempt
+        {"status": "running", "heartbeat_at": {"$lt": now - STALE_AFTER}, **under_cap},
+    ]}
+
+
+def _claim(mongo_db, course_id: Any, owner: str, manual: bool = False) -> Optional[Dict[str, Any]]:
+    now = datetime.utcnow()
+    update: Dict[str, Any] = {"$set": {"status": "running", "owner": owner, "heartbeat_at": now},
+                              "$unset": {"error": "", "retry_at": ""}}
+    if manual:
+        update["$set"]["attempts"] = 1
+    else:
+        update["$inc"] = {"attempts": 1}
+    return mongo_db[JOBS_COLLECTION].find_one_and_update(
+        {"_id": course_id, **_claimable(now, manual)}, update, return_document=ReturnDocument.AFTER)
+
+
+def _save(mongo_db, course_id: Any, owner: str, update: Dict[str, Any]) -> None:
+    update.setdefault("$set", {})["heartbeat_at"] = datetime.utcnow()
+    res = mongo_db[JOBS_COLLECTION].update_one({"_id": course_id, "owner": owner}, update)
+    if not res.matched_count:
+        raise RuntimeError("course deletion was taken over by another worker")
+
+
+def _filters(mongo_db, job: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    oid, code = job["_id"], job.get("course_code")
+    assignment_ids = [a["_id"] for a in mongo_db.assignments.find({"course_id": oid}, {"_id": 1})]
+    return {
+        "submissions": {"assignment_id": {"$in": ref_values(assignment_ids)}} if assignment_ids else None,
+        "assignments": {"course_id": oid},
+        # Legacy results carry the code in course_id
+        "results": {"course_id": {"$in": [oid, code] if code else [oid]}},
+        "enrollments": {"course_id": oid},
+        "announcements": {"course_id": oid},
+        "attendance": {"course_code": code} if code else None,
+    }
+
+
+# Fields read from each batch before it is deleted: uploaded files to
+# reconcile and students whose risk/features/progress change
+_BATCH_FIELDS = {
+    "submissions": {"file_sha256": 1, "student_id": 1},
+    "assignments": {"attachment_sha256": 1},
+    "results": {"student_id": 1},
+    "enrollments": {"user_id": 1},
+    "attendance": {"student_id": 1},
+}
+
+
+def _batch_refs(name: str, docs: List[Dict[str, Any]]):
+    hashes, students = set(), set()
+    for d in docs:
+        h = d.get("file_sha256") or d.get("attachment_sha256")
+        if h:
+            hashes.add(h)
+        s = d.get("user_id") if name == "enrollments" else d.get("student_id")
+        if s not in (None, ""):
+            students.add(str(s))
+    return hashes, students
+
+
+def _record_refs(mongo_db, course_id: Any, hashes: Iterable[str], students: Iterable[str]) -> None:
+    now = datetime.utcnow()
+    ops = [UpdateOne({"job_id": course_id, "kind": kind, "value": v}, {"$setOnInsert": {"recorded_at": now}}, upsert=True)
+           for kind, values in (("blob", hashes), ("student", students)) for v in sorted(values)]
+    if ops:
+        mongo_db[REFS_COLLECTION].bulk_write(ops, ordered=False)
+
+
+def _refs(mongo_db, job: Dict[str, Any], kind: str) -> Iterator[str]:
+    cursor = mongo_db[REFS_COLLECTION].find({"job_id": job["_id"], "kind": kind}, {"_id": 0, "value": 1}).sort("value", 1)
+    for d in cursor:
+        yield d["value"]
+    # Jobs recorded by older versions kept these as arrays in the job document
+    yield from job.get("blob_hashes" if kind == "blob" else "students") or []
+
+
+def _chunks(values: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for v in values:
+        chunk.append(v)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_deletion(mongo_db, static_dir: str, course_id: Any, batch_size: int = DEFAULT_BATCH_SIZE,
+                 pause_ms: int = DEFAULT_PAUSE_MS, manual: bool = False) -> Optional[Dict[str, Any]]:
+    """Run (or resume) one course's deletion job; returns the finished job, or None if it is not claimable.
+
+    ``manual`` (the CLI's --course) also takes a job that used up its
+    automatic attempts or is still backing off, and restarts its count.
+    """
+    owner = uuid.uuid4().hex
+    job = _claim(mongo_db, course_id, owner, manual)
+    if job is None:
+        return None
+    try:
+        filters = _filters(mongo_db, job)
+        steps = job.get("steps") or {}
+        if not steps:
+            # Progress denominators, counted once when the job first runs
+            _save(mongo_db, course_id, owner, {"$set": {
+                f"steps.{name}": {"total": mongo_db[name].count_documents(query) if query else 0, "deleted": 0}
+                for name, query in filters.items()}})
+        for name in STEPS:
+            if (steps.get(name) or {}).get("done"):
+                continue
+            query = filters[name]
+            col = mongo_db[name]
+            while query is not None:
+                docs = list(col.find(query, _BATCH_FIELDS.get(name, {"_id": 1})).limit(batch_size))
+                if not docs:
+                    break
+                hashes, students = _batch_refs(name, docs)
+                # Recorded before the delete so a crash cannot lose them
+                _record_refs(mongo_db, course_id, hashes, students)
+                deleted = col.delete_many({"_id": {"$in": [d["_id"] for d in docs]}}).deleted_count
+                _save(mongo_db, course_id, owner, {"$inc": {f"steps.{name}.deleted": deleted}})
+                if pause_ms:
+                    time.sleep(pause_ms / 1000.0)
+            _save(mongo_db, course_id, owner, {"$set": {f"steps.{name}.done": True}})
+
+        job = get_job(mongo_db, course_id)
+        removed = sum(reconcile(mongo_db, static_dir, chunk) for chunk in _chunks(_refs(mongo_db, job, "blob"), REFRESH_CHUNK))
+        mongo_db.courses.delete_one({"_id": course_id})
+        bump_version(mongo_db, COURSES)
+        for chunk in _chunks(_refs(mongo_db, job, "student"), REFRESH_CHUNK):
+            refresh_student_risk(mongo_db, chunk)
+            refresh_student_features(mongo_db, chunk)
+            invalidate_student_progress(mongo_db, chunk)
+        _save(mongo_db, course_id, owner, {"$set": {"status": "done", "files_removed": removed,
+                                                    "finished_at": datetime.utcnow()},
+                                           "$unset": {"blob_hashes": "", "students": ""}})
+        mongo_db[REFS_COLLECTION].delete_many({"job_id": course_id})
+    except Exception as e:
+        attempts = int(job.get("attempts") or 1)
+        retry_at = datetime.utcnow() + RETRY_BASE * 2 ** (attempts - 1)
+        mongo_db[JOBS_COLLECTION].update_one({"_id": course_id, "owner": owner},
+                                             {"$set": {"status": "failed", "error": str(e), "retry_at": retry_at}})
+        raise
+    return get_job(mongo_db, course_id)
+
+
+def progress(job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """JSON-friendly view of a job: status, per-step counts and an overall percentage."""
+    if job is None:
+        return None
+    steps = job.get("steps") or {}
+    total = sum((steps.get(s) or {}).get("total", 0) for s in STEPS)
+    deleted = sum(min((steps.get(s) or {}).get("deleted", 0), (steps.get(s) or {}).get("total", 0)) for s in STEPS)
+    pct = 100.0 if job.get("status") == "done" else (round(100.0 * deleted / total, 1) if total else 0.0)
+    return {
+        "course_id": str(job["_id"]),
+        "course_code": job.get("course_code"),
+        "status": job.get("status"),
+        "percent": pct,
+        "steps": {s: dict(steps[s]) for s in STEPS if s in steps},
+        "files_removed": job.get("files_removed"),
+        "error": job.get("error"),
+        "attempts": job.get("attempts", 0),
+        # False once automatic retries are used up
+        "retrying": job.get("status") != "failed" or int(job.get("attempts") or 0) < MAX_ATTEMPTS,
+        "created_at": job.get("created_at").isoformat() if job.get("created_at") else None,
+        "finished_at": job.get("finished_at").isoformat() if job.get("finished_at") else None,
+    }
+
+
+def resumable(mongo_db, instructor_id: Any = None) -> List[ObjectId]:
+    """Unfinished jobs that nobody is working on and are due a retry (optionally only one instructor's)."""
+    q: Dict[str, Any] = _claimable(datetime.utcnow())
+    if instructor_id is not None:
+        q["instructor_id"] = instructor_id
+    return [j["_id"] for j in mongo_db[JOBS_COLLECTION].find(q, {"_id": 1})]
+
+
+def _run_jobs(app, course_ids: Iterable[Any]) -> None:
+    from web.extensions import mongo
+
+    with app.app_context():
+        for cid in course_ids:
+            try:
+                run_deletion(mongo.db, os.path.join(app.root_path, "static"), cid,
+                             batch_size=app.config.get("COURSE_DELETE_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+                             pause_ms=app.config.get("COURSE_DELETE_PAUSE_MS", DEFAULT_PAUSE_MS))
+            except Exception:
+                app.logger.exception("course deletion %s failed", cid)
+
+
+def start_in_background(app, course_ids: Iterable[Any]) -> None:
+    """Run the given jobs one after another on a daemon thread with an app context."""
+    ids = list(course_ids)
+    if ids:
+        threading.Thread(target=_run_jobs, args=(app, ids), name="course-delete", daemon=True).start()
+
+
+def init_course_deletion(app) -> None:
+    """Resume unfinished jobs on one daemon thread per app, started before the first request.
+
+    Jobs are claimed with a heartbeat, so resumers in several processes (and
+    the CLI) can run side by side. ``COURSE_DELETE_RESUMER = "off"`` leaves it
+    to ``python -m db.course_delete``.
+    """
+    app.config.setdefault("COURSE_DELETE_RESUMER", os.getenv("COURSE_DELETE_RESUMER", "thread"))
+    app.config.setdefault("COURSE_DELETE_RESUME_S", DEFAULT_RESUME_S)
+    if app.config["COURSE_DELETE_RESUMER"] not in RESUMER_MODES:
+        raise ValueError(f"COURSE_DELETE_RESUMER must be one of {RESUMER_MODES}")
+    started = []
+
+    @app.before_request
+    def _start_course_delete_resumer():
+        if started:
+            return
+        started.append(True)
+        if app.config["COURSE_DELETE_RESUMER"] == "thread":
+            threading.Thread(target=_resume_loop, args=(app,), name="course-delete-resumer", daemon=True).start()
+
+
+def _resume_loop(app) -> None:
+    from web.extensions import mongo
+
+    while True:
+        try:
+            with app.app_context():
+                ids = resumable(mongo.db)
+            _run_jobs(app, ids)
+        except Exception:
+            app.logger.exception("looking for unfinished course deletions failed")
+        time.sleep(float(app.config["COURSE_DELETE_RESUME_S"]))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/education_app"))
+    ap.add_argument("--static-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"))
+    ap.add_argument("--course", help="run this course's job, even after its automatic retries ran out "
+                                     "(default: every unfinished job that is due)")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--pause-ms", type=int, default=DEFAULT_PAUSE_MS)
+    args = ap.parse_args(argv)
+
+    mongo_db = MongoClient(args.uri).get_default_database("education_app")
+    ids = [ObjectId(args.course)] if args.course else resumable(mongo_db)
+    status = 0
+    for cid in ids:
+        job = run_deletion(mongo_db, args.static_dir, cid, args.batch_size, args.pause_ms, manual=bool(args.course))
+        view = progress(job or get_job(mongo_db, cid))
+        if view is None:
+            print(f"{cid}: no such job")
+            status = 1
+            continue
+        counts = " ".join(f"{s}={v.get('deleted', 0)}" for s, v in view["steps"].items())
+        print(f"{cid} {view['course_code']}: {view['status']} {counts} files_removed={view['files_removed']}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
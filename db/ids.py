@@ -0,0 +1,76 @@
+from typing import Any, Iterable, List, Optional
+
+from bson.objectid import ObjectId
+
+# Canonical reference types:
+#   enrollments: user_id (ObjectId), course_id (ObjectId), course_code
+#   submissions: assignment_id, student_id, course_id (ObjectId), course_code
+#   results:     student_id (ObjectId for app users, raw id for imported rows),
+#                course_id (ObjectId), course_code, ref_id (ObjectId)
+#   courses:     instructor_id (ObjectId)
+#
+# Until db.migrations has converted every legacy document, an id may still be
+# stored as its hex string. Reads go through ref()/refs(), which match both
+# representations on the one canonical field (a two-point $in on the same
+# index). Once the migration is recorded as complete they collapse to plain
+# ObjectId equality.
+_canonical = False
+
+
+def set_canonical(flag: bool) -> None:
+    global _canonical
+    _canonical = bool(flag)
+
+
+def is_canonical() -> bool:
+    return _canonical
+
+
+def as_object_id(value: Any) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and len(value) == 24 and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return None
+
+
+def canonical(value: Any) -> Any:
+    """Value to store for a reference: ObjectId when it is one, else unchanged."""
+    oid = as_object_id(value)
+    return oid if oid is not None else value
+
+
+def _forms(value: Any) -> List[Any]:
+    oid = as_object_id(value)
+    if oid is None:
+        return [value]
+    return [oid] if _canonical else [oid, str(oid)]
+
+
+def ref(value: Any) -> Any:
+    """Query value matching a reference in either stored representation."""
+    forms = _forms(value)
+    return forms[0] if len(forms) == 1 else {"$in": forms}
+
+
+def ref_values(values: Iterable[Any]) -> List[Any]:
+    out: List[Any] = []
+    seen = set()
+    for v in values:
+        if v in (None, ""):
+            continue
+        for f in _forms(v):
+            if f not in seen:
+                seen.add(f)
+                out.append(f)
+    return out
+
+
+def refs(values: Iterable[Any]) -> dict:
+    return {"$in": ref_values(values)}
+
+
+def load_canonical_state(mongo_db) -> bool:
+    from db.migrations import migration_complete
+    set_canonical(migration_complete(mongo_db))
+    return _canonical
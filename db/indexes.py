@@ -0,0 +1,240 @@
+"""Managed index definitions for every collection the app queries.
+
+    python -m db.indexes                  # create missing indexes
+    python -m db.indexes --report         # show missing / unmanaged indexes
+    python -m db.indexes --drop-unmanaged # also drop indexes not listed here
+
+Each entry backs one or more shapes in db/query_shapes.py; keep the two in
+step when adding a query. Index names are left to the server defaults so
+existing deployments converge without renames.
+"""
+import argparse
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from db.keyset import CI_COLLATION
+
+Keys = List[Tuple[str, int]]
+
+
+def _ix(keys: Keys, **options: Any) -> IndexModel:
+    return IndexModel(keys, **options)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        _ix([("email", ASCENDING)], unique=True),
+        _ix([("created_at", DESCENDING)]),
+        # admin dashboard: newest users of a role; overviews: role sorted by name
+        _ix([("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        _ix([("role", ASCENDING), ("name", ASCENDING)]),
+        _ix([("reset_token", ASCENDING)], sparse=True),
+    ],
+    "courses": [
+        _ix([("code", ASCENDING)], unique=True),
+        _ix([("instructor_id", ASCENDING), ("code", ASCENDING)]),
+    ],
+    "enrollments": [
+        _ix([("user_id", ASCENDING), ("course_id", ASCENDING)], unique=True),
+        _ix([("course_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "assignments": [
+        _ix([("course_id", ASCENDING)]),
+        # blob reference counts (db/blobs.reconcile)
+        _ix([("attachment_sha256", ASCENDING)], sparse=True),
+    ],
+    "submissions": [
+        _ix([("assignment_id", ASCENDING), ("student_id", ASCENDING)]),
+        _ix([("assignment_id", ASCENDING), ("submitted_on", DESCENDING)]),
+        _ix([("student_id", ASCENDING), ("assignment_id", ASCENDING)]),
+        _ix([("file_sha256", ASCENDING)], sparse=True),
+    ],
+    "results": [
+        # grade upsert/delete key; its student_id prefix serves per-student reads
+        _ix([("student_id", ASCENDING), ("component", ASCENDING), ("ref_id", ASCENDING)]),
+        _ix([("course_id", ASCENDING)]),
+    ],
+    "announcements": [
+        # feed pages: $in on course_id merges the per-course ranges in (created_at, _id) order
+        _ix([("course_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "announcement_reads": [
+        _ix([("student_id", ASCENDING)], unique=True),
+    ],
+    "academic_records": [
+        _ix([("student_id", ASCENDING), ("course_code", ASCENDING), ("term", ASCENDING)], unique=True),
+    ],
+    "demographics": [
+        _ix([("student_id", ASCENDING)], unique=True),
+    ],
+    "lms_events": [
+        _ix([("event_id", ASCENDING)], unique=True),
+        _ix([("student_id", ASCENDING), ("event_time", ASCENDING)]),
+        # rollup rebuild: its cutoff and the events ingested while it ran
+        _ix([("ingested_at", ASCENDING)]),
+    ],
+    "attendance": [
+        _ix([("student_id", ASCENDING), ("course_code", ASCENDING), ("date", ASCENDING)], unique=True),
+        _ix([("course_code", ASCENDING)]),
+    ],
+    "feedbacks": [
+        _ix([("email", ASCENDING), ("created_at", DESCENDING)]),
+        _ix([("created_at", DESCENDING)]),
+        _ix([("status", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "predictions": [
+        _ix([("created_at", DESCENDING)]),
+        _ix([("analyst_email", ASCENDING)]),
+    ],
+    "models": [
+        _ix([("analyst_email", ASCENDING), ("created_at", DESCENDING)]),
+        _ix([("created_at", DESCENDING)]),
+    ],
+    "ml_datasets": [
+        _ix([("analyst_email", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "ml_dataset_rows": [
+        _ix([("dataset_id", ASCENDING)]),
+    ],
+    "manual_predictions": [
+        # newest first with keyset pages (db/keyset.py)
+        _ix([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        # /admin/predictions "starts with" filters: case-insensitive ranges
+        # need queries with the same collation
+        _ix([("analyst_email", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], collation=CI_COLLATION),
+        _ix([("analyst", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], collation=CI_COLLATION),
+    ],
+    "ml_predictions": [
+        _ix([("created_at", DESCENDING)]),
+        _ix([("analyst_email", ASCENDING), ("created_at", DESCENDING)]),
+        # analyst_reports: per-target counts and keyset pages of one target
+        _ix([("analyst_email", ASCENDING), ("type", ASCENDING), ("target", ASCENDING),
+             ("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "admin_notifications": [
+        _ix([("created_at", DESCENDING)]),
+        _ix([("type", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "lms_event_rollups": [
+        _ix([("granularity", ASCENDING), ("bucket", ASCENDING), ("course_code", ASCENDING), ("event_type", ASCENDING)], unique=True),
+        _ix([("granularity", ASCENDING), ("event_type", ASCENDING), ("course_code", ASCENDING)]),
+        _ix([("granularity", ASCENDING), ("course_code", ASCENDING), ("bucket", ASCENDING)]),
+    ],
+    "student_risk": [
+        _ix([("student_id", ASCENDING)], unique=True),
+        _ix([("at_risk", ASCENDING), ("avg_score", ASCENDING), ("attendance_rate", ASCENDING)]),
+        _ix([("attendance_rate", ASCENDING)]),
+    ],
+    "student_features": [
+        _ix([("student_id", ASCENDING)], unique=True),
+        _ix([("updated_at", DESCENDING)]),
+    ],
+    "student_progress": [
+        _ix([("student_id", ASCENDING)], unique=True),
+    ],
+    # uploads and students a course deletion touched (db/course_delete.py)
+    "course_deletion_refs": [
+        _ix([("job_id", ASCENDING), ("kind", ASCENDING), ("value", ASCENDING)], unique=True),
+    ],
+    "mail_outbox": [
+        # sender: due messages and expired leases; /metrics: depth by status
+        _ix([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        _ix([("claim", ASCENDING)], sparse=True),
+        # sent messages are kept for a week, failed ones for a month
+        _ix([("sent_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+        _ix([("failed_at", ASCENDING)], expireAfterSeconds=30 * 24 * 3600),
+    ],
+}
+
+
+def _key_tuple(keys: Any) -> Tuple[Tuple[str, Any], ...]:
+    # list_indexes may report directions as floats on older servers
+    return tuple((k, int(v) if isinstance(v, (int, float)) else v) for k, v in dict(keys).items())
+
+
+def ensure_indexes(mongo_db, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """Create the managed indexes (all collections, or just the given ones)."""
+    created: Dict[str, List[str]] = {}
+    for name in (collections or INDEXES.keys()):
+        models = INDEXES.get(name) or []
+        if models:
+            created[name] = mongo_db[name].create_indexes(models)
+    return created
+
+
+def ensure_unique_indexes(mongo_db) -> Dict[str, str]:
+    """Create just the unique indexes, which upserts rely on for correctness (cheap when they exist).
+
+    Returns ``{collection: error}`` for indexes that cannot be built because
+    the collection already holds duplicates; connection errors propagate.
+    """
+    failed: Dict[str, str] = {}
+    for name, models in INDEXES.items():
+        unique = [m for m in models if m.document.get("unique")]
+        if not unique:
+            continue
+        try:
+            mongo_db[name].create_indexes(unique)
+        except (DuplicateKeyError, OperationFailure) as e:
+            if getattr(e, "code", None) not in (11000, 11001):
+                raise
+            failed[name] = str(e)
+    return failed
+
+
+def ensure_indexes_on(mongo_db, name: str, target: str) -> List[str]:
+    """Create ``name``'s managed indexes on ``target``, a staging copy about to be renamed over it."""
+    models = INDEXES.get(name) or []
+    return mongo_db[target].create_indexes(models) if models else []
+
+
+def index_report(mongo_db) -> Dict[str, Dict[str, List[Any]]]:
+    report: Dict[str, Dict[str, List[Any]]] = {}
+    for name, models in INDEXES.items():
+        existing = {}
+        for ix in mongo_db[name].list_indexes():
+            if ix["name"] != "_id_":
+                existing[_key_tuple(ix["key"])] = ix["name"]
+        wanted = {_key_tuple(m.document["key"]): m.document["name"] for m in models}
+        missing = [n for k, n in wanted.items() if k not in existing]
+        unmanaged = [n for k, n in existing.items() if k not in wanted]
+        if missing or unmanaged:
+            report[name] = {"missing": missing, "unmanaged": unmanaged}
+    return report
+
+
+def drop_unmanaged(mongo_db) -> Dict[str, List[str]]:
+    dropped: Dict[str, List[str]] = {}
+    for name, entry in index_report(mongo_db).items():
+        for ix_name in entry["unmanaged"]:
+            mongo_db[name].drop_index(ix_name)
+            dropped.setdefault(name, []).append(ix_name)
+    return dropped
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/education_app"))
+    ap.add_argument("--report", action="store_true", help="only report differences")
+    ap.add_argument("--drop-unmanaged", action="store_true")
+    args = ap.parse_args(argv)
+
+    mongo_db = MongoClient(args.uri).get_default_database("education_app")
+    if not args.report:
+        for name, names in ensure_indexes(mongo_db).items():
+            print(f"{name}: {', '.join(names)}")
+        if args.drop_unmanaged:
+            for name, names in drop_unmanaged(mongo_db).items():
+                print(f"{name}: dropped {', '.join(names)}")
+    report = index_report(mongo_db)
+    for name, entry in sorted(report.items()):
+        print(f"{name:22s} missing={entry['missing']} unmanaged={entry['unmanaged']}")
+    return 1 if any(e["missing"] for e in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
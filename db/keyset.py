@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+# Keyset ("seek") pagination on (created_at, _id), newest first. A page is
+# read from the index starting strictly after the last item of the previous
+# one, so page 1000 costs the same as page 1 (skip() walks and discards every
+# earlier row). Cursors are opaque "<ms>-<oid>" tokens.
+_EPOCH = datetime(1970, 1, 1)
+# Sorts after every string under an ICU collation (CLDR reserves U+FFFF as
+# the maximal primary weight), so [p, p + PREFIX_END) is "starts with p"
+PREFIX_END = "\uffff"
+# Case-insensitive comparisons; queries must use it to match a collated index
+CI_COLLATION = {"locale": "en", "strength": 2}
+
+
+def encode_cursor(created_at: datetime, oid: ObjectId) -> str:
+    ms = (created_at - _EPOCH) // timedelta(milliseconds=1)
+    return f"{ms}-{oid}"
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError for a malformed token."""
+    try:
+        ms, oid = token.split("-", 1)
+        return _EPOCH + timedelta(milliseconds=int(ms)), ObjectId(oid)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def seek(query: Dict[str, Any], token: str, older: bool = True) -> Dict[str, Any]:
+    """``query`` restricted to items strictly older (or newer) than the cursor."""
+    at, oid = decode_cursor(token)
+    op, strict = ("$lte", "$lt") if older else ("$gte", "$gt")
+    bound: Dict[str, Any] = {op: at}
+    existing = query.get("created_at")
+    if isinstance(existing, dict):
+        # Keep the caller's date range next to the cursor bound
+        bound = {**existing, **bound}
+    # Range on created_at for the index bounds; ties broken by _id
+    extra = {"created_at": bound, "$or": [{"created_at": {strict: at}}, {"_id": {strict: oid}}]}
+    if "$or" in query:
+        return {"$and": [query, extra]}
+    return {**query, **extra}
+
+
+def prefix_range(prefix: str) -> Dict[str, str]:
+    """Range matching strings that start with ``prefix``; case-insensitive under CI_COLLATION."""
+    return {"$gte": prefix, "$lt": prefix + PREFIX_END}
+
+
+def page(collection, query: Dict[str, Any], limit: int, after: Optional[str] = None, before: Optional[str] = None,
+         collation: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """One page newest first: the items older than ``after`` or, going back, newer than ``before``.
+
+    Returns ``{"items", "next_cursor", "prev_cursor"}``; a cursor is None when
+    there is nothing further that way. Raises ValueError for a bad token.
+    """
+    older = before is None
+    q = seek(query, before, older=False) if before else (seek(query, after) if after else query)
+    direction = -1 if older else 1
+    opts = {"collation": collation} if collation else {}
+    docs: List[Dict[str, Any]] = list(collection.find(q, projection, **opts)
+                                      .sort([("created_at", direction), ("_id", direction)]).limit(limit + 1))
+    more = len(docs) > limit
+    docs = docs[:limit]
+    if not older:
+        docs.reverse()
+
+    def token(doc):
+        at = doc.get("created_at")
+        return encode_cursor(at, doc["_id"]) if isinstance(at, datetime) else None
+
+    first_page = older and not after
+    return {
+        "items": docs,
+        "next_cursor": token(docs[-1]) if docs and (more or not older) else None,
+        "prev_cursor": token(docs[0]) if docs and not first_page and (more or older) else None,
+    }
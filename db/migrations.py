@@ -0,0 +1,326 @@
+"""Batched, resumable migration of legacy id references to canonical types.
+
+    python -m db.migrations --uri mongodb://localhost:27017/education_app
+    python -m db.migrations --dry-run --batch-size 200
+
+Each collection is walked in ``_id`` order; progress is checkpointed in
+``schema_migrations`` after every batch so an interrupted run resumes where
+it stopped. See db/ids.py for the canonical shapes.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.catalog import COURSES, bump_version  # noqa: E402
+from db.ids import as_object_id, canonical  # noqa: E402
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+CANONICAL_IDS = "canonical_ids"
+STEPS = ("courses", "enrollments", "submissions", "results")
+MAX_REPORTED_CONFLICTS = 100
+
+USER_FIELDS = ("user_id", "student_id", "studentId", "userId")
+EMAIL_FIELDS = ("student_email", "email")
+COURSE_FIELDS = ("course_id", "courseId", "course", "course_code")
+INSTRUCTOR_FIELDS = ("instructor_id", "teacher_id", "teacherId", "instructorId")
+INSTRUCTOR_EMAIL_FIELDS = ("instructor_email", "teacher_email")
+
+
+def _first(doc: Dict[str, Any], fields: Iterable[str]) -> Tuple[Optional[str], Any]:
+    for f in fields:
+        v = doc.get(f)
+        if v not in (None, ""):
+            return f, v
+    return None, None
+
+
+class _Lookups:
+    """Per-batch caches for the users/courses/assignments a batch refers to."""
+
+    def __init__(self, mongo_db):
+        self.db = mongo_db
+        self.users_by_email: Dict[str, ObjectId] = {}
+        self.courses: Dict[Any, Dict[str, Any]] = {}
+        self.assignment_course: Dict[ObjectId, Any] = {}
+
+    def prime(self, docs: List[Dict[str, Any]]) -> None:
+        emails = set()
+        course_raw = set()
+        assignment_ids = set()
+        for d in docs:
+            for f in EMAIL_FIELDS + INSTRUCTOR_EMAIL_FIELDS:
+                if isinstance(d.get(f), str) and d[f] not in self.users_by_email:
+                    emails.add(d[f])
+            _, c = _first(d, COURSE_FIELDS)
+            if c is not None:
+                course_raw.add(c if isinstance(c, ObjectId) else str(c).strip())
+            aid = as_object_id(d.get("assignment_id"))
+            if aid is not None and aid not in self.assignment_course:
+                assignment_ids.add(aid)
+        if emails:
+            for u in self.db.users.find({"email": {"$in": list(emails)}}, {"email": 1}):
+                self.users_by_email[u["email"]] = u["_id"]
+        if assignment_ids:
+            for a in self.db.assignments.find({"_id": {"$in": list(assignment_ids)}}, {"course_id": 1}):
+                self.assignment_course[a["_id"]] = a.get("course_id")
+                if a.get("course_id") is not None:
+                    course_raw.add(a["course_id"])
+        self._prime_courses(course_raw)
+
+    def _prime_courses(self, raws: Iterable[Any]) -> None:
+        pending = [r for r in raws if r not in self.courses]
+        if not pending:
+            return
+        oids = [o for o in (as_object_id(r) for r in pending) if o is not None]
+        names = [r for r in pending if isinstance(r, str) and as_object_id(r) is None]
+        clauses = []
+        if oids:
+            clauses.append({"_id": {"$in": oids}})
+        if names:
+            clauses.extend([{"code": {"$in": names}}, {"code": {"$in": [n.upper() for n in names]}}, {"title": {"$in": names}}])
+        if not clauses:
+            return
+        found = list(self.db.courses.find({"$or": clauses}, {"code": 1, "title": 1}))
+        for c in found:
+            self.courses[c["_id"]] = c
+            self.courses[str(c["_id"])] = c
+        # code first, then title, for non-id references
+        for c in found:
+            if c.get("title"):
+                self.courses.setdefault(c["title"], c)
+        for c in found:
+            if c.get("code"):
+                self.courses[c["code"]] = c
+                self.courses.setdefault(c["code"].lower(), c)
+
+    def course(self, raw: Any) -> Optional[Dict[str, Any]]:
+        if raw is None:
+            return None
+        key = raw if isinstance(raw, ObjectId) else str(raw).strip()
+        return self.courses.get(key) or (self.courses.get(key.lower()) if isinstance(key, str) else None)
+
+    def user(self, doc: Dict[str, Any], id_fields: Iterable[str], email_fields: Iterable[str]) -> Tuple[Optional[str], Any]:
+        field, raw = _first(doc, id_fields)
+        if raw is not None:
+            return field, canonical(raw)
+        field, email = _first(doc, email_fields)
+        if email is not None and email in self.users_by_email:
+            return None, self.users_by_email[email]
+        return None, None
+
+
+Update = Tuple[Dict[str, Any], List[str]]
+
+
+def _diff(doc: Dict[str, Any], target: Dict[str, Any], drop: Iterable[str]) -> Optional[Update]:
+    # ObjectId never compares equal to its hex string, so type changes show up here
+    sets = {k: v for k, v in target.items() if v is not None and (k not in doc or doc[k] != v)}
+    unsets = [f for f in drop if f in doc and f not in target]
+    if not sets and not unsets:
+        return None
+    return sets, unsets
+
+
+def _course_fields(course: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not course:
+        return {}
+    return {"course_id": course["_id"], "course_code": course.get("code")}
+
+
+def migrate_course_doc(doc: Dict[str, Any], lk: _Lookups) -> Optional[Update]:
+    _, instructor = lk.user(doc, INSTRUCTOR_FIELDS, INSTRUCTOR_EMAIL_FIELDS)
+    if not isinstance(instructor, ObjectId):
+        return None
+    return _diff(doc, {"instructor_id": instructor}, ("teacher_id", "teacherId", "instructorId"))
+
+
+def migrate_enrollment_doc(doc: Dict[str, Any], lk: _Lookups) -> Optional[Update]:
+    _, user = lk.user(doc, USER_FIELDS, EMAIL_FIELDS)
+    _, raw_course = _first(doc, COURSE_FIELDS)
+    target = _course_fields(lk.course(raw_course))
+    drop: List[str] = []
+    if isinstance(user, ObjectId):
+        target["user_id"] = user
+        drop.extend(["student_id", "studentId", "userId"])
+    if "course_id" in target:
+        drop.extend(["courseId", "course"])
+    return _diff(doc, target, drop)
+
+
+def migrate_submission_doc(doc: Dict[str, Any], lk: _Lookups) -> Optional[Update]:
+    target: Dict[str, Any] = {}
+    drop: List[str] = []
+    aid = as_object_id(doc.get("assignment_id"))
+    if aid is not None:
+        target["assignment_id"] = aid
+    _, user = lk.user(doc, ("student_id", "studentId", "user_id", "userId"), EMAIL_FIELDS)
+    if isinstance(user, ObjectId):
+        target["student_id"] = user
+        drop.extend(["studentId", "user_id", "userId"])
+    course = lk.course(lk.assignment_course.get(aid)) if aid is not None else None
+    if course is None:
+        _, raw_course = _first(doc, COURSE_FIELDS)
+        course = lk.course(raw_course)
+    target.update(_course_fields(course))
+    return _diff(doc, target, drop)
+
+
+def migrate_result_doc(doc: Dict[str, Any], lk: _Lookups) -> Optional[Update]:
+    target: Dict[str, Any] = {}
+    drop: List[str] = []
+    # Imported rows keep their external student ids; app users become ObjectIds
+    field, user = lk.user(doc, ("student_id", "user_id"), EMAIL_FIELDS)
+    if user is not None:
+        target["student_id"] = user
+        if field == "user_id":
+            drop.append("user_id")
+    _, raw_course = _first(doc, ("course_code", "course_id"))
+    course = lk.course(raw_course)
+    if course is not None:
+        target.update(_course_fields(course))
+    elif isinstance(raw_course, str) and as_object_id(raw_course) is None and not doc.get("course_code"):
+        # Course no longer exists: keep the readable code, leave course_id as-is
+        target["course_code"] = raw_course
+    ref_id = as_object_id(doc.get("ref_id"))
+    if ref_id is not None:
+        target["ref_id"] = ref_id
+    return _diff(doc, target, drop)
+
+
+MIGRATORS: Dict[str, Callable[[Dict[str, Any], _Lookups], Optional[Update]]] = {
+    "courses": migrate_course_doc,
+    "enrollments": migrate_enrollment_doc,
+    "submissions": migrate_submission_doc,
+    "results": migrate_result_doc,
+}
+
+
+def get_state(mongo_db) -> Dict[str, Any]:
+    return mongo_db[MIGRATIONS_COLLECTION].find_one({"_id": CANONICAL_IDS}) or {"_id": CANONICAL_IDS, "steps": {}}
+
+
+def _save_state(mongo_db, state: Dict[str, Any]) -> None:
+    state["updated_at"] = datetime.utcnow()
+    mongo_db[MIGRATIONS_COLLECTION].replace_one({"_id": CANONICAL_IDS}, state, upsert=True)
+
+
+def migration_complete(mongo_db) -> bool:
+    state = get_state(mongo_db)
+    steps = state.get("steps") or {}
+    return all((steps.get(s) or {}).get("done") and not (steps.get(s) or {}).get("conflicts") for s in STEPS)
+
+
+def reset_migration(mongo_db) -> None:
+    mongo_db[MIGRATIONS_COLLECTION].delete_one({"_id": CANONICAL_IDS})
+
+
+def _run_step(mongo_db, name: str, state: Dict[str, Any], batch_size: int,
+              max_batches: Optional[int], dry_run: bool) -> Dict[str, Any]:
+    col = mongo_db[name]
+    migrate = MIGRATORS[name]
+    step = state["steps"].setdefault(name, {"last_id": None, "scanned": 0, "migrated": 0, "conflicts": [], "done": False})
+    if step.get("done"):
+        return step
+    lk = _Lookups(mongo_db)
+    batches = 0
+    last_id = step.get("last_id")
+    while max_batches is None or batches < max_batches:
+        q = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = list(col.find(q).sort("_id", 1).limit(batch_size))
+        if not docs:
+            step["done"] = True
+            break
+        lk.prime(docs)
+        ops = []
+        op_ids = []
+        for d in docs:
+            upd = migrate(d, lk)
+            if upd is None:
+                continue
+            sets, unsets = upd
+            update: Dict[str, Any] = {}
+            if sets:
+                update["$set"] = sets
+            if unsets:
+                update["$unset"] = {f: "" for f in unsets}
+            ops.append(UpdateOne({"_id": d["_id"]}, update))
+            op_ids.append(d["_id"])
+        migrated = len(ops)
+        if ops and not dry_run:
+            try:
+                col.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys mean the canonical twin already exists; leave the legacy row for review
+                errors = (e.details or {}).get("writeErrors", [])
+                migrated -= len(errors)
+                for w in errors:
+                    if len(step["conflicts"]) < MAX_REPORTED_CONFLICTS:
+                        step["conflicts"].append({"_id": str(op_ids[w["index"]]), "error": w.get("errmsg")})
+        if name == "courses" and migrated > 0 and not dry_run:
+            bump_version(mongo_db, COURSES)
+        step["scanned"] += len(docs)
+        step["migrated"] += migrated
+        last_id = docs[-1]["_id"]
+        step["last_id"] = last_id
+        batches += 1
+        if not dry_run:
+            _save_state(mongo_db, state)
+    return step
+
+
+def migrate_canonical_ids(mongo_db, batch_size: int = 500, max_batches: Optional[int] = None,
+                          steps: Iterable[str] = STEPS, dry_run: bool = False) -> Dict[str, Any]:
+    """Run (or resume) the migration. ``max_batches`` bounds the work per step per call."""
+    state = get_state(mongo_db) if not dry_run else {"_id": CANONICAL_IDS, "steps": {}}
+    state.setdefault("steps", {})
+    state.setdefault("started_at", datetime.utcnow())
+    # Courses first: later steps resolve course codes and instructors through them
+    for name in [s for s in STEPS if s in set(steps)]:
+        _run_step(mongo_db, name, state, batch_size, max_batches, dry_run)
+        if not state["steps"][name].get("done"):
+            break
+    complete = all((state["steps"].get(s) or {}).get("done") and not (state["steps"].get(s) or {}).get("conflicts") for s in STEPS)
+    if complete and not dry_run:
+        state["completed_at"] = datetime.utcnow()
+        _save_state(mongo_db, state)
+    return {
+        "dry_run": dry_run,
+        "complete": complete,
+        "steps": {k: {f: (str(v) if f == "last_id" and v is not None else v) for f, v in s.items()}
+                  for k, s in state["steps"].items()},
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/education_app"))
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--max-batches", type=int, default=None, help="stop each step after this many batches")
+    ap.add_argument("--step", action="append", choices=STEPS, help="limit to these collections (repeatable)")
+    ap.add_argument("--dry-run", action="store_true", help="count changes without writing or checkpointing")
+    ap.add_argument("--reset", action="store_true", help="forget saved progress and start over")
+    args = ap.parse_args(argv)
+
+    client = MongoClient(args.uri)
+    mongo_db = client.get_default_database("education_app")
+    if args.reset:
+        reset_migration(mongo_db)
+    summary = migrate_canonical_ids(mongo_db, args.batch_size, args.max_batches, args.step or STEPS, args.dry_run)
+    for name, step in summary["steps"].items():
+        print(f"{name:12s} scanned={step['scanned']} migrated={step['migrated']} "
+              f"conflicts={len(step['conflicts'])} done={step['done']}")
+    print("complete" if summary["complete"] else "incomplete (re-run to resume)")
+    return 0 if summary["complete"] or args.dry_run or args.max_batches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
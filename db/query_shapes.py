@@ -0,0 +1,220 @@
+"""Registry of the query shapes the routes issue, and an explain() checker.
+
+Each QueryShape records the collection, filter, sort, projection and limit of
+one query as the route in web/*.py (or the helper it calls under db/ and
+analytics/) builds it. The filter is a callable over a sample dict of ids (see
+benchmarks/query_audit.py) so the same shape can be explained against any
+seeded database; tests/test_query_audit.py runs the check. Every shape should
+be served by an index in db/indexes.py; explain_shape() flags COLLSCAN plans
+and plans that examine far more keys/documents than they return.
+"""
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from db.ids import ref, refs
+from db.keyset import CI_COLLATION, prefix_range
+
+DEFAULT_MAX_RATIO = 10.0
+
+Sample = Dict[str, Any]
+
+
+class QueryShape(NamedTuple):
+    name: str
+    collection: str
+    route: str
+    filter: Callable[[Sample], Dict[str, Any]]
+    sort: Optional[List[Tuple[str, int]]] = None
+    projection: Optional[Dict[str, int]] = None
+    limit: Optional[int] = None
+    # "find", "count" or "distinct" (with key); ratios are only checked for finds
+    kind: str = "find"
+    key: Optional[str] = None
+    max_ratio: Optional[float] = None
+    collation: Optional[Dict[str, Any]] = None
+
+
+_ACTIVE = {"$ne": "dropped"}
+
+SHAPES: List[QueryShape] = [
+    # users
+    QueryShape("users.by_email", "users", "login", lambda s: {"email": s["email"]}, limit=1),
+    QueryShape("users.role_recent", "users", "admin_dashboard", lambda s: {"role": "Student"},
+               sort=[("created_at", -1), ("_id", -1)], limit=20),
+    QueryShape("users.role_name", "users", "admin_dashboard", lambda s: {"role": "Teacher"}, sort=[("name", 1)], limit=8),
+    QueryShape("users.by_ids", "users", "teacher_evaluate", lambda s: {"_id": {"$in": s["student_ids"]}}, projection={"name": 1}),
+    QueryShape("users.reset_token", "users", "reset_password", lambda s: {"reset_token": "missing-token"}, limit=1),
+    # courses
+    QueryShape("courses.by_instructor", "courses", "teacher_courses", lambda s: {"instructor_id": s["teacher_id"]}, sort=[("code", 1)]),
+    QueryShape("courses.by_instructors", "courses", "admin_dashboard", lambda s: {"instructor_id": refs(s["teacher_ids"])},
+               projection={"instructor_id": 1, "code": 1, "title": 1, "name": 1}),
+    QueryShape("courses.by_code", "courses", "teacher_courses_create", lambda s: {"code": s["course_code"]}, limit=1),
+    # Student pages read courses through the in-process catalog (db/catalog.py)
+    # enrollments
+    QueryShape("enrollments.student_active", "enrollments", "student_courses",
+               lambda s: {"user_id": ref(s["student_id"]), "status": _ACTIVE}),
+    QueryShape("enrollments.by_students", "enrollments", "refresh_assignments_component",
+               lambda s: {"user_id": refs(s["student_ids"]), "status": _ACTIVE}, projection={"user_id": 1, "course_id": 1}),
+    QueryShape("enrollments.course_students", "enrollments", "refresh_course_students",
+               lambda s: {"course_id": s["course_id"], "status": _ACTIVE}, kind="distinct", key="user_id"),
+    # assignments
+    QueryShape("assignments.by_courses", "assignments", "teacher_evaluate", lambda s: {"course_id": {"$in": s["course_ids"]}},
+               projection={"title": 1, "course_id": 1}),
+    # submissions
+    QueryShape("submissions.by_student", "submissions", "student_submissions", lambda s: {"student_id": ref(s["student_id"])}),
+    # per-assignment probe of the student_assignments anti-join ($lookup into submissions)
+    QueryShape("submissions.submitted_probe", "submissions", "student_assignments",
+               lambda s: {"assignment_id": s["assignment_ids"][0], "student_id": ref(s["student_id"])}, limit=1),
+    QueryShape("submissions.teacher_page", "submissions", "teacher_evaluate",
+               lambda s: {"assignment_id": refs(s["assignment_ids"])}, sort=[("submitted_on", -1), ("_id", -1)], limit=25),
+    QueryShape("submissions.teacher_ungraded", "submissions", "teacher_evaluate",
+               lambda s: {"assignment_id": refs(s["assignment_ids"]), "score": {"$in": [None, ""]}}, kind="count"),
+    # results
+    QueryShape("results.by_student", "results", "student_results", lambda s: {"student_id": ref(s["student_id"])}),
+    QueryShape("results.grade_key", "results", "teacher_grade_submission",
+               lambda s: {"student_id": ref(s["student_id"]), "component": "assignment", "ref_id": s["assignment_ids"][0]}, limit=1),
+    QueryShape("results.by_course", "results", "teacher_courses_delete", lambda s: {"course_id": {"$in": [s["course_id"], s["course_code"]]}}, kind="count"),
+    # announcements
+    QueryShape("announcements.feed_page", "announcements", "student_announcements",
+               lambda s: {"course_id": {"$in": s["course_ids"]}}, sort=[("created_at", -1), ("_id", -1)], limit=21),
+    QueryShape("announcements.feed_after", "announcements", "student_announcements",
+               lambda s: {"course_id": {"$in": s["course_ids"]}, "created_at": {"$lte": s["recent_window"]},
+                          "$or": [{"created_at": {"$lt": s["recent_window"]}}, {"_id": {"$lt": s["announcement_id"]}}]},
+               sort=[("created_at", -1), ("_id", -1)], limit=21),
+    QueryShape("announcements.unread", "announcements", "student_dashboard",
+               lambda s: {"course_id": {"$in": s["course_ids"]}, "created_at": {"$gt": s["recent_window"]}}, kind="count"),
+    QueryShape("announcement_reads.by_student", "announcement_reads", "student_announcements",
+               lambda s: {"student_id": str(s["student_id"])}, limit=1),
+    # attendance / demographics / lms_events (CSV ids)
+    QueryShape("attendance.course_students", "attendance", "teacher_courses_delete",
+               lambda s: {"course_code": s["course_code"]}, kind="distinct", key="student_id"),
+    QueryShape("attendance.by_students", "attendance", "refresh_attendance_component",
+               lambda s: {"student_id": {"$in": s["csv_ids"]}}),
+    QueryShape("demographics.by_student", "demographics", "record_demographics", lambda s: {"student_id": s["csv_ids"][0]}, limit=1),
+    QueryShape("lms_events.by_students", "lms_events", "refresh_lms_component", lambda s: {"student_id": {"$in": s["csv_ids"]}},
+               projection={"student_id": 1, "event_time": 1, "_id": 0}),
+    # rebuild_lms_rollups: its cutoff, then the events ingested until the swap
+    QueryShape("lms_events.latest_ingested", "lms_events", "admin_rebuild_lms_rollups",
+               lambda s: {"ingested_at": {"$ne": None}}, sort=[("ingested_at", -1)], projection={"ingested_at": 1}, limit=1),
+    QueryShape("lms_events.ingested_window", "lms_events", "admin_rebuild_lms_rollups",
+               lambda s: {"ingested_at": {"$gt": s["older_than"], "$lte": s["recent_window"]}},
+               projection={"event_time": 1, "course_code": 1, "event_type": 1}),
+    # feedback / notifications
+    QueryShape("feedbacks.recent", "feedbacks", "admin_dashboard", lambda s: {}, sort=[("created_at", -1)], limit=5),
+    QueryShape("feedbacks.new_count", "feedbacks", "admin_dashboard", lambda s: {"status": "new"}, kind="count"),
+    QueryShape("admin_notifications.model_trained", "admin_notifications", "admin_dashboard",
+               lambda s: {"type": "model_trained"}, sort=[("created_at", -1)], limit=5),
+    # analyst
+    QueryShape("models.latest", "models", "analyst_dashboard", lambda s: {}, sort=[("created_at", -1)], limit=1),
+    QueryShape("models.latest_by_analyst", "models", "api_analyst_model_predict", lambda s: {"analyst_email": s["analyst_email"]},
+               sort=[("created_at", -1)], limit=1),
+    QueryShape("manual_predictions.recent", "manual_predictions", "admin_dashboard", lambda s: {}, sort=[("created_at", -1)], limit=5),
+    QueryShape("manual_predictions.page_after", "manual_predictions", "admin_predictions",
+               lambda s: {"created_at": {"$lte": s["older_than"]},
+                          "$or": [{"created_at": {"$lt": s["older_than"]}}, {"_id": {"$lt": s["announcement_id"]}}]},
+               sort=[("created_at", -1), ("_id", -1)], limit=11),
+    # Prefix ranges under the indexes' collation; the created_at order is a
+    # (limited) sort over the matching keys
+    QueryShape("manual_predictions.email_prefix", "manual_predictions", "admin_predictions",
+               lambda s: {"analyst_email": prefix_range(s["analyst_email"][:4].upper())},
+               sort=[("created_at", -1), ("_id", -1)], limit=11, collation=CI_COLLATION, max_ratio=1000),
+    QueryShape("manual_predictions.analyst_prefix", "manual_predictions", "admin_predictions",
+               lambda s: {"analyst": prefix_range(s["analyst_name"][:3].lower())},
+               sort=[("created_at", -1), ("_id", -1)], limit=11, collation=CI_COLLATION, max_ratio=1000),
+    QueryShape("manual_predictions.count_email_prefix", "manual_predictions", "admin_predictions",
+               lambda s: {"analyst_email": prefix_range(s["analyst_email"][:4])}, kind="count", collation=CI_COLLATION),
+    QueryShape("ml_predictions.dedupe", "ml_predictions", "api_analyst_model_save",
+               lambda s: {"analyst_email": s["analyst_email"], "source": "auto", "inputs_hash": "0" * 64,
+                          "created_at": {"$gte": s["recent_window"]}},
+               sort=[("created_at", -1)], limit=1),
+    # the $match of the analyst_reports overview ($facet over all of them) and of a target's pages
+    QueryShape("ml_predictions.reports", "ml_predictions", "analyst_reports",
+               lambda s: {"type": "ml", "analyst_email": s["analyst_email"]}, sort=[("created_at", -1)], limit=50),
+    QueryShape("ml_predictions.reports_target_after", "ml_predictions", "analyst_reports",
+               lambda s: {"type": "ml", "analyst_email": s["analyst_email"], "target": "Pass",
+                          "created_at": {"$lte": s["older_than"]},
+                          "$or": [{"created_at": {"$lt": s["older_than"]}}, {"_id": {"$lt": s["announcement_id"]}}]},
+               sort=[("created_at", -1), ("_id", -1)], limit=51),
+    # /analyst/export and /admin/export stream every match oldest first (web/exports.py)
+    QueryShape("ml_predictions.export_target", "ml_predictions", "analyst_export",
+               lambda s: {"type": "ml", "analyst_email": s["analyst_email"], "target": "Pass",
+                          "created_at": {"$gte": s["older_than"]}},
+               sort=[("created_at", 1)], projection={"charts": 0, "inputs_hash": 0}),
+    QueryShape("manual_predictions.export_analyst", "manual_predictions", "analyst_export",
+               lambda s: {"analyst_email": s["analyst_email"], "created_at": {"$gte": s["older_than"]}},
+               sort=[("created_at", 1)], projection={"charts": 0, "inputs_hash": 0}, collation=CI_COLLATION),
+    # materialized collections
+    QueryShape("student_risk.top", "student_risk", "admin_dashboard", lambda s: {"at_risk": True},
+               sort=[("avg_score", 1), ("attendance_rate", 1)], limit=50),
+    QueryShape("student_features.by_students", "student_features", "get_features",
+               lambda s: {"student_id": {"$in": [str(x) for x in s["student_ids"]]}}, sort=[("student_id", 1)]),
+    QueryShape("student_progress.by_student", "student_progress", "student_progress",
+               lambda s: {"student_id": str(s["student_id"])}, limit=1),
+]
+
+
+def _explain_command(shape: QueryShape, sample: Sample) -> Dict[str, Any]:
+    query = shape.filter(sample)
+    if shape.kind == "count":
+        cmd: Dict[str, Any] = {"count": shape.collection, "query": query}
+    elif shape.kind == "distinct":
+        cmd = {"distinct": shape.collection, "key": shape.key, "query": query}
+    else:
+        cmd = {"find": shape.collection, "filter": query}
+    if shape.collation:
+        cmd["collation"] = shape.collation
+    if shape.kind != "find":
+        return cmd
+    if shape.sort:
+        cmd["sort"] = dict(shape.sort)
+    if shape.projection:
+        cmd["projection"] = shape.projection
+    if shape.limit:
+        cmd["limit"] = shape.limit
+    return cmd
+
+
+def _stages(plan: Any) -> Iterable[str]:
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    # Slot-based engine nests the classic plan under queryPlan
+    for key in ("queryPlan", "inputStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages") or []:
+        yield from _stages(child)
+
+
+def explain_shape(mongo_db, shape: QueryShape, sample: Sample, max_ratio: float = DEFAULT_MAX_RATIO) -> Dict[str, Any]:
+    out = mongo_db.command("explain", _explain_command(shape, sample), verbosity="executionStats")
+    stages = list(_stages((out.get("queryPlanner") or {}).get("winningPlan")))
+    stats = out.get("executionStats") or {}
+    docs = int(stats.get("totalDocsExamined") or 0)
+    keys = int(stats.get("totalKeysExamined") or 0)
+    returned = int(stats.get("nReturned") or 0)
+    ratio = max(docs, keys) / max(returned, 1)
+    limit = shape.max_ratio if shape.max_ratio is not None else max_ratio
+    problems = []
+    if "COLLSCAN" in stages:
+        problems.append("COLLSCAN")
+    if shape.kind == "find" and ratio > limit:
+        problems.append(f"examined/returned {ratio:.1f} > {limit:g}")
+    return {
+        "name": shape.name,
+        "collection": shape.collection,
+        "route": shape.route,
+        "stages": stages,
+        "blocking_sort": "SORT" in stages,
+        "docs_examined": docs,
+        "keys_examined": keys,
+        "returned": returned,
+        "ratio": round(ratio, 2),
+        "problems": problems,
+        "ok": not problems,
+    }
+
+
+def audit(mongo_db, sample: Sample, shapes: Optional[Iterable[QueryShape]] = None,
+          max_ratio: float = DEFAULT_MAX_RATIO) -> List[Dict[str, Any]]:
+    return [explain_shape(mongo_db, shape, sample, max_ratio) for shape in (shapes or SHAPES)]
@@ -3,6 +3,8 @@ from typing import Dict, List, Tuple, Any, Optional
 
 import pandas as pd
 
+from .schemas import FORBIDDEN_CHAR_PATTERN
+
 ALLOWED_ATTENDANCE = {"present", "absent", "late"}
 
 
@@ -29,12 +31,6 @@ def coerce_dates_date_only(series: pd.Series) -> pd.Series:
     return pd.to_datetime(series, errors='coerce').dt.date.astype('string')
 
 
-# Broad set of forbidden special symbols; rows containing any of these in checked
-# columns will be dropped during cleaning. We intentionally allow letters, digits,
-# and spaces; hyphen is handled per-dataset via exclude_cols where needed (e.g., term).
-FORBIDDEN_CHAR_PATTERN = r"[<>\?\\/\|\*@\$!\^\(\)\-\+=~`#%&.,\{\}\[\]:;\"']"
-
-
 def drop_invalid_generic(df: pd.DataFrame, exclude_cols: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """Drop rows that have:
     - any missing values in any column (after trimming), including empty strings
@@ -0,0 +1,268 @@
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from db.indexes import ensure_indexes, ensure_indexes_on
+
+# Time-bucketed counters over lms_events. One document per
+# (granularity, bucket, course_code, event_type) holding the number of events
+# that landed in that bucket. Events whose event_time cannot be parsed are kept
+# under bucket=None so all-time totals still match the raw collection.
+ROLLUP_COLLECTION = "lms_event_rollups"
+# rebuild_lms_rollups writes here, then renames it over ROLLUP_COLLECTION
+REBUILD_COLLECTION = "lms_event_rollups_rebuild"
+GRANULARITIES = ("hour", "day")
+
+RollupKey = Tuple[str, Optional[datetime], Optional[str], Optional[str]]
+
+
+def get_rollup_collection(mongo_db):
+    return mongo_db[ROLLUP_COLLECTION]
+
+
+def ensure_rollup_indexes(mongo_db) -> None:
+    # Definitions live with the rest of the managed indexes
+    ensure_indexes(mongo_db, [ROLLUP_COLLECTION])
+
+
+def parse_event_time(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        s = str(value or "").strip()
+        if not s:
+            return None
+        try:
+            dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+        except Exception:
+            return None
+    # Buckets are stored as naive UTC like the rest of the app (datetime.utcnow())
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def truncate(dt: Optional[datetime], granularity: str) -> Optional[datetime]:
+    if dt is None:
+        return None
+    if granularity == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def _clean_label(value: Any) -> Optional[str]:
+    if value in (None, ""):
+        return None
+    return str(value)
+
+
+def count_events(events: Iterable[Dict[str, Any]]) -> Counter:
+    counts: Counter = Counter()
+    for ev in events:
+        dt = parse_event_time(ev.get("event_time"))
+        course_code = _clean_label(ev.get("course_code"))
+        event_type = _clean_label(ev.get("event_type"))
+        for gran in GRANULARITIES:
+            counts[(gran, truncate(dt, gran), course_code, event_type)] += 1
+    return counts
+
+
+def _key_query(key: RollupKey) -> Dict[str, Any]:
+    gran, bucket, course_code, event_type = key
+    return {"granularity": gran, "bucket": bucket, "course_code": course_code, "event_type": event_type}
+
+
+def apply_rollup_counts(mongo_db, counts: Counter, batch_size: int = 1000) -> int:
+    """Increment bucket counters for freshly inserted events in unordered bulk batches.
+
+    Returns the number of bucket documents touched.
+    """
+    col = get_rollup_collection(mongo_db)
+    now = datetime.utcnow()
+    ops: List[UpdateOne] = []
+    touched = 0
+    for key, n in counts.items():
+        if not n:
+            continue
+        ops.append(UpdateOne(
+            _key_query(key),
+            {"$inc": {"count": int(n)}, "$set": {"updated_at": now}},
+            upsert=True,
+        ))
+        if len(ops) >= batch_size:
+            col.bulk_write(ops, ordered=False)
+            touched += len(ops)
+            ops = []
+    if ops:
+        col.bulk_write(ops, ordered=False)
+        touched += len(ops)
+    return touched
+
+
+def record_lms_events(mongo_db, events: Iterable[Dict[str, Any]]) -> int:
+    return apply_rollup_counts(mongo_db, count_events(events))
+
+
+def record_lms_changes(mongo_db, before: Iterable[Dict[str, Any]], after: Iterable[Dict[str, Any]]) -> int:
+    """Move re-ingested events whose bucket, course or type changed: decrement old keys, increment new ones."""
+    counts = count_events(after)
+    counts.subtract(count_events(before))
+    return apply_rollup_counts(mongo_db, counts)
+
+
+def _latest_ingested_at(mongo_db) -> Optional[datetime]:
+    doc = next(mongo_db.lms_events.find({"ingested_at": {"$ne": None}}, {"ingested_at": 1})
+               .sort("ingested_at", -1).limit(1), None)
+    return doc["ingested_at"] if doc else None
+
+
+def rebuild_lms_rollups(mongo_db, batch_size: int = 1000) -> Dict[str, Any]:
+    """Recompute every bucket from the raw lms_events collection.
+
+    Hour buckets are grouped server-side; day buckets are derived from them so
+    the raw events are only scanned once. The counters are written to a
+    staging collection that is renamed over the live one, so charts never see
+    an empty or half-built set.
+
+    Events inserted while the rebuild runs bump the old counters (dropped by
+    the rename), so they are counted again from lms_events after the swap.
+    Which events those are comes from ``ingested_at``, stamped by the server
+    clock when upsert_batch first inserts an event (not from ``_id``, which
+    imports may supply); events stored before the field existed are stamped
+    here first. The rebuild counts events with ingested_at up to the newest
+    one at its start, the swap adds those after it. Left out: events written
+    in the instant of the swap, and re-ingested events whose time, course or
+    type changed during the rebuild (their move lands on the dropped counters
+    if the rebuild read them before the change).
+    """
+    mongo_db.lms_events.update_many({"ingested_at": None}, {"$currentDate": {"ingested_at": True}})
+    cutoff = _latest_ingested_at(mongo_db)
+    pipeline = [
+        {"$match": {"ingested_at": {"$lte": cutoff}}},
+        {"$project": {
+            "course_code": 1,
+            "event_type": 1,
+            "ts": {"$dateFromString": {"dateString": {"$toString": "$event_time"}, "onError": None, "onNull": None}},
+        }},
+        {"$group": {
+            "_id": {
+                "course_code": "$course_code",
+                "event_type": "$event_type",
+                "bucket": {"$cond": [
+                    {"$eq": [{"$ifNull": ["$ts", None]}, None]},
+                    None,
+                    {"$dateFromString": {"dateString": {"$dateToString": {"format": "%Y-%m-%dT%H:00:00", "date": "$ts"}}}},
+                ]},
+            },
+            "count": {"$sum": 1},
+        }},
+    ]
+    hour_counts: Counter = Counter()
+    day_counts: Counter = Counter()
+    rows = mongo_db.lms_events.aggregate(pipeline, allowDiskUse=True) if cutoff is not None else []
+    for d in rows:
+        g = d.get("_id") or {}
+        bucket = g.get("bucket")
+        course_code = _clean_label(g.get("course_code"))
+        event_type = _clean_label(g.get("event_type"))
+        n = int(d.get("count") or 0)
+        hour_counts[("hour", bucket, course_code, event_type)] += n
+        day_counts[("day", truncate(bucket, "day"), course_code, event_type)] += n
+
+    # Replace rather than increment so a rebuild is always idempotent
+    staging = mongo_db[REBUILD_COLLECTION]
+    staging.drop()
+    ensure_indexes_on(mongo_db, ROLLUP_COLLECTION, REBUILD_COLLECTION)
+    now = datetime.utcnow()
+    written = 0
+    batch: List[Dict[str, Any]] = []
+    for counts in (hour_counts, day_counts):
+        for key, n in counts.items():
+            doc = _key_query(key)
+            doc.update({"count": n, "updated_at": now})
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                staging.insert_many(batch, ordered=False)
+                written += len(batch)
+                batch = []
+    if batch:
+        staging.insert_many(batch, ordered=False)
+        written += len(batch)
+
+    swap = _latest_ingested_at(mongo_db)
+    staging.rename(ROLLUP_COLLECTION, dropTarget=True)
+    late = 0
+    if swap is not None and swap != cutoff:
+        late_q = {"ingested_at": {"$gt": cutoff, "$lte": swap} if cutoff is not None else {"$lte": swap}}
+        late_counts = count_events(mongo_db.lms_events.find(late_q, {"event_time": 1, "course_code": 1, "event_type": 1}))
+        apply_rollup_counts(mongo_db, late_counts, batch_size=batch_size)
+        late = int(sum(late_counts.values())) // len(GRANULARITIES)
+    return {
+        "events": int(sum(hour_counts.values())) + late,
+        "hour_buckets": len(hour_counts),
+        "day_buckets": len(day_counts),
+        "written": written,
+        "late_events": late,
+    }
+
+
+def _bucket_range(since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    rng: Dict[str, Any] = {}
+    if since is not None:
+        rng["$gte"] = since
+    if until is not None:
+        rng["$lte"] = until
+    return rng
+
+
+def matching_event_types(mongo_db, pattern: str) -> List[str]:
+    # The set of distinct event types is tiny compared to raw events, so the
+    # case-insensitive match runs in Python instead of as an unindexed $regex.
+    rx = re.compile(pattern, re.IGNORECASE)
+    types = get_rollup_collection(mongo_db).distinct("event_type", {"granularity": "day"})
+    return [t for t in types if isinstance(t, str) and rx.search(t)]
+
+
+def top_courses_by_event_type(mongo_db, pattern: str, limit: int = 10,
+                              since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    types = matching_event_types(mongo_db, pattern)
+    if not types:
+        return []
+    match: Dict[str, Any] = {"granularity": "day", "event_type": {"$in": types}}
+    rng = _bucket_range(since, until)
+    if rng:
+        match["bucket"] = rng
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$course_code", "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1}},
+        {"$limit": int(limit)},
+    ]
+    return list(get_rollup_collection(mongo_db).aggregate(pipeline))
+
+
+def event_trend(mongo_db, granularity: str = "day", course_code: Optional[str] = None,
+                event_type: Optional[str] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+    match: Dict[str, Any] = {"granularity": granularity, "bucket": {"$ne": None}}
+    rng = _bucket_range(since, until)
+    if rng:
+        match["bucket"] = dict(rng, **{"$ne": None})
+    if course_code:
+        match["course_code"] = course_code
+    if event_type:
+        match["event_type"] = event_type
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$bucket", "count": {"$sum": "$count"}}},
+        {"$sort": {"_id": 1}},
+    ]
+    return [{"bucket": d["_id"], "count": int(d.get("count") or 0)}
+            for d in get_rollup_collection(mongo_db).aggregate(pipeline)]
@@ -15,3 +15,8 @@ OPTIONAL_FIELDS: Dict[str, List[str]] = {
     "lms": ["resource_id", "details"],
     "attendance": ["remarks"],
 }
+
+# Broad set of forbidden special symbols; rows containing any of these in checked
+# columns will be dropped during cleaning. We intentionally allow letters, digits,
+# and spaces; hyphen is handled per-dataset via exclude_cols where needed (e.g., term).
+FORBIDDEN_CHAR_PATTERN = r"[<>\?\\/\|\*@\$!\^\(\)\-\+=~`#%&.,\{\}\[\]:;\"']"
@@ -1,8 +1,14 @@
-from typing import Any, Dict, Iterable, List, Tuple
+from collections.abc import Hashable
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from pymongo import UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
 
 from .utils import validate_record, preprocess_record
 from .schemas import REQUIRED_FIELDS
+from .rollups import record_lms_changes, record_lms_events
+from analytics.risk import refresh_student_risk
+from analytics.features import record_demographics, record_lms_activity, refresh_attendance_component
 
 
 DATASET_KEYS = {
@@ -30,9 +36,118 @@ def _build_key_query(dataset: str, record: Dict[str, Any]) -> Dict[str, Any]:
     return {k: record.get(k) for k in keys}
 
 
-def process_records(dataset: str, raw_records: Iterable[Dict[str, Any]], mongo_db) -> Dict[str, Any]:
+def _build_upsert(dataset: str, record: Dict[str, Any]) -> UpdateOne:
+    key_q = _build_key_query(dataset, record)
+    if dataset == "lms":
+        # Pipeline form so new events get ingested_at from the server clock
+        # ($$NOW) and re-ingested ones keep theirs; rebuild_lms_rollups uses
+        # it to find events written while it ran. $literal keeps "$..." values
+        # from being read as field paths.
+        fields = {k: {"$literal": v} for k, v in record.items()}
+        fields["ingested_at"] = {"$ifNull": ["$ingested_at", "$$NOW"]}
+        return UpdateOne(key_q, [{"$set": fields}], upsert=True)
+    # Only set non-key fields to avoid conflicts; set key fields only on insert
+    non_key_fields = {k: v for k, v in record.items() if k not in key_q}
+    update_doc = {"$setOnInsert": key_q}
+    if non_key_fields:
+        update_doc["$set"] = non_key_fields
+    return UpdateOne(key_q, update_doc, upsert=True)
+
+
+def _dedupe_key(dataset: str, record: Dict[str, Any]) -> Tuple:
+    # Raw values: str() would merge None with "None" and 7 with "7", which the
+    # unique index keeps apart
+    return tuple(v if isinstance(v, Hashable) else repr(v) for v in _build_key_query(dataset, record).values())
+
+
+def apply_derived(dataset: str, mongo_db, records: List[Dict[str, Any]], inserted_records: List[Dict[str, Any]]) -> None:
+    """Refresh the risk rows and feature store from an upserted batch (``records``, of which
+    ``inserted_records`` were new)."""
+    if dataset == "lms" and inserted_records:
+        record_lms_activity(mongo_db, inserted_records)
+    # Attendance changes (and new demographic names) move the per-student risk rows
+    if dataset in ("attendance", "demographics") and records:
+        refresh_student_risk(mongo_db, [rec.get("student_id") for rec in records])
+    # Feature store components fed by ingestion
+    if dataset == "attendance" and records:
+        refresh_attendance_component(mongo_db, [rec.get("student_id") for rec in records])
+    elif dataset == "demographics" and records:
+        record_demographics(mongo_db, records)
+
+
+def upsert_batch(dataset: str, records: List[Dict[str, Any]], mongo_db,
+                 on_written: Optional[Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+    """Upsert one batch of cleaned records with a single unordered bulk_write.
+
+    Records sharing a key inside the batch are merged (last one wins) so the
+    bulk never races against itself on the unique key index. The derived
+    analytics (apply_derived) run inline unless ``on_written`` is given; it is
+    then called with (records, inserted records) to schedule them elsewhere.
+    """
     col = get_collection(mongo_db, dataset)
+    by_key: Dict[Tuple, Dict[str, Any]] = {}
+    for rec in records:
+        key = _dedupe_key(dataset, rec)
+        if key in by_key:
+            by_key[key].update(rec)
+        else:
+            by_key[key] = dict(rec)
+    unique = list(by_key.values())
+
+    # Rollup keys of the events about to be overwritten, to move their counts
+    previous: Dict[Any, Dict[str, Any]] = {}
+    if dataset == "lms" and unique:
+        previous = {d.get("event_id"): d for d in col.find(
+            {"event_id": {"$in": [rec.get("event_id") for rec in unique]}},
+            {"_id": 0, "event_id": 1, "event_time": 1, "course_code": 1, "event_type": 1})}
+
+    inserted_records: List[Dict[str, Any]] = []
+    updated = 0
+    write_errors: List[Dict[str, Any]] = []
+    upserted_ids: Dict[int, Any] = {}
+    failed: Set[int] = set()
+    if unique:
+        try:
+            result = col.bulk_write([_build_upsert(dataset, rec) for rec in unique], ordered=False)
+            upserted_ids = result.upserted_ids or {}
+            updated = result.modified_count
+        except BulkWriteError as e:
+            details = e.details or {}
+            upserted_ids = {u["index"]: u["_id"] for u in details.get("upserted", [])}
+            updated = int(details.get("nModified", 0))
+            failed = {w["index"] for w in details.get("writeErrors", [])}
+            write_errors = [{"record": unique[w["index"]], "errors": [w.get("errmsg")]}
+                            for w in details.get("writeErrors", [])]
+        inserted_records = [unique[i] for i in sorted(upserted_ids)]
+
+    # Keep LMS bucket counters in step with the batch. New events are counted;
+    # re-ingested ones only move between buckets when their time, course or
+    # type changed, so re-uploading the same CSV does not inflate the rollups.
+    if dataset == "lms" and inserted_records:
+        record_lms_events(mongo_db, inserted_records)
+    if previous:
+        before: List[Dict[str, Any]] = []
+        after: List[Dict[str, Any]] = []
+        for i, rec in enumerate(unique):
+            old = previous.get(rec.get("event_id"))
+            if old is not None and i not in upserted_ids and i not in failed:
+                before.append(old)
+                after.append({**old, **rec})
+        record_lms_changes(mongo_db, before, after)
+    if on_written is not None:
+        on_written(unique, inserted_records)
+    else:
+        apply_derived(dataset, mongo_db, unique, inserted_records)
+
+    return {
+        "inserted": len(inserted_records),
+        "updated": updated,
+        "write_errors": write_errors,
+    }
+
 
+def process_records(dataset: str, raw_records: Iterable[Dict[str, Any]], mongo_db,
+                    batch_size: int = 1000) -> Dict[str, Any]:
     processed: List[Dict[str, Any]] = []
     errors: List[Dict[str, Any]] = []
     received = 0
@@ -46,23 +161,14 @@ def process_records(dataset: str, raw_records: Iterable[Dict[str, Any]], mongo_d
         cleaned = preprocess_record(dataset, rec)
         processed.append(cleaned)
 
-    upserted = 0
     inserted = 0
     updated = 0
 
-    for rec in processed:
-        key_q = _build_key_query(dataset, rec)
-        # Only set non-key fields to avoid conflicts; set key fields only on insert
-        non_key_fields = {k: v for k, v in rec.items() if k not in key_q}
-        update_doc = {"$setOnInsert": key_q}
-        if non_key_fields:
-            update_doc["$set"] = non_key_fields
-        result = col.update_one(key_q, update_doc, upsert=True)
-        if result.upserted_id is not None:
-            upserted += 1
-            inserted += 1
-        elif result.modified_count:
-            updated += 1
+    for i in range(0, len(processed), batch_size):
+        res = upsert_batch(dataset, processed[i:i + batch_size], mongo_db)
+        inserted += res["inserted"]
+        updated += res["updated"]
+        errors.extend(res["write_errors"])
 
     return {
         "dataset": dataset,
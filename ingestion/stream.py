@@ -0,0 +1,280 @@
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .service import apply_derived, upsert_batch
+from .utils import validate_record, preprocess_record
+
+logger = logging.getLogger(__name__)
+
+# Datasets that may be pushed as a live NDJSON stream
+STREAMABLE_DATASETS = {"lms", "attendance"}
+
+# Cap on how much per-line/per-batch detail is echoed back for one stream
+MAX_REPORTED_ERRORS = 100
+MAX_REPORTED_BATCHES = 200
+# Written batches arriving this close together share one round of risk /
+# feature store refreshes
+DERIVED_INTERVAL_MS = 1000
+
+_END = object()
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return round(ordered[idx], 2)
+
+
+class DerivedRefresher:
+    """Run the derived analytics (service.apply_derived) for written batches on their own thread.
+
+    The writer hands each batch over and goes straight back to bulk upserts, so
+    the ingest rate no longer waits on the risk and feature store round trips.
+    Batches handed over within ``interval_ms`` of each other are refreshed
+    together; whatever is pending is refreshed before ``close`` returns.
+    """
+
+    def __init__(self, dataset: str, mongo_db, interval_ms: int = DERIVED_INTERVAL_MS):
+        self.dataset = dataset
+        self.mongo_db = mongo_db
+        self.interval = max(0, int(interval_ms)) / 1000.0
+        self._cond = threading.Condition()
+        self._records: List[Dict[str, Any]] = []
+        self._inserted: List[Dict[str, Any]] = []
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name=f"ingest-derived-{dataset}", daemon=True)
+        self.runs = 0
+        self.refresh_ms = 0.0
+        self._failure: Optional[BaseException] = None
+
+    def start(self) -> "DerivedRefresher":
+        self._thread.start()
+        return self
+
+    def add(self, records: List[Dict[str, Any]], inserted: List[Dict[str, Any]]) -> None:
+        if self._failure is not None:
+            raise self._failure
+        with self._cond:
+            self._records.extend(records)
+            self._inserted.extend(inserted)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        if self._failure is not None:
+            raise self._failure
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._records or self._closing)
+                    if not self._records:
+                        return
+                    # Let the next batches join this refresh
+                    self._cond.wait_for(lambda: self._closing, timeout=self.interval)
+                    records, self._records = self._records, []
+                    inserted, self._inserted = self._inserted, []
+                t0 = time.perf_counter()
+                apply_derived(self.dataset, self.mongo_db, records, inserted)
+                self.refresh_ms += (time.perf_counter() - t0) * 1000.0
+                self.runs += 1
+        except BaseException as e:  # surfaced to the writer on next add, and on close
+            self._failure = e
+
+
+class MicroBatcher:
+    """Collect validated records and flush them as bulk upserts.
+
+    A batch is written once it reaches ``max_records`` or once its oldest record
+    has waited ``max_wait_ms``. Writes happen on a single background thread fed
+    by a bounded queue: when Mongo falls behind the queue fills up and ``put``
+    blocks, which stops the request thread from reading the socket and pushes
+    the backpressure onto the client's TCP window.
+    """
+
+    def __init__(self, dataset: str, mongo_db, max_records: int = 500, max_wait_ms: int = 250,
+                 max_pending_batches: int = 4, derived_interval_ms: int = DERIVED_INTERVAL_MS):
+        self.dataset = dataset
+        self.mongo_db = mongo_db
+        self.max_records = max(1, int(max_records))
+        self.max_wait = max(1, int(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_records * max(1, int(max_pending_batches)))
+        self._thread = threading.Thread(target=self._run, name=f"ingest-stream-{dataset}", daemon=True)
+        self.derived = DerivedRefresher(dataset, mongo_db, interval_ms=derived_interval_ms)
+        self.batches: List[Dict[str, Any]] = []
+        self.write_errors: List[Dict[str, Any]] = []
+        self.inserted = 0
+        self.updated = 0
+        self.blocked_ms = 0.0
+        self._failure: Optional[BaseException] = None
+
+    def start(self) -> "MicroBatcher":
+        self.derived.start()
+        self._thread.start()
+        return self
+
+    def put(self, record: Dict[str, Any]) -> None:
+        if self._failure is not None:
+            raise self._failure
+        t0 = time.perf_counter()
+        self._queue.put((time.perf_counter(), record))
+        waited = (time.perf_counter() - t0) * 1000.0
+        if waited > 1.0:
+            self.blocked_ms += waited
+
+    def close(self) -> None:
+        self._queue.put((time.perf_counter(), _END))
+        self._thread.join()
+        # Refresh what was written even when the writer failed part way
+        derived_failure: Optional[BaseException] = None
+        try:
+            self.derived.close()
+        except BaseException as e:
+            derived_failure = e
+        if self._failure is not None:
+            raise self._failure
+        if derived_failure is not None:
+            raise derived_failure
+
+    def _run(self) -> None:
+        try:
+            done = False
+            while not done:
+                batch: List[Dict[str, Any]] = []
+                first_at: Optional[float] = None
+                while len(batch) < self.max_records:
+                    timeout = None if first_at is None else max(0.0, first_at + self.max_wait - time.perf_counter())
+                    try:
+                        enq_at, rec = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if rec is _END:
+                        done = True
+                        break
+                    if first_at is None:
+                        first_at = enq_at
+                    batch.append(rec)
+                if batch:
+                    self._flush(batch, first_at)
+        except BaseException as e:  # surfaced to the request thread on next put/close
+            self._failure = e
+            # Drain so a blocked producer wakes up and sees the failure
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _flush(self, batch: List[Dict[str, Any]], first_at: Optional[float]) -> None:
+        t0 = time.perf_counter()
+        res = upsert_batch(self.dataset, batch, self.mongo_db, on_written=self.derived.add)
+        t1 = time.perf_counter()
+        self.inserted += res["inserted"]
+        self.updated += res["updated"]
+        for err in res["write_errors"]:
+            if len(self.write_errors) < MAX_REPORTED_ERRORS:
+                self.write_errors.append(err)
+        self.batches.append({
+            "records": len(batch),
+            "inserted": res["inserted"],
+            "updated": res["updated"],
+            "write_ms": round((t1 - t0) * 1000.0, 2),
+            # time from the oldest record entering the batch until it was durable
+            "latency_ms": round((t1 - (first_at or t0)) * 1000.0, 2),
+        })
+
+    def report(self) -> Dict[str, Any]:
+        write_ms = [b["write_ms"] for b in self.batches]
+        latency_ms = [b["latency_ms"] for b in self.batches]
+        return {
+            "batches": len(self.batches),
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "backpressure_ms": round(self.blocked_ms, 2),
+            "derived": {"refreshes": self.derived.runs, "ms": round(self.derived.refresh_ms, 2)},
+            "write_ms": {"p50": _percentile(write_ms, 50), "p95": _percentile(write_ms, 95), "max": _percentile(write_ms, 100)},
+            "latency_ms": {"p50": _percentile(latency_ms, 50), "p95": _percentile(latency_ms, 95), "max": _percentile(latency_ms, 100)},
+            "batch_log": self.batches[-MAX_REPORTED_BATCHES:],
+        }
+
+
+def iter_ndjson(lines: Iterable[bytes]):
+    """Yield ``(line_no, record, error)`` for each non-blank NDJSON line."""
+    for line_no, raw in enumerate(lines, start=1):
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="ignore")
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            obj = json.loads(raw)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(obj, dict):
+            yield line_no, None, "Each line must be a JSON object"
+            continue
+        # Same header normalization as CSV ingestion
+        yield line_no, {str(k).strip().lower().replace(" ", "_"): v for k, v in obj.items()}, None
+
+
+def process_stream(dataset: str, lines: Iterable[bytes], mongo_db, max_records: int = 500,
+                   max_wait_ms: int = 250, max_pending_batches: int = 4) -> Dict[str, Any]:
+    if dataset not in STREAMABLE_DATASETS:
+        raise ValueError(f"Unsupported dataset: {dataset}")
+    batcher = MicroBatcher(dataset, mongo_db, max_records=max_records, max_wait_ms=max_wait_ms,
+                           max_pending_batches=max_pending_batches).start()
+    received = 0
+    valid = 0
+    error_count = 0
+    errors: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    try:
+        for line_no, rec, parse_err in iter_ndjson(lines):
+            received += 1
+            errs = [parse_err] if parse_err else None
+            if rec is not None:
+                ok, verrs = validate_record(dataset, rec)
+                errs = None if ok else verrs
+            if errs:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_no, "record": rec, "errors": errs})
+                continue
+            batcher.put(preprocess_record(dataset, rec))
+            valid += 1
+    except BaseException:
+        # Stop the writer but keep this error: close() re-raises the writer's
+        # failure, which may be the one being handled or a consequence of it
+        try:
+            batcher.close()
+        except Exception:
+            logger.warning("closing the %s ingest stream failed", dataset, exc_info=True)
+        raise
+    batcher.close()
+    elapsed = time.perf_counter() - started
+    report = batcher.report()
+    error_count += len(batcher.write_errors)
+    errors.extend(batcher.write_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+    return {
+        "dataset": dataset,
+        "received": received,
+        "valid": valid,
+        "inserted": report.pop("inserted"),
+        "updated": report.pop("updated"),
+        "error_count": error_count,
+        "errors": errors,
+        "elapsed_ms": round(elapsed * 1000.0, 2),
+        "events_per_sec": round(valid / elapsed, 1) if elapsed > 0 else None,
+        **report,
+    }
@@ -0,0 +1,69 @@
+from bson.objectid import ObjectId
+import pytest
+
+from db.course_delete import JOBS_COLLECTION, REFS_COLLECTION, _record_refs, request_deletion, run_deletion
+
+
+@pytest.fixture
+def course(db):
+    cid, student = ObjectId(), ObjectId()
+    doc = {"_id": cid, "code": "DEL1", "title": "Doomed", "active": True}
+    db.courses.insert_one(doc)
+    aids = db.assignments.insert_many([{"course_id": cid, "title": f"A{n}", "attachment_sha256": f"{n:064x}"}
+                                       for n in range(3)]).inserted_ids
+    db.submissions.insert_many([{"assignment_id": a, "student_id": student} for a in aids])
+    db.enrollments.insert_one({"user_id": student, "course_id": cid, "course_code": "DEL1", "status": "active"})
+    return dict(doc, student=student)
+
+
+def test_refs_live_outside_the_job(db, course, tmp_path, monkeypatch):
+    seen = []
+    monkeypatch.setattr("db.course_delete.refresh_student_risk", lambda mongo_db, ids: seen.extend(ids))
+    monkeypatch.setattr("db.course_delete.refresh_student_features", lambda mongo_db, ids: None)
+    monkeypatch.setattr("db.course_delete.invalidate_student_progress", lambda mongo_db, ids: None)
+    job = request_deletion(db, course)
+    assert "students" not in job and "blob_hashes" not in job
+
+    # A batch recorded twice (a retried job) stays one row per value
+    _record_refs(db, course["_id"], {"a" * 64}, {"s1"})
+    _record_refs(db, course["_id"], {"a" * 64}, {"s1"})
+    assert db[REFS_COLLECTION].count_documents({"job_id": course["_id"]}) == 2
+
+    done = run_deletion(db, str(tmp_path), course["_id"], batch_size=2, pause_ms=0)
+    assert done["status"] == "done"
+    assert sorted(seen) == sorted(["s1", str(course["student"])])
+    assert db.assignments.count_documents({}) == 0 and db.courses.count_documents({}) == 0
+    assert db[REFS_COLLECTION].count_documents({}) == 0
+    assert "students" not in db[JOBS_COLLECTION].find_one({"_id": course["_id"]})
+
+
+def test_failing_job_backs_off_and_stops_after_max_attempts(db, course, tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from db.course_delete import MAX_ATTEMPTS, RETRY_BASE, progress, resumable
+
+    def broken(mongo_db, static_dir, hashes):
+        raise OSError("blob directory missing")
+
+    monkeypatch.setattr("db.course_delete.reconcile", broken)
+    request_deletion(db, course)
+    jobs = db[JOBS_COLLECTION]
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert resumable(db) == [course["_id"]]
+        with pytest.raises(OSError):
+            run_deletion(db, str(tmp_path), course["_id"], pause_ms=0)
+        job = jobs.find_one({"_id": course["_id"]})
+        assert job["status"] == "failed" and job["attempts"] == attempt
+        assert job["retry_at"] > datetime.utcnow() + RETRY_BASE * 2 ** (attempt - 1) - timedelta(seconds=5)
+        # Backing off: neither the resumer nor an automatic run takes it
+        assert resumable(db) == [] and run_deletion(db, str(tmp_path), course["_id"]) is None
+        jobs.update_one({"_id": course["_id"]}, {"$set": {"retry_at": datetime.utcnow()}})
+
+    # Out of automatic attempts; left failed for someone to run by hand
+    assert resumable(db) == [] and run_deletion(db, str(tmp_path), course["_id"]) is None
+    assert progress(jobs.find_one({"_id": course["_id"]}))["retrying"] is False
+    monkeypatch.setattr("db.course_delete.reconcile", lambda mongo_db, static_dir, hashes: 0)
+    for name in ("refresh_student_risk", "refresh_student_features", "invalidate_student_progress"):
+        monkeypatch.setattr(f"db.course_delete.{name}", lambda mongo_db, ids: None)
+    done = run_deletion(db, str(tmp_path), course["_id"], pause_ms=0, manual=True)
+    assert done["status"] == "done" and done["attempts"] == 1
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+
+def _login(client, role):
+    with client.session_transaction() as sess:
+        sess.update(role=role, user=role, email=f"{role.lower()}@example.com")
+
+
+def _ndjson(n):
+    return "".join(json.dumps({"student_id": f"S{i:05d}", "course_code": "C1", "date": "2026-09-01",
+                               "status": "present"}) + "\n"
+                   for i in range(n)).encode("utf-8")
+
+
+@pytest.mark.parametrize("role", [None, "Student", "Teacher", "Analyst"])
+def test_stream_ingest_is_admin_only(client, db, role):
+    if role:
+        _login(client, role)
+    rv = client.post("/ingest/stream/attendance", data=_ndjson(3), content_type="application/x-ndjson")
+    assert rv.status_code == 403
+    assert db.attendance.count_documents({}) == 0
+
+
+def test_admin_can_stream(client, db):
+    _login(client, "Admin")
+    rv = client.post("/ingest/stream/attendance", data=_ndjson(3), content_type="application/x-ndjson")
+    assert rv.status_code == 200, rv.get_json()
+    assert db.attendance.count_documents({}) == 3
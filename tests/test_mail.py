@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from web.mail import OUTBOX_COLLECTION
+
+
+def _reset_code(app, db):
+    outbox = app.extensions["mail"]
+    msg_id = outbox.enqueue(db, "s@example.com", "Your Password Reset Code", "code: 123456", kind="password_reset")
+    return outbox, msg_id
+
+
+def test_reset_code_expires_unsent(app, db):
+    outbox, msg_id = _reset_code(app, db)
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db[OUTBOX_COLLECTION].update_one({"_id": msg_id}, {"$set": {"expires_at": past}})
+    # Abandoned without opening an SMTP session
+    assert outbox.process(db) == 1
+    doc = db[OUTBOX_COLLECTION].find_one({"_id": msg_id})
+    assert doc["status"] == "failed" and "body" not in doc and doc["failed_at"]
+    assert outbox._pool is None
+
+
+def test_retry_past_expiry_gives_up(app, db):
+    outbox, msg_id = _reset_code(app, db)
+    col = db[OUTBOX_COLLECTION]
+    msg = col.find_one({"_id": msg_id})
+    assert msg["expires_at"] - msg["created_at"] == timedelta(seconds=app.config["MAIL_MAX_AGE_S"]["password_reset"])
+    # The first backoff (~30s) still fits in 15 minutes
+    col.bulk_write([outbox._retry(msg, "timeout", False, msg["created_at"])])
+    assert col.find_one({"_id": msg_id})["status"] == "queued"
+    # the fifth (~8 min) from minute 10 does not
+    col.bulk_write([outbox._retry(dict(msg, attempts=4), "timeout", False, msg["created_at"] + timedelta(minutes=10))])
+    doc = col.find_one({"_id": msg_id})
+    assert doc["status"] == "failed" and "body" not in doc
+
+
+def test_sent_message_drops_its_body(app, db, smtp_server):
+    outbox, msg_id = _reset_code(app, db)
+    outbox.drain(db)
+    assert "123456" in smtp_server[0].get_payload()
+    doc = db[OUTBOX_COLLECTION].find_one({"_id": msg_id})
+    assert doc["status"] == "sent" and "body" not in doc
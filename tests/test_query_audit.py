@@ -0,0 +1,68 @@
+"""The shape/index check of benchmarks/query_audit.py: every registered query
+shape must be servable by a managed index, and with a server, explain() must
+show no COLLSCAN and a bounded examined/returned ratio."""
+import pytest
+
+from benchmarks import query_audit
+from conftest import TEST_MONGO_URI, needs_mongod
+from db.indexes import INDEXES, ensure_indexes
+from db.query_shapes import SHAPES, audit
+
+
+def _fields(query):
+    return [k for k in query if not k.startswith("$")]
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    if TEST_MONGO_URI:
+        from pymongo import MongoClient
+        client = MongoClient(TEST_MONGO_URI)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    db = client["education_app_test_audit"]
+    query_audit.seed(db, n_students=60, n_teachers=4, n_courses=8, per_course=12)
+    yield db
+    client.drop_database(db.name)
+
+
+@pytest.fixture(scope="module")
+def sample(seeded_db):
+    return query_audit.sample_for(seeded_db)
+
+
+@pytest.mark.parametrize("shape", SHAPES, ids=lambda s: s.name)
+def test_shape_has_a_leading_index(shape, sample):
+    query = shape.filter(sample)
+    candidates = set(_fields(query)) | {f for f, _ in shape.sort or ()}
+    if "_id" in candidates and not shape.collation:
+        return  # the _id index
+    managed = INDEXES.get(shape.collection)
+    assert managed, f"{shape.collection} has no managed indexes"
+    leading = [m.document for m in managed
+               if next(iter(m.document["key"])) in candidates
+               and m.document.get("collation") == shape.collation]
+    assert leading, f"no index in db/indexes.py leads with one of {sorted(candidates)} for {shape.name}"
+
+
+@pytest.mark.skipif(bool(TEST_MONGO_URI), reason="the server-side audit below covers it")
+@pytest.mark.parametrize("shape", [s for s in SHAPES if not s.collation], ids=lambda s: s.name)
+def test_shape_runs(shape, seeded_db, sample):
+    # Catches filters that no longer build from the audit's sample or that the
+    # query language rejects; mongomock has no collations
+    col = seeded_db[shape.collection]
+    query = shape.filter(sample)
+    if shape.kind == "count":
+        col.count_documents(query)
+    elif shape.kind == "distinct":
+        col.distinct(shape.key, query)
+    else:
+        list(col.find(query, shape.projection, sort=shape.sort, limit=shape.limit or 0))
+
+
+@needs_mongod
+def test_audit_explains_clean(seeded_db, sample):
+    ensure_indexes(seeded_db)
+    failed = [(r["name"], r["problems"]) for r in audit(seeded_db, sample, SHAPES) if not r["ok"]]
+    assert not failed
@@ -0,0 +1,66 @@
+"""Query budgets for the hot pages: each asserts the route's query count for a
+seeded account with several courses, announcements, assignments and feedback
+items, and fails on any query shape repeated in a loop (N+1)."""
+from datetime import datetime, timedelta
+
+import pytest
+from bson.objectid import ObjectId
+
+from conftest import needs_mongod
+
+COURSES = 6
+PER_COURSE = 4
+
+
+@pytest.fixture
+def seeded(db):
+    teacher, student, admin = ObjectId(), ObjectId(), ObjectId()
+    db.users.insert_many([
+        {"_id": teacher, "name": "Teacher", "email": "t@example.com", "role": "Teacher"},
+        {"_id": student, "name": "Student", "email": "s@example.com", "role": "Student"},
+        {"_id": admin, "name": "Admin", "email": "a@example.com", "role": "Admin"},
+    ])
+    start = datetime(2026, 1, 1)
+    course_ids = [ObjectId() for _ in range(COURSES)]
+    db.courses.insert_many([{"_id": cid, "code": f"C{i}", "title": f"Course {i}", "instructor_id": teacher, "active": True}
+                            for i, cid in enumerate(course_ids)])
+    db.enrollments.insert_many([{"user_id": student, "course_id": cid, "course_code": f"C{i}", "status": "active"}
+                                for i, cid in enumerate(course_ids)])
+    db.announcements.insert_many([{"course_id": cid, "title": f"News {n}", "content": "...",
+                                   "created_at": start + timedelta(hours=i * PER_COURSE + n), "created_by": teacher}
+                                  for i, cid in enumerate(course_ids) for n in range(PER_COURSE)])
+    db.assignments.insert_many([{"course_id": cid, "course_code": f"C{i}", "title": f"A{n}", "deadline": "2030-01-01"}
+                                for i, cid in enumerate(course_ids) for n in range(PER_COURSE)])
+    db.feedbacks.insert_many([{"name": f"Student {n}", "email": f"s{n}@example.com", "message": "...", "status": "new",
+                               "student_id": str(student), "created_at": start + timedelta(days=n)} for n in range(8)])
+    return {"Teacher": teacher, "Student": student, "Admin": admin}
+
+
+def login(client, seeded, role):
+    with client.session_transaction() as sess:
+        sess.update(role=role, user=role, email=f"{role[0].lower()}@example.com", user_id=str(seeded[role]))
+
+
+# Budgets include the course catalog's first load (version check + courses) and,
+# for student pages, the lookup confirming the session's user still exists
+@pytest.mark.parametrize("role, path, budget", [
+    ("Student", "/student/announcements", 6),
+    ("Student", "/api/student/announcements", 7),
+    ("Teacher", "/teacher/announcements", 2),
+    ("Teacher", "/api/teacher/announcements", 2),
+    ("Student", "/student/courses", 4),
+    ("Admin", "/admin/feedback", 2),
+])
+def test_route_query_budget(client, seeded, query_budget, role, path, budget):
+    login(client, seeded, role)
+    with query_budget(max_queries=budget):
+        assert client.get(path).status_code == 200
+
+
+@needs_mongod
+def test_student_assignments_query_budget(client, seeded, query_budget):
+    # One anti-join aggregation ($lookup with a sub-pipeline, which mongomock
+    # lacks), the session user's lookup and the course catalog's version check and load
+    login(client, seeded, "Student")
+    with query_budget(max_queries=4):
+        assert client.get("/student/assignments").status_code == 200
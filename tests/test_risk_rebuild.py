@@ -0,0 +1,41 @@
+import analytics.risk as risk
+
+
+def _attendance(db, sid, present, total):
+    db.attendance.insert_many([{"student_id": sid, "course_code": "C1", "date": f"2026-09-{d + 1:02d}",
+                                "status": "present" if d < present else "absent"} for d in range(total)])
+
+
+def test_rebuild_keeps_rows_refreshed_meanwhile(db, monkeypatch):
+    _attendance(db, "S1", 2, 4)
+    db.student_risk.insert_one({"student_id": "GONE", "at_risk": True})
+    grouped = risk._grouped_student_ids
+
+    def refresh_during_rebuild(collection):
+        yield from grouped(collection)
+        if collection.name == "attendance":
+            # A student ingested while the rebuild runs, refreshed on the live table
+            _attendance(db, "S2", 1, 4)
+            risk.refresh_student_risk(db, ["S2"])
+
+    monkeypatch.setattr(risk, "_grouped_student_ids", refresh_during_rebuild)
+    summary = risk.rebuild_student_risk(db, chunk_size=1)
+    rows = {d["student_id"]: d for d in db.student_risk.find()}
+    assert set(rows) == {"S1", "S2"}
+    assert rows["S1"]["attendance_rate"] == 0.5 and rows["S2"]["at_risk"] is True
+    assert summary["refreshed_after_swap"] == 1
+    assert "student_risk_rebuild" not in db.list_collection_names()
+
+
+def test_admin_rebuild_runs_in_background(client, monkeypatch):
+    import web.admin as admin
+
+    ran = []
+    monkeypatch.setattr(admin, "rebuild_student_risk", lambda mongo_db: ran.append(True) or {})
+    with client.session_transaction() as sess:
+        sess.update(role="Admin", user="Admin", email="a@example.com")
+    rv = client.post("/admin/risk/rebuild")
+    assert rv.status_code == 202
+    admin._risk_rebuild_lock.acquire(timeout=5)
+    admin._risk_rebuild_lock.release()
+    assert ran == [True]
@@ -0,0 +1,32 @@
+from bson.objectid import ObjectId
+import pytest
+
+
+@pytest.fixture
+def student(client, db):
+    sid = ObjectId()
+    db.users.insert_one({"_id": sid, "name": "Student", "email": "s@example.com", "role": "Student"})
+    db.courses.insert_many([
+        {"_id": ObjectId(), "code": "OPEN1", "title": "Open", "active": True},
+        {"_id": ObjectId(), "code": "SHUT1", "title": "Closed", "active": False},
+        {"_id": ObjectId(), "code": "GONE1", "title": "Being deleted", "active": True, "deleting": True},
+    ])
+    with client.session_transaction() as sess:
+        sess.update(role="Student", user="Student", email="s@example.com", user_id=str(sid))
+    return sid
+
+
+@pytest.mark.parametrize("code, enrolled", [("OPEN1", True), ("SHUT1", False), ("GONE1", False)])
+def test_enroll_only_in_open_courses(client, db, student, code, enrolled):
+    rv = client.post("/student/enroll", data={"course_code": code})
+    assert rv.status_code in (200, 302)
+    assert (db.enrollments.count_documents({"user_id": student, "course_code": code}) == 1) is enrolled
+
+
+def test_deleted_users_session_is_dropped(client, db, student):
+    db.users.delete_one({"_id": student})
+    rv = client.post("/student/enroll", data={"course_code": "OPEN1"})
+    assert rv.status_code == 302 and "/login" in rv.headers["Location"]
+    assert db.enrollments.count_documents({}) == 0
+    with client.session_transaction() as sess:
+        assert "user_id" not in sess
@@ -0,0 +1,145 @@
+import io
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+import pytest
+
+import web.grading
+
+
+@pytest.fixture
+def teacher(client, db):
+    tid, other = ObjectId(), ObjectId()
+    db.users.insert_many([
+        {"_id": tid, "name": "Teacher", "email": "t@example.com", "role": "Teacher"},
+        {"_id": other, "name": "Other", "email": "o@example.com", "role": "Teacher"},
+    ])
+    own, foreign = ObjectId(), ObjectId()
+    db.courses.insert_many([
+        {"_id": own, "code": "OWN1", "title": "Own", "instructor_id": tid},
+        {"_id": foreign, "code": "FOR1", "title": "Foreign", "instructor_id": other},
+    ])
+    subs = {}
+    for course, code in ((own, "OWN1"), (foreign, "FOR1")):
+        aid = ObjectId()
+        db.assignments.insert_one({"_id": aid, "course_id": course, "course_code": code, "title": f"{code} essay"})
+        for n in range(2):
+            subs[f"{code}-{n}"] = db.submissions.insert_one({"assignment_id": aid, "student_id": ObjectId()}).inserted_id
+    with client.session_transaction() as sess:
+        sess.update(role="Teacher", user="Teacher", email="t@example.com", user_id=str(tid))
+    return subs
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    calls = {}
+    for name in ("refresh_student_risk", "refresh_student_features", "invalidate_student_progress"):
+        monkeypatch.setattr(web.grading, name,
+                            lambda mongo_db, ids, _name=name, **kw: calls.setdefault(_name, []).append(sorted(map(str, ids))))
+    return calls
+
+
+def _rows(rv):
+    assert rv.status_code == 200
+    return {r["row"]: r for r in rv.get_json()["rows"]}
+
+
+def test_bulk_grade_reports_each_row(client, db, teacher, refreshed):
+    good = teacher["OWN1-0"]
+    rv = client.post("/api/teacher/grades/bulk", json={"grades": [
+        {"submission_id": str(good), "score": "8", "total_marks": "10", "feedback": " ok "},
+        {"submission_id": str(teacher["OWN1-1"]), "score": "eight", "total_marks": "10"},
+        {"submission_id": str(teacher["OWN1-1"]), "score": "-1"},
+        {"submission_id": str(teacher["OWN1-1"]), "score": "5", "total_marks": "0"},
+        {"submission_id": "nope", "score": "5"},
+        {"submission_id": str(ObjectId()), "score": "5"},
+        {"submission_id": str(good), "score": "9"},
+        "not a row",
+    ]})
+    body = rv.get_json()
+    rows = _rows(rv)
+    assert (body["received"], body["graded"], body["errors"]) == (8, 1, 7)
+    assert rows[1]["status"] == "graded" and "error" not in rows[1]
+    assert rows[2]["error"] == "score not a number: eight"
+    assert rows[3]["error"] == "score must not be negative"
+    assert rows[4]["error"] == "total_marks must be positive"
+    assert rows[5]["error"] == "invalid submission_id"
+    assert rows[6]["error"] == "submission not found"
+    assert rows[7]["error"] == "duplicate submission_id"
+    assert rows[8]["error"] == "row is not an object"
+
+    sub = db.submissions.find_one({"_id": good})
+    assert (sub["score"], sub["total_marks"], sub["feedback"]) == ("8", "10", "ok")
+    assert "score" not in db.submissions.find_one({"_id": teacher["OWN1-1"]})
+    result = db.results.find_one({"student_id": sub["student_id"]})
+    assert (result["course_code"], result["marks_obtained"], result["reference_title"]) == ("OWN1", "8", "OWN1 essay")
+    assert db.results.count_documents({}) == 1
+
+
+def test_bulk_grade_reports_rows_the_database_rejected(client, db, teacher, refreshed, monkeypatch):
+    real = type(db.results).bulk_write
+
+    def bulk_write(self, ops, **kw):
+        if self.name != "results":
+            return real(self, ops, **kw)
+        real(self, ops[1:], **kw)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "document failed validation"}]})
+    monkeypatch.setattr(type(db.results), "bulk_write", bulk_write)
+
+    rv = client.post("/api/teacher/grades/bulk", json=[
+        {"submission_id": str(teacher["OWN1-0"]), "score": "6"},
+        {"submission_id": str(teacher["OWN1-1"]), "score": "7"},
+    ])
+    rows = _rows(rv)
+    assert rows[1]["status"] == "error" and rows[1]["error"] == "document failed validation"
+    assert rows[2]["status"] == "graded"
+    assert rv.get_json()["graded"] == 1
+    graded = str(db.submissions.find_one({"_id": teacher["OWN1-1"]})["student_id"])
+    assert refreshed["refresh_student_risk"] == [[graded]]
+
+
+def test_bulk_grade_refuses_other_teachers_courses(client, db, teacher, refreshed):
+    rv = client.post("/api/teacher/grades/bulk", json=[
+        {"submission_id": str(teacher["FOR1-0"]), "score": "7"},
+        {"submission_id": str(teacher["OWN1-0"]), "score": "7"},
+    ])
+    rows = _rows(rv)
+    assert rows[1] == {"row": 1, "submission_id": str(teacher["FOR1-0"]), "status": "error",
+                       "error": "not authorized for this submission"}
+    assert rows[2]["status"] == "graded"
+    assert "score" not in db.submissions.find_one({"_id": teacher["FOR1-0"]})
+    assert db.results.count_documents({"course_code": "FOR1"}) == 0
+
+
+def test_bulk_grade_refreshes_graded_students_once(client, db, teacher, refreshed):
+    students = sorted(str(db.submissions.find_one({"_id": teacher[k]})["student_id"]) for k in ("OWN1-0", "OWN1-1"))
+    csv = ("submission_id,score,total_marks,feedback\n"
+           f"{teacher['OWN1-0']},6,10,\n{teacher['OWN1-1']},7,10,good\n{teacher['FOR1-0']},5,10,\n")
+    rv = client.post("/api/teacher/grades/bulk", data={"file": (io.BytesIO(csv.encode()), "grades.csv")},
+                     content_type="multipart/form-data")
+    assert rv.get_json()["graded"] == 2
+    assert refreshed == {name: [students] for name in
+                         ("refresh_student_risk", "refresh_student_features", "invalidate_student_progress")}
+
+
+def test_bulk_grade_skips_refresh_when_nothing_was_graded(client, teacher, refreshed):
+    rv = client.post("/api/teacher/grades/bulk", json=[{"submission_id": str(teacher["OWN1-0"]), "score": "n/a"}])
+    assert rv.get_json()["graded"] == 0
+    assert refreshed == {}
+
+
+@pytest.mark.parametrize("kwargs, error", [
+    ({"json": {"grades": []}}, "no grades to import"),
+    ({"json": {"grades": "x"}}, "expected a list of grades"),
+    ({"data": {"file": (io.BytesIO(b"{"), "grades.json")}, "content_type": "multipart/form-data"},
+     "file is not valid JSON"),
+])
+def test_bulk_grade_rejects_unreadable_input(client, teacher, kwargs, error):
+    rv = client.post("/api/teacher/grades/bulk", **kwargs)
+    assert rv.status_code == 400 and rv.get_json() == {"error": error}
+
+
+def test_bulk_grade_is_teacher_only(client, db):
+    with client.session_transaction() as sess:
+        sess.update(role="Student", user_id=str(ObjectId()))
+    assert client.post("/api/teacher/grades/bulk", json=[]).status_code == 403
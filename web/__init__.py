@@ -0,0 +1,9 @@
+from web import admin, analyst, ingest, main, student, teacher
+
+# One blueprint per role; URLs are unchanged, endpoints are "<blueprint>.<view>"
+BLUEPRINTS = (main.bp, admin.bp, teacher.bp, student.bp, analyst.bp, ingest.bp)
+
+
+def register_blueprints(app) -> None:
+    for bp in BLUEPRINTS:
+        app.register_blueprint(bp)
@@ -0,0 +1,603 @@
+import threading
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from analytics.features import rebuild_features
+from analytics.risk import rebuild_student_risk
+from db.ids import load_canonical_state, ref_values, refs
+from db.keyset import CI_COLLATION, page as keyset_page, prefix_range
+from db.migrations import get_state as get_migration_state, migrate_canonical_ids
+from ingestion.rollups import rebuild_lms_rollups
+from web.exports import FORMATS, SOURCES, export_response, parse_filters
+from web.extensions import (
+    mongo, users, courses, enrollments, results, demographics, feedbacks, predictions, manual_predictions, ml_predictions,
+    admin_notifs_col,
+)
+
+bp = Blueprint("admin", __name__)
+
+# /admin/predictions in "estimated" mode counts filtered matches up to here ("10000+")
+PREDICTIONS_COUNT_CAP = 10000
+# Held while this process rebuilds student_risk in the background
+_risk_rebuild_lock = threading.Lock()
+
+
+@bp.route("/admin/feedback")
+def admin_feedback():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    # Mark all 'new' feedback as 'read' now that the admin views the page
+    try:
+        def resolve_course_display(raw):
+            try:
+                if not raw:
+                    return "UNKNOWN"
+                s = str(raw).strip()
+                # Try courses collection by _id (ObjectId)
+                disp = None
+                try:
+                    if len(s) == 24:
+                        obj = ObjectId(s)
+                        c = courses.find_one({"_id": obj})
+                        if c:
+                            disp = c.get("code") or c.get("title") or c.get("name") or s
+                except Exception:
+                    pass
+                if not disp:
+                    # Try raw _id string match or code/title/name
+                    c = (courses.find_one({"_id": s}) or
+                         courses.find_one({"code": s}) or
+                         courses.find_one({"title": s}) or
+                         courses.find_one({"name": s}))
+                    if c:
+                        disp = c.get("code") or c.get("title") or c.get("name") or s
+                return (disp or s).strip()
+            except Exception:
+                return str(raw)
+
+        def resolve_student_display(sid):
+            try:
+                if not sid:
+                    return "Unknown"
+                s = str(sid)
+                # demographics by id or email
+                d = demographics.find_one({"$or": [{"student_id": s}, {"studentId": s}, {"email": s}]}) or {}
+                name = d.get("name") or d.get("full_name") or d.get("email")
+                if name:
+                    return name
+                # users by _id
+                try:
+                    if len(s) == 24:
+                        u = users.find_one({"_id": ObjectId(s)})
+                        if u:
+                            return u.get("name") or u.get("email") or s
+                except Exception:
+                    pass
+                # users by email
+                u = users.find_one({"email": s})
+                if u:
+                    return u.get("name") or u.get("email") or s
+                return s
+            except Exception:
+                return str(sid)
+        feedbacks.update_many({"status": "new"}, {"$set": {"status": "read", "read_at": datetime.utcnow()}})
+    except Exception:
+        pass
+    items = list(feedbacks.find().sort("created_at", -1))
+    return render_template("admin/feedback.html", user=session.get("user"), role="Admin", items=items)
+
+
+@bp.route("/admin/feedback/<fid>/delete", methods=["POST"])
+def admin_feedback_delete(fid):
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    deleted = 0
+    try:
+        oid = ObjectId(fid)
+        res = feedbacks.delete_one({"_id": oid})
+        deleted = res.deleted_count
+    except Exception:
+        deleted = 0
+    if deleted:
+        flash("Feedback deleted.", "success")
+    else:
+        flash("Could not delete feedback.", "warning")
+    next_url = request.form.get("next") or url_for("admin.admin_feedback")
+    return redirect(next_url)
+
+def _student_course_labels(students, keep_missing_courses=False):
+    """Course codes per student (keyed by str(_id)) from enrollments, falling back to results.
+
+    Three queries for the whole list: enrollments by user_id, the referenced
+    courses, and results for students without enrollments.
+    """
+    sids = [s["_id"] for s in students]
+    enrs_by_student = {}
+    for e in enrollments.find({"user_id": refs(sids)}):
+        enrs_by_student.setdefault(str(e.get("user_id")), []).append(e)
+    course_ids = ref_values(e.get("course_id") for enrs in enrs_by_student.values() for e in enrs)
+    course_docs = {}
+    if course_ids:
+        for c in courses.find({"_id": {"$in": course_ids}}, {"code": 1, "title": 1, "name": 1}):
+            course_docs[str(c["_id"])] = c
+    codes_by_student = {}
+    for sid, enrs in enrs_by_student.items():
+        codes = set()
+        for e in enrs:
+            c = course_docs.get(str(e.get("course_id")))
+            if c is not None:
+                codes.add(c.get("code") or c.get("title") or c.get("name"))
+            elif keep_missing_courses:
+                codes.add(e.get("course_code") or e.get("course_title"))
+        codes.discard(None)
+        if codes:
+            codes_by_student[sid] = codes
+    # Students graded outside of enrollments still show their result courses
+    pending = [s for s in sids if str(s) not in codes_by_student]
+    if pending:
+        for r in results.find({"student_id": refs(pending)}, {"student_id": 1, "course_code": 1, "course_id": 1}):
+            label = r.get("course_code") or r.get("course_id")
+            if label:
+                codes_by_student.setdefault(str(r["student_id"]), set()).add(str(label))
+    return {sid: sorted(codes) for sid, codes in codes_by_student.items()}, enrs_by_student
+
+
+def _teacher_course_labels(teachers):
+    codes_by_teacher = {}
+    tids = [t["_id"] for t in teachers]
+    if tids:
+        for c in courses.find({"instructor_id": refs(tids)}, {"instructor_id": 1, "code": 1, "title": 1, "name": 1}):
+            disp = c.get("code") or c.get("title") or c.get("name")
+            if disp:
+                codes_by_teacher.setdefault(str(c["instructor_id"]), set()).add(disp)
+    return {tid: sorted(codes) for tid, codes in codes_by_teacher.items()}
+
+# Dashboards
+@bp.route("/admin")
+def admin_dashboard():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.home"))
+    # Show recent feedback and new feedback count on dashboard
+    recent_feedback = list(feedbacks.find().sort("created_at", -1).limit(5))
+    new_count = feedbacks.count_documents({"status": "new"})
+    total_users = users.count_documents({})
+
+    # Manual predictions (latest few)
+    try:
+        recent_manual_preds = list(manual_predictions.find().sort("created_at", -1).limit(5))
+        manual_pred_count = manual_predictions.count_documents({})
+    except Exception:
+        recent_manual_preds = []
+        manual_pred_count = 0
+    # Notifications for model training
+    try:
+        recent_notifications = list(admin_notifs_col.find({"type": "model_trained"}).sort("created_at", -1).limit(5))
+        notifications_count = admin_notifs_col.count_documents({"type": "model_trained"})
+    except Exception:
+        recent_notifications = []
+        notifications_count = 0
+
+    # Build dashboard lists
+    # Students with enrolled course codes (most recent signups first so they show up here)
+    student_rows = []
+    debug_mode = (request.args.get('debug') == '1')
+    debug_students = []
+    try:
+        stus = list(users.find({"role": "Student"}).sort([("created_at", -1), ("_id", -1)]).limit(20))
+        codes_by_student, enrs_by_student = _student_course_labels(stus)
+        for stu in stus:
+            sr = {
+                "name": stu.get("name"),
+                "email": stu.get("email"),
+                "courses": codes_by_student.get(str(stu["_id"]), []),
+            }
+            student_rows.append(sr)
+            if debug_mode:
+                debug_students.append({
+                    "student": sr,
+                    "enrollments": [{k: str(v) for k, v in doc.items() if k in ("_id","user_id","status","course_id","course_code")} for doc in enrs_by_student.get(str(stu["_id"]), [])]
+                })
+    except Exception:
+        student_rows = []
+
+    # Teachers with offered courses (by course code)
+    teacher_rows = []
+    debug_teachers = []
+    try:
+        teachers = list(users.find({"role": "Teacher"}).sort("name", 1).limit(8))
+        codes_by_teacher = _teacher_course_labels(teachers)
+        for t in teachers:
+            tr = {
+                "name": t.get("name"),
+                "email": t.get("email"),
+                "courses": codes_by_teacher.get(str(t["_id"]), []),
+            }
+            teacher_rows.append(tr)
+            if debug_mode:
+                debug_teachers.append({
+                    "teacher": tr,
+                    "primary_query": {"instructor_id": str(t["_id"])},
+                    "primary_courses_len": len(tr["courses"]),
+                })
+    except Exception:
+        teacher_rows = []
+
+    # Analysts list
+    analyst_rows = []
+    try:
+        for a in users.find({"role": "Analyst"}).sort("name", 1).limit(8):
+            analyst_rows.append({
+                "name": a.get("name"),
+                "email": a.get("email"),
+            })
+    except Exception:
+        analyst_rows = []
+
+    # Recent analyst predictions
+    recent_predictions = []
+    try:
+        recent_predictions = list(predictions.find().sort("created_at", -1).limit(10))
+    except Exception:
+        recent_predictions = []
+
+    return render_template(
+        "admin_dashboard.html",
+        user=session.get("user"),
+        role="Admin",
+        recent_feedback=recent_feedback,
+        new_feedback_count=new_count,
+        total_users=total_users,
+        recent_manual_preds=recent_manual_preds,
+        manual_pred_count=manual_pred_count,
+        recent_notifications=recent_notifications,
+        notifications_count=notifications_count,
+        student_rows=student_rows,
+        teacher_rows=teacher_rows,
+        analyst_rows=analyst_rows,
+        recent_predictions=recent_predictions,
+        debug_students=debug_students if debug_mode else None,
+        debug_teachers=debug_teachers if debug_mode else None,
+    )
+
+
+# -------------------------
+# Admin: Full Lists
+# -------------------------
+
+@bp.route("/admin/students")
+def admin_students_overview():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    rows = []
+    try:
+        stus = list(users.find({"role": "Student"}).sort("name", 1))
+        codes_by_student, _ = _student_course_labels(stus, keep_missing_courses=True)
+        for stu in stus:
+            rows.append({"name": stu.get("name"), "email": stu.get("email"), "courses": codes_by_student.get(str(stu["_id"]), [])})
+    except Exception:
+        rows = []
+    return render_template("admin/students_overview.html", user=session.get("user"), role="Admin", rows=rows)
+
+
+@bp.route("/admin/teachers")
+def admin_teachers_overview():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    rows = []
+    try:
+        teachers = list(users.find({"role": "Teacher"}).sort("name", 1))
+        codes_by_teacher = _teacher_course_labels(teachers)
+        for t in teachers:
+            rows.append({"name": t.get("name"), "email": t.get("email"), "courses": codes_by_teacher.get(str(t["_id"]), [])})
+    except Exception:
+        rows = []
+    return render_template("admin/teachers_overview.html", user=session.get("user"), role="Admin", rows=rows)
+
+
+@bp.route("/admin/analysts")
+def admin_analysts_overview():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    rows = []
+    try:
+        for a in users.find({"role": "Analyst"}).sort("name", 1):
+            rows.append({"name": a.get("name"), "email": a.get("email")})
+    except Exception:
+        rows = []
+    return render_template("admin/analysts_overview.html", user=session.get("user"), role="Admin", rows=rows)
+
+
+@bp.route("/admin/predictions")
+def admin_predictions():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    analyst = (request.args.get("analyst") or "").strip()
+    email = (request.args.get("email") or "").strip()
+    start = (request.args.get("start") or "").strip()
+    end = (request.args.get("end") or "").strip()
+    after = (request.args.get("after") or "").strip() or None
+    before = (request.args.get("before") or "").strip() or None
+    count_mode = "exact" if request.args.get("count") == "exact" else "estimated"
+    try:
+        per_page = min(50, max(5, int(request.args.get("per_page", 10))))
+    except Exception:
+        per_page = 10
+    q = {}
+    # "Starts with", case-insensitive: a range under the collation of the
+    # (analyst / analyst_email, created_at, _id) indexes instead of an
+    # unanchored $regex that reads every key
+    if analyst:
+        q["analyst"] = prefix_range(analyst)
+    if email:
+        q["analyst_email"] = prefix_range(email)
+    collation = CI_COLLATION if q else None
+    date_filter = {}
+    try:
+        if start:
+            sd = datetime.fromisoformat(start + "T00:00:00")
+            date_filter["$gte"] = sd
+        if end:
+            ed = datetime.fromisoformat(end + "T23:59:59")
+            date_filter["$lte"] = ed
+    except Exception:
+        date_filter = {}
+    if date_filter:
+        q["created_at"] = date_filter
+    try:
+        result = keyset_page(manual_predictions, q, per_page, after=after, before=before, collation=collation)
+    except ValueError:
+        # Stale or edited cursor: back to the newest page
+        result = keyset_page(manual_predictions, q, per_page, collation=collation)
+    except Exception:
+        result = {"items": [], "next_cursor": None, "prev_cursor": None}
+    # Counting a large filtered set reads every match; "estimated" reads the
+    # collection metadata when unfiltered and stops at PREDICTIONS_COUNT_CAP otherwise
+    total, total_capped = 0, False
+    count_opts = {"collation": collation} if collation else {}
+    try:
+        if count_mode == "exact":
+            total = manual_predictions.count_documents(q, **count_opts)
+        elif not q:
+            total = manual_predictions.estimated_document_count()
+        else:
+            total = manual_predictions.count_documents(q, limit=PREDICTIONS_COUNT_CAP, **count_opts)
+            total_capped = total >= PREDICTIONS_COUNT_CAP
+    except Exception:
+        total = 0
+    return render_template(
+        "admin/predictions.html",
+        user=session.get("user"), role="Admin",
+        items=result["items"], total=total, total_capped=total_capped, count_mode=count_mode,
+        next_cursor=result["next_cursor"], prev_cursor=result["prev_cursor"], first_page=not (after or before),
+        per_page=per_page, analyst=analyst, email=email, start=start, end=end,
+    )
+
+
+@bp.route("/admin/export/<source>.<fmt>")
+def admin_export(source, fmt):
+    """Every analyst's predictions streamed as CSV or Parquet; manual ones honour the page's prefix filters."""
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    if source not in SOURCES or fmt not in FORMATS:
+        return jsonify({"error": "unknown export"}), 404
+    try:
+        q = parse_filters(source, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    name = f"{source}-{datetime.utcnow():%Y%m%d}"
+    if source == "ml_predictions":
+        q["type"] = "ml"
+        return export_response(ml_predictions, source, fmt, q, name)
+    analyst = (request.args.get("analyst") or "").strip()
+    email = (request.args.get("email") or "").strip()
+    if analyst:
+        q["analyst"] = prefix_range(analyst)
+    if email:
+        q["analyst_email"] = prefix_range(email)
+    return export_response(manual_predictions, source, fmt, q, name, collation=CI_COLLATION if (analyst or email) else None)
+
+
+@bp.route("/admin/feedback_count")
+def admin_feedback_count():
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    new_count = feedbacks.count_documents({"status": "new"})
+    latest = feedbacks.find().sort("created_at", -1).limit(1)
+    latest_doc = next(latest, None)
+    latest_ts = latest_doc.get("created_at").isoformat() if latest_doc and latest_doc.get("created_at") else None
+    return jsonify({"new_count": new_count, "latest_created_at": latest_ts})
+
+@bp.route("/admin/user_count")
+def admin_user_count():
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    total = users.count_documents({})
+    latest = users.find({"created_at": {"$exists": True}}).sort("created_at", -1).limit(1)
+    latest_doc = next(latest, None)
+    latest_ts = latest_doc.get("created_at").isoformat() if latest_doc and latest_doc.get("created_at") else None
+    return jsonify({"total": total, "latest_created_at": latest_ts})
+
+# -------------------------
+# Admin: Manage Users
+# -------------------------
+
+@bp.route("/admin/users")
+def admin_users():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    items = list(users.find().sort("created_at", -1))
+    return render_template("admin/users.html", user=session.get("user"), role="Admin", items=items)
+
+
+@bp.route("/admin/users/add", methods=["POST"]) 
+def admin_users_add():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    name = (request.form.get("name") or "").strip()
+    email = (request.form.get("email") or "").strip()
+    password = (request.form.get("password") or "").strip()
+    role_val = (request.form.get("role") or "").strip() or "Student"
+    if not email or not password or not name:
+        flash("Name, email and password are required.", "warning")
+        return redirect(url_for("admin.admin_users"))
+    try:
+        users.insert_one({
+            "name": name,
+            "email": email,
+            "password": password,
+            "role": role_val,
+            "created_at": datetime.utcnow()
+        })
+        flash("User added.", "success")
+    except Exception as e:
+        # Likely duplicate email
+        flash("Could not add user: " + str(e), "danger")
+    return redirect(url_for("admin.admin_users"))
+
+
+@bp.route("/admin/users/<uid>/update", methods=["POST"]) 
+def admin_users_update(uid):
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(uid)
+    except Exception:
+        flash("Invalid user id.", "danger")
+        return redirect(url_for("admin.admin_users"))
+    update_doc = {}
+    name = (request.form.get("name") or "").strip()
+    email = (request.form.get("email") or "").strip()
+    role_val = (request.form.get("role") or "").strip()
+    password = (request.form.get("password") or "").strip()
+    if name: update_doc["name"] = name
+    if email: update_doc["email"] = email
+    if role_val: update_doc["role"] = role_val
+    if password: update_doc["password"] = password
+    if not update_doc:
+        flash("No changes provided.", "info")
+        return redirect(url_for("admin.admin_users"))
+    try:
+        users.update_one({"_id": oid}, {"$set": update_doc})
+        flash("User updated.", "success")
+    except Exception as e:
+        flash("Could not update user: " + str(e), "danger")
+    return redirect(url_for("admin.admin_users"))
+
+
+@bp.route("/admin/users/<uid>/delete", methods=["POST"]) 
+def admin_users_delete(uid):
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(uid)
+        res = users.delete_one({"_id": oid})
+        if res.deleted_count:
+            flash("User deleted.", "success")
+        else:
+            flash("User not found.", "warning")
+    except Exception as e:
+        flash("Could not delete user: " + str(e), "danger")
+    return redirect(url_for("admin.admin_users"))
+
+@bp.route("/admin/rollups/lms/rebuild", methods=["POST"])
+def admin_rebuild_lms_rollups():
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        summary = rebuild_lms_rollups(mongo.db)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/admin/risk/rebuild", methods=["POST"])
+def admin_rebuild_student_risk():
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    # A full rebuild outlives the worker timeout on a large cohort; it runs on a
+    # background thread and the result is logged
+    if not _risk_rebuild_lock.acquire(blocking=False):
+        return jsonify({"error": "a rebuild is already running"}), 409
+    app = current_app._get_current_object()
+
+    def work():
+        try:
+            with app.app_context():
+                app.logger.info("student_risk rebuilt: %s", rebuild_student_risk(mongo.db))
+        except Exception:
+            app.logger.exception("student_risk rebuild failed")
+        finally:
+            _risk_rebuild_lock.release()
+
+    threading.Thread(target=work, name="risk-rebuild", daemon=True).start()
+    return jsonify({"status": "started"}), 202
+
+@bp.route("/admin/migrations/canonical_ids", methods=["GET", "POST"])
+def admin_migrate_canonical_ids():
+    """Progress of the id migration (GET) or run the next slice of it (POST)."""
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        if request.method == "GET":
+            state = get_migration_state(mongo.db)
+            steps = {k: {f: (str(v) if f == "last_id" and v is not None else v) for f, v in st.items()}
+                     for k, st in (state.get("steps") or {}).items()}
+            return jsonify({"steps": steps, "completed_at": state.get("completed_at")}), 200
+        try:
+            batch_size = max(50, min(int(request.args.get("batch_size", 500)), 5000))
+            max_batches = max(1, int(request.args.get("max_batches", 100)))
+        except Exception:
+            return jsonify({"error": "batch_size and max_batches must be integers"}), 400
+        dry_run = request.args.get("dry_run") == "1"
+        summary = migrate_canonical_ids(mongo.db, batch_size=batch_size, max_batches=max_batches, dry_run=dry_run)
+        if summary.get("complete"):
+            load_canonical_state(mongo.db)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/admin/features/rebuild", methods=["POST"])
+def admin_rebuild_features():
+    if session.get("role") != "Admin":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        summary = rebuild_features(mongo.db)
+        return jsonify(summary), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/admin/notifications")
+def admin_notifications():
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    items = []
+    try:
+        cur = mongo.db.admin_notifications.find({}).sort("created_at", -1).limit(200)
+        for doc in cur:
+            items.append({
+                "id": str(doc.get("_id")),
+                "type": doc.get("type"),
+                "analyst": doc.get("analyst"),
+                "analyst_email": doc.get("analyst_email"),
+                "rows_used": doc.get("rows_used"),
+                "model_type": doc.get("model_type"),
+                "val_accuracy": doc.get("val_accuracy"),
+                "created_at": doc.get("created_at"),
+                "message": doc.get("message"),
+            })
+    except Exception:
+        items = []
+    return render_template("admin/notifications.html", user=session.get("user"), role="Admin", items=items)
+
+
+@bp.route("/admin/notifications/delete/<nid>", methods=["POST"])
+def admin_notifications_delete(nid):
+    if session.get("role") != "Admin":
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(nid)
+        mongo.db.admin_notifications.delete_one({"_id": oid})
+    except Exception:
+        pass
+    return redirect(url_for("admin.admin_notifications"))
@@ -0,0 +1,1455 @@
+import hashlib
+import json
+import math
+import pickle
+import re
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from analytics.aggregators import CoursePerformanceAccumulator, enrollment_course_counts
+from analytics.features import FEATURE_COLUMNS, get_features
+from analytics.risk import top_at_risk
+from db.keyset import CI_COLLATION, encode_cursor, seek
+from ingestion.rollups import event_trend, top_courses_by_event_type
+from ingestion.schemas import FORBIDDEN_CHAR_PATTERN
+from web.exports import FORMATS, SOURCES, export_response, parse_filters
+from web.extensions import (
+    mongo, enrollments, submissions, results, attendance, models, ml_datasets, ml_dataset_rows, manual_predictions, ml_predictions, admin_notifs_col,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+bp = Blueprint("analyst", __name__)
+
+
+@bp.route("/analyst")
+def analyst_dashboard():
+    if session.get("role") != "Analyst":
+        return redirect(url_for("main.home"))
+    return render_template("analyst_dashboard.html", user=session.get("user"), role="Analyst")
+
+# -------------------------
+# Analyst: Data Explorer & Analytics
+# -------------------------
+
+def require_analyst():
+    if session.get("role") != "Analyst":
+        return False
+    return True
+
+# -------------------------
+# Analyst: Model Train & Predict (Linear Regression)
+# -------------------------
+
+def _coerce_dropout(val):
+    try:
+        if isinstance(val, (int, float)):
+            return 1 if float(val) >= 1 else 0
+        s = str(val or "").strip().lower()
+        if s in ("1", "yes", "y", "true", "drop", "dropped", "dropped out"):
+            return 1
+        if s in ("0", "no", "n", "false", "continue", "continued"):
+            return 0
+        # fallback
+        return int(float(s))
+    except Exception:
+        return 0
+
+def _prepare_dataframe(df_raw: "pd.DataFrame") -> "pd.DataFrame":
+    import pandas as pd
+    # Standardize column names to exact expected labels (trim spaces)
+    df = df_raw.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    # Required columns based on problem statement
+    expected = [
+        "Student_ID", "Age", "Gender", "Attendance_Percentage", "Assignment_Completion",
+        "Test_Score", "Family_Income", "Parental_Education", "Access_to_Resources", "Dropout"
+    ]
+    # Keep only columns that exist and are expected
+    present = [c for c in expected if c in df.columns]
+    df = df[present]
+    # Basic cleanups
+    if "Dropout" in df.columns:
+        df["Dropout"] = df["Dropout"].map(_coerce_dropout)
+    # Coerce numeric fields
+    for num_col in ["Age", "Attendance_Percentage", "Assignment_Completion", "Test_Score", "Family_Income"]:
+        if num_col in df.columns:
+            df[num_col] = pd.to_numeric(df[num_col], errors="coerce")
+    # Normalize categorical fields
+    if "Gender" in df.columns:
+        df["Gender"] = df["Gender"].astype(str).str.strip().str.title()
+    if "Access_to_Resources" in df.columns:
+        df["Access_to_Resources"] = df["Access_to_Resources"].astype(str).str.strip().str.title()
+    if "Parental_Education" in df.columns:
+        df["Parental_Education"] = df["Parental_Education"].astype(str).str.strip()
+    # Drop rows with any NA in features/target
+    df = df.dropna(how="any")
+    return df
+
+def _build_features(df: "pd.DataFrame"):
+    import pandas as pd
+    # Exclude identifiers and target
+    feature_cols = [c for c in df.columns if c not in ("Student_ID", "Dropout")]
+    X = df[feature_cols].copy()
+    # One-hot encode categoricals
+    X_enc = pd.get_dummies(X, columns=[c for c in X.columns if X[c].dtype == "object"], drop_first=True)
+    y = df["Dropout"] if "Dropout" in df.columns else None
+    return X_enc, y
+
+def _align_input_with_model(input_df: "pd.DataFrame", model_cols: list) -> "pd.DataFrame":
+    import pandas as pd
+    X_enc = pd.get_dummies(input_df, columns=[c for c in input_df.columns if input_df[c].dtype == "object"], drop_first=True)
+    for col in model_cols:
+        if col not in X_enc.columns:
+            X_enc[col] = 0
+    # Keep only model columns and correct order
+    X_enc = X_enc[model_cols]
+    return X_enc
+
+def _feature_store_frame(labels_file=None) -> "pd.DataFrame":
+    """Training frame built from the student feature store.
+
+    With a labels CSV (a student id column plus one or more label columns) the
+    stored features are joined onto it by student id; without one every
+    stored student is returned and the target must be a stored feature.
+    """
+    import pandas as pd
+    if labels_file:
+        labels_file.stream.seek(0)
+        labels = pd.read_csv(labels_file)
+        labels.columns = [str(c).strip() for c in labels.columns]
+        id_col = next((c for c in labels.columns if c.lower().replace(" ", "_") in ("student_id", "studentid", "id")), None)
+        if id_col is None:
+            raise ValueError("Labels CSV needs a student_id column")
+        labels[id_col] = labels[id_col].astype(str).str.strip()
+        feats = pd.DataFrame(get_features(mongo.db, labels[id_col].tolist()))
+        if feats.empty:
+            raise ValueError("No stored features for the student ids in the labels CSV")
+        feats = feats[["student_id"] + [c for c in FEATURE_COLUMNS if c not in labels.columns]]
+        df = labels.merge(feats, left_on=id_col, right_on="student_id", how="inner")
+        return df.drop(columns=list({id_col, "student_id"}))
+    df = pd.DataFrame(get_features(mongo.db))
+    if df.empty:
+        raise ValueError("Feature store is empty; rebuild it from the admin tools first")
+    return df.drop(columns=["student_id"])
+
+def _score_frame(mdl: dict, df_in: "pd.DataFrame") -> tuple:
+    """Vectorized counterpart of the single-row predict path for batch scoring."""
+    import numpy as np
+    import pandas as pd
+    model_cols = mdl.get("feature_columns", [])
+    mtype = mdl.get("type")
+    try:
+        encoders = pickle.loads(mdl.get("encoders_blob") or b"") or {}
+    except Exception:
+        encoders = {}
+    X = pd.DataFrame(index=df_in.index)
+    for col in model_cols:
+        if col not in df_in.columns:
+            X[col] = 0
+        elif col in encoders:
+            # unseen values -> 0, same as the single-row path
+            lookup = {str(c): i for i, c in enumerate(getattr(encoders[col], "classes_", []))}
+            X[col] = df_in[col].astype(str).map(lookup).fillna(0).astype(int)
+        else:
+            X[col] = pd.to_numeric(df_in[col], errors="coerce").fillna(0)
+    if mtype == "random_forest" and mdl.get("model_blob") is not None:
+        rf = pickle.loads(mdl["model_blob"])
+        probs = np.max(rf.predict_proba(X.values), axis=1)
+        y_classes = mdl.get("y_classes") or []
+        labels = []
+        for y_pred in rf.predict(X.values):
+            if isinstance(y_pred, (int, np.integer)) and y_classes and int(y_pred) < len(y_classes):
+                labels.append(str(y_classes[int(y_pred)]))
+            else:
+                labels.append(int(y_pred) if isinstance(y_pred, (int, np.integer)) else str(y_pred))
+        return labels, [round(float(p), 3) for p in probs]
+    coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+    linear = X.values.astype(float).dot(coef) + float(mdl.get("intercept", 0.0))
+    if mtype == "logistic_regression" or (mtype == "linear_regression" and bool(mdl.get("is_binary"))):
+        probs = 1.0 / (1.0 + np.exp(-linear))
+        return [int(p >= 0.5) for p in probs], [round(float(p), 3) for p in probs]
+    return [round(float(v), 2) for v in linear], [None] * len(linear)
+
+@bp.route("/analyst/model-train-predict")
+def analyst_model_train_predict_page():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    return render_template("analyst/model_train_predict.html", user=session.get("user"), role="Analyst")
+
+@bp.route("/api/analyst/model/upload", methods=["POST"])
+def api_analyst_model_upload():
+    import pandas as pd
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    file = request.files.get("file")
+    if not file:
+        return jsonify({"error": "CSV file is required with form field 'file'"}), 400
+    try:
+        file.stream.seek(0)
+        df_raw = pd.read_csv(file)
+        # Do a light cleanup but do not force specific schema
+        df = df_raw.copy()
+        # Trim whitespace in column names
+        df.columns = [str(c).strip() for c in df.columns]
+        # Drop rows that are entirely empty
+        df = df.dropna(how="all")
+        headers = list(df.columns)
+        # Save dataset rows in a separate collection with an ownership tag
+        dataset_doc = {
+            "analyst": session.get("user"),
+            "analyst_email": session.get("email"),
+            "headers": headers,
+            "created_at": datetime.utcnow(),
+        }
+        res = ml_datasets.insert_one(dataset_doc)
+        dataset_id = str(res.inserted_id)
+        # Persist full dataset rows with reference to dataset_id
+        # Keep a safe limited sample of rows to avoid very large inserts on huge CSVs
+        records = df.head(5000).to_dict(orient="records")
+        for r in records:
+            r["dataset_id"] = dataset_id
+        if records:
+            # use batches to avoid oversized payloads
+            batch = 1000
+            for i in range(0, len(records), batch):
+                ml_dataset_rows.insert_many(records[i:i+batch], ordered=False)
+        # Store a small sample and count on the parent doc
+        sample_rows = df.head(50).to_dict(orient="records")
+        ml_datasets.update_one({"_id": res.inserted_id}, {"$set": {"sample": sample_rows, "count": int(len(df))}})
+        return jsonify({"dataset_id": dataset_id, "headers": headers, "count": int(len(df))})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/analyst/model/train", methods=["POST"])
+def api_analyst_model_train():
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import balanced_accuracy_score, r2_score
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import LabelEncoder
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    file = request.files.get("file")
+    # source=feature_store pulls features by student id; the CSV (if any) only carries labels
+    feature_source = "feature_store" if (request.form.get("source") or "").strip().lower() == "feature_store" else "csv"
+    try:
+        if feature_source == "feature_store":
+            try:
+                df_raw = _feature_store_frame(file)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        elif file:
+            file.stream.seek(0)
+            df_raw = pd.read_csv(file)
+        else:
+            return jsonify({"error": "CSV file is required for training"}), 400
+        # Prepare generic training pipeline
+        df = df_raw.copy()
+        df.columns = [str(c).strip() for c in df.columns]
+        if df.shape[1] < 2:
+            return jsonify({"error": "CSV must contain at least 2 columns (features + target)"}), 400
+        target = (request.form.get("target") or "").strip()
+        # allow user to request model type; default to linear for binary classification
+        req_model = (request.form.get("model") or "").strip().lower()
+        if not target or target not in df.columns:
+            target = df.columns[-1]
+        # Only drop rows where target is missing; keep feature NaNs to be handled downstream
+        df = df[df[target].notna()]
+        feature_cols = [c for c in df.columns if c != target]
+        if len(feature_cols) == 0:
+            return jsonify({"error": "No feature columns found after selecting target"}), 400
+        X_df = df[feature_cols].copy()
+        y_raw = df[target].copy()
+        # Decide task type
+        uniques = pd.Series(y_raw).dropna().unique()
+        uniq_count = len(uniques)
+        # Treat as classification when target is categorical/text OR small discrete set (<=20 classes)
+        is_categorical_dtype = (y_raw.dtype == "object" or str(y_raw.dtype).startswith("category"))
+        is_classification = (uniq_count >= 2) and (is_categorical_dtype or uniq_count <= 20)
+        is_binary = is_classification and uniq_count == 2
+        # Build encoders for categorical features
+        encoders = {}
+        X_enc = X_df.copy()
+        for col in X_enc.columns:
+            if X_enc[col].dtype == "object" or str(X_enc[col].dtype).startswith("category"):
+                le = LabelEncoder()
+                try:
+                    X_enc[col] = le.fit_transform(X_enc[col].astype(str).fillna(""))
+                    encoders[col] = le
+                except Exception:
+                    X_enc[col] = 0
+            else:
+                X_enc[col] = pd.to_numeric(X_enc[col], errors="coerce").fillna(0)
+        # Prepare y
+        if is_classification:
+            y_classes = None
+            if y_raw.dtype == "object" or str(y_raw.dtype).startswith("category"):
+                _ly = LabelEncoder()
+                y = _ly.fit_transform(y_raw.astype(str))
+                try:
+                    y_classes = list(getattr(_ly, "classes_", []))
+                except Exception:
+                    y_classes = None
+            else:
+                y = pd.to_numeric(y_raw, errors="coerce").fillna(0).astype(int)
+                # If numeric but low cardinality, still store sorted unique as classes for mapping
+                try:
+                    y_classes = sorted([int(v) for v in pd.Series(y).dropna().unique().tolist()]) if uniq_count > 2 else None
+                except Exception:
+                    y_classes = None
+            # Simple leakage guard: drop any feature identical to y (or its inverse)
+            drop_cols = []
+            y_arr = np.array(y).ravel()
+            for col in list(X_enc.columns):
+                col_arr = np.array(X_enc[col]).ravel()
+                if col_arr.shape == y_arr.shape and (np.array_equal(col_arr, y_arr) or np.array_equal(col_arr, 1 - y_arr)):
+                    drop_cols.append(col)
+            if drop_cols:
+                X_enc = X_enc.drop(columns=drop_cols)
+
+            # Group-balanced sample weights across Access_to_Resources within each class
+            sample_weight = None
+            try:
+                if "Access_to_Resources" in X_df.columns:
+                    grp = X_df["Access_to_Resources"].astype(str).str.title().fillna("")
+                    import pandas as _pd
+                    dfw = _pd.DataFrame({"y": y, "g": grp})
+                    counts = dfw.groupby(["y", "g"]).size().rename("n").reset_index()
+                    key_to_n = {(int(r["y"]), str(r["g"])): int(r["n"]) for _, r in counts.iterrows()}
+                    sw = []
+                    for i in range(len(dfw)):
+                        k = (int(dfw.at[i, "y"]), str(dfw.at[i, "g"]))
+                        n = float(key_to_n.get(k, 1.0))
+                        sw.append(1.0 / n)
+                    sw = np.array(sw, dtype=float)
+                    m = float(np.mean(sw)) if np.isfinite(np.mean(sw)) else 1.0
+                    if m == 0: m = 1.0
+                    sw = sw / m
+                    sample_weight = sw
+            except Exception:
+                sample_weight = None
+            # For multiclass, default to RF; for binary, allow logistic default
+            use_rf = (req_model == "rf") or (not is_binary)
+            if use_rf:
+                # Apply more conservative RF to reduce overfitting
+                clf = RandomForestClassifier(
+                    n_estimators=200,
+                    max_depth=5,
+                    min_samples_leaf=5,
+                    random_state=42,
+                    class_weight="balanced",
+                )
+                # 5-fold Stratified CV for realistic validation
+                skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+                cv_scores = []
+                for tr_idx, va_idx in skf.split(X_enc.values, y):
+                    if sample_weight is not None:
+                        clf.fit(X_enc.values[tr_idx], np.array(y)[tr_idx], sample_weight=sample_weight[tr_idx])
+                    else:
+                        clf.fit(X_enc.values[tr_idx], np.array(y)[tr_idx])
+                    va_pred = clf.predict(X_enc.values[va_idx])
+                    try:
+                        score = float(balanced_accuracy_score(np.array(y)[va_idx], va_pred))
+                    except Exception:
+                        score = None
+                    if score is not None:
+                        cv_scores.append(score)
+                val_acc = float(np.mean(cv_scores)) if cv_scores else None
+                # Fit final model on all data for persistence
+                if sample_weight is not None:
+                    clf.fit(X_enc.values, y, sample_weight=sample_weight)
+                else:
+                    clf.fit(X_enc.values, y)
+                model_doc = {
+                    "type": "random_forest",
+                    "analyst": session.get("user"),
+                    "analyst_email": session.get("email"),
+                    "created_at": datetime.utcnow(),
+                    "feature_columns": list(X_enc.columns),
+                    "feature_source": feature_source,
+                    "model_blob": Binary(pickle.dumps(clf)),
+                    "encoders_blob": Binary(pickle.dumps(encoders)) if encoders else None,
+                    "target": target,
+                    "val_accuracy": val_acc,
+                    "is_binary": bool(is_binary),
+                    "y_classes": y_classes if (y_classes and len(y_classes) >= 2) else None,
+                }
+                models.insert_one(model_doc)
+                try:
+                    admin_notifs_col.insert_one({
+                        "type": "model_trained",
+                        "analyst": session.get("user"),
+                        "analyst_email": session.get("email"),
+                        "rows_used": int(len(df)),
+                        "model_type": "random_forest",
+                        "val_accuracy": val_acc,
+                        "created_at": datetime.utcnow(),
+                        "message": f"Model trained by {session.get('user')} ({session.get('email')})"
+                    })
+                except Exception:
+                    pass
+                label_counts = {str(k): int(v) for k, v in pd.Series(y).value_counts().to_dict().items()}
+                total_labels = sum(label_counts.values()) or 1
+                label_ratio = {k: round(v/total_labels, 4) for k, v in label_counts.items()}
+                return jsonify({
+                    "message": "RandomForest model trained",
+                    "feature_columns": list(X_enc.columns),
+                    "rows_used": int(len(df)),
+                    "label_counts": label_counts,
+                    "label_ratio": label_ratio,
+                    "val_accuracy": val_acc,
+                    "target": target,
+                    "target_classes": y_classes if (y_classes and len(y_classes) >= 2) else None,
+                })
+            else:
+                # Default: Logistic Regression (linear) for binary classification
+                from sklearn.linear_model import LogisticRegression as _LogReg
+                # Stronger regularization to reduce overfitting
+                logreg = _LogReg(max_iter=1000, class_weight="balanced", C=0.1, solver="liblinear")
+                # 5-fold Stratified CV
+                skf = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+                cv_scores = []
+                for tr_idx, va_idx in skf.split(X_enc.values, y):
+                    if sample_weight is not None:
+                        logreg.fit(X_enc.values[tr_idx], np.array(y)[tr_idx], sample_weight=sample_weight[tr_idx])
+                    else:
+                        logreg.fit(X_enc.values[tr_idx], np.array(y)[tr_idx])
+                    va_pred = logreg.predict(X_enc.values[va_idx])
+                    try:
+                        score = float(balanced_accuracy_score(np.array(y)[va_idx], va_pred))
+                    except Exception:
+                        score = None
+                    if score is not None:
+                        cv_scores.append(score)
+                val_acc = float(np.mean(cv_scores)) if cv_scores else None
+                # Fit final model on all data for persistence
+                if sample_weight is not None:
+                    logreg.fit(X_enc.values, y, sample_weight=sample_weight)
+                else:
+                    logreg.fit(X_enc.values, y)
+                model_doc = {
+                    "type": "logistic_regression",
+                    "analyst": session.get("user"),
+                    "analyst_email": session.get("email"),
+                    "created_at": datetime.utcnow(),
+                    "feature_columns": list(X_enc.columns),
+                    "feature_source": feature_source,
+                    # store linear params for portable prediction
+                    "coef": list(logreg.coef_.ravel().tolist()),
+                    "intercept": float(logreg.intercept_.ravel()[0]) if hasattr(logreg.intercept_, "ravel") else float(np.array(logreg.intercept_).ravel()[0]),
+                    "encoders_blob": Binary(pickle.dumps(encoders)) if encoders else None,
+                    "target": target,
+                    "val_accuracy": val_acc,
+                    "is_binary": True,
+                }
+                models.insert_one(model_doc)
+                try:
+                    admin_notifs_col.insert_one({
+                        "type": "model_trained",
+                        "analyst": session.get("user"),
+                        "analyst_email": session.get("email"),
+                        "rows_used": int(len(df)),
+                        "model_type": "logistic_regression",
+                        "val_accuracy": val_acc,
+                        "created_at": datetime.utcnow(),
+                        "message": f"Model trained by {session.get('user')} ({session.get('email')})"
+                    })
+                except Exception:
+                    pass
+                label_counts = {str(k): int(v) for k, v in pd.Series(y).value_counts().to_dict().items()}
+                total_labels = sum(label_counts.values()) or 1
+                label_ratio = {k: round(v/total_labels, 4) for k, v in label_counts.items()}
+                return jsonify({
+                    "message": "Logistic Regression model trained",
+                    "feature_columns": list(X_enc.columns),
+                    "rows_used": int(len(df)),
+                    "label_counts": label_counts,
+                    "label_ratio": label_ratio,
+                    "val_accuracy": val_acc,
+                    "target": target,
+                })
+        else:
+            # Regression fallback
+            y = pd.to_numeric(y_raw, errors="coerce").fillna(0)
+            lin = LinearRegression()
+            # 5-fold CV with R^2
+            try:
+                from sklearn.model_selection import KFold
+                kf = KFold(n_splits=5, shuffle=True, random_state=42)
+                scores = []
+                Xv = X_enc.values
+                yv = y.values
+                for tr_idx, va_idx in kf.split(Xv):
+                    lin.fit(Xv[tr_idx], yv[tr_idx])
+                    y_hat = lin.predict(Xv[va_idx])
+                    try:
+                        s = float(r2_score(yv[va_idx], y_hat))
+                    except Exception:
+                        s = None
+                    if s is not None and np.isfinite(s):
+                        scores.append(s)
+                val_accuracy = float(np.mean(scores)) if scores else None
+            except Exception:
+                val_accuracy = None
+            # Fit final model on all data
+            lin.fit(X_enc.values, y.values)
+            model_doc = {
+                "type": "linear_regression",
+                "analyst": session.get("user"),
+                "analyst_email": session.get("email"),
+                "created_at": datetime.utcnow(),
+                "feature_columns": list(X_enc.columns),
+                "feature_source": feature_source,
+                "coef": list(lin.coef_.ravel().tolist()) if hasattr(lin.coef_, "ravel") else list(np.array(lin.coef_).tolist()),
+                "intercept": float(lin.intercept_),
+                "encoders_blob": Binary(pickle.dumps(encoders)) if encoders else None,
+                "target": target,
+                "val_accuracy": val_accuracy,
+                "is_binary": False,
+            }
+            models.insert_one(model_doc)
+            # Notify admins
+            try:
+                admin_notifs_col.insert_one({
+                    "type": "model_trained",
+                    "analyst": session.get("user"),
+                    "analyst_email": session.get("email"),
+                    "rows_used": int(len(df)),
+                    "model_type": "linear_regression",
+                    "val_accuracy": val_accuracy,
+                    "created_at": datetime.utcnow(),
+                    "message": f"Model trained by {session.get('user')} ({session.get('email')})"
+                })
+            except Exception:
+                pass
+            # Prepare encoder class listing for UI
+            try:
+                encoder_classes = {k: list(getattr(v, 'classes_', [])) for k, v in (encoders or {}).items()}
+            except Exception:
+                encoder_classes = {}
+            return jsonify({
+                "message": "Linear Regression model trained",
+                "feature_columns": list(X_enc.columns),
+                "rows_used": int(len(df)),
+                "val_accuracy": val_accuracy,
+                "target": target,
+                "encoder_classes": encoder_classes,
+            })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/analyst/model/predict", methods=["POST"])
+def api_analyst_model_predict():
+    import numpy as np
+    import pandas as pd
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        payload = request.json or {}
+        # Fetch latest model for this analyst
+        mdl = models.find_one({"analyst_email": session.get("email")}, sort=[("created_at", -1)])
+        if not mdl:
+            return jsonify({"error": "No trained model found. Train the model first."}), 400
+        model_cols = mdl.get("feature_columns", [])
+        # Build a 1-row DataFrame directly from provided payload
+        # Only keep keys that belong to model feature columns
+        row = {k: payload.get(k) for k in model_cols if k in payload}
+        df_in = pd.DataFrame([row])
+        # Coerce numerics
+        for nc in df_in.columns:
+            # we'll coerce later for RF; for linear we scale/align below
+            pass
+        # For RandomForest models, apply saved label encoders and skip scaling
+        mtype = mdl.get("type")
+        if mtype == "random_forest" and mdl.get("encoders_blob") is not None:
+            try:
+                encoders = pickle.loads(mdl["encoders_blob"]) or {}
+            except Exception:
+                encoders = {}
+            # apply encoders deterministically; unseen values -> 0
+            for cat_col, le in encoders.items():
+                if cat_col in df_in.columns:
+                    val = str(df_in.at[0, cat_col]) if cat_col in df_in.columns else ""
+                    classes = list(getattr(le, "classes_", []))
+                    try:
+                        idx = classes.index(val)
+                    except ValueError:
+                        idx = 0
+                    df_in[cat_col] = idx
+            # ensure numeric types for the rest
+            for nc in df_in.columns:
+                if nc not in encoders:
+                    df_in[nc] = pd.to_numeric(df_in[nc], errors="coerce").fillna(0)
+            # align to RF feature order without one-hot
+            for col in model_cols:
+                if col not in df_in.columns:
+                    df_in[col] = 0
+            X_enc = df_in[model_cols]
+        elif mtype in ("linear_regression", "logistic_regression"):
+            # Generic linear regression over original feature columns (encoders optional)
+            try:
+                encoders = pickle.loads(mdl.get("encoders_blob") or b"") or {}
+            except Exception:
+                encoders = {}
+            # ensure all model columns exist
+            for col in model_cols:
+                if col not in df_in.columns:
+                    df_in[col] = 0
+            # apply encoders if present, otherwise numeric coercion
+            for col in model_cols:
+                if col in encoders:
+                    val = str(df_in.at[0, col]) if col in df_in.columns else ""
+                    classes = list(getattr(encoders[col], "classes_", []))
+                    try:
+                        idx = classes.index(val)
+                    except ValueError:
+                        idx = 0
+                    df_in[col] = idx
+                else:
+                    df_in[col] = pd.to_numeric(df_in[col], errors="coerce").fillna(0)
+            X_enc = df_in[model_cols]
+        else:
+            # Legacy models: apply scaling and one-hot
+            mdl_mins = (mdl.get("numeric_mins") or {})
+            mdl_maxs = (mdl.get("numeric_maxs") or {})
+            for c, vmin in mdl_mins.items():
+                vmax = float(mdl_maxs.get(c, vmin + 1.0))
+                denom = (vmax - float(vmin)) if (vmax - float(vmin)) != 0 else 1.0
+                if c in df_in.columns:
+                    df_in[c] = (pd.to_numeric(df_in[c], errors="coerce") - float(vmin)) / denom
+            X_enc = _align_input_with_model(df_in, model_cols)
+        # Prepare debug snapshot of feature vector
+        debug_vec = {}
+        try:
+            debug_vec = {c: (float(df_in[c].iloc[0]) if c in df_in.columns else None) for c in model_cols}
+        except Exception:
+            debug_vec = {}
+        if mtype == "random_forest" and mdl.get("model_blob") is not None:
+            try:
+                rf = pickle.loads(mdl["model_blob"])
+                proba = rf.predict_proba(X_enc.values)[0]
+                y_pred = rf.predict(X_enc.values)[0]
+                # Determine probability of predicted class (or max prob for multiclass)
+                try:
+                    prob = float(np.max(proba))
+                except Exception:
+                    prob = None
+                # Map numeric class back to original label if available
+                y_classes = mdl.get("y_classes") or []
+                try:
+                    if isinstance(y_pred, (int, np.integer)) and y_classes and int(y_pred) < len(y_classes):
+                        label = str(y_classes[int(y_pred)])
+                    else:
+                        label = (str(y_pred) if not isinstance(y_pred, (int, np.integer)) else int(y_pred))
+                except Exception:
+                    label = str(y_pred)
+            except Exception:
+                prob = 0.5
+                label = "Unknown"
+        else:
+            # Linear-family models stored as coef/intercept
+            coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+            intercept = float(mdl.get("intercept", 0.0))
+            linear = float(np.dot(X_enc.values[0], coef) + intercept)
+            if mtype == "logistic_regression":
+                prob = 1.0 / (1.0 + np.exp(-linear))
+                label = 1 if prob >= 0.5 else 0
+            elif mtype == "linear_regression" and bool(mdl.get("is_binary")):
+                # Enforce binary mapping for regression model trained on binary target
+                prob = 1.0 / (1.0 + np.exp(-linear))
+                label = 1 if prob >= 0.5 else 0
+            else:
+                prob = None
+                label = str(round(linear, 4))
+        # Build charts from last uploaded sample for key metrics
+        last_ds = ml_datasets.find_one({"analyst_email": session.get("email")}, sort=[("created_at", -1)]) or {}
+        sample = last_ds.get("sample", [])
+        charts = {}
+        try:
+            if sample:
+                def hist(values, bins):
+                    buckets = {b:0 for b in bins}
+                    for v in values:
+                        try:
+                            x = float(v)
+                        except Exception:
+                            x = 0.0
+                        if x < 20: buckets["0-20"] += 1
+                        elif x < 40: buckets["20-40"] += 1
+                        elif x < 60: buckets["40-60"] += 1
+                        elif x < 80: buckets["60-80"] += 1
+                        else: buckets["80-100"] += 1
+                    return buckets
+                bins = ["0-20","20-40","40-60","60-80","80-100"]
+                att_vals = [r.get("Attendance_Percentage", 0) for r in sample]
+                asg_vals = [r.get("Assignment_Completion", 0) for r in sample]
+                tst_vals = [r.get("Test_Score", 0) for r in sample]
+                att_hist = hist(att_vals, bins)
+                asg_hist = hist(asg_vals, bins)
+                tst_hist = hist(tst_vals, bins)
+                charts["attendance_hist"] = {"labels":bins,"data":[att_hist[b] for b in bins]}
+                charts["assignment_hist"] = {"labels":bins,"data":[asg_hist[b] for b in bins]}
+                charts["test_hist"] = {"labels":bins,"data":[tst_hist[b] for b in bins]}
+                # Means for pie chart
+                import numpy as _np
+                def _safe_mean(arr):
+                    try:
+                        vals = _np.array([float(x) for x in arr if x is not None])
+                        return float(_np.nanmean(vals)) if vals.size else 0.0
+                    except Exception:
+                        return 0.0
+                charts["means"] = {
+                    "labels": ["Attendance %", "Assignment Completion", "Test Score"],
+                    "data": [
+                        round(_safe_mean(att_vals), 2),
+                        round(_safe_mean(asg_vals), 2),
+                        round(_safe_mean(tst_vals), 2)
+                    ]
+                }
+        except Exception:
+            charts.setdefault("attendance_hist", {"type":"bar","labels":[],"data":[]})
+            charts.setdefault("assignment_hist", {"type":"bar","labels":[],"data":[]})
+            charts.setdefault("test_hist", {"type":"bar","labels":[],"data":[]})
+        # Only round probability if numeric
+        try:
+            prob_out = round(prob, 3) if isinstance(prob, (int, float)) else None
+        except Exception:
+            prob_out = None
+        # Preserve binary 0/1 as ints; otherwise round numeric predictions for display stability
+        is_bin_flag = bool(mdl.get("is_binary"))
+        try:
+            if isinstance(label, (int, float)) and (int(round(float(label))) in (0,1)) and is_bin_flag:
+                label_out = int(round(float(label)))
+            elif isinstance(label, (int, float)):
+                label_out = round(float(label), 2)
+            else:
+                label_out = label
+        except Exception:
+            label_out = label
+        return jsonify({
+            "prediction": label_out,
+            "probability": prob_out,
+            "charts": charts,
+            "used_features": model_cols,
+            "input_vector": debug_vec,
+            "target": mdl.get("target"),
+            "is_binary": is_bin_flag,
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/analyst/features", methods=["GET"])
+def api_analyst_features():
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    ids = [s.strip() for s in (request.args.get("student_ids") or "").split(",") if s.strip()]
+    try:
+        limit = max(1, min(int(request.args.get("limit", 500)), 5000))
+    except Exception:
+        limit = 500
+    try:
+        rows = get_features(mongo.db, ids or None, limit=limit)
+        return jsonify({"columns": FEATURE_COLUMNS, "rows": rows})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/analyst/model/score", methods=["POST"])
+def api_analyst_model_score():
+    """Batch-score students straight from the feature store with the latest model."""
+    import pandas as pd
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        payload = request.json or {}
+        mdl = models.find_one({"analyst_email": session.get("email")}, sort=[("created_at", -1)])
+        if not mdl:
+            return jsonify({"error": "No trained model found. Train the model first."}), 400
+        if mdl.get("type") not in ("random_forest", "logistic_regression", "linear_regression"):
+            return jsonify({"error": "Batch scoring is not supported for this model type"}), 400
+        ids = payload.get("student_ids") or None
+        if ids is not None and not isinstance(ids, list):
+            return jsonify({"error": "student_ids must be a list"}), 400
+        try:
+            limit = max(1, min(int(payload.get("limit", 5000)), 50000))
+        except Exception:
+            limit = 5000
+        rows = get_features(mongo.db, ids, limit=limit)
+        if not rows:
+            return jsonify({"target": mdl.get("target"), "count": 0, "scores": [], "missing": [str(i) for i in (ids or [])]})
+        df_in = pd.DataFrame(rows)
+        labels, probs = _score_frame(mdl, df_in)
+        scores = [{"student_id": sid, "prediction": lbl, "probability": p}
+                  for sid, lbl, p in zip(df_in["student_id"].tolist(), labels, probs)]
+        found = set(df_in["student_id"].tolist())
+        return jsonify({
+            "target": mdl.get("target"),
+            "is_binary": bool(mdl.get("is_binary")),
+            "used_features": mdl.get("feature_columns", []),
+            "count": len(scores),
+            "scores": scores,
+            "missing": [str(i) for i in (ids or []) if str(i) not in found],
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/analyst/model/save", methods=["POST"])
+def api_analyst_model_save():
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        payload = request.json or {}
+        pred = payload.get("prediction")
+        charts = payload.get("charts")
+        inputs = payload.get("inputs")
+        probability = payload.get("probability")
+        # Round numeric fields
+        try:
+            pred_out = round(float(pred), 2)
+        except Exception:
+            pred_out = pred
+        try:
+            prob_out = round(float(probability), 3)
+        except Exception:
+            prob_out = probability
+        target = payload.get("target")
+        if not target:
+            try:
+                mdl = models.find_one({"analyst_email": session.get("email")}, sort=[("created_at", -1)]) or {}
+                target = mdl.get("target")
+            except Exception:
+                target = None
+        if not pred:
+            return jsonify({"error": "prediction is required"}), 400
+        try:
+            ih = hashlib.sha256(json.dumps(inputs or {}, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+        except Exception:
+            ih = None
+        now = datetime.utcnow()
+        recent_window = now - timedelta(minutes=10)
+        q = {
+            "analyst_email": session.get("email"),
+            "source": "auto",
+            "inputs_hash": ih,
+            "created_at": {"$gte": recent_window}
+        }
+        try:
+            existing = ml_predictions.find_one(q, sort=[("created_at", -1)])
+        except Exception:
+            existing = None
+        if existing and existing.get("_id"):
+            try:
+                ml_predictions.update_one(
+                    {"_id": existing.get("_id")},
+                    {"$set": {
+                        "prediction": pred_out,
+                        "probability": prob_out,
+                        "target": target,
+                        "charts": charts,
+                        "inputs": inputs,
+                        "source": "manual",
+                    }}
+                )
+            except Exception:
+                pass
+        else:
+            ml_predictions.insert_one({
+                "type": "ml",
+                "analyst": session.get("user"),
+                "analyst_email": session.get("email"),
+                "inputs": inputs,
+                "prediction": pred_out,
+                "probability": prob_out,
+                "target": target,
+                "charts": charts,
+                "source": "manual",
+                "inputs_hash": ih,
+                "created_at": now,
+            })
+        return jsonify({"message": "Saved"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+_DATASET_COLLECTIONS = {
+    "attendance": "attendance",
+    "grades": "results",
+    "enrollments": "enrollments",
+    "demographics": "demographics",
+    "lms": "lms_events",
+    "academic_records": "academic_records",
+}
+
+@bp.route("/analyst/datasets")
+def analyst_datasets():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    # Provide counts per dataset for quick overview
+    counts = {}
+    try:
+        for key, coll_name in _DATASET_COLLECTIONS.items():
+            counts[key] = mongo.db[coll_name].count_documents({})
+    except Exception:
+        counts = {}
+    return render_template("analyst/datasets.html", user=session.get("user"), role="Analyst", counts=counts)
+
+@bp.route("/api/analyst/dataset")
+def api_analyst_dataset():
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    name = (request.args.get("name") or "").strip()
+    if name not in _DATASET_COLLECTIONS:
+        return jsonify({"error": f"Unknown dataset: {name}"}), 400
+    coll = mongo.db[_DATASET_COLLECTIONS[name]]
+    q = (request.args.get("q") or "").strip()
+    limit = min(int(request.args.get("limit", 500) or 500), 2000)
+    sort = (request.args.get("sort") or "").strip()
+    order = (request.args.get("order") or "asc").lower()
+    try:
+        cursor = coll.find({})
+        if q:
+            # Basic text search across string fields (client-side like behavior)
+            cursor = coll.find({"$or": [
+                {k: {"$regex": q, "$options": "i"}} for k in coll.find_one() or {} if isinstance((coll.find_one() or {}).get(k), str)
+            ]})
+        if sort:
+            cursor = cursor.sort(sort, 1 if order != "desc" else -1)
+        rows = list(cursor.limit(limit))
+        # Convert ObjectId to string and prepare headers
+        clean_rows = []
+        headers = set()
+        def fmt_dt(val):
+            try:
+                if isinstance(val, dict) and "$date" in val:
+                    s = val.get("$date")
+                    try:
+                        dt = datetime.fromisoformat(str(s).replace("Z", "+00:00"))
+                        return dt.strftime("%Y-%m-%d %H:%M:%S")
+                    except Exception:
+                        return str(s)
+                if isinstance(val, datetime):
+                    return val.strftime("%Y-%m-%d %H:%M:%S")
+                return val
+            except Exception:
+                return val
+        def clean_value(v):
+            # Normalize None/NaN/inf and textual equivalents to empty string; format date-like objects
+            try:
+                if v is None:
+                    return ""
+                if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+                    return ""
+                if isinstance(v, dict) and "$date" in v:
+                    return fmt_dt(v)
+                if isinstance(v, datetime):
+                    return fmt_dt(v)
+                if isinstance(v, str) and v.strip().lower() in ("nan", "none", "null", "inf", "-inf"):
+                    return ""
+                return v
+            except Exception:
+                return v
+        # Precompile forbidden character regex and define columns to exclude from symbol checks
+        comp_pat = re.compile(FORBIDDEN_CHAR_PATTERN)
+        # Exclude fields where certain symbols are expected/allowed (dates, contacts, feedback text, etc.)
+        exclude_cols = {"term", "dob", "email", "phone", "address", "event_time", "details", "date",
+                        "feedback", "remarks", "remark", "comment", "comments"}
+        # Always drop rows that contain a literal '?' anywhere (even in excluded columns)
+        hard_pat = re.compile(r"\?")
+
+        # Dataset-specific rule: for 'grades', allow incomplete rows (optional fields may be empty)
+        require_complete = (name != "grades")
+
+        for r in rows:
+            cr = {}
+            for k, v in r.items():
+                if k == "_id":
+                    cr[k] = str(v)
+                else:
+                    cr[k] = clean_value(v)
+                headers.add(k)
+            # Skip rows that have forbidden special symbols in checked columns
+            has_forbidden = False
+            try:
+                for ck, cv in cr.items():
+                    if ck == "_id":
+                        continue
+                    # If any column has a literal '?', drop the row immediately
+                    if isinstance(cv, str) and hard_pat.search(cv):
+                        has_forbidden = True
+                        break
+                    # Otherwise check forbidden pattern only for non-excluded columns
+                    if ck in exclude_cols:
+                        continue
+                    if isinstance(cv, str) and comp_pat.search(cv):
+                        has_forbidden = True
+                        break
+            except Exception:
+                has_forbidden = has_forbidden or False
+            if has_forbidden:
+                continue
+
+            # Skip rows based on completeness only if required
+            if require_complete:
+                non_id_keys = [k for k in cr.keys() if k != "_id"]
+                if non_id_keys and all((str(cr[k]).strip() != "") for k in non_id_keys):
+                    clean_rows.append(cr)
+            else:
+                clean_rows.append(cr)
+        headers = [h for h in sorted(headers)]
+        return jsonify({"name": name, "headers": headers, "rows": clean_rows})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/analyst/visualizations")
+def analyst_visualizations():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    return render_template("analyst/visualizations.html", user=session.get("user"), role="Analyst")
+
+@bp.route("/api/analyst/charts/overview")
+def api_analyst_charts_overview():
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    # Build simple aggregates for charts
+    data = {}
+    try:
+        # Course demand: enrollments per course_code
+        pipeline = [
+            {"$group": {"_id": {"$ifNull": ["$course_code", "$course_id"]}, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": 10}
+        ]
+        demand = list(enrollments.aggregate(pipeline))
+        data["course_demand"] = {
+            "labels": [str(d.get("_id") or "Unknown") for d in demand],
+            "values": [int(d.get("count") or 0) for d in demand]
+        }
+    except Exception:
+        data["course_demand"] = {"labels": [], "values": []}
+    try:
+        # Attendance patterns: present vs absent counts
+        pipeline = [
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]
+        att = list(attendance.aggregate(pipeline))
+        data["attendance_status"] = {
+            "labels": [str(d.get("_id") or "Unknown") for d in att],
+            "values": [int(d.get("count") or 0) for d in att]
+        }
+    except Exception:
+        data["attendance_status"] = {"labels": [], "values": []}
+    try:
+        # Student performance trends: average score by course or term if available
+        pipeline = [
+            {"$group": {"_id": {"course": {"$ifNull": ["$course_code", "$course_id"]}}, "avg_score": {"$avg": "$score"}}},
+            {"$sort": {"avg_score": -1}},
+            {"$limit": 10}
+        ]
+        perf = list(results.aggregate(pipeline))
+        data["performance"] = {
+            "labels": [str((d.get("_id") or {}).get("course") or "Unknown") for d in perf],
+            "values": [float(d.get("avg_score") or 0) for d in perf]
+        }
+    except Exception:
+        data["performance"] = {"labels": [], "values": []}
+    try:
+        # Dropout proxy: count of LMS events of type 'drop' if exists (served from the daily rollups)
+        drops = top_courses_by_event_type(mongo.db, "drop", limit=10)
+        data["dropout"] = {
+            "labels": [str(d.get("_id") or "Unknown") for d in drops],
+            "values": [int(d.get("count") or 0) for d in drops]
+        }
+    except Exception:
+        data["dropout"] = {"labels": [], "values": []}
+    return jsonify(data)
+
+@bp.route("/api/analyst/charts/lms_trend")
+def api_analyst_charts_lms_trend():
+    if not require_analyst():
+        return jsonify({"error": "unauthorized"}), 403
+    granularity = (request.args.get("granularity") or "day").strip().lower()
+    course_code = (request.args.get("course_code") or "").strip().upper() or None
+    event_type = (request.args.get("event_type") or "").strip() or None
+    start = (request.args.get("start") or "").strip()
+    end = (request.args.get("end") or "").strip()
+    try:
+        since = datetime.fromisoformat(start) if start else None
+        until = datetime.fromisoformat(end) if end else None
+    except Exception:
+        return jsonify({"error": "start/end must be ISO dates"}), 400
+    if granularity == "hour" and since is None and until is None:
+        # Hourly series default to the last 72 hours to keep the chart readable
+        until = datetime.utcnow()
+        since = until - timedelta(hours=72)
+    try:
+        points = event_trend(mongo.db, granularity=granularity, course_code=course_code,
+                             event_type=event_type, since=since, until=until)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    fmt = "%Y-%m-%d %H:00" if granularity == "hour" else "%Y-%m-%d"
+    return jsonify({
+        "granularity": granularity,
+        "labels": [p["bucket"].strftime(fmt) for p in points],
+        "values": [p["count"] for p in points],
+    })
+
+@bp.route("/analyst/predictions")
+def analyst_predictions():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    # Compute simple heuristic predictions if no ML outputs exist
+    at_risk_students = []
+    high_low_courses = {"high": [], "low": []}
+    upcoming_perf = []
+    course_marks = {}
+    course_labels = {}
+
+    try:
+        # Risk: low attendance or low average score, read from the materialized student_risk table
+        at_risk_students = top_at_risk(mongo.db, limit=50)
+    except Exception:
+        at_risk_students = []
+    try:
+        # High/low enrollment courses: resolve each enrollment to a course CODE only; drop unresolved
+        counts = enrollment_course_counts(mongo.db)
+        items = sorted(({"course": k, "count": v} for k, v in counts.items()), key=lambda x: x["count"], reverse=True)
+        # Threshold-based split: Low = count <= 1, High = count > 1
+        high = [it for it in items if (it.get("count", 0) or 0) > 1][:10]
+        low_candidates = sorted(items, key=lambda x: x["count"])  # ascending for lows
+        low = [it for it in low_candidates if (it.get("count", 0) or 0) <= 1][:10]
+        high_low_courses = {"high": high, "low": low}
+    except Exception:
+        high_low_courses = {"high": [], "low": []}
+
+    # One cursor pass over submissions and one over results feeds both the
+    # per-course averages and the per-course/per-student marks charts
+    perf = CoursePerformanceAccumulator(mongo.db)
+    try:
+        perf.feed_submissions(submissions.find({}, {
+            "course_code": 1, "course_id": 1, "course": 1, "course_title": 1, "code": 1, "title": 1, "name": 1,
+            "student_id": 1, "studentId": 1, "user_id": 1, "userId": 1, "student": 1, "student_email": 1, "email": 1,
+            "student_name": 1, "score": 1, "total_marks": 1,
+        }))
+    except Exception:
+        pass
+    try:
+        perf.feed_results(results.find({}, {
+            "course_id": 1, "course_code": 1, "course": 1, "course_title": 1,
+            "student_id": 1, "user_id": 1, "student_email": 1, "email": 1, "name": 1, "score": 1,
+        }))
+    except Exception:
+        pass
+    try:
+        # Upcoming performance proxy: per-course average percentage from submissions
+        items = perf.course_averages(limit=20)
+        # Fallback to results if submissions had no data
+        if not items:
+            pipe = [
+                {"$group": {"_id": {"course": {"$ifNull": ["$course_code", "$course_id"]}}, "avg_score": {"$avg": "$score"}}},
+                {"$sort": {"avg_score": -1}},
+                {"$limit": 20}
+            ]
+            tmp = list(results.aggregate(pipe))
+            perf.resolver.prime((d.get("_id") or {}).get("course") for d in tmp)
+            for d in tmp:
+                code = perf.resolver.resolve((d.get("_id") or {}).get("course"))
+                if not code:
+                    continue
+                items.append({
+                    "course": code,
+                    "predicted_avg": round(float(d.get("avg_score") or 0), 1)
+                })
+        upcoming_perf = sorted(items, key=lambda x: x.get("predicted_avg", 0), reverse=True)[:20]
+    except Exception:
+        upcoming_perf = []
+    # Build per-course student average marks for interactive charts
+    try:
+        course_marks, course_labels = perf.top_marks(per_course=20)
+    except Exception:
+        course_marks = {}
+    return render_template("analyst/predictions.html", user=session.get("user"), role="Analyst", at_risk=at_risk_students, high_low=high_low_courses, upcoming=upcoming_perf, course_marks=course_marks, course_labels=course_labels)
+
+# Saved ML predictions by target. The overview is one aggregation: $facet
+# over the analyst's predictions with a per-target $group that keeps the
+# newest REPORT_GROUP_SIZE items ($topN, MongoDB 5.2+) and derives each
+# group's input columns in the pipeline. Only the REPORT_TARGETS largest
+# targets get a card, and their items keep just the inputs shown as columns,
+# so the $facet result stays far below the 16MB document limit however many
+# targets an analyst has. A target's own view pages through
+# the (analyst_email, type, target, created_at, _id) index with a keyset
+# cursor, which the overview's "Older" links also start from.
+REPORT_GROUP_SIZE = 25
+REPORT_PAGE_SIZE = 50
+REPORT_COLUMNS = 10
+REPORT_TARGETS = 20
+_UNLABELED = ("(Unlabeled)", "Unlabeled", "unlabeled", "UNLABELED")
+_REPORT_FIELDS = {"prediction": 1, "probability": 1, "created_at": 1, "inputs": 1, "target": 1}
+
+
+def _input_columns_expr(items_expr):
+    """Input keys of ``items_expr`` in first-seen order, without long, 'charts' and '_id' keys."""
+    inputs = {"$cond": [{"$eq": [{"$type": "$$this.inputs"}, "object"]}, "$$this.inputs", {}]}
+    keys = {"$map": {"input": {"$objectToArray": inputs}, "as": "kv", "in": "$$kv.k"}}
+    fresh = {"$filter": {"input": keys, "as": "k", "cond": {"$and": [
+        {"$not": [{"$in": ["$$k", "$$value"]}]},
+        {"$lte": [{"$strLenCP": "$$k"}, 64]},
+        {"$not": [{"$in": [{"$toLower": "$$k"}, ["charts", "_id"]]}]},
+    ]}}}
+    return {"$slice": [{"$reduce": {"input": items_expr, "initialValue": [],
+                                    "in": {"$concatArrays": ["$$value", fresh]}}}, REPORT_COLUMNS]}
+
+
+def _report_item(doc):
+    inputs = doc.get("inputs")
+    return {
+        "id": str(doc.get("_id")),
+        "prediction": doc.get("prediction"),
+        "probability": doc.get("probability"),
+        "created_at": doc.get("created_at"),
+        "inputs": inputs if isinstance(inputs, dict) else {},
+        "target": doc.get("target"),
+    }
+
+
+def _report_cursor(doc):
+    at = doc.get("created_at")
+    return encode_cursor(at, doc["_id"]) if isinstance(at, datetime) and isinstance(doc.get("_id"), ObjectId) else None
+
+
+def _labeled(target):
+    t = (target or "").strip() if isinstance(target, str) else ""
+    return t if t and t not in _UNLABELED else ""
+
+
+def _report_overview(base_q):
+    """(targets, grouped, columns_per, group_next, items, columns_all) from one aggregation."""
+    newest = {"created_at": -1, "_id": -1}
+    fields = {k: f"${k}" for k in ("_id",) + tuple(_REPORT_FIELDS)}
+    pipeline = [
+        {"$match": base_q},
+        {"$facet": {
+            # Every target with its count, for the navigation
+            "counts": [
+                {"$group": {"_id": "$target", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "targets": [
+                {"$group": {"_id": "$target", "count": {"$sum": 1},
+                            "recent": {"$topN": {"n": REPORT_GROUP_SIZE + 1, "sortBy": newest, "output": fields}}}},
+                # Unlabeled predictions get no card (they are in "recent")
+                {"$match": {"_id": {"$nin": [None, "", *_UNLABELED]}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": REPORT_TARGETS},
+                {"$project": {"count": 1, "recent": 1,
+                              "columns": _input_columns_expr({"$slice": ["$recent", REPORT_GROUP_SIZE]})}},
+                # The columns are all the cards show of inputs
+                {"$project": {"count": 1, "columns": 1, "recent": {"$map": {"input": "$recent", "as": "d", "in": {
+                    **{k: f"$$d.{k}" for k in fields},
+                    "inputs": {"$cond": [
+                        {"$eq": [{"$type": "$$d.inputs"}, "object"]},
+                        {"$arrayToObject": {"$filter": {"input": {"$objectToArray": "$$d.inputs"}, "as": "kv",
+                                                        "cond": {"$in": ["$$kv.k", "$columns"]}}}},
+                        {}]}}}}}},
+            ],
+            # All predictions, for analysts whose predictions carry no target
+            "recent": [
+                {"$sort": newest},
+                {"$limit": REPORT_PAGE_SIZE},
+                {"$group": {"_id": None, "items": {"$push": fields}}},
+                {"$project": {"items": 1, "columns": _input_columns_expr("$items")}},
+            ],
+        }},
+    ]
+    out = next(ml_predictions.aggregate(pipeline), None) or {}
+    targets, seen = [], set()
+    for g in out.get("counts") or []:
+        tgt = _labeled(g.get("_id"))
+        if tgt and tgt not in seen:
+            seen.add(tgt)
+            targets.append({"target": tgt, "count": int(g.get("count") or 0)})
+    grouped, columns_per, group_next = {}, {}, {}
+    for g in out.get("targets") or []:
+        tgt = _labeled(g.get("_id"))
+        if not tgt or tgt in grouped:
+            continue
+        recent = g.get("recent") or []
+        grouped[tgt] = [_report_item(d) for d in recent[:REPORT_GROUP_SIZE]]
+        columns_per[tgt] = g.get("columns") or []
+        if len(recent) > REPORT_GROUP_SIZE:
+            group_next[tgt] = _report_cursor(recent[REPORT_GROUP_SIZE - 1])
+    everything = (out.get("recent") or [{}])[0]
+    items = [_report_item(d) for d in everything.get("items") or []]
+    return targets, grouped, columns_per, group_next, items, everything.get("columns") or []
+
+
+def _report_target_page(base_q, target, after=None, before=None):
+    """One keyset page of a target's predictions: (items, columns, next_cursor, prev_cursor)."""
+    older = before is None
+    q = {**base_q, "target": target}
+    if before:
+        q = seek(q, before, older=False)
+    elif after:
+        q = seek(q, after)
+    direction = -1 if older else 1
+    out = next(ml_predictions.aggregate([
+        {"$match": q},
+        {"$sort": {"created_at": direction, "_id": direction}},
+        {"$limit": REPORT_PAGE_SIZE + 1},
+        {"$project": _REPORT_FIELDS},
+        {"$group": {"_id": None, "items": {"$push": "$$ROOT"}}},
+        {"$project": {"items": 1, "columns": _input_columns_expr({"$slice": ["$items", REPORT_PAGE_SIZE]})}},
+    ]), None) or {}
+    # $push keeps the $sort order in practice; sort again rather than rely on it
+    docs = sorted(out.get("items") or [], key=lambda d: (d.get("created_at") or datetime.min, d["_id"]), reverse=older)
+    more = len(docs) > REPORT_PAGE_SIZE
+    docs = docs[:REPORT_PAGE_SIZE]
+    if not older:
+        docs.reverse()
+    next_cursor = _report_cursor(docs[-1]) if docs and (more or not older) else None
+    prev_cursor = _report_cursor(docs[0]) if docs and (after or before) and (more or older) else None
+    return [_report_item(d) for d in docs], out.get("columns") or [], next_cursor, prev_cursor
+
+
+@bp.route("/analyst/reports")
+def analyst_reports():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    selected_target = (request.args.get("target") or "").strip()
+    # Treat '(Unlabeled)' or empty as no filter
+    if selected_target in ("", "(Unlabeled)"):
+        selected_target = ""
+    after = (request.args.get("after") or "").strip() or None
+    before = (request.args.get("before") or "").strip() or None
+    base_q = {"type": "ml", "analyst_email": session.get("email")}
+    items, columns, targets = [], [], []
+    grouped, columns_per, group_next, columns_all = {}, {}, {}, []
+    next_cursor = prev_cursor = None
+    try:
+        if selected_target:
+            # Counts for the navigation only: a $group the index covers
+            targets = [{"target": _labeled(d["_id"]), "count": int(d.get("count") or 0)} for d in ml_predictions.aggregate([
+                {"$match": base_q},
+                {"$group": {"_id": "$target", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ]) if _labeled(d.get("_id"))]
+            try:
+                items, columns, next_cursor, prev_cursor = _report_target_page(base_q, selected_target, after, before)
+            except ValueError:
+                items, columns, next_cursor, prev_cursor = _report_target_page(base_q, selected_target)
+        else:
+            targets, grouped, columns_per, group_next, items, columns_all = _report_overview(base_q)
+    except Exception:
+        current_app.logger.exception("analyst reports for %s failed", session.get("email"))
+        flash("Saved predictions could not be loaded right now.", "danger")
+        items, targets, grouped = [], [], {}
+
+    return render_template(
+        "analyst/reports.html",
+        user=session.get("user"),
+        role="Analyst",
+        items=items,
+        columns=columns,
+        targets=targets,
+        selected_target=selected_target,
+        grouped=grouped,
+        columns_per=columns_per,
+        group_next=group_next,
+        columns_all=columns_all,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
+
+@bp.route("/analyst/reports/delete/<pid>", methods=["POST"])
+def analyst_reports_delete(pid):
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    email = session.get("email")
+    try:
+        oid = ObjectId(pid)
+        ml_predictions.delete_one({"_id": oid, "analyst_email": email})
+    except Exception:
+        pass
+    return redirect(url_for("analyst.analyst_reports"))
+
+@bp.route("/analyst/export/<source>.<fmt>")
+def analyst_export(source, fmt):
+    """The analyst's own ml_predictions / manual_predictions, streamed as CSV or Parquet."""
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    if source not in SOURCES or fmt not in FORMATS:
+        return jsonify({"error": "unknown export"}), 404
+    try:
+        q = parse_filters(source, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    email = session.get("email")
+    name = f"{source}-{datetime.utcnow():%Y%m%d}"
+    if source == "ml_predictions":
+        q.update({"type": "ml", "analyst_email": email})
+        return export_response(ml_predictions, source, fmt, q, name)
+    # manual_predictions' analyst_email indexes are case-insensitive
+    q["analyst_email"] = email
+    return export_response(manual_predictions, source, fmt, q, name, collation=CI_COLLATION)
+
+@bp.route("/analyst/manual-predict", methods=["GET", "POST"])
+def analyst_manual_predict():
+    if not require_analyst():
+        return redirect(url_for("main.login"))
+    ctx = {"user": session.get("user"), "role": "Analyst", "input": None, "prediction": None, "error": None}
+    if request.method == "POST":
+        try:
+            student_name = (request.form.get("student_name", "").strip())
+            assignment_marks = float(request.form.get("assignment_marks", "").strip())
+            test_marks = float(request.form.get("test_marks", "").strip())
+            percentage = float(request.form.get("percentage", "").strip())
+            attendance = float(request.form.get("attendance", "").strip())
+        except Exception:
+            ctx["error"] = "Please enter valid numeric values."
+            ctx["input"] = {
+                "student_name": (request.form.get("student_name", "").strip()),
+                "assignment_marks": request.form.get("assignment_marks"),
+                "test_marks": request.form.get("test_marks"),
+                "percentage": request.form.get("percentage"),
+                "attendance": request.form.get("attendance"),
+            }
+            return render_template("analyst/manual_predict.html", **ctx)
+        if not student_name:
+            ctx["error"] = "Student name is required."
+            ctx["input"] = {
+                "student_name": "",
+                "assignment_marks": assignment_marks,
+                "test_marks": test_marks,
+                "percentage": percentage,
+                "attendance": attendance,
+            }
+            return render_template("analyst/manual_predict.html", **ctx)
+        dropped = (percentage < 45.0) or (attendance < 40.0) or (assignment_marks < 40.0) or (test_marks < 40.0)
+        ctx["input"] = {
+            "student_name": student_name,
+            "assignment_marks": assignment_marks,
+            "test_marks": test_marks,
+            "percentage": percentage,
+            "attendance": attendance,
+        }
+        ctx["prediction"] = "Dropped Out" if dropped else "Continue"
+        try:
+            manual_predictions.insert_one({
+                "type": "manual",
+                "analyst": session.get("user"),
+                "analyst_email": session.get("email"),
+                "inputs": ctx.get("input"),
+                "prediction": ctx.get("prediction"),
+                "created_at": datetime.utcnow(),
+            })
+        except Exception:
+            pass
+        return render_template("analyst/manual_predict.html", **ctx)
+    return render_template("analyst/manual_predict.html", **ctx)
@@ -0,0 +1,63 @@
+import mimetypes
+import os
+import unicodedata
+from typing import Optional
+from urllib.parse import quote
+
+from flask import current_app, request, send_file
+from werkzeug.security import safe_join
+
+# Downloads of uploaded files (assignment attachments, submissions). Files in
+# the blob store are named by their SHA-256, which doubles as a strong ETag, so
+# revalidation and If-Range work without reading the file. DOWNLOAD_OFFLOAD
+# hands the transfer to the front-end server instead of a Python worker:
+#   ""         - stream from Flask (Range and If-None-Match handled by send_file)
+#   "accel"    - nginx: X-Accel-Redirect to DOWNLOAD_ACCEL_PREFIX + path, which
+#                must be an internal location aliased to static/
+#   "sendfile" - Apache mod_xsendfile / lighttpd: X-Sendfile with the absolute path
+# The front-end server then answers Range requests itself.
+OFFLOAD_MODES = ("", "accel", "sendfile")
+
+
+def init_downloads(app) -> None:
+    app.config.setdefault("DOWNLOAD_OFFLOAD", os.getenv("DOWNLOAD_OFFLOAD", ""))
+    app.config.setdefault("DOWNLOAD_ACCEL_PREFIX", os.getenv("DOWNLOAD_ACCEL_PREFIX", "/_protected/"))
+    if app.config["DOWNLOAD_OFFLOAD"] not in OFFLOAD_MODES:
+        raise ValueError(f"DOWNLOAD_OFFLOAD must be one of {OFFLOAD_MODES}")
+
+
+def _disposition(download_name: str) -> str:
+    try:
+        download_name.encode("ascii")
+        return f"attachment; filename=\"{download_name.replace(chr(34), '')}\""
+    except UnicodeEncodeError:
+        fallback = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii").replace('"', "")
+        return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(download_name, safe='')}"
+
+
+def send_upload(rel_path: str, download_name: str, sha256: Optional[str] = None):
+    """Response for a file under static/; raises FileNotFoundError when it is missing."""
+    static_dir = os.path.join(current_app.root_path, "static")
+    full_path = safe_join(static_dir, rel_path.replace("\\", "/"))
+    if full_path is None or not os.path.isfile(full_path):
+        raise FileNotFoundError(rel_path)
+    mode = current_app.config.get("DOWNLOAD_OFFLOAD") or ""
+    if not mode:
+        # Uploads older than the blob store keep werkzeug's mtime/size ETag
+        return send_file(full_path, as_attachment=True, download_name=download_name, etag=sha256 or True)
+
+    if sha256 and request.if_none_match.contains(sha256):
+        rv = current_app.response_class(status=304)
+        rv.set_etag(sha256)
+        return rv
+    # Blob files have no extension: the type comes from the original name
+    rv = current_app.response_class(mimetype=mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    rv.headers["Content-Disposition"] = _disposition(download_name)
+    if mode == "accel":
+        prefix = current_app.config.get("DOWNLOAD_ACCEL_PREFIX") or "/_protected/"
+        rv.headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(rel_path.replace("\\", "/").lstrip("/"))
+    else:
+        rv.headers["X-Sendfile"] = full_path
+    if sha256:
+        rv.set_etag(sha256)
+    return rv
@@ -0,0 +1,230 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import Response, jsonify
+
+# Bulk export of saved predictions as CSV or Parquet. The response body is a
+# generator over a Mongo cursor, so a multi-million-row history streams in
+# constant memory. Flattened ``inputs`` need their columns (and, for Parquet,
+# types) before the first row, so one server-side aggregation learns the
+# input keys and their BSON types first; the second pass streams the rows.
+SOURCES = {
+    "ml_predictions": ("analyst", "analyst_email", "target", "prediction", "probability", "source"),
+    "manual_predictions": ("analyst", "analyst_email", "prediction"),
+}
+FORMATS = ("csv", "parquet")
+BATCH_SIZE = 1000
+# Rows per Parquet row group (and per chunk written to the client)
+ROW_GROUP_SIZE = 10000
+# Input keys beyond this are left out of the export
+MAX_INPUT_COLUMNS = 200
+INPUT_PREFIX = "inputs."
+
+_NUMBER_TYPES = {"double", "int", "long", "decimal"}
+_INT_TYPES = {"int", "long"}
+
+
+def parse_filters(source: str, args) -> Dict[str, Any]:
+    """Mongo filter from the request's target/start/end; raises ValueError for bad input."""
+    q: Dict[str, Any] = {}
+    target = (args.get("target") or "").strip()
+    if target:
+        if "target" not in SOURCES[source]:
+            raise ValueError(f"{source} has no target")
+        q["target"] = target
+    dates: Dict[str, datetime] = {}
+    for name, op, suffix in (("start", "$gte", "T00:00:00"), ("end", "$lte", "T23:59:59.999")):
+        raw = (args.get(name) or "").strip()
+        if raw:
+            try:
+                dates[op] = datetime.fromisoformat(raw + suffix)
+            except ValueError:
+                raise ValueError(f"{name} must be YYYY-MM-DD")
+    if dates:
+        q["created_at"] = dates
+    return q
+
+
+def _kind(types) -> str:
+    types = set(types) - {"null", "missing", "undefined"}
+    if not types:
+        return "string"
+    if types <= _INT_TYPES:
+        return "int"
+    if types <= _NUMBER_TYPES:
+        return "float"
+    if types == {"bool"}:
+        return "bool"
+    if types == {"date"}:
+        return "date"
+    return "string"
+
+
+def discover_columns(collection, query: Dict[str, Any],
+                     collation: Optional[Dict[str, Any]] = None) -> Tuple[str, List[Tuple[str, str]]]:
+    """(kind of prediction, [(input key, kind)]) over the matching documents, computed server-side."""
+    pipeline = [
+        {"$match": query},
+        {"$facet": {
+            "prediction": [{"$group": {"_id": None, "types": {"$addToSet": {"$type": "$prediction"}}}}],
+            "inputs": [
+                {"$project": {"_id": 0, "kv": {"$cond": [{"$eq": [{"$type": "$inputs"}, "object"]},
+                                                        {"$objectToArray": "$inputs"}, []]}}},
+                {"$unwind": "$kv"},
+                {"$group": {"_id": "$kv.k", "types": {"$addToSet": {"$type": "$kv.v"}}}},
+                {"$sort": {"_id": 1}},
+                {"$limit": MAX_INPUT_COLUMNS},
+            ],
+        }},
+    ]
+    opts = {"collation": collation} if collation else {}
+    out = next(collection.aggregate(pipeline, allowDiskUse=True, **opts), None) or {}
+    prediction = (out.get("prediction") or [{}])[0].get("types") or []
+    return _kind(prediction), [(d["_id"], _kind(d.get("types") or [])) for d in out.get("inputs") or []]
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _convert(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    if kind in ("int", "float"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None
+        return int(value) if kind == "int" else float(value)
+    if kind == "bool":
+        return value if isinstance(value, bool) else None
+    if kind == "date":
+        return value if isinstance(value, datetime) else None
+    return _text(value)
+
+
+class Export:
+    """Columns of one export and the rows of a cursor in that shape."""
+
+    def __init__(self, source: str, prediction_kind: str, input_columns: List[Tuple[str, str]]):
+        fixed = [("id", "string"), ("created_at", "date")]
+        for field in SOURCES[source]:
+            kind = prediction_kind if field == "prediction" else ("float" if field == "probability" else "string")
+            fixed.append((field, kind))
+        self.fields = [name for name, _ in fixed]
+        self.inputs = [key for key, _ in input_columns]
+        self.columns: List[Tuple[str, str]] = fixed + [(INPUT_PREFIX + key, kind) for key, kind in input_columns]
+
+    def rows(self, cursor) -> Iterator[List[Any]]:
+        kinds = [kind for _, kind in self.columns]
+        for doc in cursor:
+            inputs = doc.get("inputs") if isinstance(doc.get("inputs"), dict) else {}
+            raw = [str(doc["_id"])] + [doc.get(f) for f in self.fields[1:]] + [inputs.get(k) for k in self.inputs]
+            yield [_convert(v, kind) for v, kind in zip(raw, kinds)]
+
+
+def _csv_chunks(export: Export, cursor) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in export.columns])
+    n = 0
+    for row in export.rows(cursor):
+        writer.writerow(["" if v is None else (v.isoformat() if isinstance(v, datetime) else v) for v in row])
+        n += 1
+        if n % BATCH_SIZE == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes to the response but keeps counting offsets."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records absolute offsets in the footer
+        return self.position
+
+    def take(self) -> bytes:
+        out, self.chunks = b"".join(self.chunks), []
+        return out
+
+
+def _load_pyarrow():
+    """(pyarrow, pyarrow.parquet), or None when pyarrow (an optional dependency) is unavailable."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    return pa, pq
+
+
+def _parquet_chunks(export: Export, cursor, pa, pq) -> Iterator[bytes]:
+    types = {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "date": pa.timestamp("ms")}
+    schema = pa.schema([(name, types[kind]) for name, kind in export.columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    batch: List[List[Any]] = []
+
+    def flush():
+        columns = list(zip(*batch)) if batch else [[] for _ in export.columns]
+        writer.write_table(pa.Table.from_arrays([pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema))
+        batch.clear()
+
+    for row in export.rows(cursor):
+        batch.append(row)
+        if len(batch) >= ROW_GROUP_SIZE:
+            flush()
+            yield sink.take()
+    if batch:
+        flush()
+    writer.close()
+    yield sink.take()
+
+
+def export_response(collection, source: str, fmt: str, query: Dict[str, Any], download_name: str,
+                    collation: Optional[Dict[str, Any]] = None):
+    """Streaming CSV/Parquet response of ``collection`` rows matching ``query``, oldest first.
+
+    Sorted on created_at alone so every filter the routes build reads one
+    index in order (ascending is a backwards walk of the created_at-desc keys).
+    """
+    arrow = _load_pyarrow() if fmt == "parquet" else None
+    if fmt == "parquet" and arrow is None:
+        return jsonify({"error": "Parquet export needs pyarrow installed; use .csv"}), 501
+    prediction_kind, input_columns = discover_columns(collection, query, collation)
+    export = Export(source, prediction_kind, input_columns)
+    projection = {"charts": 0, "inputs_hash": 0}
+    opts = {"collation": collation} if collation else {}
+    cursor = collection.find(query, projection, **opts).sort("created_at", 1).batch_size(BATCH_SIZE)
+    chunks = _parquet_chunks(export, cursor, *arrow) if arrow else _csv_chunks(export, cursor)
+    mimetype = "application/vnd.apache.parquet" if fmt == "parquet" else "text/csv"
+    rv = Response(chunks, mimetype=mimetype)
+    rv.headers["Content-Disposition"] = f'attachment; filename="{download_name}.{fmt}"'
+    rv.headers["X-Export-Columns"] = str(len(export.columns))
+    return rv
@@ -0,0 +1,50 @@
+from flask import current_app, g
+from flask_pymongo import PyMongo
+from werkzeug.local import LocalProxy
+
+from db.catalog import COURSES, CourseCatalog, bump_version
+
+# Bound to an app in create_app(). The client connects lazily, so importing the
+# blueprints never touches the database.
+mongo = PyMongo()
+
+
+def _collection(name: str):
+    return LocalProxy(lambda: mongo.db[name])
+
+
+users = _collection("users")
+courses = _collection("courses")
+enrollments = _collection("enrollments")
+assignments = _collection("assignments")
+submissions = _collection("submissions")
+results = _collection("results")
+academic_records = _collection("academic_records")
+demographics = _collection("demographics")
+lms_events = _collection("lms_events")
+attendance = _collection("attendance")
+feedbacks = _collection("feedbacks")
+announcements = _collection("announcements")
+predictions = _collection("predictions")
+models = _collection("models")
+ml_datasets = _collection("ml_datasets")
+ml_dataset_rows = _collection("ml_dataset_rows")
+# Separate collections for predictions and notifications
+manual_predictions = _collection("manual_predictions")
+ml_predictions = _collection("ml_predictions")
+admin_notifs_col = _collection("admin_notifications")
+
+
+def course_catalog():
+    """The course catalog for this request; its version is checked once per request."""
+    snap = g.get("course_catalog")
+    if snap is None:
+        catalog = current_app.extensions.setdefault("course_catalog", CourseCatalog())
+        snap = g.course_catalog = catalog.snapshot(mongo.db)
+    return snap
+
+
+def courses_changed() -> None:
+    """Call after writing to courses: every worker reloads its catalog on the next request."""
+    bump_version(mongo.db, COURSES)
+    g.pop("course_catalog", None)
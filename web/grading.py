@@ -0,0 +1,186 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from analytics.features import refresh_student_features
+from analytics.progress import invalidate_student_progress
+from analytics.risk import refresh_student_risk
+from db.ids import as_object_id, canonical, ref
+from ingestion.utils import read_csv_stream
+
+# Grade writes shared by the single-submission form and the bulk import. A
+# bulk import resolves every submission, assignment and course of the file in
+# one query each and writes submissions and results with one bulk_write each,
+# instead of three round trips (and a risk/feature refresh) per grade.
+MAX_BULK_ROWS = 5000
+
+
+def result_update(sub_doc: Dict[str, Any], assignment: Optional[Dict[str, Any]], course_code: Optional[str],
+                  score: Any, total_marks: Any, feedback: Any, now: datetime) -> UpdateOne:
+    """Upsert of the student's results row for a graded submission."""
+    student_id = sub_doc.get("student_id")
+    assignment_id = sub_doc.get("assignment_id")
+    # Canonical results shape: ObjectId references plus the readable course_code
+    return UpdateOne(
+        {"student_id": ref(student_id), "component": "Assignment", "ref_id": ref(assignment_id)},
+        {
+            "$set": {
+                "student_id": canonical(student_id),
+                "ref_id": canonical(assignment_id),
+                "course_id": (assignment or {}).get("course_id"),
+                "course_code": course_code,
+                "marks_obtained": score,
+                "total_marks": total_marks,
+                "feedback": feedback,
+                "reference_title": (assignment or {}).get("title"),
+                "updated_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
+    )
+
+
+def grades_changed(mongo_db, student_ids) -> None:
+    """Refresh what is derived from a student's results after grades were written or removed."""
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+    refresh_student_risk(mongo_db, student_ids)
+    refresh_student_features(mongo_db, student_ids, components=("results",))
+    invalidate_student_progress(mongo_db, student_ids)
+
+
+def parse_grade_rows(file_storage=None, payload: Any = None) -> List[Dict[str, Any]]:
+    """Rows from an uploaded CSV/JSON file or a JSON body (a list, or {"grades": [...]}).
+
+    Raises ValueError when the input cannot be read at all.
+    """
+    if file_storage is not None:
+        name = (file_storage.filename or "").lower()
+        if name.endswith(".json") or (file_storage.mimetype or "").endswith("json"):
+            try:
+                payload = json.load(file_storage.stream)
+            except Exception:
+                raise ValueError("file is not valid JSON")
+        else:
+            rows = []
+            for row in read_csv_stream(file_storage):
+                rows.append({k.lstrip("\ufeff"): v for k, v in row.items() if k})
+                if len(rows) > MAX_BULK_ROWS:
+                    break
+            payload = rows
+    if isinstance(payload, dict):
+        payload = payload.get("grades")
+    if not isinstance(payload, list):
+        raise ValueError("expected a list of grades")
+    if len(payload) > MAX_BULK_ROWS:
+        raise ValueError(f"at most {MAX_BULK_ROWS} rows per import")
+    return payload
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _number(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    """(value as stored, error). Grades are stored as text, like the form posts them."""
+    text = _text(value)
+    if text is None:
+        return None, None
+    try:
+        num = float(text)
+    except ValueError:
+        return None, f"not a number: {text}"
+    if num < 0:
+        return None, "must not be negative"
+    return text, None
+
+
+def bulk_grade(mongo_db, instructor_id: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Grade submissions of the instructor's courses; returns a per-row status summary."""
+    statuses: List[Dict[str, Any]] = []
+    wanted: List[Tuple[int, ObjectId, Dict[str, Any]]] = []
+    seen = set()
+    for i, row in enumerate(rows, start=1):
+        status: Dict[str, Any] = {"row": i, "submission_id": None, "status": "error"}
+        statuses.append(status)
+        if not isinstance(row, dict):
+            status["error"] = "row is not an object"
+            continue
+        status["submission_id"] = _text(row.get("submission_id"))
+        oid = as_object_id(status["submission_id"])
+        score, score_err = _number(row.get("score"))
+        total, total_err = _number(row.get("total_marks"))
+        if oid is None:
+            status["error"] = "invalid submission_id"
+        elif score is None:
+            status["error"] = f"score {score_err or 'is required'}"
+        elif total_err:
+            status["error"] = f"total_marks {total_err}"
+        elif total is not None and float(total) == 0:
+            status["error"] = "total_marks must be positive"
+        elif oid in seen:
+            status["error"] = "duplicate submission_id"
+        else:
+            seen.add(oid)
+            wanted.append((i - 1, oid, {"score": score, "total_marks": total, "feedback": _text(row.get("feedback"))}))
+
+    # One query each for the submissions, their assignments and the courses
+    subs = {s["_id"]: s for s in mongo_db.submissions.find(
+        {"_id": {"$in": [oid for _, oid, _ in wanted]}}, {"assignment_id": 1, "student_id": 1})} if wanted else {}
+    assignment_oids = {as_object_id(s.get("assignment_id")) for s in subs.values()} - {None}
+    assignment_map = {a["_id"]: a for a in mongo_db.assignments.find(
+        {"_id": {"$in": list(assignment_oids)}}, {"course_id": 1, "course_code": 1, "title": 1})} if assignment_oids else {}
+    course_oids = {a.get("course_id") for a in assignment_map.values()} - {None}
+    course_map = {c["_id"]: c for c in mongo_db.courses.find(
+        {"_id": {"$in": list(course_oids)}}, {"code": 1, "instructor_id": 1})} if course_oids else {}
+
+    now = datetime.utcnow()
+    sub_ops: List[UpdateOne] = []
+    result_ops: List[UpdateOne] = []
+    applied: List[int] = []
+    for idx, oid, grade in wanted:
+        status = statuses[idx]
+        sub_doc = subs.get(oid)
+        assignment = assignment_map.get(as_object_id((sub_doc or {}).get("assignment_id")))
+        course = course_map.get((assignment or {}).get("course_id"))
+        if sub_doc is None:
+            status["error"] = "submission not found"
+            continue
+        if course is None or str(course.get("instructor_id")) != str(instructor_id):
+            status["error"] = "not authorized for this submission"
+            continue
+        sub_ops.append(UpdateOne({"_id": oid}, {"$set": {**grade, "graded_on": now}}))
+        result_ops.append(result_update(sub_doc, assignment, assignment.get("course_code") or course.get("code"),
+                                        grade["score"], grade["total_marks"], grade["feedback"], now))
+        applied.append(idx)
+
+    failed = {}
+    if sub_ops:
+        for col, ops in ((mongo_db.submissions, sub_ops), (mongo_db.results, result_ops)):
+            try:
+                col.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                for err in e.details.get("writeErrors", []):
+                    failed.setdefault(applied[err["index"]], err.get("errmsg") or "write failed")
+    graded_students = []
+    for idx in applied:
+        status = statuses[idx]
+        if idx in failed:
+            status["error"] = failed[idx]
+        else:
+            status["status"] = "graded"
+            status.pop("error", None)
+            graded_students.append(subs[as_object_id(status["submission_id"])].get("student_id"))
+    grades_changed(mongo_db, {str(s): s for s in graded_students if s not in (None, "")}.values())
+
+    graded = sum(1 for s in statuses if s["status"] == "graded")
+    return {"received": len(rows), "graded": graded, "errors": len(rows) - graded, "rows": statuses}
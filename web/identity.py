@@ -0,0 +1,50 @@
+from typing import Any, Dict, Optional
+
+from flask import g, session
+
+from db.ids import as_object_id
+from web.extensions import users
+
+# Who is making the request. login() stores the user's id in the signed session
+# cookie, so the user is looked up by _id instead of by email; the document is
+# fetched on first use and cached for the rest of the request. A session whose
+# user no longer exists (deleted account, stale cookie) is cleared.
+_MISSING = object()
+
+
+def current_user_id() -> Optional[str]:
+    """The logged-in user's id as a hex string, or None (callers send the client to login)."""
+    if not session.get("user_id") and not session.get("email"):
+        return None
+    user = current_user()
+    if user is None:
+        session.clear()
+        return None
+    # Sessions issued before user_id was stored remember it from now on
+    session["user_id"] = str(user["_id"])
+    return session["user_id"]
+
+
+def current_user() -> Optional[Dict[str, Any]]:
+    """The logged-in user's document (without the password), loaded at most once per request."""
+    user = g.get("current_user", _MISSING)
+    if user is not _MISSING:
+        return user
+    oid = as_object_id(session.get("user_id"))
+    if oid is not None:
+        user = users.find_one({"_id": oid}, {"password": 0})
+    elif session.get("email"):
+        user = users.find_one({"email": session.get("email")}, {"password": 0})
+    else:
+        user = None
+    g.current_user = user
+    return user
+
+
+def identity_changed(name: Optional[str] = None, email: Optional[str] = None) -> None:
+    """Call after updating the current user: refreshes the session copies and drops the cached document."""
+    if email:
+        session["email"] = email
+    if name:
+        session["user"] = name
+    g.pop("current_user", None)
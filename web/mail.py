@@ -0,0 +1,362 @@
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from flask import current_app
+from pymongo import UpdateOne
+
+from web.extensions import mongo
+from web.metrics import LATENCY_BUCKETS, Histogram, histogram_lines
+
+# Outgoing mail goes through an outbox collection instead of an SMTP session
+# on the request thread. send_mail() inserts the message and wakes the sender,
+# a daemon thread per process (MAIL_SENDER="thread", started on first use) or
+# ``flask --app app send-mail`` in its own process (MAIL_SENDER="off"). The
+# sender claims due messages in batches, sends each batch over one pooled,
+# already authenticated connection and retries failures with exponential
+# backoff until MAIL_MAX_ATTEMPTS. Claims carry a lease, so messages held by a
+# sender that died are picked up again (delivery is at least once).
+# Kinds listed in MAIL_MAX_AGE_S (password reset codes) are abandoned once
+# they are older than that instead of arriving after the code has expired,
+# and a message's body is dropped as soon as it is sent or given up on.
+#
+# For local testing point MAIL_SERVER at a stand-in such as
+# ``python -m aiosmtpd -n -l localhost:8025`` with MAIL_USE_TLS=false and
+# MAIL_DEFAULT_SENDER set; login is skipped without MAIL_USERNAME.
+OUTBOX_COLLECTION = "mail_outbox"
+SENDER_MODES = ("thread", "off")
+# Enqueue-to-sent delay, which includes retries
+DELAY_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+LEASE = timedelta(minutes=5)
+# Seconds after which a queued message of this kind is no longer worth sending
+DEFAULT_MAX_AGE_S = {"password_reset": 15 * 60}
+
+
+def init_mail(app) -> None:
+    app.config.setdefault("MAIL_DEFAULT_SENDER", os.getenv("MAIL_DEFAULT_SENDER") or app.config.get("MAIL_USERNAME") or "")
+    app.config.setdefault("MAIL_SENDER", os.getenv("MAIL_SENDER", "thread"))
+    app.config.setdefault("MAIL_TIMEOUT", 10)
+    app.config.setdefault("MAIL_POOL_SIZE", 2)
+    # Connections idle longer than this are closed instead of reused
+    app.config.setdefault("MAIL_POOL_IDLE_S", 60)
+    app.config.setdefault("MAIL_BATCH_SIZE", 20)
+    app.config.setdefault("MAIL_POLL_S", 5)
+    app.config.setdefault("MAIL_MAX_ATTEMPTS", 6)
+    app.config.setdefault("MAIL_RETRY_BASE_S", 30)
+    app.config.setdefault("MAIL_RETRY_MAX_S", 3600)
+    app.config.setdefault("MAIL_MAX_AGE_S", dict(DEFAULT_MAX_AGE_S))
+    if app.config["MAIL_SENDER"] not in SENDER_MODES:
+        raise ValueError(f"MAIL_SENDER must be one of {SENDER_MODES}")
+    outbox = app.extensions["mail"] = Outbox(app)
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.collectors.append(outbox.render_metrics)
+
+    started = []
+
+    @app.before_request
+    def _start_mail_sender():
+        # Messages left queued by a previous process are sent without waiting for a new one
+        if started:
+            return
+        started.append(True)
+        if app.config["MAIL_SENDER"] == "thread" and mail_configured():
+            outbox.start()
+
+
+def mail_configured() -> bool:
+    cfg = current_app.config
+    return bool(cfg.get("MAIL_SERVER") and cfg.get("MAIL_DEFAULT_SENDER"))
+
+
+def send_mail(to: Union[str, Iterable[str]], subject: str, body: str, kind: Optional[str] = None) -> Any:
+    """Queue a plain-text message; returns its outbox id. Never talks to the SMTP server."""
+    outbox: Outbox = current_app.extensions["mail"]
+    msg_id = outbox.enqueue(mongo.db, to, subject, body, kind)
+    outbox.wake()
+    return msg_id
+
+
+class SMTPPool:
+    """At most ``size`` SMTP connections, kept logged in between batches."""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "", use_tls: bool = True,
+                 timeout: float = 10, size: int = 2, idle_s: float = 60):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.use_tls, self.timeout, self.idle_s = use_tls, timeout, idle_s
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._idle: List[Any] = []  # [(connection, last used)]
+        self.opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                conn.starttls()
+            if self.username and self.password:
+                conn.login(self.username, self.password)
+        except Exception:
+            _close(conn)
+            raise
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def _take_idle(self) -> Optional[smtplib.SMTP]:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn, used = self._idle.pop()
+            if now - used > self.idle_s:
+                _close(conn)
+                continue
+            try:
+                # Servers drop idle sessions; a dead one is replaced, not reported
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close(conn)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            conn = self._take_idle() or self._open()
+            try:
+                yield conn
+            except Exception:
+                # The session state is unknown after a failure
+                _close(conn)
+                raise
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close(conn)
+
+
+def _close(conn) -> None:
+    try:
+        conn.quit()
+    except Exception:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _permanent(exc: Exception) -> bool:
+    # 5xx replies (bad recipient, rejected content) will not succeed on retry
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500 \
+        and not isinstance(exc, smtplib.SMTPAuthenticationError)
+
+
+class Outbox:
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[SMTPPool] = None
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.send_seconds = Histogram(LATENCY_BUCKETS)
+        self.delay_seconds = Histogram(DELAY_BUCKETS)
+
+    @property
+    def pool(self) -> SMTPPool:
+        with self._lock:
+            if self._pool is None:
+                cfg = self.app.config
+                self._pool = SMTPPool(cfg.get("MAIL_SERVER"), int(cfg.get("MAIL_PORT") or 587),
+                                      cfg.get("MAIL_USERNAME") or "", cfg.get("MAIL_PASSWORD") or "",
+                                      bool(cfg.get("MAIL_USE_TLS")), cfg["MAIL_TIMEOUT"], cfg["MAIL_POOL_SIZE"],
+                                      cfg["MAIL_POOL_IDLE_S"])
+            return self._pool
+
+    def reset_pool(self) -> None:
+        """Close pooled connections; the next batch connects with the current config."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def enqueue(self, mongo_db, to, subject: str, body: str, kind: Optional[str] = None) -> Any:
+        now = datetime.utcnow()
+        doc = {
+            "to": [to] if isinstance(to, str) else list(to),
+            "from": self.app.config.get("MAIL_DEFAULT_SENDER"),
+            "subject": subject,
+            "body": body,
+            "kind": kind,
+            "status": "queued",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        max_age = (self.app.config.get("MAIL_MAX_AGE_S") or {}).get(kind)
+        if max_age:
+            doc["expires_at"] = now + timedelta(seconds=max_age)
+        return mongo_db[OUTBOX_COLLECTION].insert_one(doc).inserted_id
+
+    def wake(self) -> None:
+        if self.app.config.get("MAIL_SENDER") == "thread":
+            self.start()
+        self._wake.set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run, name="mail-sender", daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        """Sender loop: a batch whenever woken or every MAIL_POLL_S seconds."""
+        with self.app.app_context():
+            while True:
+                self._wake.clear()
+                try:
+                    busy = self.process(mongo.db) >= self.app.config["MAIL_BATCH_SIZE"]
+                except Exception:
+                    self.app.logger.exception("mail sender batch failed")
+                    busy = False
+                if not busy:
+                    self._wake.wait(self.app.config["MAIL_POLL_S"])
+
+    def _claim(self, mongo_db, limit: int) -> List[Dict[str, Any]]:
+        col = mongo_db[OUTBOX_COLLECTION]
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": "queued", "next_attempt_at": {"$lte": now}},
+            # Held by a sender that never reported back
+            {"status": "sending", "lease_until": {"$lt": now}},
+        ]}
+        ids = [d["_id"] for d in col.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(limit)]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        col.update_many({"_id": {"$in": ids}, **due},
+                        {"$set": {"status": "sending", "claim": token, "lease_until": now + LEASE}})
+        return list(col.find({"claim": token}))
+
+    def _give_up(self, msg: Dict[str, Any], attempts: int, error: str, now: datetime) -> UpdateOne:
+        self.failed += 1
+        # The body (e.g. a reset code) is not kept once it will never be sent
+        return UpdateOne({"_id": msg["_id"]}, {"$set": {"status": "failed", "attempts": attempts, "error": error,
+                                                       "failed_at": now},
+                                               "$unset": {"body": "", "claim": "", "lease_until": ""}})
+
+    def _retry(self, msg: Dict[str, Any], error: str, permanent: bool, now: datetime) -> UpdateOne:
+        cfg = self.app.config
+        attempts = msg.get("attempts", 0) + 1
+        if permanent or attempts >= cfg["MAIL_MAX_ATTEMPTS"]:
+            return self._give_up(msg, attempts, error, now)
+        delay = min(cfg["MAIL_RETRY_MAX_S"], cfg["MAIL_RETRY_BASE_S"] * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        expires_at = msg.get("expires_at")
+        if expires_at is not None and now + timedelta(seconds=delay) >= expires_at:
+            return self._give_up(msg, attempts, f"{error}; expired before the next attempt", now)
+        self.retried += 1
+        return UpdateOne({"_id": msg["_id"]}, {"$set": {"status": "queued", "attempts": attempts, "error": error,
+                                                       "next_attempt_at": now + timedelta(seconds=delay)},
+                                               "$unset": {"claim": "", "lease_until": ""}})
+
+    def process(self, mongo_db, limit: Optional[int] = None) -> int:
+        """Send one batch of due messages; returns how many were claimed."""
+        batch = self._claim(mongo_db, limit or self.app.config["MAIL_BATCH_SIZE"])
+        if not batch:
+            return 0
+        ops: List[UpdateOne] = []
+        now = datetime.utcnow()
+        pending = []
+        for msg in batch:
+            if msg.get("expires_at") is not None and msg["expires_at"] <= now:
+                ops.append(self._give_up(msg, msg.get("attempts", 0), "expired before it could be sent", now))
+            else:
+                pending.append(msg)
+        if not pending:
+            mongo_db[OUTBOX_COLLECTION].bulk_write(ops, ordered=False)
+            return len(batch)
+        try:
+            with self.pool.connection() as conn:
+                while pending:
+                    msg = pending[0]
+                    mime = MIMEText(msg.get("body") or "")
+                    mime["Subject"] = msg.get("subject") or ""
+                    mime["From"] = msg.get("from") or self.app.config.get("MAIL_DEFAULT_SENDER")
+                    mime["To"] = ", ".join(msg.get("to") or [])
+                    started = time.perf_counter()
+                    try:
+                        conn.sendmail(mime["From"], msg.get("to") or [], mime.as_string())
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                        # Rejected message; the session is still usable
+                        pending.pop(0)
+                        ops.append(self._retry(msg, str(e), _permanent(e), datetime.utcnow()))
+                        continue
+                    now = datetime.utcnow()
+                    pending.pop(0)
+                    self.sent += 1
+                    self.send_seconds.observe(time.perf_counter() - started)
+                    self.delay_seconds.observe(max(0.0, (now - msg["created_at"]).total_seconds()))
+                    ops.append(UpdateOne({"_id": msg["_id"]}, {"$set": {"status": "sent", "sent_at": now, "attempts": msg.get("attempts", 0) + 1},
+                                                               "$unset": {"body": "", "claim": "", "lease_until": "", "error": ""}}))
+        except Exception as e:
+            # Connection-level failure: the message in flight and the rest of the batch are retried
+            now = datetime.utcnow()
+            ops.extend(self._retry(msg, str(e) or type(e).__name__, False, now) for msg in pending)
+            self.app.logger.warning("mail: SMTP session failed (%s); %d message(s) rescheduled", e, len(pending))
+        mongo_db[OUTBOX_COLLECTION].bulk_write(ops, ordered=False)
+        return len(batch)
+
+    def drain(self, mongo_db) -> int:
+        """Send everything that is due now (foreground sender, tests); returns the messages claimed."""
+        total = 0
+        while True:
+            n = self.process(mongo_db)
+            total += n
+            if n == 0:
+                return total
+
+    def render_metrics(self) -> List[str]:
+        lines = ["# HELP mail_outbox_messages Outbox messages by status (queue depth).",
+                 "# TYPE mail_outbox_messages gauge"]
+        depth = {s: 0 for s in ("queued", "sending", "failed")}
+        for row in mongo.db[OUTBOX_COLLECTION].aggregate([
+                {"$match": {"status": {"$in": list(depth)}}}, {"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+            depth[row["_id"]] = row["n"]
+        lines += [f'mail_outbox_messages{{status="{s}"}} {n}' for s, n in depth.items()]
+        for name, help_text, value in (
+            ("mail_sent_total", "Messages accepted by the SMTP server.", self.sent),
+            ("mail_failed_total", "Messages given up on.", self.failed),
+            ("mail_retries_total", "Send attempts rescheduled with backoff.", self.retried),
+            ("mail_smtp_connections_opened_total", "SMTP sessions opened (reuse keeps this low).",
+             self._pool.opened if self._pool else 0),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {value}"]
+        for name, help_text, hist in (
+            ("mail_send_duration_seconds", "Time for the SMTP server to accept one message.", self.send_seconds),
+            ("mail_delivery_delay_seconds", "Time from enqueue to accepted, retries included.", self.delay_seconds),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            histogram_lines(lines, name, "", hist)
+        return lines
@@ -0,0 +1,189 @@
+import secrets
+from datetime import datetime, timedelta
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+
+from web.extensions import users, feedbacks
+from web.mail import mail_configured, send_mail
+
+bp = Blueprint("main", __name__)
+
+
+@bp.route("/")
+def home():
+    return render_template("home.html")
+
+@bp.route("/services")
+def services():
+    return render_template("services.html")
+
+
+@bp.route("/our-team")
+def our_team():
+    # Build 6 team members; use current user's name/email if available for the first card
+    me_name = session.get("user") or "Muhammad Shariq Baig"
+    me_email = session.get("email") or "shariqbaigcena@gmail.com"
+    members = [
+        {"name": me_name, "email": me_email, "designation": "Project Lead", "image": url_for('static', filename='images/people/Shariq.jpeg')},
+        {"name": "Shahzaib", "email": "shehzibaba0031@gmail.com", "designation": "Project Assistant", "image": url_for('static', filename='images/people/shehzi.jpg')},
+        {"name": "Saad Siddiqui", "email": "saadshahidsiddiqui@gmail.com", "designation": "Documentation Assistant", "image": url_for('static', filename='images/people/Saad.jpeg')},
+        {"name": "Majeed Ahmed", "email": "majeedahmedbrohii@gmail.com", "designation": "Research Assistant", "image": url_for('static', filename='images/people/majeed.jpg')},
+        {"name": "Sana Ullah", "email": "anasumrani543@gmail.com", "designation": "UI Reviewer", "image": url_for('static', filename='images/people/sana.jpg')},
+        {"name": "Hamza", "email": "minhash299@gmail.com", "designation": "Support Member", "image": url_for('static', filename='images/people/Hamza.jpg')},
+    ]
+    return render_template("our_team.html", members=members)
+
+@bp.route("/feedback", methods=["GET", "POST"])
+def feedback():
+    message = None
+    if request.method == "POST":
+        name = (request.form.get("name") or "").strip()
+        email = (request.form.get("email") or "").strip()
+        content = (request.form.get("message") or "").strip()
+        if content:
+            doc = {
+                "name": name,
+                "email": email,
+                "message": content,
+                "created_at": datetime.utcnow(),
+                "status": "new"
+            }
+            feedbacks.insert_one(doc)
+            message = "Thanks for your feedback! We'll get back to you if needed."
+        else:
+            message = "Please enter your feedback message."
+    return render_template("feedback.html", message=message)
+
+# Signup
+@bp.route("/signup", methods=["GET", "POST"])
+def signup():
+    if request.method == "POST":
+        name = request.form["name"]
+        email = request.form["email"]
+        password = request.form["password"]
+        role = request.form["role"]
+
+        existing_user = users.find_one({"email": email})
+        if existing_user:
+            flash("Email already registered! Please login instead.", "warning")
+            return redirect(url_for("main.login"))
+
+        new_user = {"name": name, "email": email, "password": password, "role": role, "created_at": datetime.utcnow()}
+        users.insert_one(new_user)
+        flash("Signup successful! Please login.", "success")
+        return redirect(url_for("main.login"))
+
+    return render_template("signup.html")
+
+# Login
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        email = request.form["email"]
+        password = request.form["password"]
+
+        user = users.find_one({"email": email, "password": password})
+        if user:
+            session.permanent = True
+            session["user"] = user["name"]
+            session["role"] = user["role"]
+            session["email"] = user["email"]
+            # Store user_id as string for convenience
+            session["user_id"] = str(user.get("_id"))
+
+            flash(f"Welcome back, {user['name']}!", "success")
+
+            if user["role"] == "Admin":
+                return redirect(url_for("admin.admin_dashboard"))
+            elif user["role"] == "Teacher":
+                return redirect(url_for("teacher.teacher_dashboard"))
+            elif user["role"] == "Student":
+                return redirect(url_for("student.student_dashboard"))
+            elif user["role"] == "Analyst":
+                return redirect(url_for("analyst.analyst_dashboard"))
+        else:
+            flash("Invalid email or password.", "danger")
+            return render_template("login.html")
+    return render_template("login.html")
+
+# Forgot Password - Request Reset (send 6-digit code)
+@bp.route("/forgot-password", methods=["GET", "POST"])
+def forgot_password():
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip()
+        if not email:
+            flash("Please enter your email.", "warning")
+            return render_template("forgot_password.html")
+        user = users.find_one({"email": email})
+        # Always respond the same to avoid email enumeration
+        code = f"{secrets.randbelow(1000000):06d}"
+        expires = datetime.utcnow() + timedelta(minutes=15)
+        if user:
+            users.update_one({"_id": user["_id"]}, {"$set": {"reset_code": code, "reset_expires": expires}, "$unset": {"reset_token": ""}})
+
+        if user and mail_configured():
+            # Queued for the background sender; the response does not wait on SMTP
+            send_mail(email, "Your Password Reset Code",
+                      f"Your password reset code is: {code}\nThis code expires in 15 minutes.", kind="password_reset")
+        # Do not leak codes in UI; keep response generic to avoid enumeration
+        flash("If an account exists for that email, a verification code has been sent.", "info")
+        return redirect(url_for("main.reset_password_code"))
+
+    return render_template("forgot_password.html")
+
+# Forgot Password - Reset with token (kept for compatibility)
+@bp.route("/reset-password/<token>", methods=["GET", "POST"])
+def reset_password(token):
+    now = datetime.utcnow()
+    user = users.find_one({"reset_token": token, "reset_expires": {"$gt": now}})
+    if not user:
+        flash("Invalid or expired reset link.", "danger")
+        return redirect(url_for("main.forgot_password"))
+    if request.method == "POST":
+        password = (request.form.get("password") or "").strip()
+        confirm = (request.form.get("confirm") or "").strip()
+        if not password:
+            flash("Please enter a new password.", "warning")
+            return render_template("reset_password.html")
+        if password != confirm:
+            flash("Passwords do not match.", "danger")
+            return render_template("reset_password.html")
+        users.update_one({"_id": user["_id"]}, {"$set": {"password": password}, "$unset": {"reset_token": "", "reset_expires": ""}})
+        flash("Your password has been reset. Please login.", "success")
+        return redirect(url_for("main.login"))
+    
+    return render_template("reset_password.html")
+
+# Forgot Password - Reset using email + code
+@bp.route("/reset-password", methods=["GET", "POST"])
+def reset_password_code():
+    if request.method == "POST":
+        email = (request.form.get("email") or "").strip()
+        code = (request.form.get("code") or "").strip()
+        new_password = (request.form.get("new_password") or "").strip()
+        confirm_password = (request.form.get("confirm_password") or "").strip()
+        if not email or not code or not new_password or not confirm_password:
+            flash("Please fill in all fields.", "warning")
+            return render_template("reset_password.html", email=email)
+        if new_password != confirm_password:
+            flash("Passwords do not match.", "danger")
+            return render_template("reset_password.html", email=email)
+        now = datetime.utcnow()
+        user = users.find_one({"email": email, "reset_code": code, "reset_expires": {"$gt": now}})
+        if not user:
+            flash("Invalid or expired code.", "danger")
+            return render_template("reset_password.html", email=email)
+        users.update_one({"_id": user["_id"]}, {"$set": {"password": new_password}, "$unset": {"reset_code": "", "reset_expires": "", "reset_token": ""}})
+        flash("Your password has been reset. Please login.", "success")
+        return redirect(url_for("main.login"))
+    return render_template("reset_password.html")
+
+
+ 
+
+# Logout
+@bp.route("/logout")
+def logout():
+    session.clear()   # sab session data clear kar dega
+    flash("You have been logged out.", "info")
+    return redirect(url_for("main.login"))
@@ -0,0 +1,284 @@
+import hmac
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Response, current_app, request
+from pymongo import monitoring
+
+# Per-process request and MongoDB command metrics, exported in Prometheus text
+# format on /metrics. Under a multi-worker server each worker reports its own
+# counters; scrape them individually or aggregate in Prometheus.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Commands issued by the driver itself, not by route code
+_IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "killCursors"}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.total += 1
+        self.sum += value
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        out, running = [], 0
+        for upper, n in zip(self.buckets, self.counts):
+            running += n
+            out.append((f"{upper:g}", running))
+        out.append(("+Inf", self.total))
+        return out
+
+
+class CommandRecord:
+    __slots__ = ("name", "collection", "duration", "docs", "failed")
+
+    def __init__(self, name, collection, duration, docs, failed=False):
+        self.name = name
+        self.collection = collection
+        self.duration = duration
+        self.docs = docs
+        self.failed = failed
+
+
+class RequestStats:
+    """Commands issued while serving one request (filled by the command listener)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.commands: List[CommandRecord] = []
+        self.pending: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.recorded = False
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(c.duration for c in self.commands)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _docs_returned(command_name: str, reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if command_name == "distinct":
+        return len(reply.get("values") or [])
+    if command_name == "count":
+        return 1
+    if command_name == "findAndModify":
+        return 0 if reply.get("value") is None else 1
+    # Writes report affected rows in "n"; nothing is returned to the caller
+    return 0
+
+
+class RequestCommandListener(monitoring.CommandListener):
+    """Attributes every command to the request active on the issuing thread."""
+
+    def started(self, event):
+        stats = _current.get()
+        if stats is None or event.command_name in _IGNORED_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        stats.pending[event.request_id] = (event.command_name, target if isinstance(target, str) else None)
+
+    def succeeded(self, event):
+        stats = _current.get()
+        if stats is None:
+            return
+        info = stats.pending.pop(event.request_id, None)
+        if info is None:
+            return
+        stats.commands.append(CommandRecord(info[0], info[1], event.duration_micros / 1e6,
+                                            _docs_returned(event.command_name, event.reply or {})))
+
+    def failed(self, event):
+        stats = _current.get()
+        if stats is None:
+            return
+        info = stats.pending.pop(event.request_id, None)
+        if info is not None:
+            stats.commands.append(CommandRecord(info[0], info[1], event.duration_micros / 1e6, 0, failed=True))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.commands_per_request: Dict[str, Histogram] = {}
+        # (endpoint, command, collection) -> [count, seconds, documents, failures]
+        self.commands: Dict[Tuple[str, str, str], List[float]] = defaultdict(lambda: [0, 0.0, 0, 0])
+        self.slow_requests: Dict[str, int] = defaultdict(int)
+        # Other subsystems' metrics (e.g. the mail outbox): callables returning exposition lines
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def record(self, endpoint: str, method: str, status: int, seconds: float, stats: RequestStats, slow: bool) -> None:
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            hist = self.latency.get((endpoint, method))
+            if hist is None:
+                hist = self.latency[(endpoint, method)] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+            per_req = self.commands_per_request.get(endpoint)
+            if per_req is None:
+                per_req = self.commands_per_request[endpoint] = Histogram(COMMAND_BUCKETS)
+            per_req.observe(len(stats.commands))
+            for c in stats.commands:
+                row = self.commands[(endpoint, c.name, c.collection or "")]
+                row[0] += 1
+                row[1] += c.duration
+                row[2] += c.docs
+                row[3] += 1 if c.failed else 0
+            if slow:
+                self.slow_requests[endpoint] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            family("http_requests_total", "counter", "Requests served, by endpoint, method and status.")
+            for (ep, method, status), n in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{_esc(ep)}",method="{method}",status="{status}"}} {n}')
+
+            family("http_request_duration_seconds", "histogram", "Request latency by endpoint.")
+            for (ep, method), h in sorted(self.latency.items()):
+                labels = f'endpoint="{_esc(ep)}",method="{method}"'
+                histogram_lines(lines, "http_request_duration_seconds", labels, h)
+
+            family("http_request_mongo_commands", "histogram", "MongoDB commands issued per request.")
+            for ep, h in sorted(self.commands_per_request.items()):
+                histogram_lines(lines, "http_request_mongo_commands", f'endpoint="{_esc(ep)}"', h)
+
+            for metric, idx, kind, help_text in (
+                ("mongo_commands_total", 0, "counter", "MongoDB commands attributed to requests."),
+                ("mongo_command_duration_seconds_total", 1, "counter", "Time spent in MongoDB commands."),
+                ("mongo_documents_returned_total", 2, "counter", "Documents returned by MongoDB commands."),
+                ("mongo_command_failures_total", 3, "counter", "Failed MongoDB commands."),
+            ):
+                family(metric, kind, help_text)
+                for (ep, cmd, coll), row in sorted(self.commands.items()):
+                    value = f"{row[idx]:.6f}" if idx == 1 else str(int(row[idx]))
+                    lines.append(f'{metric}{{endpoint="{_esc(ep)}",command="{cmd}",collection="{_esc(coll)}"}} {value}')
+
+            family("http_slow_requests_total", "counter", "Requests slower than SLOW_REQUEST_MS.")
+            for ep, n in sorted(self.slow_requests.items()):
+                lines.append(f'http_slow_requests_total{{endpoint="{_esc(ep)}"}} {n}')
+        for collect in self.collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+def _esc(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def histogram_lines(lines: List[str], name: str, labels: str, h: Histogram) -> None:
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    for le, n in h.cumulative():
+        lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {n}')
+    lines.append(f"{name}_sum{suffix} {h.sum:.6f}")
+    lines.append(f"{name}_count{suffix} {h.total}")
+
+
+def top_commands(stats: RequestStats, n: int) -> List[Dict[str, Any]]:
+    """The n slowest commands of a request, identical (command, collection) pairs folded together."""
+    grouped: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for c in stats.commands:
+        g = grouped.setdefault((c.name, c.collection or ""), {"command": c.name, "collection": c.collection, "count": 0, "ms": 0.0, "docs": 0})
+        g["count"] += 1
+        g["ms"] += c.duration * 1000.0
+        g["docs"] += c.docs
+    rows = sorted(grouped.values(), key=lambda g: -g["ms"])[:n]
+    for g in rows:
+        g["ms"] = round(g["ms"], 2)
+    return rows
+
+
+def _scraper_allowed(config) -> bool:
+    token = config.get("METRICS_TOKEN") or ""
+    if token:
+        sent = request.headers.get("Authorization", "")
+        if hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+            return True
+    allow = config.get("METRICS_ALLOW") or ()
+    if isinstance(allow, str):
+        allow = [a.strip() for a in allow.split(",") if a.strip()]
+    return request.remote_addr in allow
+
+
+def init_metrics(app) -> RequestCommandListener:
+    """Install the timing hooks and /metrics; returns the listener to pass to the MongoClient."""
+    # /metrics is off unless enabled, and then only answers scrapers that send
+    # METRICS_TOKEN as a bearer token or connect from an address in
+    # METRICS_ALLOW (empty by default: behind a local reverse proxy every
+    # client would look like 127.0.0.1)
+    app.config.setdefault("METRICS_ENABLED", os.getenv("METRICS_ENABLED", "false").lower() == "true")
+    app.config.setdefault("METRICS_TOKEN", os.getenv("METRICS_TOKEN", ""))
+    app.config.setdefault("METRICS_ALLOW", os.getenv("METRICS_ALLOW", ""))
+    app.config.setdefault("SLOW_REQUEST_MS", 500)
+    app.config.setdefault("SLOW_REQUEST_TOP_N", 5)
+    registry = MetricsRegistry()
+    app.extensions["metrics"] = registry
+    listener = RequestCommandListener()
+
+    @app.before_request
+    def _start_request_stats():
+        request.environ["metrics.token"] = _current.set(RequestStats())
+
+    @app.after_request
+    def _record_request_stats(response):
+        stats = _current.get()
+        if stats is None or stats.recorded:
+            return response
+        stats.recorded = True
+        seconds = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "unmatched"
+        slow_ms = app.config.get("SLOW_REQUEST_MS") or 0
+        slow = bool(slow_ms) and seconds * 1000.0 >= slow_ms
+        registry.record(endpoint, request.method, response.status_code, seconds, stats, slow)
+        if slow:
+            current_app.logger.warning(
+                "slow request %s %s endpoint=%s status=%s %.1fms mongo_commands=%d mongo_ms=%.1f top=%s",
+                request.method, request.path, endpoint, response.status_code, seconds * 1000.0,
+                len(stats.commands), stats.db_seconds * 1000.0, top_commands(stats, int(app.config.get("SLOW_REQUEST_TOP_N") or 5)),
+            )
+        return response
+
+    @app.teardown_request
+    def _clear_request_stats(exc):
+        token = request.environ.pop("metrics.token", None)
+        if token is not None:
+            _current.reset(token)
+
+    def metrics_view():
+        if not app.config.get("METRICS_ENABLED"):
+            return Response("metrics disabled\n", status=404, mimetype="text/plain")
+        if not _scraper_allowed(app.config):
+            return Response("forbidden\n", status=403, mimetype="text/plain")
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+    return listener
@@ -0,0 +1,79 @@
+"""pytest fixtures: bound the MongoDB queries a route may issue (``query_budget``)
+and receive the mail it sends (``smtp_server``, needs aiosmtpd).
+
+Enable with ``pytest -p web.pytest_plugin`` or ``pytest_plugins = ["web.pytest_plugin"]``
+in a conftest. The plugin expects an ``app`` fixture returning an application
+built by ``create_app`` (pytest-flask's convention)::
+
+    def test_student_courses_queries(client, query_budget):
+        with query_budget(max_queries=6):
+            client.get("/student/courses")
+"""
+import socket
+from contextlib import contextmanager
+from email import message_from_bytes
+from typing import List, Optional
+
+import pytest
+
+from web.query_guard import RequestQueries
+
+
+@pytest.fixture
+def query_budget(app):
+    guard = app.extensions["query_guard"]
+
+    @contextmanager
+    def budget(max_queries: Optional[int] = None, allow_repeats: bool = False):
+        seen: List[RequestQueries] = []
+        with guard.observe(seen.append):
+            yield seen
+        problems = []
+        for q in seen:
+            if max_queries is not None and q.total > max_queries:
+                problems.append(f"{q.total} queries > budget of {max_queries}\n{q.describe()}")
+            elif not allow_repeats and q.repeated():
+                problems.append(f"repeated query shapes\n{q.describe()}")
+        if problems:
+            pytest.fail("\n\n".join(problems), pytrace=False)
+
+    return budget
+
+
+@pytest.fixture
+def smtp_server(app):
+    """A local SMTP stand-in (aiosmtpd) the app's mail outbox sends to; yields the received messages.
+
+        def test_reset_mail(client, app, smtp_server):
+            client.post("/forgot-password", data={"email": "s@example.com"})
+            with app.app_context():
+                app.extensions["mail"].drain(mongo.db)
+            assert smtp_server[0]["To"] == "s@example.com"
+    """
+    controller_mod = pytest.importorskip("aiosmtpd.controller")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    received = []
+
+    class Handler:
+        async def handle_DATA(self, server, session, envelope):
+            received.append(message_from_bytes(envelope.content))
+            return "250 OK"
+
+    controller = controller_mod.Controller(Handler(), hostname="127.0.0.1", port=port)
+    controller.start()
+    outbox = app.extensions["mail"]
+    saved = {k: app.config.get(k) for k in ("MAIL_SERVER", "MAIL_PORT", "MAIL_USE_TLS", "MAIL_USERNAME",
+                                            "MAIL_PASSWORD", "MAIL_DEFAULT_SENDER", "MAIL_SENDER")}
+    app.config.update(MAIL_SERVER=controller.hostname, MAIL_PORT=controller.port, MAIL_USE_TLS=False,
+                      MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_SENDER="off",
+                      MAIL_DEFAULT_SENDER=saved["MAIL_DEFAULT_SENDER"] or "noreply@example.com")
+    outbox.reset_pool()
+    try:
+        yield received
+    finally:
+        outbox.reset_pool()
+        app.config.update(saved)
+        controller.stop()
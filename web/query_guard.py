@@ -0,0 +1,193 @@
+import os
+import threading
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import current_app, request
+from pymongo import monitoring
+
+# Development guard against N+1 query patterns: the same structurally identical
+# command (same collection, filter keys and operators, different values) issued
+# over and over inside one request, typically a find_one() in a loop over a
+# cursor. QUERY_GUARD selects the action: "off", "log" (default in debug mode)
+# or "raise". QUERY_GUARD_THRESHOLD is the repeat count that counts as N+1.
+DEFAULT_THRESHOLD = 5
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+# Cursor maintenance and driver handshakes are not separate queries
+_SKIPPED_COMMANDS = {"getMore", "killCursors", "hello", "ismaster", "isMaster", "ping", "endSessions",
+                     "saslStart", "saslContinue"}
+
+
+class QueryGuardError(RuntimeError):
+    pass
+
+
+def _value_shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _value_shape(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, dict) for v in value):
+            return tuple(_value_shape(v) for v in value)
+        return "list"
+    return type(value).__name__
+
+
+def _keys(spec: Any) -> Tuple[str, ...]:
+    return tuple(spec or ())
+
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Structural key of a command: values are replaced by their type names."""
+    collection = command.get(command_name)
+    if command_name == "find":
+        body = (_value_shape(command.get("filter") or {}), _keys(command.get("sort")), _keys(command.get("projection")))
+    elif command_name == "aggregate":
+        body = _value_shape(command.get("pipeline") or [])
+    elif command_name == "count":
+        body = _value_shape(command.get("query") or {})
+    elif command_name == "distinct":
+        body = (command.get("key"), _value_shape(command.get("query") or {}))
+    elif command_name == "findAndModify":
+        body = (_value_shape(command.get("query") or {}), _keys(command.get("update")))
+    elif command_name in ("update", "delete"):
+        entries = command.get("updates" if command_name == "update" else "deletes") or []
+        body = tuple(sorted({repr(_value_shape(e.get("q") or {})) for e in entries}))
+    else:
+        # insert and anything else: one entry per collection
+        body = None
+    return (command_name, collection if isinstance(collection, str) else None, body)
+
+
+def _app_stack() -> List[str]:
+    frames = []
+    for fs in traceback.extract_stack():
+        path = os.path.abspath(fs.filename)
+        if path.startswith(_PROJECT_ROOT) and path != _THIS_FILE and "site-packages" not in path:
+            frames.append(f'{os.path.relpath(path, _PROJECT_ROOT)}:{fs.lineno} in {fs.name}: {fs.line or ""}'.rstrip(": "))
+    return frames
+
+
+class RequestQueries:
+    """Commands seen during one request, grouped by shape."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.endpoint: Optional[str] = None
+        self.path: Optional[str] = None
+        self.total = 0
+        self.counts: Counter = Counter()
+        self.labels: Dict[Tuple[Any, ...], str] = {}
+        self.stacks: Dict[Tuple[Any, ...], List[str]] = {}
+
+    def add(self, command_name: str, command: Dict[str, Any]) -> None:
+        shape = command_shape(command_name, command)
+        self.total += 1
+        self.counts[shape] += 1
+        if shape not in self.labels:
+            self.labels[shape] = f"{command_name} {command.get(command_name)}"
+        if self.counts[shape] == self.threshold:
+            # Captured once per shape, at the call site that crossed the threshold
+            self.stacks[shape] = _app_stack()
+
+    def repeated(self) -> List[Dict[str, Any]]:
+        return [{"query": self.labels[s], "shape": s, "count": n, "stack": self.stacks.get(s, [])}
+                for s, n in self.counts.most_common() if n >= self.threshold]
+
+    def describe(self) -> str:
+        lines = [f"{self.path} ({self.endpoint}): {self.total} queries"]
+        for r in self.repeated():
+            lines.append(f"  {r['count']}x {r['query']} {r['shape'][2]!r}")
+            lines.extend(f"      {f}" for f in r["stack"][-6:])
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+class QueryGuardListener(monitoring.CommandListener):
+    def started(self, event):
+        queries = _current.get()
+        if queries is not None and event.command_name not in _SKIPPED_COMMANDS:
+            queries.add(event.command_name, event.command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class QueryGuard:
+    def __init__(self, app):
+        self.app = app
+        self._observers: List[Callable[[RequestQueries], None]] = []
+        self._lock = threading.Lock()
+
+    def mode(self) -> str:
+        mode = self.app.config.get("QUERY_GUARD")
+        if mode is None:
+            mode = "log" if self.app.debug else "off"
+        return str(mode).lower()
+
+    def active(self) -> bool:
+        return self.mode() != "off" or bool(self._observers)
+
+    @contextmanager
+    def observe(self, callback: Callable[[RequestQueries], None]):
+        """Track every request while the block runs, whatever QUERY_GUARD says."""
+        with self._lock:
+            self._observers.append(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._observers.remove(callback)
+
+    def finish(self, queries: RequestQueries) -> None:
+        for callback in list(self._observers):
+            callback(queries)
+        repeated = queries.repeated()
+        if not repeated:
+            return
+        mode = self.mode()
+        if mode == "raise":
+            raise QueryGuardError("N+1 queries detected in " + queries.describe())
+        if mode == "log":
+            current_app.logger.warning("N+1 queries detected in %s", queries.describe())
+
+
+def init_query_guard(app) -> QueryGuardListener:
+    """Install the per-request tracking hooks; returns the listener for the MongoClient."""
+    app.config.setdefault("QUERY_GUARD_THRESHOLD", DEFAULT_THRESHOLD)
+    guard = QueryGuard(app)
+    app.extensions["query_guard"] = guard
+
+    @app.before_request
+    def _start_query_guard():
+        if guard.active():
+            queries = RequestQueries(int(app.config.get("QUERY_GUARD_THRESHOLD") or DEFAULT_THRESHOLD))
+            request.environ["query_guard.token"] = _current.set(queries)
+
+    @app.after_request
+    def _check_query_guard(response):
+        queries = _current.get()
+        # after_request runs again for the error response if finish() raised
+        if queries is not None and queries.endpoint is None:
+            queries.endpoint = request.endpoint or "unmatched"
+            queries.path = request.path
+            guard.finish(queries)
+        return response
+
+    @app.teardown_request
+    def _clear_query_guard(exc):
+        token = request.environ.pop("query_guard.token", None)
+        if token is not None:
+            _current.reset(token)
+
+    return QueryGuardListener()
@@ -0,0 +1,699 @@
+import os
+import pickle
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from analytics.features import refresh_student_features
+from analytics.progress import band, get_student_progress
+from db.announcements import DEFAULT_LIMIT as FEED_LIMIT, UNREAD_CAP, feed_page, mark_seen, unread_count
+from db.blobs import put_stream
+from db.catalog import is_active
+from db.ids import as_object_id, canonical, is_canonical, ref
+from web.extensions import (
+    mongo, users, courses, enrollments, assignments, submissions, results, models, course_catalog,
+)
+from web.downloads import send_upload
+from web.identity import current_user, current_user_id, identity_changed
+
+bp = Blueprint("student", __name__)
+
+# Progress chart colours by band: green, yellow, red
+BAND_COLORS = {"high": "#198754", "pass": "#ffc107", "low": "#dc3545"}
+
+
+# -------------------------
+# Student model metadata and predict (read-only)
+# -------------------------
+
+@bp.route("/api/student/model/meta")
+def api_student_model_meta():
+    # Anyone logged-in as Student can view meta; avoid exposing analyst info
+    if session.get("role") != "Student":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        mdl = models.find_one({}, sort=[("created_at", -1)])
+        if not mdl:
+            return jsonify({"error": "No trained model available"}), 404
+        cols = mdl.get("feature_columns", [])
+        fields = []
+        encoders = {}
+        try:
+            blob = mdl.get("encoders_blob")
+            if blob:
+                encoders = pickle.loads(blob) or {}
+        except Exception:
+            encoders = {}
+        for c in cols:
+            f = {"name": c}
+            if c in encoders:
+                try:
+                    classes = list(getattr(encoders[c], "classes_", []))
+                except Exception:
+                    classes = []
+                f.update({"type": "categorical", "options": classes})
+            else:
+                f.update({"type": "number"})
+            fields.append(f)
+        return jsonify({
+            "feature_columns": cols,
+            "fields": fields,
+            "target": mdl.get("target"),
+            "type": mdl.get("type")
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -------------------------
+# Student: multiple model metas (unique per target) and predict by model id
+# -------------------------
+
+@bp.route("/api/student/models/meta")
+def api_student_models_meta():
+    if session.get("role") != "Student":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        seen = set()
+        out = []
+        cursor = models.find({}).sort("created_at", -1).limit(200)
+        for mdl in cursor:
+            tgt = (mdl.get("target") or "").strip()
+            if not tgt:
+                continue
+            key = tgt.lower()
+            # Exclude unwanted targets from student UI
+            if key in ("predicted_category",):
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            cols = mdl.get("feature_columns", []) or []
+            fields = []
+            encoders = {}
+            try:
+                blob = mdl.get("encoders_blob")
+                if blob:
+                    encoders = pickle.loads(blob) or {}
+            except Exception:
+                encoders = {}
+            for c in cols:
+                cname = str(c).strip()
+                if cname.lower() in ("student_id", "studentid", "id"):
+                    continue
+                f = {"name": c}
+                if c in encoders:
+                    try:
+                        classes = list(getattr(encoders[c], "classes_", []))
+                    except Exception:
+                        classes = []
+                    f.update({"type": "categorical", "options": classes})
+                else:
+                    f.update({"type": "number"})
+                fields.append(f)
+            out.append({
+                "model_id": str(mdl.get("_id")),
+                "target": mdl.get("target"),
+                "type": mdl.get("type"),
+                "feature_columns": cols,
+                "fields": fields,
+            })
+        if not out:
+            return jsonify({"error": "No trained models available"}), 404
+        return jsonify({"models": out})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/student/model/<mid>/predict", methods=["POST"])
+def api_student_model_predict_by_id(mid):
+    import numpy as np
+    import pandas as pd
+    if session.get("role") != "Student":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        payload = request.json or {}
+        try:
+            oid = ObjectId(mid)
+        except Exception:
+            return jsonify({"error": "invalid model id"}), 400
+        mdl = models.find_one({"_id": oid})
+        if not mdl:
+            return jsonify({"error": "Model not found"}), 404
+        model_cols = mdl.get("feature_columns", []) or []
+        row = {col: payload.get(col) for col in model_cols}
+        df_in = pd.DataFrame([row])
+        encoders = {}
+        try:
+            blob = mdl.get("encoders_blob")
+            if blob:
+                encoders = pickle.loads(blob) or {}
+        except Exception:
+            encoders = {}
+        for col in model_cols:
+            if col in encoders:
+                val = str(df_in.at[0, col]) if col in df_in.columns else ""
+                classes = list(getattr(encoders[col], "classes_", []))
+                try:
+                    idx = classes.index(val)
+                except ValueError:
+                    idx = 0
+                df_in[col] = idx
+            else:
+                df_in[col] = pd.to_numeric(df_in.get(col, 0), errors="coerce").fillna(0)
+        mtype = mdl.get("type")
+        if mtype == "logistic_regression":
+            coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+            intercept = float(mdl.get("intercept", 0.0))
+            linear = float(np.dot(df_in[model_cols].values[0], coef) + intercept)
+            prob = 1.0 / (1.0 + np.exp(-linear))
+            label = 1 if prob >= 0.5 else 0
+            return jsonify({
+                "prediction": label,
+                "probability": round(float(prob), 3),
+                "target": mdl.get("target"),
+                "is_binary": True,
+            })
+        if mtype == "random_forest" and mdl.get("model_blob") is not None:
+            rf = pickle.loads(mdl["model_blob"]) or None
+            y_pred = rf.predict(df_in[model_cols].values)[0]
+            prob = None
+            try:
+                proba = rf.predict_proba(df_in[model_cols].values)[0]
+                prob = float(np.max(proba))
+            except Exception:
+                prob = None
+            # Map back to original label if y_classes stored
+            y_classes = mdl.get("y_classes") or []
+            try:
+                if isinstance(y_pred, (int, np.integer)) and y_classes and int(y_pred) < len(y_classes):
+                    pred_out = str(y_classes[int(y_pred)])
+                else:
+                    pred_out = (int(y_pred) if isinstance(y_pred, (int, np.integer)) else y_pred)
+            except Exception:
+                pred_out = (int(y_pred) if isinstance(y_pred, (int, np.integer)) else y_pred)
+            return jsonify({
+                "prediction": pred_out,
+                "probability": (round(float(prob), 3) if isinstance(prob, (int, float)) else None),
+                "target": mdl.get("target"),
+                "is_binary": bool(mdl.get("is_binary")),
+            })
+        # default: linear regression numeric
+        coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+        intercept = float(mdl.get("intercept", 0.0))
+        y = float(np.dot(df_in[model_cols].values[0], coef) + intercept)
+        is_bin = bool(mdl.get("is_binary"))
+        pred_val = 1 if (1.0/(1.0+np.exp(-y)) >= 0.5) else 0 if is_bin else round(y, 4)
+        if is_bin:
+            return jsonify({
+                "prediction": int(pred_val),
+                "probability": round(float(1.0/(1.0+np.exp(-y))), 3),
+                "target": mdl.get("target"),
+                "is_binary": True,
+            })
+        else:
+            return jsonify({
+                "prediction": round(y, 4),
+                "probability": None,
+                "target": mdl.get("target"),
+                "is_binary": False,
+            })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/api/student/model/predict", methods=["POST"])
+def api_student_model_predict():
+    import numpy as np
+    import pandas as pd
+    if session.get("role") != "Student":
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        payload = request.json or {}
+        mdl = models.find_one({}, sort=[("created_at", -1)])
+        if not mdl:
+            return jsonify({"error": "No trained model available"}), 404
+        model_cols = mdl.get("feature_columns", []) or []
+        row = {col: payload.get(col) for col in model_cols}
+        df_in = pd.DataFrame([row])
+        encoders = {}
+        try:
+            blob = mdl.get("encoders_blob")
+            if blob:
+                encoders = pickle.loads(blob) or {}
+        except Exception:
+            encoders = {}
+        for col in model_cols:
+            if col in encoders:
+                val = str(df_in.at[0, col]) if col in df_in.columns else ""
+                classes = list(getattr(encoders[col], "classes_", []))
+                try:
+                    idx = classes.index(val)
+                except ValueError:
+                    idx = 0
+                df_in[col] = idx
+            else:
+                df_in[col] = pd.to_numeric(df_in.get(col, 0), errors="coerce").fillna(0)
+
+        mtype = mdl.get("type")
+        if mtype == "logistic_regression":
+            coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+            intercept = float(mdl.get("intercept", 0.0))
+            linear = float(np.dot(df_in[model_cols].values[0], coef) + intercept)
+            prob = 1.0 / (1.0 + np.exp(-linear))
+            label = 1 if prob >= 0.5 else 0
+            return jsonify({
+                "prediction": label,
+                "probability": round(float(prob), 3),
+                "target": mdl.get("target"),
+                "used_features": model_cols,
+            })
+        if mtype == "random_forest" and mdl.get("model_blob") is not None:
+            rf = pickle.loads(mdl["model_blob"]) or None
+            y_pred = rf.predict(df_in[model_cols].values)[0]
+            prob = None
+            try:
+                proba = rf.predict_proba(df_in[model_cols].values)[0]
+                prob = float(max(proba))
+            except Exception:
+                prob = None
+            return jsonify({
+                "prediction": int(y_pred) if isinstance(y_pred, (int, np.integer)) else y_pred,
+                "probability": (round(float(prob), 3) if isinstance(prob, (int, float)) else None),
+                "target": mdl.get("target"),
+                "used_features": model_cols,
+                "is_binary": bool(mdl.get("is_binary")),
+            })
+        # default: linear regression style
+        coef = np.array(mdl.get("coef", []), dtype=float).ravel()
+        intercept = float(mdl.get("intercept", 0.0))
+        y = float(np.dot(df_in[model_cols].values[0], coef) + intercept)
+        return jsonify({
+            "prediction": round(y, 4),
+            "probability": None,
+            "target": mdl.get("target"),
+            "used_features": model_cols,
+            "is_binary": bool(mdl.get("is_binary")),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/assignments/<aid>/download")
+def assignment_download(aid):
+    try:
+        oid = ObjectId(aid)
+    except Exception:
+        flash("Invalid assignment id.", "danger")
+        return redirect(url_for("student.student_assignments"))
+    a = assignments.find_one({"_id": oid})
+    if not a or not a.get("attachment_path"):
+        flash("No attachment available for this assignment.", "warning")
+        return redirect(url_for("student.student_assignments"))
+    download_name = a.get("attachment_name") or "attachment"
+    try:
+        return send_upload(a.get("attachment_path"), download_name, a.get("attachment_sha256"))
+    except Exception:
+        flash("Could not download attachment.", "danger")
+        return redirect(url_for("student.student_assignments"))
+
+# -------------------------
+# Student Feature Routes
+# -------------------------
+@bp.route("/student/profile", methods=["GET", "POST"])
+def student_profile():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    if request.method == "POST":
+        name = request.form.get("name")
+        email = request.form.get("email")
+        password = request.form.get("password")
+        dob = request.form.get("dob")
+        contact = request.form.get("contact")
+
+        update_doc = {}
+        if name: update_doc["name"] = name
+        if email: update_doc["email"] = email
+        if password: update_doc["password"] = password
+        if dob: update_doc["dob"] = dob
+        if contact: update_doc["contact"] = contact
+
+        if update_doc:
+            # Keyed by id, so an email change keeps the same identity
+            users.update_one({"_id": as_object_id(student_id)}, {"$set": update_doc})
+            identity_changed(name=name, email=email)
+
+    profile = current_user()
+    return render_template("student/profile.html", user=session.get("user"), role="Student", profile=profile)
+
+
+@bp.route("/student/courses")
+def student_courses():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    # Join enrollments -> courses
+    catalog = course_catalog()
+    enrolled = []
+    for enr in enrollments.find({"user_id": ref(student_id), "status": {"$ne": "dropped"}}):
+        course = catalog.resolve(enr.get("course_id"), enr.get("course_code"))
+        enrolled.append({
+            "enrollment_id": str(enr.get("_id")),
+            "course_id": str(enr.get("course_id")) if enr.get("course_id") else None,
+            "course_code": course.get("code") if course else enr.get("course_code"),
+            "course_title": course.get("title") if course else "(Unknown Course)",
+        })
+    return render_template("student/courses.html", user=session.get("user"), role="Student", enrolled=enrolled)
+
+
+@bp.route("/student/enroll", methods=["GET", "POST"])
+def student_enroll():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    message = None
+
+    # Helper to compute available (active) courses excluding already enrolled
+    def compute_available():
+        catalog = course_catalog()
+        enrolled_codes = set()
+        for enr in enrollments.find({"user_id": ref(student_id), "status": {"$ne": "dropped"}}, {"course_code": 1, "course_id": 1}):
+            code = enr.get("course_code")
+            if not code and enr.get("course_id"):
+                # fallback lookup if needed
+                crs = catalog.by_id(enr.get("course_id"))
+                code = crs.get("code") if crs else None
+            if code:
+                enrolled_codes.add(code)
+        return [c for c in catalog.active if c.get("code") not in enrolled_codes]
+
+    if request.method == "POST":
+        code = (request.form.get("course_code") or "").strip().upper()
+        if code:
+            # Ensure course exists (lightweight create if not)
+            course = course_catalog().by_code(code)
+            # Inactive courses and courses being deleted stay in the catalog
+            # but take no new enrollments
+            if not course or not is_active(course) or course.get("deleting"):
+                message = (f"Course {code} is not open for enrollment." if course
+                           else f"Course {code} not found. Please select from the list.")
+                available_courses = compute_available()
+                return render_template(
+                    "student/enroll.html",
+                    user=session.get("user"),
+                    role="Student",
+                    message=message,
+                    available_courses=available_courses,
+                )
+            # Upsert enrollment (matches a legacy string user_id too, and canonicalizes it)
+            res = enrollments.update_one(
+                {"user_id": ref(student_id), "course_id": course["_id"]},
+                {"$set": {"user_id": canonical(student_id), "course_code": course.get("code"), "status": "active"}},
+                upsert=True,
+            )
+            if res.upserted_id is not None:
+                message = f"Enrolled in {code}."
+            else:
+                message = "Already enrolled. Status set to active."
+            refresh_student_features(mongo.db, [student_id], components=("assignments",))
+        else:
+            message = "Please select a course."
+
+    available_courses = compute_available()
+    return render_template(
+        "student/enroll.html",
+        user=session.get("user"),
+        role="Student",
+        message=message,
+        available_courses=available_courses,
+    )
+
+
+@bp.route("/student/drop/<course_id>", methods=["POST"]) 
+def student_drop_course(course_id):
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    oid = None
+    try:
+        oid = ObjectId(course_id)
+    except Exception:
+        oid = None
+    query = {"user_id": ref(student_id)}
+    if oid is not None:
+        query["course_id"] = oid
+    enrollments.update_many(query, {"$set": {"status": "dropped"}})
+    refresh_student_features(mongo.db, [student_id], components=("assignments",))
+    return redirect(url_for("student.student_courses"))
+
+
+def _unsubmitted_assignments_pipeline(student_id: str, skip: int, limit: int) -> list:
+    """Active enrollments -> their assignments, minus the ones this student has submitted.
+
+    The anti-join probes submissions by (assignment_id, student_id) for each
+    candidate assignment, so the cost follows the number of open assignments,
+    not the length of the student's submission history.
+    """
+    # Until ids are canonical a submission may reference the assignment by its hex string
+    aid_field = "_id" if is_canonical() else "aid_forms"
+    pipeline = [
+        {"$match": {"user_id": ref(student_id), "status": {"$ne": "dropped"}}},
+        {"$project": {"course_id": 1}},
+        {"$lookup": {"from": "assignments", "localField": "course_id", "foreignField": "course_id", "as": "a"}},
+        {"$unwind": "$a"},
+        {"$replaceRoot": {"newRoot": "$a"}},
+    ]
+    if aid_field != "_id":
+        pipeline.append({"$addFields": {"aid_forms": ["$_id", {"$toString": "$_id"}]}})
+    pipeline += [
+        {"$lookup": {
+            "from": "submissions",
+            "localField": aid_field,
+            "foreignField": "assignment_id",
+            "pipeline": [{"$match": {"student_id": ref(student_id)}}, {"$limit": 1}, {"$project": {"_id": 1}}],
+            "as": "submitted",
+        }},
+        {"$match": {"submitted": {"$size": 0}}},
+        # Soonest deadline first; assignments without one go last
+        {"$addFields": {"no_deadline": {"$cond": [{"$eq": [{"$ifNull": ["$deadline", ""]}, ""]}, 1, 0]}}},
+        {"$sort": {"no_deadline": 1, "deadline": 1, "_id": 1}},
+        {"$project": {"submitted": 0, "aid_forms": 0, "no_deadline": 0}},
+        {"$facet": {"items": [{"$skip": skip}, {"$limit": limit}], "total": [{"$count": "n"}]}},
+    ]
+    return pipeline
+
+
+@bp.route("/student/assignments")
+def student_assignments():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+    except Exception:
+        page = 1
+    try:
+        per_page = min(100, max(10, int(request.args.get("per_page", 25))))
+    except Exception:
+        per_page = 25
+    result = next(enrollments.aggregate(_unsubmitted_assignments_pipeline(student_id, (page - 1) * per_page, per_page)), {})
+    items = result.get("items") or []
+    total = (result.get("total") or [{}])[0].get("n", 0)
+    pages = max(1, (total + per_page - 1) // per_page)
+    # Normalize for template: convert ObjectId to str, expose attachment info
+    catalog = course_catalog()
+    view_items = []
+    for a in items:
+        c_code = a.get("course_code")
+        c_title = a.get("course_title")
+        if not c_code or not c_title:
+            cdoc = catalog.by_id(a.get("course_id"))
+            if cdoc:
+                c_code = c_code or cdoc.get("code")
+                c_title = c_title or cdoc.get("title")
+        view_items.append({
+            "_id": str(a.get("_id")),
+            "course_code": c_code,
+            "course_title": c_title,
+            "title": a.get("title"),
+            "description": a.get("description"),
+            "deadline": a.get("deadline"),
+            "attachment_name": a.get("attachment_name"),
+            "has_attachment": True if a.get("attachment_path") else False,
+        })
+    return render_template("student/assignments.html", user=session.get("user"), role="Student", assignments=view_items,
+                           total=total, page=page, per_page=per_page, pages=pages)
+
+
+@bp.route("/student/submissions", methods=["GET", "POST"]) 
+def student_submissions():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    message = None
+    if request.method == "POST":
+        assignment_id = (request.form.get("assignment_id") or "").strip()
+        file = request.files.get("file")
+        filename = file.filename if file and getattr(file, 'filename', None) else None
+        # Optional: basic validation of assignment id shape
+        try:
+            _ = ObjectId(assignment_id)
+        except Exception:
+            flash("Invalid assignment id.", "warning")
+            return redirect(url_for("student.student_assignments"))
+
+        # Lookup assignment to capture course info
+        a_doc = None
+        try:
+            a_doc = assignments.find_one({"_id": ObjectId(assignment_id)})
+        except Exception:
+            a_doc = None
+        course_id = (a_doc or {}).get("course_id")
+        # Resolve readable course code/title from courses if not present on assignment
+        course_code = (a_doc or {}).get("course_code")
+        course_title = (a_doc or {}).get("course_title")
+        if (not course_code or not course_title) and course_id:
+            try:
+                cdoc = courses.find_one({"_id": course_id})
+                if cdoc:
+                    course_code = course_code or cdoc.get("code")
+                    course_title = course_title or cdoc.get("title")
+            except Exception:
+                pass
+
+        file_path = file_sha256 = None
+        if file and filename:
+            # Stored once per distinct content; the path is relative to static/
+            # with forward slashes for url_for('static', ...)
+            blob = put_stream(mongo.db, os.path.join(current_app.root_path, 'static'), file.stream)
+            file_path, file_sha256 = blob["path"], blob["sha256"]
+
+        # Capture student display info
+        student = current_user() or {}
+        stu_name = student.get("name") or student.get("email")
+        stu_email = student.get("email")
+
+        submissions.insert_one({
+            "assignment_id": canonical(assignment_id),
+            "student_id": canonical(student_id),
+            "student_name": stu_name,
+            "student_email": stu_email,
+            "course_id": course_id,
+            "course_code": course_code,
+            "course_title": course_title,
+            "filename": filename,
+            "file_path": file_path,
+            "file_sha256": file_sha256,
+            "submitted_on": datetime.utcnow(),
+        })
+        refresh_student_features(mongo.db, [student_id], components=("assignments",))
+        message = "Submission uploaded successfully."
+    items = list(submissions.find({"student_id": ref(student_id)})) if student_id else []
+    return render_template("student/submissions.html", user=session.get("user"), role="Student", submissions_list=items, message=message)
+
+
+@bp.route("/student/results")
+def student_results():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    items = list(results.find({"student_id": ref(student_id)})) if student_id else []
+    return render_template("student/results.html", user=session.get("user"), role="Student", results_list=items)
+
+
+@bp.route("/student/progress")
+def student_progress():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+
+    # Per-course averages are computed in Mongo and cached until the next grade write
+    rows = get_student_progress(mongo.db, student_id)
+    labels = [r["course"] for r in rows]
+    values = [r["avg"] for r in rows]
+    colors = [BAND_COLORS[band(v)] for v in values]
+
+    return render_template(
+        "student/progress.html",
+        user=session.get("user"),
+        role="Student",
+        chart_labels=labels,
+        chart_values=values,
+        chart_colors=colors,
+    )
+
+
+def _announcement_courses(student_id):
+    """Course ids of the student's active enrollments and their codes, keyed by str(course_id)."""
+    course_ids = [e.get("course_id") for e in enrollments.find(
+        {"user_id": ref(student_id), "status": {"$ne": "dropped"}}, {"course_id": 1})]
+    catalog = course_catalog()
+    labels = {}
+    for cid in course_ids:
+        course = catalog.by_id(cid)
+        labels[str(cid)] = course.get("code") if course else ""
+    return course_ids, labels
+
+
+def _feed_limit():
+    try:
+        return int(request.args.get("limit", FEED_LIMIT))
+    except Exception:
+        return FEED_LIMIT
+
+
+@bp.route("/student/announcements")
+def student_announcements():
+    student_id = current_user_id()
+    if not student_id:
+        return redirect(url_for("main.login"))
+    cursor = request.args.get("cursor") or None
+    course_ids, labels = _announcement_courses(student_id)
+    try:
+        page = feed_page(mongo.db, course_ids, labels, cursor, _feed_limit())
+    except ValueError:
+        return redirect(url_for("student.student_announcements"))
+    if not cursor:
+        mark_seen(mongo.db, student_id, page["items"])
+    return render_template("student/announcements.html", user=session.get("user"), role="Student",
+                           items=page["items"], next_cursor=page["next_cursor"], cursor=cursor)
+
+
+@bp.route("/api/student/announcements")
+def api_student_announcements():
+    student_id = current_user_id()
+    if session.get("role") != "Student" or not student_id:
+        return jsonify({"error": "unauthorized"}), 403
+    course_ids, labels = _announcement_courses(student_id)
+    try:
+        page = feed_page(mongo.db, course_ids, labels, request.args.get("cursor") or None, _feed_limit())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    for a in page["items"]:
+        a["created_at"] = a["created_at"].isoformat() if isinstance(a.get("created_at"), datetime) else None
+    page["unread"] = unread_count(mongo.db, student_id, course_ids)
+    return jsonify(page)
+
+
+@bp.route("/api/student/announcements/read", methods=["POST"])
+def api_student_announcements_read():
+    student_id = current_user_id()
+    if session.get("role") != "Student" or not student_id:
+        return jsonify({"error": "unauthorized"}), 403
+    course_ids, labels = _announcement_courses(student_id)
+    latest = feed_page(mongo.db, course_ids, labels, limit=1)
+    mark_seen(mongo.db, student_id, latest["items"])
+    return jsonify({"unread": 0})
+
+@bp.route("/student")
+def student_dashboard():
+    if session.get("role") != "Student":
+        return redirect(url_for("main.home"))
+    student_id = current_user_id()
+    unread = 0
+    if student_id:
+        course_ids, _ = _announcement_courses(student_id)
+        unread = unread_count(mongo.db, student_id, course_ids)
+    return render_template("student_dashboard.html", user=session.get("user"), role="Student",
+                           unread_announcements=unread, unread_cap=UNREAD_CAP)
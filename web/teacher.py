@@ -0,0 +1,732 @@
+import csv
+import io
+import os
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+
+from analytics.features import refresh_course_students
+from analytics.progress import cohort_progress
+from db.announcements import DEFAULT_LIMIT as FEED_LIMIT, feed_page
+from db.blobs import put_stream, release
+from db.course_delete import JOBS_COLLECTION as DELETION_JOBS, get_job, progress as deletion_progress
+from db.course_delete import request_deletion, start_in_background
+from db.ids import as_object_id, ref, refs
+from web.downloads import send_upload
+from web.grading import bulk_grade, grades_changed, parse_grade_rows, result_update
+from web.extensions import (
+    mongo, users, courses, enrollments, assignments, submissions, results, announcements, courses_changed,
+)
+from web.identity import current_user, current_user_id, identity_changed
+
+bp = Blueprint("teacher", __name__)
+
+
+@bp.route("/teacher")
+def teacher_dashboard():
+    if session.get("role") != "Teacher":
+        return redirect(url_for("main.home"))
+    return render_template("teacher_dashboard.html", user=session.get("user"), role="Teacher")
+
+
+# -------------------------
+# Teacher: Course Management
+# -------------------------
+
+def require_teacher():
+    if session.get("role") != "Teacher":
+        return False
+    return True
+
+@bp.route("/teacher/courses", methods=["GET"]) 
+def teacher_courses():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    items = list(courses.find({"instructor_id": ObjectId(instructor_id)}).sort("code", 1)) if instructor_id else []
+    deleting = [c["_id"] for c in items if c.get("deleting")]
+    if deleting:
+        # Jobs interrupted by a restart are picked up by the app's resumer
+        # (db.course_delete.start_resumer), not here
+        jobs = {j["_id"]: deletion_progress(j) for j in mongo.db[DELETION_JOBS].find({"_id": {"$in": deleting}})}
+        for c in items:
+            c["deletion"] = jobs.get(c["_id"])
+    return render_template("teacher/courses.html", user=session.get("user"), role="Teacher", items=items)
+
+
+@bp.route("/teacher/courses/create", methods=["POST"]) 
+def teacher_courses_create():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    code = (request.form.get("code") or "").strip().upper()
+    title = (request.form.get("title") or "").strip()
+    description = (request.form.get("description") or "").strip()
+    if not code or not title:
+        flash("Code and Title are required.", "warning")
+        return redirect(url_for("teacher.teacher_courses"))
+    # If course with code exists but no instructor, allow teacher to claim by setting instructor_id if not set
+    existing = courses.find_one({"code": code})
+    if existing and existing.get("instructor_id") and str(existing.get("instructor_id")) != instructor_id:
+        flash("Course code already owned by another instructor.", "danger")
+        return redirect(url_for("teacher.teacher_courses"))
+    if existing and existing.get("deleting"):
+        flash("This course is still being deleted; try again once it is gone.", "warning")
+        return redirect(url_for("teacher.teacher_courses"))
+    if existing:
+        courses.update_one({"_id": existing["_id"]}, {"$set": {
+            "title": title,
+            "description": description,
+            "active": True,
+            "instructor_id": ObjectId(instructor_id),
+        }})
+        flash("Course updated.", "success")
+    else:
+        courses.insert_one({
+            "code": code,
+            "title": title,
+            "description": description,
+            "active": True,
+            "created_at": datetime.utcnow(),
+            "instructor_id": ObjectId(instructor_id),
+        })
+        flash("Course created.", "success")
+    courses_changed()
+    return redirect(url_for("teacher.teacher_courses"))
+
+
+@bp.route("/teacher/courses/<cid>/update", methods=["POST"]) 
+def teacher_courses_update(cid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    try:
+        oid = ObjectId(cid)
+    except Exception:
+        flash("Invalid course id.", "danger")
+        return redirect(url_for("teacher.teacher_courses"))
+    doc = courses.find_one({"_id": oid})
+    if not doc or str(doc.get("instructor_id")) != instructor_id:
+        flash("Not authorized to update this course.", "danger")
+        return redirect(url_for("teacher.teacher_courses"))
+    if doc.get("deleting"):
+        flash("This course is being deleted.", "warning")
+        return redirect(url_for("teacher.teacher_courses"))
+    title = (request.form.get("title") or "").strip()
+    description = (request.form.get("description") or "").strip()
+    update_doc = {}
+    # Only update 'active' if explicitly sent by the form
+    if "active" in request.form:
+        active = (request.form.get("active") or "on") in ("on", "true", "1", "yes")
+        update_doc["active"] = active
+    if title:
+        update_doc["title"] = title
+    update_doc["description"] = description
+    courses.update_one({"_id": oid}, {"$set": update_doc})
+    courses_changed()
+    flash("Course updated.", "success")
+    return redirect(url_for("teacher.teacher_courses"))
+
+
+@bp.route("/teacher/courses/<cid>/delete", methods=["POST"]) 
+def teacher_courses_delete(cid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    try:
+        oid = ObjectId(cid)
+    except Exception:
+        flash("Invalid course id.", "danger")
+        return redirect(url_for("teacher.teacher_courses"))
+    doc = courses.find_one({"_id": oid})
+    if not doc or str(doc.get("instructor_id")) != instructor_id:
+        flash("Not authorized to delete this course.", "danger")
+        return redirect(url_for("teacher.teacher_courses"))
+    # Dependents go in batches on a background thread; the course leaves the
+    # catalog now and the list shows the job's progress
+    request_deletion(mongo.db, doc)
+    courses_changed()
+    start_in_background(current_app._get_current_object(), [oid])
+    flash("Course is being deleted with all related data.", "success")
+    return redirect(url_for("teacher.teacher_courses"))
+
+
+@bp.route("/api/teacher/courses/<cid>/deletion", methods=["GET"])
+def api_teacher_course_deletion(cid):
+    if not require_teacher():
+        return jsonify({"error": "unauthorized"}), 401
+    oid = as_object_id(cid)
+    job = get_job(mongo.db, oid) if oid else None
+    if not job or str(job.get("instructor_id")) != session.get("user_id"):
+        return jsonify({"error": "not found"}), 404
+    return jsonify(deletion_progress(job))
+
+
+# -------------------------
+# Teacher: Student Management
+# -------------------------
+
+@bp.route("/teacher/students")
+def teacher_students():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    if not instructor_id:
+        return redirect(url_for("main.login"))
+    # Find teacher-owned courses
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)}))
+    course_map = {str(c["_id"]): c for c in owned}
+    course_ids = [c["_id"] for c in owned]
+    # Fetch enrollments for these courses
+    enr_list = list(enrollments.find({"course_id": {"$in": course_ids}}).sort("status", 1)) if course_ids else []
+    # Build student info map
+    student_oids = list({as_object_id(e.get("user_id")) for e in enr_list} - {None})
+    students_info = {}
+    if student_oids:
+        docs = users.find({"_id": {"$in": student_oids}})
+        for d in docs:
+            students_info[str(d["_id"])] = d
+    # Prepare view model
+    rows = []
+    for e in enr_list:
+        c = course_map.get(str(e.get("course_id")))
+        s = students_info.get(str(e.get("user_id")))
+        rows.append({
+            "enrollment_id": str(e.get("_id")),
+            "course_code": (c.get("code") if c else e.get("course_code")),
+            "course_title": (c.get("title") if c else ""),
+            "student_name": s.get("name") if s else "(Unknown)",
+            "student_email": s.get("email") if s else "",
+            "status": e.get("status") or "active",
+        })
+    return render_template("teacher/students.html", user=session.get("user"), role="Teacher", rows=rows)
+
+
+@bp.route("/teacher/enrollments/<eid>/approve", methods=["POST"]) 
+def teacher_enrollment_approve(eid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    # Set status to active
+    try:
+        oid = ObjectId(eid)
+        enrollments.update_one({"_id": oid}, {"$set": {"status": "active"}})
+        flash("Enrollment approved.", "success")
+    except Exception:
+        flash("Could not approve enrollment.", "danger")
+    return redirect(url_for("teacher.teacher_students"))
+
+
+# -------------------------
+# Teacher: Assignments CRUD
+# -------------------------
+
+@bp.route("/teacher/assignments")
+def teacher_assignments():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)})) if instructor_id else []
+    course_ids = [c["_id"] for c in owned]
+    course_map = {str(c["_id"]): c for c in owned}
+    items = []
+    if course_ids:
+        for a in assignments.find({"course_id": {"$in": course_ids}}).sort("_id", -1):
+            c = course_map.get(str(a.get("course_id")))
+            items.append({
+                "_id": str(a.get("_id")),
+                "title": a.get("title"),
+                "description": a.get("description"),
+                "deadline": a.get("deadline"),
+                "attachment_name": a.get("attachment_name"),
+                "course_code": c.get("code") if c else "",
+                "course_title": c.get("title") if c else "",
+            })
+    # For create form
+    simple_courses = [{"_id": str(c["_id"]), "code": c.get("code"), "title": c.get("title")} for c in owned]
+    return render_template("teacher/assignments.html", user=session.get("user"), role="Teacher", items=items, courses=simple_courses)
+
+
+@bp.route("/teacher/assignments/create", methods=["POST"]) 
+def teacher_assignments_create():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    course_id = request.form.get("course_id")
+    title = (request.form.get("title") or "").strip()
+    description = (request.form.get("description") or "").strip()
+    deadline = (request.form.get("deadline") or "").strip()
+    attachment = request.files.get("attachment")
+    attachment_name = attachment.filename if attachment and getattr(attachment, 'filename', None) else None
+    # Own course check
+    try:
+        cid = ObjectId(course_id)
+    except Exception:
+        flash("Invalid course.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    course = courses.find_one({"_id": cid})
+    if not course or str(course.get("instructor_id")) != instructor_id:
+        flash("Not authorized for this course.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    # Prepare attachment saving if provided
+    attachment_path = attachment_sha256 = None
+    if attachment and attachment_name:
+        # Stored once per distinct content; the path is relative to static/
+        blob = put_stream(mongo.db, os.path.join(current_app.root_path, 'static'), attachment.stream)
+        attachment_path, attachment_sha256 = blob["path"], blob["sha256"]
+
+    assignments.insert_one({
+        "course_id": cid,
+        "course_code": course.get("code"),
+        "course_title": course.get("title"),
+        "title": title,
+        "description": description,
+        "deadline": deadline,
+        "attachment_name": attachment_name,
+        "attachment_path": attachment_path,
+        "attachment_sha256": attachment_sha256,
+        "created_at": datetime.utcnow(),
+    })
+    refresh_course_students(mongo.db, cid)
+    flash("Assignment created.", "success")
+    return redirect(url_for("teacher.teacher_assignments"))
+
+
+@bp.route("/teacher/assignments/<aid>/update", methods=["POST"]) 
+def teacher_assignments_update(aid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    try:
+        oid = ObjectId(aid)
+    except Exception:
+        flash("Invalid assignment id.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    a = assignments.find_one({"_id": oid})
+    if not a:
+        flash("Assignment not found.", "warning")
+        return redirect(url_for("teacher.teacher_assignments"))
+    course = courses.find_one({"_id": a.get("course_id")})
+    if not course or str(course.get("instructor_id")) != instructor_id:
+        flash("Not authorized to update this assignment.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    title = (request.form.get("title") or "").strip()
+    description = (request.form.get("description") or "").strip()
+    deadline = (request.form.get("deadline") or "").strip()
+    update_doc = {"title": title, "description": description, "deadline": deadline}
+    assignments.update_one({"_id": oid}, {"$set": update_doc})
+    flash("Assignment updated.", "success")
+    return redirect(url_for("teacher.teacher_assignments"))
+
+
+@bp.route("/teacher/assignments/<aid>/delete", methods=["POST"]) 
+def teacher_assignments_delete(aid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    try:
+        oid = ObjectId(aid)
+    except Exception:
+        flash("Invalid assignment id.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    a = assignments.find_one({"_id": oid})
+    if not a:
+        flash("Assignment not found.", "warning")
+        return redirect(url_for("teacher.teacher_assignments"))
+    course = courses.find_one({"_id": a.get("course_id")})
+    if not course or str(course.get("instructor_id")) != instructor_id:
+        flash("Not authorized to delete this assignment.", "danger")
+        return redirect(url_for("teacher.teacher_assignments"))
+    assignments.delete_one({"_id": oid})
+    release(mongo.db, os.path.join(current_app.root_path, 'static'), [a.get("attachment_sha256")])
+    refresh_course_students(mongo.db, a.get("course_id"))
+    flash("Assignment deleted.", "success")
+    return redirect(url_for("teacher.teacher_assignments"))
+
+
+# -------------------------
+# Teacher: Evaluate Submissions
+# -------------------------
+
+EVALUATE_FILTER_ARGS = ("course", "assignment", "status", "page", "per_page")
+
+
+def _evaluate_filters(args) -> dict:
+    # Current list state, carried through grade/delete redirects
+    return {k: args.get(k) for k in EVALUATE_FILTER_ARGS if args.get(k)}
+
+
+def _evaluate_query(instructor_id, course_filter, assignment_filter, status):
+    """Owned courses, their assignments and the submissions filter of the evaluate list (None when empty)."""
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)}, {"code": 1, "title": 1})) if instructor_id else []
+    course_ids = [c["_id"] for c in owned if not course_filter or str(c["_id"]) == course_filter]
+    assign_map = {}
+    if course_ids:
+        for a in assignments.find({"course_id": {"$in": course_ids}}, {"title": 1, "course_id": 1}):
+            assign_map[str(a["_id"])] = a
+    assign_ids = [aid for aid in assign_map if not assignment_filter or aid == assignment_filter]
+    q = None
+    if assign_ids:
+        q = {"assignment_id": refs(assign_ids)}
+        if status == "graded":
+            q["score"] = {"$nin": [None, ""]}
+        elif status == "ungraded":
+            q["score"] = {"$in": [None, ""]}
+    return owned, assign_map, q
+
+
+@bp.route("/teacher/submissions")
+def teacher_evaluate():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    course_filter = (request.args.get("course") or "").strip()
+    assignment_filter = (request.args.get("assignment") or "").strip()
+    status = (request.args.get("status") or "").strip().lower()
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+    except Exception:
+        page = 1
+    try:
+        per_page = min(100, max(10, int(request.args.get("per_page", 25))))
+    except Exception:
+        per_page = 25
+
+    # 1) owned courses, 2) their assignments, 3) one page of submissions, 4) names for that page
+    owned, assign_map, q = _evaluate_query(instructor_id, course_filter, assignment_filter, status)
+    course_codes = {c["_id"]: c.get("code") or "" for c in owned}
+
+    items = []
+    total = 0
+    if q is not None:
+        total = submissions.count_documents(q)
+        page_docs = list(
+            submissions.find(q, {"assignment_id": 1, "student_id": 1, "filename": 1, "file_path": 1,
+                                 "score": 1, "total_marks": 1, "feedback": 1})
+            .sort([("submitted_on", -1), ("_id", -1)])
+            .skip((page - 1) * per_page)
+            .limit(per_page)
+        )
+        stu_oids = [ObjectId(s["student_id"]) for s in page_docs if ObjectId.is_valid(str(s.get("student_id") or ""))]
+        users_map = {str(u["_id"]): u for u in users.find({"_id": {"$in": stu_oids}}, {"name": 1})} if stu_oids else {}
+        for s in page_docs:
+            a = assign_map.get(str(s.get("assignment_id"))) or {}
+            items.append({
+                "_id": str(s.get("_id")),
+                "assignment_title": a.get("title") or "",
+                "course_code": course_codes.get(a.get("course_id")) or "",
+                "student_name": (users_map.get(str(s.get("student_id"))) or {}).get("name", ""),
+                "filename": s.get("filename"),
+                "file_path": s.get("file_path"),
+                "score": s.get("score"),
+                "total_marks": s.get("total_marks"),
+                "feedback": s.get("feedback"),
+            })
+    pages = max(1, (total + per_page - 1) // per_page)
+    course_options = [{"_id": str(c["_id"]), "code": c.get("code"), "title": c.get("title")} for c in owned]
+    assignment_options = [{"_id": aid, "title": a.get("title") or "", "course_code": course_codes.get(a.get("course_id")) or ""}
+                          for aid, a in assign_map.items()]
+    return render_template(
+        "teacher/evaluate.html", user=session.get("user"), role="Teacher", items=items,
+        total=total, page=page, per_page=per_page, pages=pages,
+        course=course_filter, assignment=assignment_filter, status=status,
+        course_options=course_options, assignment_options=assignment_options,
+        filters=_evaluate_filters(request.args),
+    )
+
+
+@bp.route("/teacher/submissions/grading-sheet.csv")
+def teacher_grading_sheet():
+    """The filtered submissions as a CSV to fill in and upload to /api/teacher/grades/bulk."""
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    status = (request.args.get("status") or "").strip().lower()
+    owned, assign_map, q = _evaluate_query(instructor_id, (request.args.get("course") or "").strip(),
+                                           (request.args.get("assignment") or "").strip(), status)
+    course_codes = {c["_id"]: c.get("code") or "" for c in owned}
+    docs = list(submissions.find(q, {"assignment_id": 1, "student_id": 1, "student_name": 1, "score": 1,
+                                     "total_marks": 1, "feedback": 1}).sort([("assignment_id", 1), ("_id", 1)])) if q else []
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["submission_id", "course", "assignment", "student", "score", "total_marks", "feedback"])
+    for s in docs:
+        a = assign_map.get(str(s.get("assignment_id"))) or {}
+        writer.writerow([str(s["_id"]), course_codes.get(a.get("course_id")) or "", a.get("title") or "",
+                         s.get("student_name") or "", s.get("score") or "", s.get("total_marks") or "", s.get("feedback") or ""])
+    return current_app.response_class(buf.getvalue(), mimetype="text/csv",
+                                      headers={"Content-Disposition": "attachment; filename=grading-sheet.csv"})
+
+
+@bp.route("/teacher/submissions/<sid>/grade", methods=["POST"]) 
+def teacher_grade_submission(sid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    
+    # Check if this is a delete action
+    if request.args.get('delete') == 'true':
+        try:
+            oid = ObjectId(sid)
+            # Get the submission to find related records
+            sub_doc = submissions.find_one({"_id": oid})
+            if sub_doc:
+                # Remove grade and feedback from submission
+                submissions.update_one({"_id": oid}, {"$unset": {
+                    "score": "",
+                    "total_marks": "",
+                    "feedback": "",
+                    "graded_on": ""
+                }})
+                
+                # Also remove from results collection
+                if sub_doc.get("assignment_id"):
+                    results.delete_one({
+                        "student_id": ref(sub_doc.get("student_id")),
+                        "component": "Assignment",
+                        "ref_id": ref(sub_doc.get("assignment_id")),
+                    })
+                    grades_changed(mongo.db, [sub_doc.get("student_id")])
+                
+                flash("Grade and feedback deleted successfully.", "success")
+            else:
+                flash("Submission not found.", "danger")
+        except Exception as e:
+            flash(f"Error deleting grade: {str(e)}", "danger")
+        return redirect(url_for("teacher.teacher_evaluate", **_evaluate_filters(request.args)))
+    
+    # Normal save/update action
+    score = request.form.get("score")
+    total_marks = request.form.get("total_marks")
+    feedback = request.form.get("feedback")
+    
+    try:
+        oid = ObjectId(sid)
+        # Update submission with grade and feedback
+        sub_doc = submissions.find_one({"_id": oid})
+        submissions.update_one({"_id": oid}, {"$set": {
+            "score": score,
+            "total_marks": total_marks,
+            "feedback": feedback,
+            "graded_on": datetime.utcnow(),
+        }})
+
+        # Also upsert into results so it shows under student Results
+        if sub_doc:
+            assignment_id = sub_doc.get("assignment_id")
+            student_id = sub_doc.get("student_id")
+            a = None
+            course_code = None
+            aid = as_object_id(assignment_id)
+            a = assignments.find_one({"_id": aid}) if aid else None
+            if a:
+                course_code = a.get("course_code")
+                if not course_code and a.get("course_id"):
+                    course_code = (courses.find_one({"_id": a.get("course_id")}, {"code": 1}) or {}).get("code")
+
+            results.bulk_write([result_update(sub_doc, a, course_code, score, total_marks, feedback, datetime.utcnow())])
+            grades_changed(mongo.db, [student_id])
+        flash("Grade saved.", "success")
+    except Exception:
+        flash("Could not grade submission.", "danger")
+    return redirect(url_for("teacher.teacher_evaluate", **_evaluate_filters(request.args)))
+
+
+@bp.route("/api/teacher/grades/bulk", methods=["POST"])
+def api_teacher_grades_bulk():
+    """Grade many submissions from a CSV/JSON file (form field 'file') or a JSON body.
+
+    Columns: submission_id, score, total_marks, feedback. Returns a status per row.
+    """
+    if not require_teacher():
+        return jsonify({"error": "unauthorized"}), 403
+    instructor_id = session.get("user_id")
+    if not instructor_id:
+        return jsonify({"error": "unauthorized"}), 403
+    try:
+        file = request.files.get("file")
+        rows = parse_grade_rows(file, None if file else request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "no grades to import"}), 400
+    return jsonify(bulk_grade(mongo.db, instructor_id, rows))
+
+
+@bp.route("/api/teacher/progress")
+def api_teacher_progress():
+    """Per-course grade distribution for the students of the teacher's courses (or ?course_id=)."""
+    if not require_teacher():
+        return jsonify({"error": "unauthorized"}), 403
+    instructor_id = session.get("user_id")
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)}, {"code": 1})) if instructor_id else []
+    course_filter = (request.args.get("course_id") or "").strip()
+    if course_filter:
+        owned = [c for c in owned if str(c["_id"]) == course_filter]
+        if not owned:
+            return jsonify({"error": "course not found"}), 404
+    course_ids = [c["_id"] for c in owned]
+    student_ids = enrollments.distinct("user_id", {"course_id": {"$in": course_ids}, "status": {"$ne": "dropped"}}) if course_ids else []
+    # Only the teacher's own courses are reported, whatever else the class takes
+    keys = course_ids + [c["code"] for c in owned if c.get("code")]
+    items = cohort_progress(mongo.db, student_ids, keys) if student_ids else []
+    return jsonify({"students": len(student_ids), "courses": items})
+
+
+@bp.route("/teacher/submissions/<sid>/download")
+def teacher_submission_download(sid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    sub = submissions.find_one({"_id": as_object_id(sid)}) if as_object_id(sid) else None
+    if not sub or not sub.get("file_path"):
+        flash("No file available for this submission.", "warning")
+        return redirect(url_for("teacher.teacher_evaluate"))
+    a = assignments.find_one({"_id": as_object_id(sub.get("assignment_id"))}, {"course_id": 1})
+    course = courses.find_one({"_id": a.get("course_id")}, {"instructor_id": 1}) if a else None
+    if not course or str(course.get("instructor_id")) != instructor_id:
+        flash("Not authorized to download this submission.", "danger")
+        return redirect(url_for("teacher.teacher_evaluate"))
+    try:
+        return send_upload(sub["file_path"], sub.get("filename") or "submission", sub.get("file_sha256"))
+    except Exception:
+        flash("Could not download submission.", "danger")
+        return redirect(url_for("teacher.teacher_evaluate"))
+
+
+# -------------------------
+# Announcements (Teacher + Student)
+# -------------------------
+
+@bp.route("/teacher/announcements", methods=["GET", "POST"]) 
+def teacher_announcements():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    instructor_id = session.get("user_id")
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)})) if instructor_id else []
+    if request.method == "POST":
+        course_id = request.form.get("course_id")
+        title = (request.form.get("title") or "").strip()
+        content = (request.form.get("content") or "").strip()
+        try:
+            cid = ObjectId(course_id)
+        except Exception:
+            flash("Invalid course.", "danger")
+            return redirect(url_for("teacher.teacher_announcements"))
+        course = courses.find_one({"_id": cid})
+        if not course or str(course.get("instructor_id")) != instructor_id:
+            flash("Not authorized for this course.", "danger")
+            return redirect(url_for("teacher.teacher_announcements"))
+        announcements.insert_one({
+            "course_id": cid,
+            "title": title,
+            "content": content,
+            "created_at": datetime.utcnow(),
+            "created_by": ObjectId(instructor_id),
+        })
+        flash("Announcement posted.", "success")
+        return redirect(url_for("teacher.teacher_announcements"))
+    # List teacher announcements, one page at a time
+    cursor = request.args.get("cursor") or None
+    labels = {str(c["_id"]): c.get("code") or "" for c in owned}
+    try:
+        page = feed_page(mongo.db, [c["_id"] for c in owned], labels, cursor, _feed_limit())
+    except ValueError:
+        return redirect(url_for("teacher.teacher_announcements"))
+    # For create form
+    simple_courses = [{"_id": str(c["_id"]), "code": c.get("code"), "title": c.get("title")} for c in owned]
+    return render_template("teacher/announcements.html", user=session.get("user"), role="Teacher", items=page["items"],
+                           courses=simple_courses, next_cursor=page["next_cursor"], cursor=cursor)
+
+
+@bp.route("/api/teacher/announcements")
+def api_teacher_announcements():
+    if not require_teacher():
+        return jsonify({"error": "unauthorized"}), 403
+    instructor_id = session.get("user_id")
+    owned = list(courses.find({"instructor_id": ObjectId(instructor_id)}, {"code": 1})) if instructor_id else []
+    course_id = request.args.get("course_id")
+    if course_id:
+        owned = [c for c in owned if str(c["_id"]) == course_id]
+        if not owned:
+            return jsonify({"error": "course not found"}), 404
+    labels = {str(c["_id"]): c.get("code") or "" for c in owned}
+    try:
+        page = feed_page(mongo.db, [c["_id"] for c in owned], labels, request.args.get("cursor") or None, _feed_limit())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    for a in page["items"]:
+        a["created_at"] = a["created_at"].isoformat() if isinstance(a.get("created_at"), datetime) else None
+    return jsonify(page)
+
+
+def _feed_limit():
+    try:
+        return int(request.args.get("limit", FEED_LIMIT))
+    except Exception:
+        return FEED_LIMIT
+
+
+@bp.route("/teacher/announcements/<aid>/delete", methods=["POST"]) 
+def teacher_announcement_delete(aid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(aid)
+        announcements.delete_one({"_id": oid})
+        flash("Announcement deleted.", "success")
+    except Exception:
+        flash("Could not delete.", "danger")
+    return redirect(url_for("teacher.teacher_announcements"))
+
+@bp.route("/teacher/enrollments/<eid>/decline", methods=["POST"]) 
+def teacher_enrollment_decline(eid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(eid)
+        enrollments.update_one({"_id": oid}, {"$set": {"status": "declined"}})
+        flash("Enrollment declined.", "info")
+    except Exception:
+        flash("Could not decline enrollment.", "danger")
+    return redirect(url_for("teacher.teacher_students"))
+
+
+@bp.route("/teacher/enrollments/<eid>/remove", methods=["POST"]) 
+def teacher_enrollment_remove(eid):
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    try:
+        oid = ObjectId(eid)
+        # Permanently remove the enrollment so the row disappears from the list
+        res = enrollments.delete_one({"_id": oid})
+        if res.deleted_count:
+            flash("Enrollment removed.", "success")
+        else:
+            flash("Enrollment not found.", "warning")
+    except Exception:
+        flash("Could not remove student.", "danger")
+    return redirect(url_for("teacher.teacher_students"))
+
+
+# -------------------------
+# Teacher Profile
+# -------------------------
+
+@bp.route("/teacher/profile", methods=["GET", "POST"]) 
+def teacher_profile_page():
+    if not require_teacher():
+        return redirect(url_for("main.login"))
+    if request.method == "POST":
+        name = (request.form.get("name") or "").strip()
+        email = (request.form.get("email") or "").strip()
+        subject = (request.form.get("subject_specialization") or "").strip()
+        update_doc = {}
+        if name: update_doc["name"] = name
+        if email: update_doc["email"] = email
+        if subject: update_doc["subject_specialization"] = subject
+        if update_doc:
+            users.update_one({"_id": as_object_id(current_user_id())}, {"$set": update_doc})
+            identity_changed(name=name, email=email)
+            flash("Profile updated.", "success")
+    profile = current_user()
+    return render_template("teacher/profile.html", user=session.get("user"), role="Teacher", profile=profile)